@@ -5,6 +5,7 @@ from google.oauth2.service_account import Credentials
 import gspread
 from gspread.exceptions import WorksheetNotFound
 import menu
+import flash
 import os
 import smtplib
 from email.mime.text import MIMEText
@@ -187,7 +188,6 @@ if not st.session_state["login_success"]:
     # ✅ 메인 흐름에서 스피너 표시
     if submitted:
         with st.spinner("접속 중입니다..."):
-            time.sleep(1)
             attempt_login()
 
 # --- 로그인 성공 후 처리 ---
@@ -235,12 +235,11 @@ if st.session_state["login_success"]:
                         if st.button("삭제", key=f"delete_notice_{idx}"):
                             notice_to_delete = row.to_dict()
                             if delete_notice_from_sheet(notice_to_delete):
-                                st.success("공지사항이 성공적으로 삭제되었습니다.")
+                                flash.flash("공지사항이 성공적으로 삭제되었습니다.")
                                 # 세션 상태를 다시 로드하여 UI에 즉시 반영
                                 st.session_state["notices"] = load_notices_from_sheet()
                             else:
-                                st.error("공지사항 삭제에 실패했습니다.")
-                            time.sleep(1)
+                                flash.flash("공지사항 삭제에 실패했습니다.", "error")
                             st.rerun()
 
     # --- 관리자용 공지사항 입력 폼 ---
@@ -262,9 +261,7 @@ if st.session_state["login_success"]:
                     add_notice_to_sheet(new_notice)
                     # 세션 상태를 다시 로드하여 UI에 즉시 반영
                     st.session_state["notices"] = load_notices_from_sheet()
-                    st.success("공지사항이 성공적으로 추가되었습니다.")
-                    time.sleep(1)
-                    st.rerun()
+                    flash.rerun("공지사항이 성공적으로 추가되었습니다.")
 
     with st.expander("⚠️ 오류사항 보고하기"):
         with st.form(key="error_report_form"):
@@ -0,0 +1,114 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_THRESHOLD = 0.95
+
+
+def normalize_question(question):
+    """대소문자·공백·문장부호 차이를 없앤 질문 문자열. (완전 일치 조회 키)"""
+    text = re.sub(r"[^\w\s]", " ", str(question).lower())
+    return " ".join(text.split())
+
+
+class SemanticAnswerCache:
+    """질문 임베딩이 충분히 비슷하면(코사인 유사도 ≥ threshold) 이전 답변을 돌려주는 챗봇 응답 캐시.
+
+    항목은 (관리자 모드, 지식베이스 버전)이 같을 때만 재사용되므로, 관리자용 답변이 일반 사용자에게
+    나가거나 문서가 바뀐 뒤 예전 답변이 나가지 않습니다. 정규화한 질문이 똑같으면 임베딩 없이 바로 찾습니다.
+    LRU(max_entries)와 TTL(ttl_seconds)로 오래된 항목을 내보냅니다.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, threshold=DEFAULT_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "exact_hits": 0, "misses": 0, "evicted": 0, "expired": 0}
+
+    @staticmethod
+    def _scope(is_admin, kb_version):
+        return (bool(is_admin), kb_version)
+
+    def _expire(self, now):
+        expired = [key for key, entry in self._entries.items() if now - entry["created"] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        self.stats["expired"] += len(expired)
+
+    def _hit(self, key, exact):
+        self._entries.move_to_end(key)
+        entry = self._entries[key]
+        entry["hits"] += 1
+        self.stats["hits"] += 1
+        self.stats["exact_hits"] += int(exact)
+        return entry["answer"]
+
+    def lookup_exact(self, question, is_admin, kb_version):
+        """정규화한 질문이 같은 항목의 답변. 없으면 None이며, 이때는 미스로 세지 않습니다. (lookup이 이어서 호출되므로)"""
+        key = (self._scope(is_admin, kb_version), normalize_question(question))
+        with self._lock:
+            self._expire(time.time())
+            if key in self._entries:
+                return self._hit(key, exact=True)
+        return None
+
+    def lookup(self, vector, is_admin, kb_version):
+        """같은 범위의 항목 중 가장 비슷한 질문의 답변. 임계값 미만이면 None."""
+        vector = self._unit(vector)
+        scope = self._scope(is_admin, kb_version)
+        with self._lock:
+            self._expire(time.time())
+            keys = [key for key in self._entries if key[0] == scope]
+            if keys:
+                similarities = np.stack([self._entries[key]["vector"] for key in keys]) @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    return self._hit(keys[best], exact=False)
+            self.stats["misses"] += 1
+        return None
+
+    def store(self, question, vector, answer, is_admin, kb_version):
+        key = (self._scope(is_admin, kb_version), normalize_question(question))
+        with self._lock:
+            self._entries[key] = {"vector": self._unit(vector), "answer": answer, "created": time.time(), "hits": 0}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evicted"] += 1
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def summary(self):
+        """적중률 등 통계 사전. (관리자 화면 표시용)"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return dict(self.stats, entries=len(self._entries), lookups=lookups,
+                        hit_rate=(self.stats["hits"] / lookups) if lookups else 0.0)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """프로세스 전체가 공유하는 응답 캐시. (새로고침 버튼의 st.cache_resource.clear()에 영향받지 않도록 모듈 전역)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticAnswerCache()
+        return _cache
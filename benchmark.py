@@ -0,0 +1,298 @@
+"""스케줄 배정(5)·방배정(6) 페이지를 합성 데이터로 실행해 인원 규모별 시간·메모리·공정성 지표를 기록합니다.
+
+    python benchmark.py --sizes 50 100 200 500 --repeat 3
+
+페이지 코드를 그대로 streamlit AppTest로 실행하며, 구글 시트 대신 fake_sheets의 메모리 시트를 씁니다.
+결과는 표로 출력하고 .metrics/benchmarks.jsonl에 한 줄씩 추가하며, 같은 조건의 직전 기록과 비교한 변화율을 함께 보여 줍니다.
+배정 결과 편집기의 한 칸 편집은 페이지 전체 재실행(fragment 도입 전 동작)과 편집기 fragment만 재실행(현재 동작)을 함께 잽니다.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import fake_sheets
+import instrumentation
+import job_runner
+import load_test
+import synthetic_data
+import versioned_memo
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PAGE_SCHEDULE = os.path.join(ROOT, "pages", "5 스케줄_배정.py")
+PAGE_ROOM = os.path.join(ROOT, "pages", "6 방배정.py")
+RESULTS_PATH = os.path.join(instrumentation.METRICS_DIR, "benchmarks.jsonl")
+BENCH_TIMINGS_PATH = os.path.join(instrumentation.METRICS_DIR, "benchmark_timings.jsonl")
+RUN_TIMEOUT = 1800
+ADMIN_SESSION = {"login_success": True, "is_admin": True, "admin_mode": True, "name": "벤치마크", "employee_id": "00000"}
+SCHEDULE_FAIRNESS_ROWS = ["오전누적", "오후누적", "오전당직누적", "오후당직누적"]
+ROOM_FAIRNESS_ROWS = ["이른방 합계", "늦은방 합계", "오전당직", "오후당직"]
+EDIT_MODES = {"전체": False, "fragment": True}
+
+
+def _open_page(path):
+    at = AppTest.from_file(path, default_timeout=RUN_TIMEOUT)
+    for key, value in fake_sheets.FAKE_SECRETS.items():
+        at.secrets[key] = value
+    for key, value in ADMIN_SESSION.items():
+        at.session_state[key] = value
+    return at
+
+
+def _open_session_page(path, session_id):
+    at = load_test.SessionAppTest(path, session_id=session_id, default_timeout=RUN_TIMEOUT)
+    for key, value in ADMIN_SESSION.items():
+        at.session_state[key] = value
+    return at
+
+
+def _check(at, step):
+    if at.exception:
+        raise RuntimeError(f"{step}: {at.exception[0].value}")
+
+
+def _timed_run(at, step, button_label=None, job_key=None):
+    """페이지를 한 번 실행(또는 button_label 버튼 클릭)하고 (경과 초, 실행 중 tracemalloc 최고치 바이트)를 반환합니다.
+
+    job_key가 있으면 버튼이 제출한 백그라운드 작업(세션의 job_key)이 끝날 때까지 기다렸다가 결과를 반영하는 재실행까지 잽니다.
+    """
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    if button_label is None:
+        at.run()
+    else:
+        next(b for b in at.button if button_label in str(b.label)).click().run()
+    if job_key is not None:
+        _check(at, step)
+        _wait_for_job(at.session_state[job_key])
+        at.run()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+    _check(at, step)
+    return elapsed, peak
+
+
+def _wait_for_job(job_id):
+    runner = job_runner.get_job_runner()
+    deadline = time.time() + RUN_TIMEOUT
+    while time.time() < deadline:
+        job = runner.status(job_id)
+        if job and job["state"] != "running":
+            if job["state"] == "error":
+                raise RuntimeError(f"배정 작업 실패: {job['error']}")
+            return
+        time.sleep(0.05)
+    raise TimeoutError(f"배정 작업 {job_id}가 끝나지 않았습니다.")
+
+
+def _spread(frame, rows):
+    """'항목' 행 × 인원 열 표에서 행별 인원 간 편차(최대-최소)와 표준편차."""
+    if frame is None or frame.empty:
+        return {}
+    table = frame.set_index(frame.columns[0])
+    metrics = {}
+    for row in rows:
+        if row in table.index:
+            values = pd.to_numeric(table.loc[row], errors="coerce").dropna()
+            metrics[f"{row} 편차"] = int(values.max() - values.min()) if len(values) else 0
+            metrics[f"{row} 표준편차"] = round(float(values.std(ddof=0)), 3) if len(values) else 0.0
+    return metrics
+
+
+def run_once(month_str, workbook, seed):
+    """같은 합성 시트로 5번(배정 + 시트 저장) → 6번(방배정 + 시트 저장) 페이지를 차례로 실행합니다."""
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    versioned_memo.clear()
+    random.seed(seed)
+    np.random.seed(seed)
+    spreadsheet = fake_sheets.FakeSpreadsheet(workbook)
+    wall, peak = {}, {}
+    with fake_sheets.install(spreadsheet), instrumentation.capture() as events:
+        schedule_page = _open_page(PAGE_SCHEDULE)
+        wall["5 로드"], peak["5 로드"] = _timed_run(schedule_page, "5 로드")
+        wall["5 배정"], peak["5 배정"] = _timed_run(schedule_page, "5 배정", "스케줄 배정 수행", "schedule_job_id")
+        schedule_results = schedule_page.session_state["assignment_results"]
+
+        room_page = _open_page(PAGE_ROOM)
+        wall["6 로드"], peak["6 로드"] = _timed_run(room_page, "6 로드")
+        wall["6 배정"], peak["6 배정"] = _timed_run(room_page, "6 배정", "방배정 수행", "room_job_id")
+        room_results = room_page.session_state["assignment_results"]
+
+    stages = defaultdict(lambda: {"횟수": 0, "초": 0.0})
+    for page, stage_name, seconds in events:
+        stage = stages[f"{page.split(' ')[0]} {stage_name}"]
+        stage["횟수"] += 1
+        stage["초"] += seconds
+    fairness = _spread(schedule_results["summary_df_initial"], SCHEDULE_FAIRNESS_ROWS)
+    fairness.update(_spread(room_results["stats_df"], ROOM_FAIRNESS_ROWS))
+    fairness["방배정 요청 반영"] = len(room_results.get("applied_messages", []))
+    fairness["방배정 요청 미반영"] = len(room_results.get("unapplied_messages", []))
+    return {"wall": wall, "peak": peak, "stages": dict(stages), "fairness": fairness}
+
+
+def _time_cell_edits(at, page, key, repeat, timings):
+    """key 편집기의 첫 행 한 칸을 다른 행의 값으로 바꾸는 편집을 모드별로 repeat번씩 번갈아 잽니다."""
+    editor = next(e for e in at.get("arrow_data_frame") if e.proto.id.endswith(f"-{key}"))
+    column = next(col for col in editor.value.columns if col not in ("날짜", "요일"))
+    value = str(editor.value[column].iloc[1])
+    for _ in range(repeat):
+        for mode, fragment_only in EDIT_MODES.items():
+            started = time.perf_counter()
+            at.edit_cell(key, 0, column, value, fragment_only=fragment_only)
+            timings[f"{page} 셀 편집 ({mode})"].append(time.perf_counter() - started)
+            _check(at, f"{page} 셀 편집 ({mode})")
+            if fragment_only:
+                at.run()  # fragment 실행 뒤에는 트리가 fragment 부분뿐이므로 다음 편집 전에 전체를 다시 그립니다.
+
+
+def cell_edit_timings(workbook, seed, repeat):
+    """배정을 마친 5번·6번 페이지에서 결과 편집기 한 칸을 고칠 때의 재실행 시간 (모드별 중앙값, 초)."""
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    versioned_memo.clear()
+    random.seed(seed)
+    np.random.seed(seed)
+    spreadsheet = fake_sheets.FakeSpreadsheet(workbook)
+    timings = defaultdict(list)
+    # 기본 AppTest는 실행마다 fragment 기록을 버리므로, fragment만 다시 실행할 수 있는 부하 테스트용 AppTest를 씁니다.
+    with fake_sheets.install(spreadsheet):
+        with load_test.shared_runtime():
+            schedule_page = _open_session_page(PAGE_SCHEDULE, "benchmark-edit-5")
+            _timed_run(schedule_page, "5 로드")
+            _timed_run(schedule_page, "5 배정", "스케줄 배정 수행", "schedule_job_id")
+            key = f"edited_schedule_table_{schedule_page.session_state['editor_key_version']}"
+            _time_cell_edits(schedule_page, "5", key, repeat, timings)
+
+        with load_test.shared_runtime():
+            room_page = _open_session_page(PAGE_ROOM, "benchmark-edit-6")
+            _timed_run(room_page, "6 로드")
+            _timed_run(room_page, "6 배정", "방배정 수행", "room_job_id")
+            _time_cell_edits(room_page, "6", "room_editor", repeat, timings)
+    return {step: round(statistics.median(values), 4) for step, values in timings.items()}
+
+
+def benchmark(staff_count, repeat, request_density, holiday_pattern, seed):
+    month_str = synthetic_data.next_month_str()
+    workbook = synthetic_data.generate(month_str, staff_count, request_density=request_density,
+                                       holiday_pattern=holiday_pattern, seed=seed)
+    runs = [run_once(month_str, workbook, seed) for _ in range(repeat)]
+    # 최고 메모리는 tracemalloc이 실행을 느리게 하므로 시간 측정과 따로 한 번 더 실행해 잽니다.
+    tracemalloc.start()
+    try:
+        traced = run_once(month_str, workbook, seed)
+    finally:
+        tracemalloc.stop()
+
+    cell_edit = cell_edit_timings(workbook, seed, repeat)
+
+    stage_names = runs[0]["stages"].keys()
+    return {
+        "ts": time.time(),
+        "commit": _git_commit(),
+        "month": month_str,
+        "staff": staff_count,
+        "request_density": request_density,
+        "holidays": holiday_pattern,
+        "seed": seed,
+        "repeat": repeat,
+        "wall_s": {step: round(statistics.median(run["wall"][step] for run in runs), 4) for step in runs[0]["wall"]},
+        "stages_s": {name: {"횟수": runs[0]["stages"][name]["횟수"],
+                            "초": round(statistics.median(run["stages"][name]["초"] for run in runs if name in run["stages"]), 4)}
+                     for name in stage_names},
+        "peak_mb": {step: round(value / 2 ** 20, 1) for step, value in traced["peak"].items()},
+        "cell_edit_s": cell_edit,
+        "fairness": runs[0]["fairness"],
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _condition(record):
+    return (record["staff"], record["request_density"], record["holidays"], record["seed"])
+
+
+def _previous_records():
+    """조건별 가장 최근 기록. (변화율 비교용)"""
+    previous = {}
+    if os.path.exists(RESULTS_PATH):
+        with open(RESULTS_PATH, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                previous[_condition(record)] = record
+    return previous
+
+
+def summary_table(records, previous):
+    rows = []
+    for record in records:
+        before = previous.get(_condition(record))
+        row = {"인원": record["staff"]}
+        for step, seconds in record["wall_s"].items():
+            row[f"{step}(s)"] = seconds
+            if before and before["wall_s"].get(step):
+                row[f"{step} 변화(%)"] = round((seconds / before["wall_s"][step] - 1) * 100, 1)
+        for step, seconds in record.get("cell_edit_s", {}).items():
+            row[f"{step}(s)"] = seconds
+        for step, mb in record["peak_mb"].items():
+            row[f"{step} 최고(MB)"] = mb
+        for key in ("오전누적 편차", "오후누적 편차", "이른방 합계 편차", "오후당직 편차", "방배정 요청 미반영"):
+            row[key] = record["fairness"].get(key)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 100, 200, 500], help="근무자 수 목록")
+    parser.add_argument("--repeat", type=int, default=3, help="시간 측정 반복 횟수 (중앙값 사용)")
+    parser.add_argument("--request-density", type=float, default=1.0, help="1인당 평균 요청 건수")
+    parser.add_argument("--holidays", choices=sorted(synthetic_data.HOLIDAY_PATTERNS), default="single")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-save", action="store_true", help="결과를 benchmarks.jsonl에 남기지 않음")
+    args = parser.parse_args()
+
+    # 벤치마크 실행의 단계 기록이 관리자 계측 패널의 운영 통계에 섞이지 않도록 다른 파일에 남깁니다.
+    instrumentation.LOG_PATH = BENCH_TIMINGS_PATH
+
+    previous = _previous_records()
+    records = []
+    for staff_count in args.sizes:
+        print(f"▶ 인원 {staff_count}명 실행 중...", flush=True)
+        record = benchmark(staff_count, args.repeat, args.request_density, args.holidays, args.seed)
+        records.append(record)
+        if not args.no_save:
+            os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+            with open(RESULTS_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    with pd.option_context("display.max_columns", None, "display.width", 200):
+        print(summary_table(records, previous).to_string(index=False))
+        for record in records:
+            stages = pd.DataFrame([{"단계": name, **values} for name, values in record["stages_s"].items()])
+            print(f"\n[인원 {record['staff']}명] 단계별 시간 (중앙값)")
+            print(stages.sort_values("초", ascending=False).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import calendar
+import datetime
+import pandas as pd
+import streamlit as st
+
+# 캘린더 이벤트 색상 및 라벨 (마스터 보기 / 요청사항 입력 / 방배정 요청 입력 페이지 공통)
+MASTER_COLORS = {"오전": "#48A6A7", "오후": "#FCB454", "오전 & 오후": "#F38C79"}
+SATURDAY_COLORS = {"토요근무": "#6A5ACD", "당직": "#FF6347"}
+CLOSING_DAY_COLOR = "#DC143C"  # 붉은색 계열 (Crimson)
+ROOM_REQUEST_COLOR = "#7C8EC7"
+REQUEST_COLORS = {
+    "휴가": "#A1C1D3", "학회": "#B4ABE4", "보충 어려움(오전)": "#FFD3B5", "보충 어려움(오후)": "#FFD3B5",
+    "보충 불가(오전)": "#FFB6C1", "보충 불가(오후)": "#FFB6C1", "꼭 근무(오전)": "#C3E6CB",
+    "꼭 근무(오후)": "#C3E6CB",
+}
+REQUEST_LABELS = {
+    "휴가": "휴가🎉", "학회": "학회📚", "보충 어려움(오전)": "보충 어려움(오전)", "보충 어려움(오후)": "보충 어려움(오후)",
+    "보충 불가(오전)": "보충 불가(오전)", "보충 불가(오후)": "보충 불가(오후)", "꼭 근무(오전)": "꼭근무(오전)",
+    "꼭 근무(오후)": "꼭근무(오후)",
+}
+ROOM_REQUEST_LABELS = {
+    "1번방": "1번방", "2번방": "2번방", "3번방": "3번방", "4번방": "4번방", "5번방": "5번방",
+    "6번방": "6번방", "7번방": "7번방", "8번방": "8번방", "9번방": "9번방", "10번방": "10번방",
+    "11번방": "11번방", "당직 안됨": "당직🚫", "오전 당직 안됨": "오전당직🚫", "오후 당직 안됨": "오후당직🚫",
+    "당직 아닌 이른방": "당직아닌이른방", "이른방 제외": "이른방 제외", "늦은방 제외": "늦은방 제외",
+    "8:30": "8:30", "9:00": "9:00", "9:30": "9:30", "10:00": "10:00", "오전 당직": "오전당직",
+    "오후 당직": "오후당직",
+}
+
+EVENT_KINDS = ("master", "saturday", "request", "room_request", "closing_day")
+_EVENT_COLUMNS = ["이름", "title", "start", "end", "color"]
+
+
+def _group_events(df, source):
+    """이름별 이벤트 리스트 딕셔너리로 변환합니다."""
+    index = {}
+    if df.empty:
+        return index
+    for person, group in df.groupby("이름", sort=False):
+        records = group.drop(columns=["이름"]).to_dict("records")
+        for record in records:
+            if not record.get("end"):
+                record.pop("end", None)
+            record["source"] = source
+        index[str(person)] = records
+    return index
+
+
+def _month_weekday_frame(year, month, week_labels, closing_dates_set):
+    """해당 월 평일(휴관일 제외)의 날짜/요일/주차 프레임을 만듭니다."""
+    weekday_map = {0: "월", 1: "화", 2: "수", 3: "목", 4: "금"}
+    _, last_day = calendar.monthrange(year, month)
+    first_sunday = next((day for day in range(1, 8) if datetime.date(year, month, day).weekday() == 6), None)
+    rows = []
+    for day_num in range(1, last_day + 1):
+        date_obj = datetime.date(year, month, day_num)
+        if date_obj in closing_dates_set or date_obj.weekday() not in weekday_map:
+            continue
+        if first_sunday is None: week_num = (date_obj.day + datetime.date(year, month, 1).weekday()) // 7
+        else: week_num = (day_num - first_sunday) // 7 + 1 if day_num >= first_sunday else 0
+        if week_num >= len(week_labels): continue
+        rows.append({"start": date_obj.strftime("%Y-%m-%d"), "주차": week_labels[week_num], "요일": weekday_map[date_obj.weekday()]})
+    return pd.DataFrame(rows, columns=["start", "주차", "요일"])
+
+
+def build_master_event_index(df_master, year, month, week_labels, closing_dates_set):
+    """전체 근무자의 마스터(평일) 이벤트를 한 번에 생성합니다. (특정 주차 > 매주 > 근무없음 순으로 적용)"""
+    if df_master is None or df_master.empty:
+        return {}
+    master = df_master[["이름", "주차", "요일", "근무여부"]].astype({"이름": str, "주차": str, "요일": str})
+    specific = master[master["주차"] != "매주"].drop_duplicates(subset=["이름", "주차", "요일"])
+    every_week = master[master["주차"] == "매주"].drop_duplicates(subset=["이름", "요일"]).drop(columns=["주차"])
+
+    days = _month_weekday_frame(year, month, week_labels, closing_dates_set)
+    names = pd.DataFrame({"이름": master["이름"].drop_duplicates()})
+    grid = names.merge(days, how="cross")
+    grid = grid.merge(specific, on=["이름", "주차", "요일"], how="left")
+    grid = grid.merge(every_week, on=["이름", "요일"], how="left", suffixes=("", "_매주"))
+    grid["title"] = grid["근무여부"].fillna(grid["근무여부_매주"]).fillna("근무없음")
+
+    grid = grid[(grid["title"] != "근무없음") & (grid["title"].astype(str) != "")]
+    grid["title"] = grid["title"].astype(str)
+    grid["color"] = grid["title"].map(MASTER_COLORS).fillna("#E0E0E0")
+    grid["end"] = None
+    return _group_events(grid[_EVENT_COLUMNS], "master")
+
+
+def build_saturday_event_index(df_saturday_schedule, names, year, month):
+    """토요/휴일 스케줄에서 근무자별 토요근무/당직 이벤트를 생성합니다."""
+    if df_saturday_schedule is None or df_saturday_schedule.empty or not names:
+        return {}
+    month_schedule = df_saturday_schedule[(df_saturday_schedule['날짜'].dt.year == year) & (df_saturday_schedule['날짜'].dt.month == month)]
+    if month_schedule.empty:
+        return {}
+    starts = month_schedule['날짜'].dt.strftime("%Y-%m-%d")
+    work_col = month_schedule['근무'] if '근무' in month_schedule.columns else pd.Series("", index=month_schedule.index)
+    on_call_col = month_schedule['당직'] if '당직' in month_schedule.columns else pd.Series("", index=month_schedule.index)
+    work = work_col.where(work_col.map(lambda v: isinstance(v, str)), "")
+    on_call = on_call_col.where(on_call_col.map(lambda v: isinstance(v, str)), "").str.strip()
+
+    frames = []
+    for person in names:
+        is_work = work.str.contains(person, regex=False)
+        is_on_call = on_call == person
+        if is_work.any():
+            frames.append(pd.DataFrame({"이름": person, "title": "토요근무", "start": starts[is_work], "order": 0}))
+        if is_on_call.any():
+            frames.append(pd.DataFrame({"이름": person, "title": "당직", "start": starts[is_on_call], "order": 1}))
+    if not frames:
+        return {}
+    events = pd.concat(frames)
+    events["_pos"] = events.index.map(month_schedule.index.get_loc)
+    events = events.sort_values(["이름", "_pos", "order"], kind="stable")
+    events["color"] = events["title"].map(SATURDAY_COLORS)
+    events["end"] = None
+    return _group_events(events[_EVENT_COLUMNS], "saturday")
+
+
+def _parse_date_info(df, allow_range):
+    """'날짜정보' 컬럼을 (행 번호, 시작일, 종료일) 형태로 풀어냅니다."""
+    info = df["날짜정보"].fillna("").astype(str)
+    valid = info.str.strip() != ""
+    is_range = info.str.contains("~", regex=False) & valid if allow_range else pd.Series(False, index=df.index)
+
+    singles = info[valid & ~is_range].str.split(",").explode().str.strip()
+    singles = singles.str.split(" (", regex=False).str[0]
+    single_dates = pd.to_datetime(singles, format="%Y-%m-%d", errors="coerce")
+    single_frame = pd.DataFrame({"_row": singles.index, "start": single_dates.values, "end": pd.NaT}).dropna(subset=["start"])
+
+    ranges = info[is_range].str.split("~", n=1, expand=True)
+    if ranges.empty:
+        range_frame = pd.DataFrame(columns=["_row", "start", "end"])
+    else:
+        range_frame = pd.DataFrame({
+            "_row": ranges.index,
+            "start": pd.to_datetime(ranges[0].str.strip(), format="%Y-%m-%d", errors="coerce").values,
+            "end": (pd.to_datetime(ranges[1].str.strip(), format="%Y-%m-%d", errors="coerce") + pd.Timedelta(days=1)).values,
+        }).dropna(subset=["start", "end"])
+
+    parsed = pd.concat([single_frame, range_frame]).sort_values("_row", kind="stable")
+    parsed["start"] = parsed["start"].dt.strftime("%Y-%m-%d")
+    parsed["end"] = parsed["end"].dt.strftime("%Y-%m-%d").where(parsed["end"].notna(), None)
+    return parsed
+
+
+def build_request_event_index(df_request):
+    """요청사항 시트의 모든 근무자 요청을 이벤트로 변환합니다. ('요청 없음' 제외)"""
+    if df_request is None or df_request.empty or "날짜정보" not in df_request.columns:
+        return {}
+    requests = df_request[df_request["분류"] != "요청 없음"].reset_index(drop=True)
+    parsed = _parse_date_info(requests, allow_range=True)
+    if parsed.empty:
+        return {}
+    events = parsed.join(requests[["이름", "분류"]], on="_row")
+    events["이름"] = events["이름"].astype(str)
+    events["title"] = events["분류"].map(REQUEST_LABELS).fillna(events["분류"]).astype(str)
+    events["color"] = events["분류"].map(REQUEST_COLORS).fillna("#E0E0E0")
+    events = events.sort_values(["이름", "_row"], kind="stable")
+    return _group_events(events[_EVENT_COLUMNS], "request")
+
+
+def build_room_request_event_index(df_room_request):
+    """방배정 요청 시트의 모든 근무자 요청을 이벤트로 변환합니다."""
+    if df_room_request is None or df_room_request.empty or "날짜정보" not in df_room_request.columns:
+        return {}
+    requests = df_room_request.reset_index(drop=True)
+    parsed = _parse_date_info(requests, allow_range=False)
+    if parsed.empty:
+        return {}
+    events = parsed.join(requests[["이름", "분류"]], on="_row")
+    events["이름"] = events["이름"].astype(str)
+    events["title"] = events["분류"].map(ROOM_REQUEST_LABELS).fillna(events["분류"]).astype(str)
+    events["color"] = ROOM_REQUEST_COLOR
+    events["end"] = events["start"]
+    events["allDay"] = True
+    events = events.sort_values(["이름", "_row"], kind="stable")
+    return _group_events(events[_EVENT_COLUMNS + ["allDay"]], "room_request")
+
+
+def build_closing_day_events(df_closing_days):
+    """휴관일 이벤트를 생성합니다. (모든 근무자 공통)"""
+    if df_closing_days is None or df_closing_days.empty:
+        return []
+    return [{"title": "휴관일", "start": d, "color": CLOSING_DAY_COLOR, "source": "closing_day"}
+            for d in df_closing_days['날짜'].dt.strftime("%Y-%m-%d")]
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _build_base_event_index(_df_master, _df_saturday, _df_closing_days, year, month, week_labels, base_version):
+    """마스터/토요·휴일/휴관일 이벤트. 요청이 제출되어도 바뀌지 않는 무거운 부분이라 따로 캐싱합니다."""
+    closing_dates_set = set(_df_closing_days['날짜'].dt.date) if _df_closing_days is not None and not _df_closing_days.empty else set()
+    names = set()
+    if _df_master is not None and not _df_master.empty and "이름" in _df_master.columns:
+        names.update(_df_master["이름"].astype(str).unique())
+    names.discard("")
+    return {
+        "master": build_master_event_index(_df_master, year, month, list(week_labels), closing_dates_set),
+        "saturday": build_saturday_event_index(_df_saturday, sorted(names), year, month),
+        "closing_day": build_closing_day_events(_df_closing_days),
+        "_saturday_source": (_df_saturday, year, month),
+    }
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _build_request_event_index(_df_request, _df_room_request, request_version):
+    """요청/방배정 요청 이벤트. 제출마다 버전이 바뀌므로 가벼운 이 부분만 다시 만듭니다."""
+    return {
+        "request": build_request_event_index(_df_request),
+        "room_request": build_room_request_event_index(_df_room_request),
+    }
+
+
+def get_calendar_event_index(df_master, df_request, df_room_request, df_saturday, df_closing_days, year, month, week_labels,
+                             base_version, request_version):
+    """월 + 데이터 버전 단위로 전체 근무자의 캘린더 이벤트 인덱스를 반환합니다.
+
+    base_version은 마스터/토요·휴일/휴관일, request_version은 요청/방배정 요청 시트를 불러올 때 정해 둔
+    버전 키(예: dataset_store.versions(...))이며, 여기서 표를 다시 해시하지 않습니다.
+    요청이 제출되면 request_version만 바뀌므로 마스터/토요 이벤트는 다시 만들지 않습니다.
+    같은 월/데이터라면 모든 세션이 하나의 인덱스를 공유하므로, 반환값은 수정하지 말고
+    get_user_events로 필요한 근무자의 이벤트만 꺼내 쓰세요.
+    """
+    base = _build_base_event_index(df_master, df_saturday, df_closing_days, year, month, tuple(week_labels), base_version)
+    requests = _build_request_event_index(df_request, df_room_request, request_version)
+    return {**base, **requests}
+
+
+def get_user_events(event_index, name, kinds=EVENT_KINDS):
+    """인덱스에서 특정 근무자의 이벤트를 종류 순서대로 꺼냅니다."""
+    events = []
+    for kind in kinds:
+        if kind == "closing_day":
+            events.extend(dict(e) for e in event_index["closing_day"])
+        elif kind == "saturday" and str(name) not in event_index["saturday"]:
+            # 마스터에 없는 근무자는 토요 이벤트를 그때그때 만듭니다.
+            df_saturday, year, month = event_index["_saturday_source"]
+            events.extend(build_saturday_event_index(df_saturday, [str(name)], year, month).get(str(name), []))
+        else:
+            events.extend(dict(e) for e in event_index[kind].get(str(name), []))
+    return events
@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+from openai import OpenAI
+
+HEALTH_TTL_SECONDS = 300
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="chat-retrieval")
+
+
+@st.cache_data(ttl=HEALTH_TTL_SECONDS, show_spinner=False)
+def check_openai(_api_key):
+    """OpenAI 연결 확인. 성공만 HEALTH_TTL_SECONDS 동안 캐시하고, 실패는 예외로 올려 다음 실행에서 다시 확인합니다.
+
+    매 실행마다 models.list()를 호출하던 연결 테스트를 대신합니다.
+    """
+    OpenAI(api_key=_api_key, timeout=10, max_retries=0).models.list()
+    return True
+
+
+def start_retrieval(search, query):
+    """문서 검색 search(query)를 백그라운드 스레드에서 시작하고 Future를 반환합니다.
+
+    search는 retriever.invoke(질문) 또는 vectorstore.similarity_search_by_vector(질문 임베딩) 등입니다.
+    질문을 받자마자 시작해, 사용자 메시지를 그리는 동안 검색이 함께 진행됩니다.
+    (검색 스레드는 st.* 를 호출하지 않습니다)
+    """
+    return _executor.submit(search, query)
+
+
+def stream_answer(chain, retrieval, inputs, format_context=None):
+    """검색 결과를 기다린 뒤 chain.stream()의 토큰을 차례로 내보내는 생성기. (st.write_stream 입력)
+
+    chain은 inputs와 'context'를 받아 문자열 조각을 내보내는 runnable(prompt | llm | StrOutputParser 등)입니다.
+    format_context가 있으면 검색된 문서 목록을 문자열로 바꿔 넘깁니다.
+    """
+    docs = retrieval.result()
+    context = format_context(docs) if format_context else docs
+    yield from chain.stream(dict(inputs, context=context))
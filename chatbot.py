@@ -1,92 +1,38 @@
 import os
 import streamlit as st
-from openai import OpenAI
-from langchain_core.documents import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import FAISS
-from langchain.chains import create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_core.prompts import ChatPromptTemplate
-import git
-import shutil
 import traceback
 
-# 데이터 로드 함수 (기존과 동일)
+import chat_pipeline
+
+# 데이터 로드 함수 (로컬 작업 트리 + 디스크에 저장된 인덱스, 바뀐 조각만 재임베딩)
 @st.cache_resource(show_spinner="데이터를 준비하는 중...")
 def load_knowledge_base():
-    repo_path = "./temp_repo"
+    import knowledge_base
     try:
-        if os.path.exists(repo_path):
-            shutil.rmtree(repo_path, ignore_errors=True)
-
-        git.Repo.clone_from("https://github.com/HUI135/gc-endoscopy-room.git", repo_path, branch="main")
-
-        docs = []
-        file_extensions_to_load = ['.py', '.md', '.txt']
-        
-        for root, _, files in os.walk(repo_path):
-            if ".git" in root:
-                continue
-            for file_name in files:
-                if any(file_name.endswith(ext) for ext in file_extensions_to_load):
-                    file_path = os.path.join(root, file_name)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                        doc = Document(page_content=content, metadata={"source": file_path})
-                        docs.append(doc)
-                    except Exception as e:
-                        st.warning(f"'{file_name}' 파일을 읽는 중 오류 발생: {e}")
-
-        if not docs:
-            st.warning("⚠️ 리포지토리에서 .py, .md, .txt 파일을 로드하지 못했습니다. 리포지토리 내용을 확인하세요.")
-            return None
-
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        splits = text_splitter.split_documents(docs)
-
-        if not splits:
-            st.warning("⚠️ 파일을 분석 가능한 텍스트 조각으로 나누지 못했습니다.")
-            return None
-
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small", api_key=st.secrets["gpt"]["openai_api_key"])
-        vectorstore = FAISS.from_documents(splits, embeddings)
+        provider = st.secrets.get("knowledge_base", {}).get("embedding_provider")
+        vectorstore, _ = knowledge_base.load_vectorstore(api_key=st.secrets["gpt"]["openai_api_key"], provider=provider)
+        if vectorstore is None:
+            st.warning("⚠️ .py, .md, .txt 파일을 분석 가능한 텍스트 조각으로 나누지 못했습니다. 앱 폴더 내용을 확인하세요.")
         return vectorstore
     except Exception as e:
+        # 실패를 None으로 돌려주면 st.cache_resource가 그대로 캐시하므로, 알린 뒤 다시 올려 다음 질문에서 재시도합니다.
         st.error(f"❌ 데이터 로딩 중 오류가 발생했습니다: {e}")
         st.code(traceback.format_exc())
-        return None
-    finally:
-        if os.path.exists(repo_path):
-            shutil.rmtree(repo_path, ignore_errors=True)
-
-# 챗봇 설정 및 렌더링 함수
-def render_chatbot():
-    # API 키 설정 및 검사
-    try:
-        OPENAI_API_KEY = st.secrets["gpt"]["openai_api_key"]
-        os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
-    except (KeyError, TypeError):
-        st.error("⚠️ 시스템 설정 오류가 발생했습니다. 관리자에게 문의하세요.")
-        return
+        raise
 
-    # OpenAI 연결 테스트
-    try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        client.models.list()
-    except Exception as e:
-        st.error(f"시스템 연결 오류: {e}")
-        return
-
-    # 데이터 로드
+# 챗봇 체인 (첫 질문 때 langchain을 불러와 만들고, 이후에는 재사용)
+@st.cache_resource(show_spinner="데이터를 준비하는 중...")
+def load_chat_chain(api_key):
+    """(retriever, 답변 생성 체인). 데이터 로드에 실패하면 None."""
     vectorstore = load_knowledge_base()
     if vectorstore is None:
-        st.error("데이터베이스 초기화에 실패했습니다. 위의 로그를 확인하여 원인을 파악하거나 관리자에게 문의하세요.")
-        return
+        return None
+
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_openai import ChatOpenAI
 
-    # 챗봇 설정
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, api_key=OPENAI_API_KEY)
+    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, api_key=api_key)
     system_prompt = (
         "You are a friendly assistant for the GC Endoscopy app, designed to help general users of the Gangnam Center endoscopy services. "
         "Answer questions clearly and simply, focusing solely on how to use the app for general users (e.g., booking appointments, viewing hospital information, submitting requests like schedule or room assignment changes) "
@@ -100,7 +46,24 @@ def render_chatbot():
         [("system", system_prompt), ("human", "{input}")]
     )
     question_answer_chain = create_stuff_documents_chain(llm, prompt)
-    rag_chain = create_retrieval_chain(vectorstore.as_retriever(), question_answer_chain)
+    return vectorstore.as_retriever(), question_answer_chain
+
+# 챗봇 설정 및 렌더링 함수
+def render_chatbot():
+    # API 키 설정 및 검사
+    try:
+        OPENAI_API_KEY = st.secrets["gpt"]["openai_api_key"]
+        os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
+    except (KeyError, TypeError):
+        st.error("⚠️ 시스템 설정 오류가 발생했습니다. 관리자에게 문의하세요.")
+        return
+
+    # OpenAI 연결 테스트 (성공 결과는 잠시 캐시)
+    try:
+        chat_pipeline.check_openai(OPENAI_API_KEY)
+    except Exception as e:
+        st.error(f"시스템 연결 오류: {e}")
+        return
 
     # 세션 상태 초기화
     if "messages" not in st.session_state:
@@ -118,28 +81,36 @@ def render_chatbot():
 
             # <<-- 변경점 2: 사용자 입력을 받기 위해 st.chat_input 사용
             if user_input := st.chat_input("궁금한 점을 입력하세요..."):
+                # 관리자 모드 확인 로직 (기존과 유사)
+                is_admin_query = "i am an admin" in user_input.lower() or "administrator" in user_input.lower()
+                is_admin_mode = st.session_state.get("admin_mode", False)
+                blocked = is_admin_query and not is_admin_mode
+                # 체인은 첫 질문 때 만들고, 검색은 사용자 메시지를 그리는 동안 백그라운드에서 시작
+                try:
+                    chat_chain = None if blocked else load_chat_chain(OPENAI_API_KEY)
+                except Exception:
+                    chat_chain = None  # 오류는 load_knowledge_base가 표시했고, 캐시되지 않아 다음 질문에서 다시 시도합니다.
+                retrieval = None if chat_chain is None else chat_pipeline.start_retrieval(chat_chain[0].invoke, user_input)
+
                 # 사용자 메시지를 대화 기록에 추가하고 화면에 표시
                 st.session_state.messages.append({"role": "user", "content": user_input})
                 with st.chat_message("user"):
                     st.markdown(user_input)
-                
-                # 챗봇 응답 생성 및 표시
-                with st.chat_message("assistant"):
-                    with st.spinner("답변을 생각하고 있어요..."):
-                        # 관리자 모드 확인 로직 (기존과 유사)
-                        is_admin_query = "i am an admin" in user_input.lower() or "administrator" in user_input.lower()
-                        is_admin_mode = st.session_state.get("admin_mode", False)
 
-                        if is_admin_query and not is_admin_mode:
-                            answer = "관리자 기능에 접근하려면 먼저 관리자 모드로 전환해주세요."
-                        else:
-                            try:
-                                response = rag_chain.invoke({"input": user_input})
-                                answer = response["answer"]
-                            except Exception as e:
-                                answer = f"죄송합니다, 답변을 생성하는 중 문제가 발생했습니다: {e}"
-                        
+                # 챗봇 응답 생성 및 표시 (토큰 단위 스트리밍)
+                with st.chat_message("assistant"):
+                    if blocked:
+                        answer = "관리자 기능에 접근하려면 먼저 관리자 모드로 전환해주세요."
+                        st.markdown(answer)
+                    elif chat_chain is None:
+                        answer = "데이터베이스 초기화에 실패했습니다. 위의 로그를 확인하여 원인을 파악하거나 관리자에게 문의하세요."
                         st.markdown(answer)
+                    else:
+                        try:
+                            answer = st.write_stream(chat_pipeline.stream_answer(chat_chain[1], retrieval, {"input": user_input}))
+                        except Exception as e:
+                            answer = f"죄송합니다, 답변을 생성하는 중 문제가 발생했습니다: {e}"
+                            st.markdown(answer)
 
                 # 챗봇 응답을 대화 기록에 추가
                 st.session_state.messages.append({"role": "assistant", "content": answer})
@@ -0,0 +1,189 @@
+import hashlib
+import threading
+import time
+import weakref
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+_SESSION_KEYS = "_dataset_keys"
+_SESSION_TOKEN = "_dataset_session"
+
+
+def _content_version(df):
+    """열 이름·dtype·인덱스·행 순서까지 반영한 내용 해시. (정렬이나 dtype만 다른 표는 다른 버전)"""
+    if df is None or df.empty:
+        return f"empty:{','.join(map(str, getattr(df, 'columns', [])))}"
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr([(str(col), repr(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df.astype(str), index=True).to_numpy().tobytes())
+    return f"{len(df)}:{digest.hexdigest()}"
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum()) if isinstance(df, pd.DataFrame) else 0
+
+
+class _SessionToken:
+    """세션 상태에 넣어 두는 표식. 세션이 사라져 이 객체가 수거되면 그 세션의 참조를 모두 놓습니다."""
+
+
+class DatasetStore:
+    """모든 세션이 함께 쓰는 읽기 전용 DataFrame 저장소. (키: (워크시트, 버전))
+
+    같은 시트를 같은 내용으로 불러온 세션들은 한 DataFrame을 공유하고, 세션에는 키만 남습니다.
+    키마다 참조하는 세션을 세며, 마지막 세션이 놓으면 DataFrame을 버립니다.
+    저장된 DataFrame은 여러 세션이 보므로 바꾸지 말고, 편집할 때는 copy() 후 새 버전으로 다시 등록합니다.
+    """
+
+    def __init__(self):
+        self._frames = {}
+        self._owners = {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def put(self, worksheet, df, version=None, owner=None):
+        """df를 (worksheet, version) 키로 등록하고 키를 반환합니다. version이 없으면 내용 해시를 씁니다.
+
+        같은 키가 이미 있으면 새 df 대신 기존 DataFrame을 씁니다. owner가 있으면 같은 잠금 안에서 참조를 잡습니다.
+        """
+        key = (worksheet, version if version is not None else _content_version(df))
+        with self._lock:
+            if key not in self._frames:
+                self._frames[key] = df
+                self._owners[key] = set()
+            if owner is not None:
+                self._owners[key].add(owner)
+        return key
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._frames.get(key, default)
+
+    def release(self, key, owner):
+        with self._lock:
+            self._release(key, owner)
+
+    def _release(self, key, owner):
+        owners = self._owners.get(key)
+        if owners is None:
+            return
+        owners.discard(owner)
+        if not owners:
+            del self._owners[key]
+            del self._frames[key]
+
+    def release_owner(self, owner):
+        """owner(세션)가 잡고 있던 모든 키를 놓습니다."""
+        with self._lock:
+            for key in [key for key, owners in self._owners.items() if owner in owners]:
+                self._release(key, owner)
+            self._sessions.pop(owner, None)
+
+    def record_session(self, owner, keys, private_bytes):
+        with self._lock:
+            self._sessions[owner] = {"keys": tuple(keys), "private_bytes": private_bytes, "updated": time.time()}
+
+    def is_shared(self, df):
+        with self._lock:
+            return any(df is frame for frame in self._frames.values())
+
+    def datasets_report(self):
+        """데이터별 (워크시트, 버전, 행 수, 바이트, 참조 세션 수) 표."""
+        with self._lock:
+            items = [(key, df, len(self._owners.get(key, ()))) for key, df in self._frames.items()]
+        rows = [{"워크시트": worksheet, "버전": version, "행 수": len(df), "바이트": frame_bytes(df), "참조 세션": refs}
+                for (worksheet, version), df, refs in items]
+        return pd.DataFrame(rows, columns=["워크시트", "버전", "행 수", "바이트", "참조 세션"])
+
+    def sessions_report(self):
+        """세션별 (세션, 공유 데이터 수, 공유 데이터 바이트, 세션 전용 바이트, 기록 시각) 표.
+
+        세션 전용 바이트는 세션 상태에 있는, 저장소에 없는 DataFrame의 크기이며 마지막 데이터 등록(bind) 시점 기준입니다.
+        공유 데이터 바이트는 그 세션이 참조하는 양이며 실제로는 다른 세션과 나눠 씁니다.
+        """
+        with self._lock:
+            sessions = dict(self._sessions)
+            sizes = {key: frame_bytes(df) for key, df in self._frames.items()}
+        rows = []
+        for owner, info in sessions.items():
+            keys = [key for key in info["keys"] if key in sizes]
+            rows.append({"세션": owner, "공유 데이터": len(keys), "공유 데이터 바이트": sum(sizes[key] for key in keys),
+                         "세션 전용 바이트": info["private_bytes"],
+                         "기록 시각": time.strftime("%H:%M:%S", time.localtime(info["updated"]))})
+        return pd.DataFrame(rows, columns=["세션", "공유 데이터", "공유 데이터 바이트", "세션 전용 바이트", "기록 시각"])
+
+
+_store = DatasetStore()
+
+
+def get_store():
+    return _store
+
+
+def _session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "local"
+
+
+def _session_keys():
+    if _SESSION_TOKEN not in st.session_state:
+        token = _SessionToken()
+        weakref.finalize(token, _store.release_owner, _session_id())
+        st.session_state[_SESSION_TOKEN] = token
+    return st.session_state.setdefault(_SESSION_KEYS, {})
+
+
+def bind(name, worksheet, df, version=None):
+    """df를 공유 저장소에 등록하고, 현재 세션에는 name → 키만 남깁니다. (st.session_state[name] = df 대신 사용)
+
+    같은 name에 이전에 묶인 데이터의 참조는 놓습니다. 세션에서 편집한 결과도 같은 방법으로 다시 등록하며,
+    내용이 달라지면 새 버전 키가 되어 다른 세션의 데이터에는 영향을 주지 않습니다.
+    """
+    owner = _session_id()
+    keys = _session_keys()
+    key = _store.put(worksheet, df, version, owner=owner)
+    previous = keys.get(name)
+    keys[name] = key
+    if previous is not None and previous != key:
+        _store.release(previous, owner)
+    record_session()
+    return _store.get(key)
+
+
+def frame(name, default=None):
+    """현재 세션에서 name으로 묶인 공유 DataFrame. (읽기 전용 — 바꿀 때는 copy() 후 bind)"""
+    key = st.session_state.get(_SESSION_KEYS, {}).get(name)
+    df = _store.get(key) if key is not None else None
+    if df is None:
+        return default if default is not None else pd.DataFrame()
+    return df
+
+
+def versions(*names):
+    """name들에 묶인 (워크시트, 버전) 키 튜플. 등록(bind) 때 정해진 값이라 매 렌더링마다 다시 해시하지 않습니다."""
+    keys = st.session_state.get(_SESSION_KEYS, {})
+    return tuple(keys.get(name) for name in names)
+
+
+def record_session():
+    """현재 세션이 참조하는 키와 세션 전용 DataFrame 크기를 메모리 보고서에 기록합니다."""
+    private_bytes = sum(frame_bytes(value) for value in st.session_state.values()
+                        if isinstance(value, pd.DataFrame) and not _store.is_shared(value))
+    _store.record_session(_session_id(), st.session_state.get(_SESSION_KEYS, {}).values(), private_bytes)
+
+
+def memory_report(concurrent_sessions=100):
+    """(데이터별 표, 세션별 표, 요약 dict). 요약의 '예상 합계'는 공유 데이터 + 세션 전용 평균 × concurrent_sessions 입니다."""
+    datasets = _store.datasets_report()
+    sessions = _store.sessions_report()
+    shared_bytes = int(datasets["바이트"].sum())
+    per_session = float(sessions["세션 전용 바이트"].mean()) if not sessions.empty else 0.0
+    summary = {
+        "공유 데이터 바이트": shared_bytes,
+        "세션 수": len(sessions),
+        "세션 전용 평균 바이트": int(per_session),
+        "예상 합계 바이트": int(shared_bytes + per_session * concurrent_sessions),
+    }
+    return datasets, sessions, summary
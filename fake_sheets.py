@@ -0,0 +1,333 @@
+import functools
+import itertools
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import gspread
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import a1_to_rowcol, numericise_all
+
+FAKE_URL = "https://docs.google.com/spreadsheets/d/fake-benchmark-sheet/edit"
+# 실제 Sheets API의 사용자(서비스 계정)당 분당 한도. 앱의 모든 세션이 같은 서비스 계정을 씁니다.
+SHEETS_QUOTA_PER_MINUTE = {"read": 60, "write": 60}
+
+_local = threading.local()
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    return str(value)
+
+
+class _QuotaResponse:
+    """APIError가 읽는 만큼만 흉내 낸 429 응답."""
+
+    status_code = 429
+
+    def __init__(self, kind, limit, window):
+        self.text = (f"Quota exceeded for quota metric '{kind.capitalize()} requests' and limit "
+                     f"'{kind.capitalize()} requests per {window:g}s per user' ({limit}).")
+
+    def json(self):
+        return {"error": {"code": 429, "message": self.text, "status": "RESOURCE_EXHAUSTED"}}
+
+
+def _api(kind):
+    """API 요청 한 번으로 치는 메서드. 지연과 한도 검사를 거치며, 안에서 부르는 다른 메서드는 따로 세지 않습니다."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            depth = getattr(_local, "depth", 0)
+            if depth == 0:
+                getattr(self, "spreadsheet", self).request(kind)
+            _local.depth = depth + 1
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                _local.depth = depth
+        return wrapper
+    return decorator
+
+
+class FakeCell:
+    def __init__(self, row, col, value):
+        self.row = row
+        self.col = col
+        self.value = value
+
+
+class FakeWorksheet:
+    """메모리에 값(문자열 2차원 목록)을 들고 있는 gspread Worksheet 대역. 페이지가 쓰는 메서드만 구현합니다."""
+
+    def __init__(self, spreadsheet, title, values=None, sheet_id=0):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self._values = [[_cell(v) for v in row] for row in (values or [])]
+
+    @property
+    def row_count(self):
+        return max(len(self._values), 1000)
+
+    @property
+    def col_count(self):
+        return max((len(row) for row in self._values), default=26)
+
+    def _trimmed(self):
+        # 실제 API처럼 끝쪽의 빈 행/열은 돌려주지 않고, 나머지는 직사각형으로 채웁니다.
+        rows = list(self._values)
+        while rows and not any(rows[-1]):
+            rows.pop()
+        width = max((max((i + 1 for i, v in enumerate(row) if v != ""), default=0) for row in rows), default=0)
+        return [(row + [""] * width)[:width] for row in rows]
+
+    @_api("read")
+    def get_all_values(self, *args, **kwargs):
+        return self._trimmed()
+
+    @_api("read")
+    def get_all_records(self, head=1, default_blank="", empty2zero=False, **kwargs):
+        values = self._trimmed()
+        if len(values) < head:
+            return []
+        keys = values[head - 1]
+        return [dict(zip(keys, numericise_all(row, empty2zero=empty2zero, default_blank=default_blank)))
+                for row in values[head:]]
+
+    @_api("read")
+    def row_values(self, row, **kwargs):
+        values = self._trimmed()
+        return list(values[row - 1]) if row <= len(values) else []
+
+    @_api("read")
+    def col_values(self, col, **kwargs):
+        return [row[col - 1] if col <= len(row) else "" for row in self._trimmed()]
+
+    def _ensure(self, rows, cols):
+        while len(self._values) < rows:
+            self._values.append([])
+        for row in self._values:
+            if len(row) < cols:
+                row.extend([""] * (cols - len(row)))
+
+    @_api("write")
+    def update(self, values=None, range_name=None, **kwargs):
+        if isinstance(values, str) and not isinstance(range_name, str):
+            values, range_name = range_name, values  # 예전 순서 update('A1', values)
+        start = (range_name or "A1").split("!")[-1].split(":")[0]
+        row0, col0 = a1_to_rowcol(start)
+        values = [[_cell(v) for v in row] for row in (values or [])]
+        self._ensure(row0 - 1 + len(values), col0 - 1 + max((len(row) for row in values), default=0))
+        for r, row in enumerate(values):
+            self._values[row0 - 1 + r][col0 - 1:col0 - 1 + len(row)] = row
+        return {"updatedRows": len(values)}
+
+    @_api("write")
+    def update_cell(self, row, col, value):
+        self._ensure(row, col)
+        self._values[row - 1][col - 1] = _cell(value)
+
+    @_api("write")
+    def update_acell(self, label, value):
+        self.update_cell(*a1_to_rowcol(label), value)
+
+    @_api("write")
+    def batch_update(self, data, **kwargs):
+        for item in data:
+            self.update(item["values"], item["range"])
+
+    @_api("write")
+    def append_row(self, values, **kwargs):
+        self.append_rows([values])
+
+    @_api("write")
+    def append_rows(self, values, **kwargs):
+        table = self._trimmed()
+        self._values = [list(row) for row in table] + [[_cell(v) for v in row] for row in values]
+
+    @_api("write")
+    def clear(self):
+        self._values = []
+
+    @_api("write")
+    def batch_clear(self, ranges):
+        for range_name in ranges:
+            start, _, end = range_name.split("!")[-1].partition(":")
+            (row0, col0), (row1, col1) = a1_to_rowcol(start), a1_to_rowcol(end or start)
+            for row in self._values[row0 - 1:row1]:
+                row[col0 - 1:col1] = [""] * len(row[col0 - 1:col1])
+
+    @_api("write")
+    def delete_rows(self, start_index, end_index=None):
+        del self._values[start_index - 1:(end_index or start_index)]
+
+    @_api("write")
+    def delete_columns(self, start_index, end_index=None):
+        for row in self._values:
+            del row[start_index - 1:(end_index or start_index)]
+
+    def _cells(self):
+        for r, row in enumerate(self._trimmed(), 1):
+            for c, value in enumerate(row, 1):
+                yield FakeCell(r, c, value)
+
+    @_api("read")
+    def findall(self, query, in_row=None, in_column=None, **kwargs):
+        match = query.fullmatch if isinstance(query, re.Pattern) else (lambda v: v == query)
+        return [cell for cell in self._cells()
+                if (in_row is None or cell.row == in_row) and (in_column is None or cell.col == in_column)
+                and match(cell.value)]
+
+    @_api("read")
+    def find(self, query, in_row=None, in_column=None, **kwargs):
+        found = self.findall(query, in_row, in_column)
+        return found[0] if found else None
+
+    @_api("write")
+    def format(self, *args, **kwargs):
+        pass
+
+    @_api("write")
+    def resize(self, rows=None, cols=None):
+        pass
+
+
+class FakeSpreadsheet:
+    """워크시트 제목 → FakeWorksheet 모음. 여러 스레드(백그라운드 저장 작업)가 함께 쓰므로 시트 목록은 잠금으로 보호합니다.
+
+    latency(+0~jitter)초만큼 매 API 요청을 늦추고, quota가 있으면 {"read": n, "write": n} 한도를 quota_window초
+    슬라이딩 창으로 검사해 넘치면 실제 API처럼 429 APIError를 냅니다. 요청 수는 stats에 쌓입니다.
+    """
+
+    def __init__(self, workbook=None, url=FAKE_URL, title="fake", latency=0.0, jitter=0.0, quota=None, quota_window=60.0):
+        self.url = url
+        self.id = "fake-benchmark-sheet"
+        self.title = title
+        self.latency = latency
+        self.jitter = jitter
+        self.quota = quota
+        self.quota_window = quota_window
+        self.stats = {"read": 0, "write": 0, "throttled": 0}
+        self._recent = {"read": deque(), "write": deque()}
+        self._rng = random.Random()  # 페이지 코드가 쓰는 전역 random 순서를 건드리지 않도록 따로 둡니다.
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._sheets = {}
+        for sheet_title, values in (workbook or {}).items():
+            self._sheets[sheet_title] = FakeWorksheet(self, sheet_title, values, next(self._ids))
+
+    def request(self, kind):
+        """API 요청 한 번(kind는 'read'/'write')의 지연과 한도를 적용합니다."""
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self._rng.uniform(0, self.jitter))
+        with self._lock:
+            limit = (self.quota or {}).get(kind)
+            if limit is not None:
+                recent = self._recent[kind]
+                now = time.monotonic()
+                while recent and recent[0] <= now - self.quota_window:
+                    recent.popleft()
+                if len(recent) >= limit:
+                    self.stats["throttled"] += 1
+                    raise APIError(_QuotaResponse(kind, limit, self.quota_window))
+                recent.append(now)
+            self.stats[kind] += 1
+
+    @_api("read")
+    def worksheet(self, title):
+        with self._lock:
+            if title not in self._sheets:
+                raise WorksheetNotFound(title)
+            return self._sheets[title]
+
+    @_api("read")
+    def worksheets(self, *args, **kwargs):
+        with self._lock:
+            return list(self._sheets.values())
+
+    @_api("write")
+    def add_worksheet(self, title, rows=1000, cols=26, index=None):
+        with self._lock:
+            if title in self._sheets:
+                raise gspread.exceptions.GSpreadException(f'A sheet with the name "{title}" already exists.')
+            worksheet = FakeWorksheet(self, title, sheet_id=next(self._ids))
+            self._sheets[title] = worksheet
+            return worksheet
+
+    @_api("write")
+    def del_worksheet(self, worksheet):
+        with self._lock:
+            self._sheets.pop(worksheet.title, None)
+
+    @_api("write")
+    def batch_update(self, body):
+        """sheet_ops.batch_delete_rows가 보내는 deleteDimension(ROWS) 요청만 처리합니다."""
+        with self._lock:
+            by_id = {ws.id: ws for ws in self._sheets.values()}
+        for request in body.get("requests", []):
+            dimension = request.get("deleteDimension", {}).get("range")
+            if dimension and dimension.get("dimension") == "ROWS":
+                by_id[dimension["sheetId"]].delete_rows(dimension["startIndex"] + 1, dimension["endIndex"])
+        return {"replies": []}
+
+    def values(self):
+        """제목 → 현재 값(get_all_values 결과) dict. 벤치마크에서 결과 시트를 읽을 때 쓰며 API 요청으로 세지 않습니다."""
+        with self._lock:
+            worksheets = list(self._sheets.values())
+        return {ws.title: ws._trimmed() for ws in worksheets}
+
+
+class FakeClient:
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+
+    @_api("read")
+    def open_by_url(self, url):
+        return self.spreadsheet
+
+    @_api("read")
+    def open_by_key(self, key):
+        return self.spreadsheet
+
+    @_api("read")
+    def open(self, title, folder_id=None):
+        return self.spreadsheet
+
+
+class _FakeCredentials:
+    @classmethod
+    def from_service_account_info(cls, info, scopes=None):
+        return cls()
+
+
+FAKE_SECRETS = {
+    "google_sheet": {"url": FAKE_URL},
+    "gspread": {"type": "service_account", "private_key": "fake", "client_email": "bench@example.com"},
+}
+
+
+@contextmanager
+def install(spreadsheet):
+    """gspread.authorize와 서비스 계정 인증을 가짜로 바꿔, 페이지 코드가 spreadsheet를 쓰도록 합니다.
+
+    페이지는 st.secrets의 URL로 시트를 여므로 AppTest에는 FAKE_SECRETS를 함께 넣어야 합니다.
+    """
+    from google.oauth2 import service_account
+
+    client = FakeClient(spreadsheet)
+    original_authorize = gspread.authorize
+    original_credentials = service_account.Credentials.from_service_account_info
+    gspread.authorize = lambda credentials, *args, **kwargs: client
+    service_account.Credentials.from_service_account_info = _FakeCredentials.from_service_account_info
+    try:
+        yield client
+    finally:
+        gspread.authorize = original_authorize
+        service_account.Credentials.from_service_account_info = original_credentials
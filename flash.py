@@ -0,0 +1,138 @@
+import ast
+import os
+import subprocess
+
+import pandas as pd
+import streamlit as st
+
+FLASH_STATE_KEY = "_flash_messages"
+_TOAST_ICONS = {"success": "✅", "info": "ℹ️", "warning": "⚠️", "error": "❌"}
+
+
+def flash(message, kind="success"):
+    """다음 실행(st.rerun / st.switch_page 이후)에 표시할 메시지를 세션에 남깁니다.
+
+    메시지를 읽을 시간을 주려고 st.rerun() 앞에 두던 time.sleep()을 대신합니다.
+    """
+    st.session_state.setdefault(FLASH_STATE_KEY, []).append((kind, message))
+
+
+def rerun(message=None, kind="success"):
+    """메시지를 남기고 바로 다시 실행합니다. (대기 없음)"""
+    if message:
+        flash(message, kind)
+    st.rerun()
+
+
+def render_flashes():
+    """쌓인 메시지를 토스트로 한 번씩 표시하고 비웁니다. (menu.menu()에서 매 페이지 호출)"""
+    for kind, message in st.session_state.pop(FLASH_STATE_KEY, []):
+        st.toast(message, icon=_TOAST_ICONS.get(kind))
+
+
+# --- sleep 감사 ---
+# st.rerun() / st.switch_page() 앞의 고정 대기는 flash 메시지로 바꿨습니다. 남은 대기는 find_fixed_sleeps()로 찾습니다.
+# (API 재시도 백오프와 백그라운드 작업 안의 대기는 실제 재시도 간격이므로 대상이 아닙니다)
+
+
+def _sleep_seconds(node):
+    """time.sleep(<상수>) 호출이면 대기 초, 아니면 None."""
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "sleep"
+            and isinstance(node.func.value, ast.Name) and node.func.value.id == "time"):
+        if node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, (int, float)):
+            return float(node.args[0].value)
+    return None
+
+
+def _fixed_sleeps(tree):
+    """(함수 이름, 줄, 초) 목록. 함수 밖이면 함수 이름은 '(모듈)'입니다."""
+    found = []
+
+    def visit(node, func_name):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                visit(child, child.name)
+                continue
+            seconds = _sleep_seconds(child)
+            if seconds is not None:
+                found.append((func_name, child.lineno, seconds))
+            visit(child, func_name)
+
+    visit(tree, "(모듈)")
+    return found
+
+
+def _app_paths(root):
+    """root 기준 앱 소스 상대 경로(Home.py, pages/*.py)."""
+    paths = ["Home.py"]
+    pages_dir = os.path.join(root, "pages")
+    if os.path.isdir(pages_dir):
+        paths += sorted(f"pages/{f}" for f in os.listdir(pages_dir) if f.endswith(".py"))
+    return paths
+
+
+def _sleep_rows(path, source):
+    return [{"파일": os.path.basename(path), "함수": func_name, "줄": lineno, "대기(초)": seconds}
+            for func_name, lineno, seconds in _fixed_sleeps(ast.parse(source, filename=path))]
+
+
+def find_fixed_sleeps(root=None):
+    """root 아래 앱 소스(Home.py, pages/*.py)에 남은 상수 time.sleep() 호출 목록. 새로 생긴 고정 대기를 찾을 때 사용합니다.
+
+    백그라운드 작업 함수(job_runner로 실행되는 *_job) 안의 대기는 화면을 막지 않지만, 구분할 수 있도록 함수 이름과 함께 보여줍니다.
+    """
+    root = root or os.path.dirname(os.path.abspath(__file__))
+    found = []
+    for path in _app_paths(root):
+        full_path = os.path.join(root, path)
+        if not os.path.exists(full_path):
+            continue
+        with open(full_path, encoding="utf-8") as f:
+            found += _sleep_rows(path, f.read())
+    return pd.DataFrame(found, columns=["파일", "함수", "줄", "대기(초)"])
+
+
+def _git(root, *args):
+    result = subprocess.run(["git", "-C", root, *args], capture_output=True, check=False)
+    return result.stdout.decode("utf-8") if result.returncode == 0 else None
+
+
+def sleep_audit(base=None, root=None):
+    """base 커밋과 현재 소스의 상수 time.sleep()을 같은 AST 검사로 세어 파일·함수별로 없앤 대기(초)를 비교합니다.
+
+    base가 없으면 저장소의 첫 커밋(기준선)을 씁니다. 페이지 코드는 대부분 함수 밖에 있으므로 그 흐름들은 '(모듈)'로 묶입니다.
+    """
+    root = root or os.path.dirname(os.path.abspath(__file__))
+    if base is None:
+        roots = _git(root, "rev-list", "--max-parents=0", "HEAD")
+        if not roots:
+            raise RuntimeError(f"{root}에서 기준 커밋을 찾을 수 없습니다.")
+        base = roots.split()[-1]
+    listed = _git(root, "ls-tree", "-r", "-z", "--name-only", base, "--", "Home.py", "pages")
+    if listed is None:
+        raise RuntimeError(f"기준 커밋 {base}을(를) 읽을 수 없습니다.")
+    base_paths = [p for p in listed.split("\0") if p.endswith(".py")]
+    before = []
+    for path in base_paths:
+        before += _sleep_rows(path, _git(root, "show", f"{base}:{path}"))
+    after = find_fixed_sleeps(root)
+    keys = ["파일", "함수"]
+    before = pd.DataFrame(before, columns=["파일", "함수", "줄", "대기(초)"]).groupby(keys)["대기(초)"].agg(["count", "sum"])
+    after = after.groupby(keys)["대기(초)"].agg(["count", "sum"])
+    audit = before.join(after, how="outer", lsuffix="_before", rsuffix="_after").fillna(0).reset_index()
+    audit = pd.DataFrame({
+        "파일": audit["파일"], "함수": audit["함수"],
+        "기존 호출": audit["count_before"].astype(int), "남은 호출": audit["count_after"].astype(int),
+        "기존 대기(초)": audit["sum_before"], "남은 대기(초)": audit["sum_after"],
+        "제거된 대기(초)": audit["sum_before"] - audit["sum_after"],
+    })
+    return audit.sort_values(keys, ignore_index=True)
+
+
+if __name__ == "__main__":
+    audit = sleep_audit()
+    print(audit.to_string(index=False))
+    print(f"\n합계 {audit['제거된 대기(초)'].sum():.1f}초 제거 (호출 {audit['기존 호출'].sum() - audit['남은 호출'].sum()}개)")
+    remaining = find_fixed_sleeps()
+    print("\n남은 고정 time.sleep():")
+    print(remaining.to_string(index=False) if not remaining.empty else "(없음)")
@@ -0,0 +1,111 @@
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+_MARK = "#import-report"
+
+
+def app_sources(root=APP_ROOT):
+    """Home.py와 pages/*.py 경로 목록."""
+    paths = [os.path.join(root, "Home.py")]
+    pages_dir = os.path.join(root, "pages")
+    if os.path.isdir(pages_dir):
+        paths += sorted(os.path.join(pages_dir, f) for f in os.listdir(pages_dir) if f.endswith(".py"))
+    return [p for p in paths if os.path.exists(p)]
+
+
+def module_imports(path):
+    """파일의 모듈 수준 import 문 목록. (함수 안의 import는 호출될 때 불러오므로 첫 실행 비용에 포함되지 않습니다)"""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source, filename=path)
+    return [ast.get_source_segment(source, node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def _parse_importtime(stderr):
+    """-X importtime 출력을 import 문 순서별 (최상위 모듈 누적 µs 합계, 실패 예외 이름)으로 묶습니다."""
+    totals, failures, current = {}, {}, None
+    for line in stderr.splitlines():
+        if line.startswith(_MARK):
+            parts = line.split()
+            if parts[1] == "stmt":
+                current = int(parts[2])
+                totals[current] = 0
+            elif parts[1] == "failed":
+                failures[int(parts[2])] = parts[3]
+            continue
+        if current is None or not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        # 들여쓰기가 없는 줄만 이 import 문이 직접 불러온 모듈입니다. (하위 모듈은 누적 시간에 이미 포함)
+        if not fields[2].startswith("  "):
+            totals[current] += int(fields[1])
+    return totals, failures
+
+
+def measure(statements, root=APP_ROOT):
+    """새 파이썬 프로세스에서 statements를 순서대로 실행하며 -X importtime으로 측정합니다. (콜드 스타트 기준)
+
+    앞선 import 문이 이미 불러온 모듈은 뒤 문장에서 다시 세지 않으므로, 각 문장의 시간은 그 문장이 추가로 든 비용입니다.
+    [(import 문, ms, 오류 이름 또는 None)]을 반환합니다.
+    """
+    script = ["import sys"]
+    for i, statement in enumerate(statements):
+        script.append(f"sys.stderr.write({_MARK + ' stmt ' + str(i)!r} + '\\n')")
+        script.append("try:")
+        script.append("    exec(" + repr(statement) + ")")
+        script.append("except Exception as e:")
+        script.append(f"    sys.stderr.write({_MARK + ' failed ' + str(i) + ' '!r} + type(e).__name__ + '\\n')")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "\n".join(script)],
+                            cwd=root, env=env, capture_output=True, text=True)
+    totals, failures = _parse_importtime(result.stderr)
+    return [(statement, totals.get(i, 0) / 1000.0, failures.get(i)) for i, statement in enumerate(statements)]
+
+
+def import_report(root=APP_ROOT):
+    """페이지별 모듈 수준 import 문의 콜드 import 시간 표 (페이지, 순서, import 문, 시간(ms), 오류)."""
+    rows = []
+    for path in app_sources(root):
+        for order, (statement, ms, error) in enumerate(measure(module_imports(path), root)):
+            rows.append({"페이지": os.path.basename(path), "순서": order, "import 문": statement,
+                         "시간(ms)": round(ms, 1), "오류": error or ""})
+    return pd.DataFrame(rows, columns=["페이지", "순서", "import 문", "시간(ms)", "오류"])
+
+
+def page_totals(report):
+    """페이지별 import 시간 합계(ms). 기준값 저장·비교에 사용합니다."""
+    return report.groupby("페이지", sort=False)["시간(ms)"].sum().round(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="페이지별 콜드 import 시간 보고서 (python -X importtime 기반)")
+    parser.add_argument("--top", type=int, default=5, help="페이지별로 보여줄 가장 느린 import 문 개수")
+    parser.add_argument("--save", metavar="JSON", help="페이지별 합계를 기준값으로 저장")
+    parser.add_argument("--compare", metavar="JSON", help="저장한 기준값과 페이지별 합계 비교")
+    args = parser.parse_args()
+
+    report = import_report()
+    totals = page_totals(report)
+    for page, rows in report.groupby("페이지", sort=False):
+        print(f"\n{page}  합계 {totals[page]:.1f}ms")
+        slowest = rows.sort_values("시간(ms)", ascending=False).head(args.top)
+        print(slowest[["import 문", "시간(ms)", "오류"]].to_string(index=False))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = pd.Series(json.load(f), dtype=float)
+        comparison = pd.DataFrame({"기준(ms)": baseline, "현재(ms)": totals})
+        comparison["차이(ms)"] = (comparison["현재(ms)"] - comparison["기준(ms)"]).round(1)
+        print("\n기준값 대비:")
+        print(comparison.to_string())
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(totals.to_dict(), f, ensure_ascii=False, indent=1)
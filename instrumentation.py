@@ -0,0 +1,344 @@
+import cProfile
+import functools
+import json
+import marshal
+import os
+import pstats
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+METRICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".metrics")
+LOG_PATH = os.path.join(METRICS_DIR, "timings.jsonl")
+HISTORY_SIZE = 100
+PROFILE_TOP_N = 30
+BACKGROUND = "(백그라운드)"
+API_CALLS = "Sheets API 호출 수"
+
+# 시트 API를 호출하는 gspread 메서드. (이 메서드 안에서 다시 부르는 메서드는 한 번으로 셉니다)
+WORKSHEET_METHODS = (
+    "get_all_records", "get_all_values", "get", "get_values", "batch_get", "row_values", "col_values", "acell", "cell",
+    "find", "findall", "update", "update_cell", "update_cells", "update_acell", "batch_update", "append_row",
+    "append_rows", "insert_row", "insert_rows", "delete_rows", "clear", "batch_clear", "format", "batch_format",
+    "resize", "add_rows", "add_cols",
+)
+SPREADSHEET_METHODS = (
+    "worksheet", "worksheets", "get_worksheet", "add_worksheet", "del_worksheet", "duplicate_sheet",
+    "batch_update", "values_get", "values_batch_get", "values_update", "values_batch_update", "values_append",
+    "values_clear", "fetch_sheet_metadata",
+)
+CLIENT_METHODS = ("open_by_url", "open_by_key", "open", "create")
+
+_lock = threading.Lock()
+_local = threading.local()
+_history = {}
+_runs = {}
+_profilers = {}
+_listeners = []
+_last_runs = {}
+_hooks_installed = False
+_history_loaded = False
+
+
+def _session_key():
+    # 백그라운드 작업 스레드에서도 불리므로 컨텍스트가 없다는 경고는 끕니다.
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+def _append_log(entry):
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    line = json.dumps(entry, ensure_ascii=False)
+    with _lock:
+        with open(LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def _load_history():
+    """서버 재시작 후에도 통계가 이어지도록 로그 끝부분에서 단계별 최근 기록을 불러옵니다."""
+    global _history_loaded
+    if _history_loaded:
+        return
+    _history_loaded = True
+    if not os.path.exists(LOG_PATH):
+        return
+    with open(LOG_PATH, encoding="utf-8") as f:
+        lines = deque(f, maxlen=HISTORY_SIZE * 50)
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if entry.get("type") == "stage":
+            _history.setdefault((entry["page"], entry["stage"]), deque(maxlen=HISTORY_SIZE)).append(entry["seconds"])
+        elif entry.get("type") == "run":
+            _history.setdefault((entry["page"], API_CALLS), deque(maxlen=HISTORY_SIZE)).append(entry["api_calls"])
+
+
+def current_page():
+    run = _runs.get(_session_key())
+    return run["page"] if run else BACKGROUND
+
+
+def record(stage_name, seconds, page=None):
+    """단계 하나의 소요 시간을 기록합니다. (메모리 통계 + JSONL 로그)"""
+    page = page or current_page()
+    with _lock:
+        _load_history()
+        _history.setdefault((page, stage_name), deque(maxlen=HISTORY_SIZE)).append(seconds)
+        for events in _listeners:
+            events.append((page, stage_name, seconds))
+    _append_log({"type": "stage", "ts": time.time(), "page": page, "stage": stage_name, "seconds": round(seconds, 6)})
+
+
+@contextmanager
+def stage(stage_name, page=None):
+    """with instrumentation.stage("시트 로드"): ... 블록의 소요 시간을 기록합니다. (예외가 나도 기록)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage_name, time.perf_counter() - started, page)
+
+
+@contextmanager
+def capture():
+    """블록 안에서 기록되는 단계 시간을 [(페이지, 단계, 초)] 목록으로도 모읍니다. (벤치마크용)"""
+    events = []
+    with _lock:
+        _listeners.append(events)
+    try:
+        yield events
+    finally:
+        with _lock:
+            _listeners.remove(events)
+
+
+def timed(stage_name, page=None):
+    """함수 호출 시간을 stage_name으로 기록하는 데코레이터. (st.cache_data 안쪽에 두면 캐시 미스만 기록)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name, page):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Laps:
+    """긴 파이프라인을 다시 들여쓰지 않고 구간별로 재는 스톱워치. lap(name)은 직전 lap 이후 시간을 name으로 기록합니다."""
+
+    def __init__(self, page=None):
+        self.page = page or current_page()
+        self._last = time.perf_counter()
+
+    def lap(self, stage_name):
+        now = time.perf_counter()
+        record(stage_name, now - self._last, self.page)
+        self._last = now
+
+
+def begin_run(page):
+    """스크립트 실행 시작. (menu.menu()에서 호출) 같은 세션의 직전 실행 API 호출 수를 로그로 넘기고 새로 셉니다."""
+    install_gspread_hooks()
+    session = _session_key()
+    # st.stop() 등으로 끝나지 못한 프로파일러가 남아 있으면 끕니다.
+    abandoned = _profilers.pop(session, None)
+    if abandoned is not None:
+        abandoned.disable()
+    with _lock:
+        previous = _runs.get(session)
+        _runs[session] = {"page": page, "started": time.time(), "calls": Counter(), "api_seconds": 0.0}
+    if previous is not None:
+        _finish_run(session, previous)
+
+
+def _finish_run(session, run):
+    with _lock:
+        _last_runs[session] = run
+        _load_history()
+        _history.setdefault((run["page"], API_CALLS), deque(maxlen=HISTORY_SIZE)).append(sum(run["calls"].values()))
+    if run["calls"]:
+        calls = {}
+        for (worksheet, method), count in run["calls"].items():
+            calls.setdefault(worksheet, {})[method] = count
+        _append_log({"type": "run", "ts": run["started"], "page": run["page"], "api_calls": sum(run["calls"].values()),
+                     "api_seconds": round(run["api_seconds"], 6), "calls": calls})
+
+
+def count_call(worksheet, method, seconds=0.0):
+    """Sheets API 호출 한 번을 현재 실행(세션)에 더합니다. 스크립트 밖(백그라운드 작업)이면 바로 로그에 남깁니다."""
+    run = _runs.get(_session_key())
+    if run is None:
+        _append_log({"type": "call", "ts": time.time(), "page": BACKGROUND, "worksheet": worksheet,
+                     "method": method, "seconds": round(seconds, 6)})
+        return
+    with _lock:
+        run["calls"][(worksheet, method)] += 1
+        run["api_seconds"] += seconds
+
+
+def _target_name(obj, method, args):
+    if method in CLIENT_METHODS:
+        return "(클라이언트)"
+    if method in ("worksheet", "add_worksheet", "del_worksheet") and args:
+        return args[0] if isinstance(args[0], str) else str(getattr(args[0], "title", args[0]))
+    if type(obj).__name__ == "Spreadsheet":
+        return "(스프레드시트)"
+    return str(getattr(obj, "title", "?"))
+
+
+def _wrap_api(cls, method):
+    original = getattr(cls, method, None)
+    if original is None or getattr(original, "_instrumented", False):
+        return
+
+    @functools.wraps(original)
+    def wrapper(self, *args, **kwargs):
+        depth = getattr(_local, "depth", 0)
+        if depth:
+            return original(self, *args, **kwargs)
+        _local.depth = 1
+        started = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            _local.depth = 0
+            count_call(_target_name(self, method, args), method, time.perf_counter() - started)
+
+    wrapper._instrumented = True
+    setattr(cls, method, wrapper)
+
+
+def install_gspread_hooks():
+    """gspread Worksheet/Spreadsheet/Client 메서드에 호출 수·시간 계측을 한 번만 붙입니다.
+
+    모든 페이지가 같은 gspread 클래스를 쓰므로 페이지 코드를 고치지 않아도 전부 계측됩니다. gspread가 없으면 아무것도 하지 않습니다.
+    """
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    _hooks_installed = True
+    try:
+        from gspread.client import Client
+        from gspread.spreadsheet import Spreadsheet
+        from gspread.worksheet import Worksheet
+    except ImportError:
+        return
+    for cls, methods in ((Worksheet, WORKSHEET_METHODS), (Spreadsheet, SPREADSHEET_METHODS), (Client, CLIENT_METHODS)):
+        for method in methods:
+            _wrap_api(cls, method)
+
+
+def stage_summary():
+    """(페이지, 단계)별 최근 HISTORY_SIZE회의 횟수·p50·p95 표. 시간 단위는 ms, 'Sheets API 호출 수'는 회."""
+    with _lock:
+        _load_history()
+        items = [(key, list(values)) for key, values in _history.items()]
+    rows = []
+    for (page, stage_name), values in sorted(items):
+        series = pd.Series(values, dtype=float)
+        scale = 1 if stage_name == API_CALLS else 1000
+        rows.append({"페이지": page, "단계": stage_name, "횟수": len(values),
+                     "p50": round(series.quantile(0.5) * scale, 1), "p95": round(series.quantile(0.95) * scale, 1)})
+    return pd.DataFrame(rows, columns=["페이지", "단계", "횟수", "p50", "p95"])
+
+
+def last_run_calls(session=None):
+    """현재 세션 직전 실행의 워크시트·메서드별 Sheets API 호출 수 표."""
+    with _lock:
+        run = _last_runs.get(session if session is not None else _session_key())
+        calls = dict(run["calls"]) if run else {}
+    rows = [{"워크시트": worksheet, "메서드": method, "호출 수": count} for (worksheet, method), count in calls.items()]
+    return pd.DataFrame(rows, columns=["워크시트", "메서드", "호출 수"]).sort_values("호출 수", ascending=False)
+
+
+def render_panel():
+    """관리자용 사이드바 계측 패널."""
+    with st.sidebar.expander("⏱️ 성능 계측"):
+        summary = stage_summary()
+        if summary.empty:
+            st.caption("아직 기록된 단계가 없습니다.")
+        else:
+            st.caption(f"최근 {HISTORY_SIZE}회 기준 (시간: ms, API 호출 수: 회)")
+            st.dataframe(summary, hide_index=True, use_container_width=True)
+        calls = last_run_calls()
+        if not calls.empty:
+            st.caption(f"직전 실행 Sheets API 호출 {int(calls['호출 수'].sum())}회")
+            st.dataframe(calls, hide_index=True, use_container_width=True)
+        st.caption(f"로그: {os.path.relpath(LOG_PATH)}")
+
+
+def profile_toggle(key, label="🔬 이번 실행 프로파일링 (cProfile)"):
+    """관리자용 '이번 실행 프로파일링' 스위치. 켜 두면 start_profile(key) ~ finish_profile() 구간을 프로파일링합니다."""
+    return st.toggle(label, key=key, help="켜면 실행이 느려질 수 있습니다. 결과는 실행 후 상위 함수 표와 .prof 파일로 제공됩니다.")
+
+
+def start_profile(key):
+    """profile_toggle(key)가 켜져 있으면 cProfile을 시작해 반환하고, 꺼져 있으면 None. (꺼져 있을 때는 아무 비용 없음)
+
+    긴 파이프라인을 다시 들여쓰지 않도록 with 대신 시작/끝 호출로 씁니다. 끝나지 못한 경우 다음 실행의 begin_run()이 끕니다.
+    """
+    if not st.session_state.get(key, False):
+        return None
+    profiler = cProfile.Profile()
+    _profilers[_session_key()] = profiler
+    profiler.enable()
+    return profiler
+
+
+def start_job_profile(enabled):
+    """백그라운드 작업 스레드용 start_profile. 세션 대신 enabled로 켜고, 결과는 profile_result()로 받아 작업 결과에 담습니다."""
+    if not enabled:
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def profile_result(profiler, top_n=PROFILE_TOP_N):
+    """프로파일링을 끝내고 결과(상위 함수 표, 총 시간, .prof 내용)를 dict로 반환합니다. (profiler가 None이면 None)"""
+    if profiler is None:
+        return None
+    profiler.disable()
+    stats = pstats.Stats(profiler)
+    rows = [{"함수": pstats.func_std_string(func), "호출 수": nc, "자체 시간(s)": round(tt, 4), "누적 시간(s)": round(ct, 4)}
+            for func, (cc, nc, tt, ct, callers) in stats.stats.items()]
+    top = pd.DataFrame(rows, columns=["함수", "호출 수", "자체 시간(s)", "누적 시간(s)"])
+    top = top.sort_values("누적 시간(s)", ascending=False).head(top_n).reset_index(drop=True)
+    return {
+        "top": top,
+        "total": stats.total_tt,
+        "prof": marshal.dumps(stats.stats),  # pstats.Stats.dump_stats()와 같은 형식
+        "created": time.strftime("%Y%m%d_%H%M%S"),
+    }
+
+
+def finish_profile(profiler, key, top_n=PROFILE_TOP_N):
+    """start_profile()로 시작한 프로파일링을 끝내고 결과를 세션에 저장합니다. (profiler가 None이면 아무것도 하지 않음)"""
+    if profiler is None:
+        return
+    _profilers.pop(_session_key(), None)
+    st.session_state[f"{key}_result"] = profile_result(profiler, top_n)
+
+
+def render_profile(key):
+    """finish_profile(key)로 저장된 마지막 프로파일 결과(상위 함수 표 + .prof 다운로드)를 표시합니다."""
+    result = st.session_state.get(f"{key}_result")
+    if not result:
+        return
+    with st.expander(f"🔬 프로파일 결과 (총 {result['total']:.2f}초, 누적 시간 상위 {len(result['top'])}개)"):
+        st.dataframe(result["top"], hide_index=True, use_container_width=True)
+        st.download_button(
+            label="📥 .prof 파일 다운로드",
+            data=result["prof"],
+            file_name=f"{key}_{result['created']}.prof",
+            mime="application/octet-stream",
+            key=f"{key}_download",
+        )
+        st.caption("snakeviz, python -m pstats 등으로 열 수 있습니다.")
@@ -0,0 +1,211 @@
+import functools
+import os
+import pickle
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+JOB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".jobs")
+JOB_QUERY_PARAM = "job"
+JOB_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+_local = threading.local()
+
+
+class JobRunner:
+    """오래 걸리는 관리자 작업(배정 결과 시트 저장 등)을 스크립트 스레드 밖에서 실행합니다.
+
+    작업 상태, 진행 로그, 결과는 작업 ID별로 JOB_DIR에 저장됩니다.
+    위젯 조작이나 새로고침으로 스크립트가 다시 실행되어도 작업은 계속되고, 같은 ID로 결과를 다시 불러올 수 있습니다.
+    """
+
+    def __init__(self, max_workers=2, job_dir=JOB_DIR):
+        self.job_dir = job_dir
+        os.makedirs(self.job_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="admin-job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._prune()
+
+    def submit(self, kind, fn, *args, payload=None, **kwargs):
+        """fn(report, *args, **kwargs)를 백그라운드에서 실행하고 작업 ID를 반환합니다.
+
+        report(message, fraction=None)로 진행 상황을 남길 수 있고, payload는 작업과 함께 저장되어
+        새로고침 후 화면 복원에 사용됩니다.
+        """
+        job_id = f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        job = {"id": job_id, "kind": kind, "state": "running", "events": [], "notices": [], "error": None,
+               "payload": payload, "result": None, "started": time.time(), "finished": None}
+        with self._lock:
+            self._jobs[job_id] = job
+        self._persist(job)
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def status(self, job_id):
+        """작업 상태 스냅샷. 메모리에 없으면(서버 재시작 등) 저장된 파일에서 읽습니다."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job, events=list(job["events"]), notices=list(job["notices"]))
+        path = self._path(job_id)
+        if not job_id or not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            job = pickle.load(f)
+        if job["state"] == "running":
+            # 실행 중 저장된 뒤 서버가 재시작된 작업
+            job = dict(job, state="error", error="서버가 재시작되어 작업이 중단되었습니다.")
+        return job
+
+    def _report(self, job_id, message, fraction=None):
+        with self._lock:
+            self._jobs[job_id]["events"].append({"time": time.time(), "message": message, "fraction": fraction})
+
+    def _run(self, job_id, fn, args, kwargs):
+        _local.notices = self._jobs[job_id]["notices"]
+        try:
+            result = fn(functools.partial(self._report, job_id), *args, **kwargs)
+            state, error = "done", None
+        except Exception as e:
+            result, state, error = None, "error", f"{type(e).__name__}: {e}"
+        finally:
+            _local.notices = None
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(state=state, error=error, result=result, finished=time.time())
+        self._persist(job)
+
+    def _path(self, job_id):
+        return os.path.join(self.job_dir, f"{os.path.basename(str(job_id))}.pkl")
+
+    def _persist(self, job):
+        with self._lock:
+            snapshot = dict(job, events=list(job["events"]), notices=list(job["notices"]))
+        tmp_path = self._path(job["id"]) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(snapshot, f)
+        os.replace(tmp_path, self._path(job["id"]))
+
+    def _prune(self):
+        cutoff = time.time() - JOB_MAX_AGE_SECONDS
+        for name in os.listdir(self.job_dir):
+            path = os.path.join(self.job_dir, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    """모든 세션이 공유하는 작업 실행기.
+
+    페이지의 새로고침 버튼이 st.cache_resource.clear()를 호출하므로, 실행 중인 작업을 잃지 않도록
+    st.cache_resource 대신 모듈 전역으로 유지합니다.
+    """
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
+
+
+def write_sheet_with_retry(report, worksheet, data, retries=3, delay=5):
+    """백그라운드 작업용 시트 덮어쓰기. (st 호출 없이 report로 재시도 상황을 남기고, 최종 실패 시 예외를 올립니다)"""
+    for attempt in range(retries):
+        try:
+            worksheet.clear()
+            worksheet.update(data, "A1")
+            return True
+        except Exception as e:
+            if attempt == retries - 1:
+                raise
+            report(f"⚠️ '{worksheet.title}' 저장 지연, {delay}초 후 재시도합니다... ({attempt+1}/{retries}): {e}")
+            time.sleep(delay)
+            delay *= 2
+    return False
+
+
+class _Notifier:
+    """st.success/info/warning/error 대신 쓰는 알림. 백그라운드 작업 안에서는 작업의 notices에 모았다가
+    render_job_progress가 작업이 끝난 뒤 표시하고, 스크립트 스레드에서는 바로 st로 표시합니다."""
+
+    def _notify(self, level, message):
+        notices = getattr(_local, "notices", None)
+        if notices is None:
+            return getattr(st, level)(message)
+        notices.append((level, str(message)))
+
+    def success(self, message):
+        return self._notify("success", message)
+
+    def info(self, message):
+        return self._notify("info", message)
+
+    def warning(self, message):
+        return self._notify("warning", message)
+
+    def error(self, message):
+        return self._notify("error", message)
+
+
+ui = _Notifier()
+
+
+def remember_job(state_key, job_id):
+    """작업 ID를 세션과 URL 쿼리에 기록해, 새로고침 후에도 같은 작업을 찾을 수 있게 합니다."""
+    st.session_state[state_key] = job_id
+    st.query_params[JOB_QUERY_PARAM] = job_id
+
+
+def forget_job(state_key):
+    """새 작업을 시작하기 전에 이전 작업 ID를 세션과 URL 쿼리에서 지웁니다."""
+    st.session_state.pop(state_key, None)
+    if JOB_QUERY_PARAM in st.query_params:
+        del st.query_params[JOB_QUERY_PARAM]
+
+
+def current_job_id(state_key, kind):
+    """세션(없으면 URL 쿼리)에 기록된 kind 작업 ID."""
+    job_id = st.session_state.get(state_key) or st.query_params.get(JOB_QUERY_PARAM)
+    if job_id and str(job_id).startswith(f"{kind}-"):
+        st.session_state[state_key] = job_id
+        return job_id
+    return None
+
+
+def render_job_progress(job_id, label):
+    """작업 진행 상황을 표시합니다. 실행 중이면 1초마다 폴링하고, 끝나면 페이지를 한 번 다시 실행합니다."""
+    runner = get_job_runner()
+    job = runner.status(job_id)
+    if job is None:
+        return None
+
+    if job["state"] == "running":
+        @st.fragment(run_every=1.0)
+        def _poll():
+            current = runner.status(job_id)
+            fractions = [e["fraction"] for e in current["events"] if e["fraction"] is not None]
+            st.progress(fractions[-1] if fractions else 0.0, text=f"⏳ {label} 진행 중...")
+            if current["events"]:
+                st.caption(current["events"][-1]["message"])
+            if current["state"] != "running":
+                st.rerun()
+        _poll()
+    elif job["state"] == "done":
+        st.success(f"✅ {label} 완료")
+    else:
+        st.error(f"❌ {label} 실패: {job['error']}")
+    if job["state"] != "running":
+        for level, message in job.get("notices", []):
+            getattr(st, level)(message)
+
+    if job["events"]:
+        with st.expander(f"📜 {label} 로그", expanded=False):
+            st.code("\n".join(e["message"] for e in job["events"]), language="text")
+    return job
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+INDEX_DIR = os.path.join(APP_ROOT, ".knowledge_index")
+MANIFEST_NAME = "manifest.json"
+FILE_EXTENSIONS = (".py", ".md", ".txt")
+SKIP_DIRS = {"__pycache__", "temp_repo", "venv"}
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+DEFAULT_PROVIDER = "openai"
+PROVIDER_ENV = "KNOWLEDGE_BASE_EMBEDDINGS"
+
+_build_lock = threading.Lock()
+
+
+class HashingEmbeddings(Embeddings):
+    """네트워크 없이 동작하는 로컬 대체 임베딩. (토큰 해싱 + L2 정규화)
+
+    의미 검색 품질은 OpenAI 임베딩보다 낮지만, 같은 단어를 공유하는 조각을 찾는 데는 충분해
+    API 키 없이 개발하거나 오프라인에서 챗봇 흐름을 확인할 때 사용합니다.
+    """
+
+    def __init__(self, dimensions=512):
+        self.dimensions = dimensions
+
+    def _embed(self, text):
+        vector = [0.0] * self.dimensions
+        for token in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def _openai_embeddings(api_key=None):
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings(model="text-embedding-3-small", api_key=api_key)
+
+
+def _local_embeddings(api_key=None):
+    return HashingEmbeddings()
+
+
+# 이름 → (매니페스트에 기록할 모델 식별자, 임베딩 객체 생성 함수)
+# 식별자가 바뀌면 벡터 공간이 달라지므로 인덱스를 처음부터 다시 만듭니다.
+EMBEDDING_PROVIDERS = {
+    "openai": ("openai:text-embedding-3-small", _openai_embeddings),
+    "local": ("local:hashing-512", _local_embeddings),
+}
+
+
+def provider_name(name=None):
+    """사용할 임베딩 제공자 이름. (인자 > 환경 변수 KNOWLEDGE_BASE_EMBEDDINGS > 기본값 openai)"""
+    name = name or os.environ.get(PROVIDER_ENV) or DEFAULT_PROVIDER
+    if name not in EMBEDDING_PROVIDERS:
+        raise ValueError(f"알 수 없는 임베딩 제공자입니다: {name} (사용 가능: {', '.join(EMBEDDING_PROVIDERS)})")
+    return name
+
+
+def get_embeddings(provider=None, api_key=None):
+    """(모델 식별자, 임베딩 객체). 질문 임베딩 등 인덱스 밖에서도 같은 벡터 공간을 쓸 때 사용합니다."""
+    model_id, factory = EMBEDDING_PROVIDERS[provider_name(provider)]
+    return model_id, factory(api_key)
+
+
+def collect_documents(root=APP_ROOT):
+    """로컬 작업 트리의 .py/.md/.txt 파일을 Document 목록으로 읽습니다. (숨김 폴더·인덱스 폴더 제외)
+
+    source 메타데이터는 root 기준 상대 경로라, 배포 위치가 달라도 조각 해시가 같습니다.
+    """
+    docs = []
+    for current, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d not in SKIP_DIRS)
+        for file_name in sorted(files):
+            if not file_name.endswith(FILE_EXTENSIONS):
+                continue
+            path = os.path.join(current, file_name)
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                content = f.read()
+            docs.append(Document(page_content=content, metadata={"source": os.path.relpath(path, root)}))
+    return docs
+
+
+def chunk_id(doc):
+    """조각의 내용 해시. (출처 경로 + 본문) 본문이 같아도 파일이 다르면 다른 조각입니다."""
+    return hashlib.sha256(f"{doc.metadata.get('source', '')}\0{doc.page_content}".encode("utf-8")).hexdigest()
+
+
+def split_documents(docs):
+    """문서를 조각으로 나누고 {조각 해시: 조각} 사전으로 반환합니다. (같은 해시는 한 번만)"""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    chunks = {}
+    for doc in splitter.split_documents(docs):
+        chunks.setdefault(chunk_id(doc), doc)
+    return chunks
+
+
+def index_version(model_id, chunks):
+    """임베딩 모델과 조각 해시 집합으로 정한 인덱스 버전. 문서나 모델이 바뀌면 달라집니다."""
+    digest = hashlib.sha256(model_id.encode("utf-8"))
+    for chunk_hash in sorted(chunks):
+        digest.update(chunk_hash.encode("ascii"))
+    return digest.hexdigest()[:16]
+
+
+def _read_manifest(index_dir):
+    path = os.path.join(index_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _write_manifest(index_dir, manifest):
+    path = os.path.join(index_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def load_vectorstore(api_key=None, provider=None, root=APP_ROOT, index_dir=INDEX_DIR):
+    """디스크의 FAISS 인덱스를 불러와 작업 트리와 맞춘 뒤 (vectorstore, 통계)를 반환합니다. 통계의 version은 index_version()입니다.
+
+    불러온 인덱스에 실제로 들어 있는 조각 해시(index_to_docstore_id)와 현재 조각 해시를 비교해 새로 생긴 조각만 임베딩하고,
+    사라진 조각은 인덱스에서 지웁니다. 인덱스 저장 후 매니페스트를 쓰기 전에 종료돼도 다음 시작에서 같은 조각을 다시 넣지 않습니다.
+    바뀐 것이 없으면 임베딩 API를 전혀 호출하지 않습니다. 제공자나 조각 설정(매니페스트의 settings)이 바뀌었으면 새로 만듭니다.
+    조각이 하나도 없으면 vectorstore는 None입니다.
+    """
+    name = provider_name(provider)
+    model_id, embeddings = get_embeddings(name, api_key)
+    settings = {"model": model_id, "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+
+    with _build_lock:
+        chunks = split_documents(collect_documents(root))
+        stats = {"provider": name, "files": len({d.metadata["source"] for d in chunks.values()}),
+                 "chunks": len(chunks), "embedded": 0, "removed": 0, "rebuilt": False,
+                 "version": index_version(model_id, chunks)}
+        if not chunks:
+            return None, stats
+
+        manifest = _read_manifest(index_dir)
+        vectorstore = None
+        if manifest and manifest.get("settings") == settings:
+            try:
+                vectorstore = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+            except Exception:
+                vectorstore = None
+        indexed = set(vectorstore.index_to_docstore_id.values()) if vectorstore is not None else set()
+
+        added = [chunk_hash for chunk_hash in chunks if chunk_hash not in indexed]
+        removed = [chunk_hash for chunk_hash in indexed if chunk_hash not in chunks]
+        if vectorstore is None:
+            stats["rebuilt"] = True
+            vectorstore = FAISS.from_documents([chunks[h] for h in added], embeddings, ids=added)
+        else:
+            if removed:
+                vectorstore.delete(removed)
+            if added:
+                vectorstore.add_documents([chunks[h] for h in added], ids=added)
+        stats["embedded"], stats["removed"] = len(added), len(removed)
+
+        if added or removed or stats["rebuilt"]:
+            os.makedirs(index_dir, exist_ok=True)
+            vectorstore.save_local(index_dir)
+            _write_manifest(index_dir, {
+                "settings": settings,
+                "chunks": {chunk_hash: chunks[chunk_hash].metadata["source"] for chunk_hash in sorted(chunks)},
+            })
+        return vectorstore, stats
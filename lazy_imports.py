@@ -0,0 +1,75 @@
+import importlib
+import importlib.util
+import sys
+import threading
+
+# 여러 세션(스레드)이 같은 대리 객체를 처음 동시에 건드려도 불러오기는 한 번만 합니다.
+_resolve_lock = threading.Lock()
+
+
+class LazyModule:
+    """처음 속성에 접근할 때 importlib.import_module로 불러오는 모듈 대리 객체. (lazy_module 참고)
+
+    importlib.util.LazyLoader는 파이썬 3.11에서 여러 스레드가 처음 접근할 때 반쯤 초기화된 모듈을 보일 수 있어 쓰지 않습니다.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def resolve(self):
+        if self._module is None:
+            with _resolve_lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __repr__(self):
+        return f"<lazy module {self._name}>"
+
+
+def lazy_module(name):
+    """처음 속성에 접근할 때 실제로 불러오는 모듈 객체. (import name 대신 사용)
+
+    엑셀 내보내기처럼 버튼을 눌러야 쓰는 무거운 패키지를 페이지 첫 실행에서 불러오지 않도록 합니다.
+    이미 불러온 모듈이면 그대로 반환합니다.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    return LazyModule(name)
+
+
+class LazyAttr:
+    """module_name.attr를 처음 호출(또는 속성 접근)할 때 불러오는 대리 객체. (from module import attr 대신 사용)"""
+
+    def __init__(self, module_name, attr):
+        self._module_name = module_name
+        self._attr = attr
+        self._value = None
+
+    def resolve(self):
+        if self._value is None:
+            with _resolve_lock:
+                if self._value is None:
+                    self._value = getattr(importlib.import_module(self._module_name), self._attr)
+        return self._value
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __repr__(self):
+        return f"<lazy {self._module_name}.{self._attr}>"
+
+
+def lazy_attrs(module_name, *attrs):
+    """lazy_attrs("openpyxl.styles", "Font", "Side") → (LazyAttr, LazyAttr)"""
+    proxies = tuple(LazyAttr(module_name, attr) for attr in attrs)
+    return proxies[0] if len(proxies) == 1 else proxies
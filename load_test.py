@@ -0,0 +1,391 @@
+"""여러 사용자가 동시에 로그인(Home) → 마스터 보기(1) → 요청사항 입력(2)을 할 때의 처리량·오류율·지연 분포를 잽니다.
+
+    python load_test.py --sessions 1 10 25 50 100 --latency 0.2 --jitter 0.3
+
+세션마다 실제 페이지 코드를 streamlit AppTest로 실행하고, 구글 시트 대신 fake_sheets의 메모리 시트에 요청합니다.
+메모리 시트는 요청마다 지연을 주고, 서비스 계정 한도(기본 분당 읽기/쓰기 각 60회)를 넘으면 실제처럼 429 오류를 냅니다.
+세션은 한 프로세스의 스레드로 돌기 때문에 페이지의 CPU 작업은 GIL을 나눠 쓰고, 시트 응답 대기만 실제처럼 겹칩니다.
+결과는 표로 출력하고 .metrics/load_tests.jsonl에 한 줄씩 추가합니다.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+from unittest.mock import MagicMock
+from urllib import parse
+
+import pandas as pd
+import streamlit as st
+from streamlit import source_util
+from streamlit.proto.WidgetStates_pb2 import WidgetState, WidgetStates
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.fragment import MemoryFragmentStorage
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.pages_manager import PagesManager
+from streamlit.runtime.scriptrunner import RerunData
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.runtime.secrets import Secrets
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.element_tree import parse_tree_from_messages
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner, require_widgets_deltas
+from streamlit.testing.v1.util import patch_config_options
+
+import fake_sheets
+import instrumentation
+import synthetic_data
+import versioned_memo
+import write_behind
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+HOME = os.path.join(ROOT, "Home.py")
+PAGE_MASTER = "pages/1 📅_마스터_보기.py"
+PAGE_REQUEST = "pages/2 🙋‍♂️_요청사항_입력.py"
+RESULTS_PATH = os.path.join(instrumentation.METRICS_DIR, "load_tests.jsonl")
+LOAD_TIMINGS_PATH = os.path.join(instrumentation.METRICS_DIR, "load_test_timings.jsonl")
+RUN_TIMEOUT = 300
+USER_PASSWORD = "load-test"
+LOAD_SECRETS = dict(fake_sheets.FAKE_SECRETS, passwords={
+    "user": USER_PASSWORD, "admin": "load-test-admin",
+    **{f"administrator{i}": 0 for i in range(1, 7)},
+})
+SCENARIOS = ["로그인", "마스터 보기", "요청 입력"]
+# Home 상단에 항상 떠 있는 안내 배너는 오류로 세지 않습니다.
+IGNORED_ERRORS = ("웹페이지 업데이트로",)
+
+
+class _SessionScriptRunner(LocalScriptRunner):
+    # 실제 서버처럼 컴파일된 페이지를 모든 세션이 공유합니다. (세션마다 따로 컴파일하면 파이썬 3.11의 ast가 스레드 간에 깨짐)
+    script_cache = ScriptCache()
+
+    def __init__(self, *args, session_id, fragment_storage, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._session_id = session_id
+        self._script_cache = self.script_cache
+        # 브라우저 세션처럼 실행 사이에 st.fragment 함수를 기억해 두어야 fragment만 다시 실행할 수 있습니다.
+        self._fragment_storage = fragment_storage
+
+    def run(self, widget_state=None, query_params=None, timeout=3, page_hash="", fragment_id=None):
+        """fragment_id가 있으면 위젯이 든 fragment만 다시 실행합니다. (브라우저가 fragment 안 위젯을 바꿀 때와 같은 요청)"""
+        if fragment_id is None:
+            return super().run(widget_state, query_params, timeout, page_hash)
+        self.request_rerun(RerunData(widget_states=widget_state, query_string=parse.urlencode(query_params or {}, doseq=True),
+                                     page_script_hash=page_hash, fragment_id_queue=[fragment_id],
+                                     is_fragment_scoped_rerun=True))
+        if not self._script_thread:
+            self.start()
+        require_widgets_deltas(self, timeout)
+        return parse_tree_from_messages(self.forward_msgs())
+
+    def element_fragments(self):
+        """이번 실행에서 fragment 안에 그려진 위젯 요소 ID → fragment ID."""
+        fragments = {}
+        for msg in self.forward_msgs():
+            if msg.WhichOneof("type") != "delta" or not msg.delta.fragment_id:
+                continue
+            element = msg.delta.new_element
+            kind = element.WhichOneof("type")
+            element_id = getattr(getattr(element, kind), "id", "") if kind else ""
+            if element_id:
+                fragments[element_id] = msg.delta.fragment_id
+        return fragments
+
+
+class SessionAppTest(AppTest):
+    """세션마다 고유한 session_id로 실행되고, 여러 스레드에서 동시에 돌려도 되는 AppTest.
+
+    AppTest.run()은 실행할 때마다 st.secrets와 Runtime 인스턴스를 전역으로 바꿨다가 되돌리고 모든 세션에
+    같은 session_id를 쓰므로, 동시에 돌리면 서로의 실행 중에 전역이 사라지고 dataset_store의 세션별 참조가 섞입니다.
+    여기서는 전역 설정을 shared_runtime()이 한 번만 하고, 실행마다 세션 ID만 따로 주며 컴파일 캐시는 공유합니다.
+    """
+
+    def __init__(self, script_path, session_id, *, default_timeout=RUN_TIMEOUT):
+        super().__init__(script_path, default_timeout=default_timeout)
+        self.session_id = session_id
+        self._fragment_storage = MemoryFragmentStorage()
+        self._element_fragments = {}
+
+    def _run(self, widget_state=None, timeout=None, fragment_id=None):
+        pages_manager = PagesManager(self._script_path, setup_watcher=False)
+        script_runner = _SessionScriptRunner(
+            self._script_path, self.session_state, pages_manager,
+            args=self.args, kwargs=self.kwargs, session_id=self.session_id,
+            fragment_storage=self._fragment_storage,
+        )
+        self._tree = script_runner.run(widget_state, self.query_params,
+                                       self.default_timeout if timeout is None else timeout, self._page_hash,
+                                       fragment_id=fragment_id)
+        self._tree._runner = self
+        self._element_fragments.update(script_runner.element_fragments())
+        query_string = script_runner.event_data[-1]["client_state"].query_string
+        self.query_params = parse.parse_qs(query_string)
+        return self
+
+    def edit_cell(self, key, row, column, value, fragment_only=False):
+        """key 편집기(st.data_editor)의 row행 column열을 value로 고친 것처럼 다시 실행합니다.
+
+        fragment_only면 편집기가 든 st.fragment만 다시 실행하고(실제 브라우저 동작), 아니면 페이지 전체를 다시 실행합니다.
+        fragment만 실행한 뒤의 요소 트리는 그 fragment 부분만 담습니다.
+        """
+        editor = next(e for e in self.get("arrow_data_frame") if e.proto.id.endswith(f"-{key}"))
+        states = WidgetStates()
+        states.widgets.extend(state for state in self._tree.get_widget_states().widgets if state.id != editor.proto.id)
+        edits = {"edited_rows": {str(row): {column: value}}, "added_rows": [], "deleted_rows": []}
+        states.widgets.append(WidgetState(id=editor.proto.id, string_value=json.dumps(edits, ensure_ascii=False)))
+        fragment_id = self._element_fragments.get(editor.proto.id) if fragment_only else None
+        if fragment_only and fragment_id is None:
+            raise ValueError(f"'{key}' 편집기는 st.fragment 안에 있지 않습니다.")
+        return self._run(states, fragment_id=fragment_id)
+
+
+@contextmanager
+def shared_runtime():
+    """부하 테스트 동안 모든 세션이 함께 쓰는 가짜 Runtime과 st.secrets. (실제 서버 한 프로세스처럼 캐시를 공유)
+
+    페이지 목록 캐시는 처음 실행한 스크립트를 메인 페이지로 기억하므로, 다른 스크립트를 메인으로 쓰는 다음 실행에
+    남지 않도록 들어갈 때와 나올 때 비웁니다.
+    """
+    source_util.invalidate_pages_cache()
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    saved_secrets = st.secrets
+    secrets = Secrets()
+    secrets._secrets = LOAD_SECRETS
+    Runtime._instance = runtime
+    st.secrets = secrets
+    try:
+        with patch_config_options({"global.appTest": True}):
+            yield runtime
+    finally:
+        st.secrets = saved_secrets
+        Runtime._instance = None
+        source_util.invalidate_pages_cache()
+
+
+def _errors(at):
+    """실행 결과에서 사용자에게 보인 오류 메시지. (잡히지 않은 예외 포함)"""
+    messages = [str(e.value) for e in at.exception]
+    messages += [e.value for e in at.error if not any(ignored in e.value for ignored in IGNORED_ERRORS)]
+    return messages
+
+
+def _timed(results, scenario, action):
+    """action()을 실행해 (시나리오, 초, 오류 메시지 또는 None)을 남기고 성공 여부를 반환합니다."""
+    started = time.perf_counter()
+    try:
+        error = action()
+    except Exception as e:  # AppTest 시간 초과 등 실행 자체의 실패도 오류로 셉니다.
+        error = f"{type(e).__name__}: {e}"
+    results.append((scenario, time.perf_counter() - started, error))
+    return error is None
+
+
+def _login(at, employee_id):
+    at.run()
+    errors = _errors(at)
+    if errors:
+        return errors[0]
+    at.text_input(key="password_input").input(USER_PASSWORD)
+    at.text_input(key="employee_id_input").input(employee_id)
+    next(b for b in at.button if b.label == "확인").click().run()
+    errors = _errors(at)
+    if errors:
+        return errors[0]
+    if not at.session_state["login_success"]:
+        return "로그인되지 않았습니다."
+    return None
+
+
+def _view_master(at):
+    at.switch_page(PAGE_MASTER).run()
+    errors = _errors(at)
+    if errors:
+        return errors[0]
+    if not any("html-calendar" in m.value for m in at.markdown):
+        return "캘린더가 표시되지 않았습니다."
+    return None
+
+
+def _submit_request(at, day_index):
+    at.switch_page(PAGE_REQUEST).run()
+    errors = _errors(at)
+    if errors:
+        return errors[0]
+    labels = at.multiselect(key="date_multiselect").options
+    if not labels:
+        return "선택할 수 있는 날짜가 없습니다."
+    at.selectbox(key="category_select").select("휴가")
+    at.multiselect(key="date_multiselect").set_value([_label_date(labels[day_index % len(labels)])])
+    next(b for b in at.button if "추가" in b.label).click().run()
+    errors = _errors(at)
+    if errors:
+        return errors[0]
+    # 추가에 성공하면 콜백이 날짜 선택을 비웁니다. (중복·날짜 오류면 그대로 남음)
+    if at.multiselect(key="date_multiselect").value:
+        return "요청이 추가되지 않았습니다."
+    return None
+
+
+def _label_date(label):
+    """'10월 3일 (금)' 형식의 선택지 이름을 date로 되돌립니다. (요청 일자는 모두 다음 달)"""
+    year = int(synthetic_data.next_month_str().split("년")[0])
+    month, day = (int(part) for part in label.split(" (")[0].replace("일", "").split("월 "))
+    return date(year, month, day)
+
+
+def run_session(step, index, staff_count, ramp):
+    """한 사용자의 로그인 → 마스터 보기 → 요청 입력. 앞 단계가 실패하면 뒤 단계는 시도하지 않습니다."""
+    time.sleep(ramp * index)
+    at = SessionAppTest(HOME, session_id=f"load-{step}-{index}")
+    results = []
+    (_timed(results, "로그인", lambda: _login(at, f"{index % staff_count + 1:05d}"))
+     and _timed(results, "마스터 보기", lambda: _view_master(at))
+     and _timed(results, "요청 입력", lambda: _submit_request(at, index)))
+    return results
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def load_step(sessions, workbook, args):
+    """sessions개 세션을 동시에 돌린 한 단계의 결과 기록. 단계마다 새 시트·캐시·쓰기 큐로 시작합니다."""
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    versioned_memo.clear()
+    quota = None if args.no_quota else {"read": args.read_quota, "write": args.write_quota}
+    spreadsheet = fake_sheets.FakeSpreadsheet(workbook, latency=args.latency, jitter=args.jitter,
+                                              quota=quota, quota_window=args.quota_window)
+    # 요청 로그는 프로세스 전역 쓰기 큐로 반영되므로, 이 단계의 메모리 시트로 보내는 임시 큐로 바꿔 둡니다.
+    queue = write_behind.WriteBehindQueue(client_factory=lambda: fake_sheets.FakeClient(spreadsheet),
+                                          buffer_path=os.path.join(args.buffer_dir, f"pending-{sessions}.jsonl"))
+    with write_behind._queue_lock:
+        saved_queue, write_behind._queue = write_behind._queue, queue
+
+    ramp = args.ramp / sessions if sessions > 1 else 0.0
+    try:
+        with fake_sheets.install(spreadsheet):
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="load-session") as pool:
+                futures = [pool.submit(run_session, sessions, i, args.staff, ramp) for i in range(sessions)]
+                outcomes = [future.result() for future in futures]
+            wall = time.perf_counter() - started
+            queue.flush()
+    finally:
+        with write_behind._queue_lock:
+            write_behind._queue = saved_queue
+
+    results = [result for outcome in outcomes for result in outcome]
+    scenarios = {}
+    for scenario in SCENARIOS:
+        latencies = sorted(seconds for name, seconds, _ in results if name == scenario)
+        errors = [error for name, _, error in results if name == scenario and error]
+        scenarios[scenario] = {
+            "시도": len(latencies),
+            "오류": len(errors),
+            "p50": _round(_percentile(latencies, 50)),
+            "p95": _round(_percentile(latencies, 95)),
+            "p99": _round(_percentile(latencies, 99)),
+            "오류 예시": errors[0][:200] if errors else None,
+        }
+    completed = sum(1 for outcome in outcomes if len(outcome) == len(SCENARIOS) and not outcome[-1][2])
+    failed = sum(1 for _, _, error in results if error)
+    return {
+        "ts": time.time(),
+        "sessions": sessions,
+        "staff": args.staff,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "quota": quota,
+        "quota_window": args.quota_window,
+        "wall_s": round(wall, 3),
+        "throughput_sessions_per_s": round(completed / wall, 3),
+        "throughput_actions_per_s": round((len(results) - failed) / wall, 3),
+        "completed_sessions": completed,
+        "error_rate": round(failed / len(results), 4) if results else 0.0,
+        "scenarios": scenarios,
+        "sheets": dict(spreadsheet.stats),
+        "write_behind": {"pending": queue.pending_count(), **queue.stats},
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+def summary_table(records):
+    rows = []
+    for record in records:
+        row = {
+            "세션": record["sessions"],
+            "완료 세션": record["completed_sessions"],
+            "처리량(세션/s)": record["throughput_sessions_per_s"],
+            "처리량(동작/s)": record["throughput_actions_per_s"],
+            "오류율(%)": round(record["error_rate"] * 100, 1),
+        }
+        for scenario, stats in record["scenarios"].items():
+            row[f"{scenario} p50"] = stats["p50"]
+            row[f"{scenario} p95"] = stats["p95"]
+            row[f"{scenario} p99"] = stats["p99"]
+        row["시트 읽기"] = record["sheets"]["read"]
+        row["시트 쓰기"] = record["sheets"]["write"]
+        row["429"] = record["sheets"]["throttled"]
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 25, 50, 100], help="동시 세션 수 목록")
+    parser.add_argument("--staff", type=int, default=100, help="합성 데이터의 근무자 수 (세션은 차례로 다른 사번으로 로그인)")
+    parser.add_argument("--latency", type=float, default=0.2, help="시트 API 요청당 기본 지연(초)")
+    parser.add_argument("--jitter", type=float, default=0.3, help="요청당 추가 지연의 최대값(초, 균등 분포)")
+    parser.add_argument("--read-quota", type=int, default=fake_sheets.SHEETS_QUOTA_PER_MINUTE["read"])
+    parser.add_argument("--write-quota", type=int, default=fake_sheets.SHEETS_QUOTA_PER_MINUTE["write"])
+    parser.add_argument("--quota-window", type=float, default=60.0, help="한도를 세는 창(초)")
+    parser.add_argument("--no-quota", action="store_true", help="한도 없이 지연만 주기")
+    parser.add_argument("--ramp", type=float, default=0.0, help="세션 시작을 이 시간(초)에 걸쳐 고르게 나눔 (0이면 동시에 시작)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-save", action="store_true", help="결과를 load_tests.jsonl에 남기지 않음")
+    args = parser.parse_args()
+
+    # 부하 테스트의 단계 기록이 관리자 계측 패널의 운영 통계에 섞이지 않도록 다른 파일에 남깁니다.
+    instrumentation.LOG_PATH = LOAD_TIMINGS_PATH
+
+    month_str = synthetic_data.next_month_str()
+    workbook = synthetic_data.generate(month_str, args.staff, seed=args.seed)
+    workbook["공지사항"] = [["제목", "내용", "날짜"], ["부하 테스트", "합성 공지입니다.", f"{date.today():%Y-%m-%d}"]]
+
+    records = []
+    with tempfile.TemporaryDirectory(prefix="load-test-") as buffer_dir, shared_runtime():
+        args.buffer_dir = buffer_dir
+        for sessions in args.sessions:
+            print(f"▶ 동시 세션 {sessions}개 실행 중...", flush=True)
+            record = load_step(sessions, workbook, args)
+            records.append(record)
+            if not args.no_save:
+                os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+                with open(RESULTS_PATH, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    with pd.option_context("display.max_columns", None, "display.width", 200):
+        print(summary_table(records).to_string(index=False))
+    for record in records:
+        examples = {name: stats["오류 예시"] for name, stats in record["scenarios"].items() if stats["오류 예시"]}
+        for scenario, example in examples.items():
+            print(f"[세션 {record['sessions']}] {scenario} 오류 예시: {example}")
+
+
+if __name__ == "__main__":
+    main()
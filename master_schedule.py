@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+WEEKDAY_ORDER = ["월", "화", "수", "목", "금"]
+TIME_SLOTS = ["오전", "오후"]
+
+
+def _week_sort_key(week):
+    return int(week.replace("주", ""))
+
+
+def expand_master_shifts(df_master):
+    """마스터의 '오전 & 오후'를 오전/오후 두 행으로 펼쳐 (이름, 주차, 요일, 시간대) 테이블을 만듭니다."""
+    if df_master is None or df_master.empty:
+        return pd.DataFrame(columns=["이름", "주차", "요일", "시간대"])
+    df = df_master[["이름", "주차", "요일", "근무여부"]].astype(str)
+    df = df[df["근무여부"].isin(["오전", "오후", "오전 & 오후"])]
+    df = df.assign(시간대=df["근무여부"].str.split(" & ")).explode("시간대")
+    return df[["이름", "주차", "요일", "시간대"]].reset_index(drop=True)
+
+
+def generate_shift_table(df_master, week_labels=None):
+    """마스터 데이터로 '요일 시간대'별 근무 테이블(시간대, 근무)을 생성합니다.
+
+    week_labels를 주면(스케줄 관리) 해당 주차만 보고, 모든 주차에 근무하는 인원은 이름만 표시하며
+    명단을 정렬합니다. 주지 않으면(스케줄 배정) 매주 근무자 다음에 특정 주차 근무자를 원래 순서대로 나열합니다.
+    """
+    df_split = expand_master_shifts(df_master)
+    if week_labels is not None:
+        df_split = df_split[(df_split["주차"] == "매주") | df_split["주차"].isin(week_labels)]
+    is_every = df_split["주차"] == "매주"
+
+    every_week = df_split[is_every].drop_duplicates(subset=["요일", "시간대", "이름"])
+    specific = (df_split[~is_every].groupby(["요일", "시간대", "이름"], sort=False)["주차"]
+                .agg(lambda weeks: sorted(weeks, key=_week_sort_key)).reset_index())
+
+    if week_labels is not None:
+        every_keys = every_week.set_index(["요일", "시간대", "이름"]).index
+        specific = specific[~specific.set_index(["요일", "시간대", "이름"]).index.isin(every_keys)]
+        full = specific["주차"].map(lambda weeks: set(weeks) == set(week_labels))
+        specific_entries = specific["이름"].where(full, specific["이름"] + "(" + specific["주차"].str.join(",") + ")")
+    else:
+        specific_entries = specific["이름"] + "(" + specific["주차"].str.join(",") + ")"
+
+    entries = pd.concat([
+        every_week[["요일", "시간대"]].assign(entry=every_week["이름"]),
+        specific[["요일", "시간대"]].assign(entry=specific_entries),
+    ], ignore_index=True)
+    if week_labels is not None:
+        entries = entries.sort_values("entry", kind="stable")
+    cells = entries.groupby(["요일", "시간대"], sort=False)["entry"].agg(", ".join)
+
+    rows = []
+    for day in WEEKDAY_ORDER:
+        for time in TIME_SLOTS:
+            rows.append((f"{day} {time}", cells.get((day, time), "")))
+    return pd.DataFrame(rows, columns=["시간대", "근무"])
+
+
+class MasterAssignmentMatrix:
+    """근무자 × 날짜 × 시간대(오전/오후) 마스터 배정 불리언 행렬.
+
+    matrix[i, j, k]는 names[i]가 dates[j]의 TIME_SLOTS[k]에 마스터 근무인지를 뜻합니다.
+    기존 initial_master_assignments 딕셔너리처럼 .get((날짜, 시간대), set())으로도 조회할 수 있습니다.
+    """
+
+    def __init__(self, names, dates, matrix, slot_workers):
+        self.names = tuple(names)
+        self.dates = tuple(dates)
+        self.matrix = matrix
+        self.matrix.setflags(write=False)
+        self.name_index = {name: i for i, name in enumerate(self.names)}
+        self.date_index = {date_str: j for j, date_str in enumerate(self.dates)}
+        self._slot_workers = {ts: frozenset(workers) for ts, workers in slot_workers.items()}
+        names_arr = np.array(self.names, dtype=object)
+        self._sets = {
+            (date_str, ts): frozenset(names_arr[self.matrix[:, j, k]])
+            for j, date_str in enumerate(self.dates) for k, ts in enumerate(TIME_SLOTS)
+        }
+
+    def get(self, key, default=None):
+        return self._sets.get(key, default)
+
+    def __getitem__(self, key):
+        return self._sets[key]
+
+    def __contains__(self, key):
+        return key in self._sets
+
+    def is_master(self, name, date_str, time_slot):
+        i, j = self.name_index.get(name), self.date_index.get(date_str)
+        if i is None or j is None:
+            return False
+        return bool(self.matrix[i, j, TIME_SLOTS.index(time_slot)])
+
+    def counts(self, time_slot):
+        """날짜별 마스터 근무자 수 {날짜: 인원}."""
+        per_date = self.matrix[:, :, TIME_SLOTS.index(time_slot)].sum(axis=0)
+        return dict(zip(self.dates, per_date.tolist()))
+
+    def slot_workers(self, time_slot):
+        """해당 시간대 마스터 행이 하나라도 있는 근무자 집합 (주차/요일 무관)."""
+        return self._slot_workers.get(time_slot, frozenset())
+
+
+def build_master_assignment_matrix(df_master, dates, week_numbers, day_map):
+    """마스터 시트에서 근무자 × 날짜 × 시간대 배정 행렬을 한 번에 계산합니다.
+
+    dates는 Timestamp 목록, week_numbers는 {date: 월 기준 주차(int)}입니다.
+    """
+    df_split = expand_master_shifts(df_master)
+    df_dates = pd.DataFrame({"날짜": [d.strftime('%Y-%m-%d') for d in dates],
+                             "요일": [day_map[d.weekday()] for d in dates],
+                             "주차번호": [f"{week_numbers[d.date()]}주" for d in dates]})
+
+    every_week = df_split[df_split["주차"] == "매주"].merge(df_dates, on="요일")
+    specific = df_split[df_split["주차"] != "매주"].merge(df_dates, left_on=["요일", "주차"], right_on=["요일", "주차번호"])
+    matched = pd.concat([every_week, specific], ignore_index=True)
+
+    names = df_master["이름"].astype(str).unique().tolist() if df_master is not None and not df_master.empty else []
+    date_list = df_dates["날짜"].tolist()
+    matrix = np.zeros((len(names), len(date_list), len(TIME_SLOTS)), dtype=bool)
+    if not matched.empty:
+        name_codes = pd.Categorical(matched["이름"], categories=names).codes
+        date_codes = pd.Categorical(matched["날짜"], categories=date_list).codes
+        slot_codes = pd.Categorical(matched["시간대"], categories=TIME_SLOTS).codes
+        matrix[name_codes, date_codes, slot_codes] = True
+
+    slot_workers = {ts: set(df_split.loc[df_split["시간대"] == ts, "이름"]) for ts in TIME_SLOTS}
+    return MasterAssignmentMatrix(names, date_list, matrix, slot_workers)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _cached_master_assignment_matrix(_df_master, master_hash, dates_key, _week_numbers, _day_map):
+    return build_master_assignment_matrix(_df_master, list(dates_key), _week_numbers, _day_map)
+
+
+def get_master_assignment_matrix(df_master, dates, week_numbers, day_map):
+    """마스터 시트 내용 해시 + 날짜 목록을 키로 캐싱된 배정 행렬을 반환합니다. (재실행 시 재계산 없음)"""
+    if df_master is None or df_master.empty:
+        master_hash = "empty"
+    else:
+        master_hash = f"{len(df_master)}:{int(pd.util.hash_pandas_object(df_master, index=False).sum()) & 0xFFFFFFFFFFFFFFFF:x}"
+    dates_key = tuple(pd.Timestamp(d) for d in dates)
+    return _cached_master_assignment_matrix(df_master, master_hash, dates_key, week_numbers, day_map)
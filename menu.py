@@ -2,8 +2,14 @@ import streamlit as st
 import os
 import re
 
+import flash
+import instrumentation
+import write_behind
+
 def menu():
     current_page_basename = st.session_state.get("current_page", "Home.py")
+    instrumentation.begin_run(current_page_basename)
+    flash.render_flashes()
 
     # 사이드바 UI 구성
     # 기본 Streamlit 페이지 목록 숨기기
@@ -69,6 +75,9 @@ def menu():
                     st.switch_page("pages/6 방배정.py")
                 if st.sidebar.button("🔄 방배정 변경", use_container_width=True, disabled=(current_page_basename == "7 방배정_변경.py")):
                     st.switch_page("pages/7 방배정_변경.py")
+
+                instrumentation.render_panel()
+                write_behind.render_status()
             else:
                 st.sidebar.info("관리자 메뉴를 보려면 Home 페이지에서 인증하세요.")
 
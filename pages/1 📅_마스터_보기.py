@@ -11,6 +11,10 @@ from gspread.exceptions import WorksheetNotFound, APIError
 import time
 from collections import Counter
 import menu
+import flash
+import request_journal
+import calendar_events
+import dataset_store
 import streamlit as st
 
 st.set_page_config(page_title="마스터 수정", page_icon="📅", layout="wide")
@@ -22,9 +26,7 @@ menu.menu()
 
 # 로그인 체크 및 자동 리디렉션
 if not st.session_state.get("login_success", False):
-    st.warning("⚠️ Home 페이지에서 먼저 로그인해주세요.")
-    st.error("1초 후 Home 페이지로 돌아갑니다...")
-    time.sleep(1)
+    flash.flash("Home 페이지에서 먼저 로그인해주세요.", "warning")
     st.switch_page("Home.py")
     st.stop()
 
@@ -97,7 +99,7 @@ def load_master_data_page1(_gc, url):
         st.error(f"마스터 데이터 로드 중 오류 발생: {str(e)}")
         st.stop()
 
-def initialize_page_data(gc, url, name, week_labels):
+def initialize_page_data(gc, url, name, week_labels, year):
     """페이지에 필요한 데이터를 한 번에 로드하고, 필요 시 초기화 및 업데이트합니다."""
     try:
         # --- 데이터 로딩 ---
@@ -106,7 +108,7 @@ def initialize_page_data(gc, url, name, week_labels):
         
         df_master = pd.DataFrame(sheet.worksheet("마스터").get_all_records())
         try:
-            df_request = pd.DataFrame(sheet.worksheet(f"{month_str} 요청").get_all_records())
+            df_request = request_journal.load_current_requests(sheet, f"{month_str} 요청")
         except WorksheetNotFound:
             df_request = pd.DataFrame()
         try:
@@ -147,9 +149,12 @@ def initialize_page_data(gc, url, name, week_labels):
                 st.stop()
         
         # --- 최종 데이터를 세션 상태에 저장합니다. ---
-        st.session_state["df_master"] = df_master
-        st.session_state["df_request"] = df_request
-        st.session_state["df_room_request"] = df_room_request
+        # 전체 표는 모든 세션이 공유하는 저장소에 두고 세션에는 키만 남깁니다.
+        df_master = dataset_store.bind("df_master", "마스터", df_master)
+        dataset_store.bind("df_request", f"{month_str} 요청", df_request)
+        dataset_store.bind("df_room_request", f"{month_str} 방배정 요청", df_room_request)
+        dataset_store.bind("df_saturday_schedule", f"{year}년 토요/휴일 스케줄", load_saturday_schedule(gc, url, year))
+        dataset_store.bind("df_closing_days", f"{year}년 휴관일", load_closing_days(gc, url, year))
         st.session_state["df_user_master"] = df_master[df_master["이름"] == name].copy()
         st.session_state["master_page_initialized"] = True
 
@@ -188,116 +193,6 @@ def load_saturday_schedule(_gc, url, year):
         st.error(f"토요/휴일 스케줄 로드 중 오류 발생: {str(e)}")
         return pd.DataFrame(columns=["날짜", "근무", "당직"])
 
-def generate_master_events(df_user_master, year, month, week_labels, closing_dates_set):
-    """마스터 스케줄(평일)에서 이벤트를 생성하는 함수 (휴관일 제외)"""
-    # ... (함수 앞부분의 master_data 생성 로직은 기존과 동일) ...
-    master_data = {}
-    요일리스트 = ["월", "화", "수", "목", "금"]
-    every_week_df = df_user_master[df_user_master["주차"] == "매주"]
-    for week in week_labels:
-        master_data[week] = {}
-        week_df = df_user_master[df_user_master["주차"] == week]
-        for day in 요일리스트:
-            day_specific = week_df[week_df["요일"] == day]
-            if not day_specific.empty:
-                master_data[week][day] = day_specific.iloc[0]["근무여부"]
-            elif not every_week_df.empty:
-                day_every = every_week_df[every_week_df["요일"] == day]
-                master_data[week][day] = day_every.iloc[0]["근무여부"] if not day_every.empty else "근무없음"
-            else:
-                master_data[week][day] = "근무없음"
-    
-    events = []
-    weekday_map = {0: "월", 1: "화", 2: "수", 3: "목", 4: "금"}
-    _, last_day = calendar.monthrange(year, month)
-    status_colors = {"오전": "#48A6A7", "오후": "#FCB454", "오전 & 오후": "#F38C79"}
-    first_sunday = next((day for day in range(1, 8) if datetime.date(year, month, day).weekday() == 6), None)
-    
-    for day_num in range(1, last_day + 1):
-        date_obj = datetime.date(year, month, day_num)
-        
-        # ▼▼▼ [수정된 부분] 휴관일인 경우 마스터 일정을 표시하지 않고 건너뜁니다. ▼▼▼
-        if date_obj in closing_dates_set:
-            continue
-        # ▲▲▲ [수정된 부분] ▲▲▲
-
-        if date_obj.weekday() in weekday_map:
-            day_name = weekday_map[date_obj.weekday()]
-            if first_sunday is None: week_num = (date_obj.day + datetime.date(year, month, 1).weekday()) // 7
-            else: week_num = (day_num - first_sunday) // 7 + 1 if day_num >= first_sunday else 0
-            if week_num >= len(week_labels): continue
-            week = week_labels[week_num]
-            status = master_data.get(week, {}).get(day_name, "근무없음")
-            if status and status != "근무없음":
-                events.append({"title": f"{status}", "start": date_obj.strftime("%Y-%m-%d"), "color": status_colors.get(status, "#E0E0E0")})
-    return events
-
-def generate_closing_day_events(df_closing_days):
-    """휴관일 DataFrame에서 이벤트를 생성하는 함수"""
-    events = []
-    if not df_closing_days.empty:
-        for date_obj in df_closing_days['날짜']:
-            events.append({
-                "title": "휴관일", 
-                "start": date_obj.strftime("%Y-%m-%d"), 
-                "color": "#DC143C"  # 붉은색 계열 (Crimson)
-            })
-    return events
-def generate_saturday_events(df_saturday_schedule, current_user_name, year, month):
-    """토요/휴일 스케줄에서 이벤트를 생성하는 함수"""
-    events = []
-    status_colors = {"토요근무": "#6A5ACD", "당직": "#FF6347"}
-    if not df_saturday_schedule.empty:
-        month_schedule = df_saturday_schedule[(df_saturday_schedule['날짜'].dt.year == year) & (df_saturday_schedule['날짜'].dt.month == month)]
-        for _, row in month_schedule.iterrows():
-            date_obj = row['날짜'].date()
-            if isinstance(row.get('근무', ''), str) and current_user_name in row.get('근무', ''):
-                events.append({"title": "토요근무", "start": date_obj.strftime("%Y-%m-%d"), "color": status_colors.get("토요근무")})
-            if isinstance(row.get('당직', ''), str) and current_user_name == row.get('당직', '').strip():
-                events.append({"title": "당직", "start": date_obj.strftime("%Y-%m-%d"), "color": status_colors.get("당직")})
-    return events
-
-def generate_request_events(df_user_request):
-    """일반 요청사항에서 이벤트를 생성하는 함수"""
-    events = []
-    if df_user_request.empty: return events
-    status_colors = {"휴가": "#A1C1D3", "학회": "#B4ABE4", "보충 어려움(오전)": "#FFD3B5", "보충 불가(오전)": "#FFB6C1", "꼭 근무(오전)": "#C3E6CB"}
-    label_map = {"휴가": "휴가🎉", "학회": "학회📚", "보충 어려움(오전)": "보충 어려움(오전)", "보충 불가(오전)": "보충 불가(오전)", "꼭 근무(오전)": "꼭근무(오전)"}
-    for _, row in df_user_request.iterrows():
-        분류, 날짜정보 = row["분류"], row["날짜정보"]
-        if not 날짜정보 or 분류 == "요청 없음": continue
-        # (오후)가 포함된 분류 처리
-        base_분류 = 분류.replace("(오후)", "(오전)").replace("(오후)", "").strip()
-        title = label_map.get(분류, 분류)
-        color = status_colors.get(base_분류, "#E0E0E0")
-        if "~" in 날짜정보:
-            시작_str, 종료_str = [x.strip() for x in 날짜정보.split("~")]
-            시작 = datetime.datetime.strptime(시작_str, "%Y-%m-%d").date()
-            종료 = datetime.datetime.strptime(종료_str, "%Y-%m-%d").date()
-            events.append({"title": title, "start": 시작.strftime("%Y-%m-%d"), "end": (종료 + datetime.timedelta(days=1)).strftime("%Y-%m-%d"), "color": color})
-        else:
-            for 날짜 in [d.strip() for d in 날짜정보.split(",")]:
-                try:
-                    dt = datetime.datetime.strptime(날짜, "%Y-%m-%d").date()
-                    events.append({"title": title, "start": dt.strftime("%Y-%m-%d"), "color": color})
-                except: continue
-    return events
-
-def generate_room_request_events(df_user_room_request):
-    """방배정 요청사항에서 이벤트를 생성하는 함수"""
-    events = []
-    if df_user_room_request.empty: return events
-    for _, row in df_user_room_request.iterrows():
-        분류, 날짜정보 = row["분류"], row["날짜정보"]
-        if not 날짜정보 or pd.isna(날짜정보): continue
-        for 날짜 in [d.strip() for d in 날짜정보.split(",")]:
-            try:
-                date_part = 날짜.split(" (")[0]
-                dt = datetime.datetime.strptime(date_part, "%Y-%m-%d").date()
-                events.append({"title": f"{분류}", "start": dt.strftime("%Y-%m-%d"), "color": "#7C8EC7"})
-            except: continue
-    return events
-
 # 캘린더 이벤트 생성 함수
 def generate_calendar_events(df_user_master, df_saturday_schedule, current_user_name, year, month, week_labels):
     # --- 1. 평일 스케줄 데이터 가공 (기존 로직) ---
@@ -423,10 +318,10 @@ week_labels = [f"{i+1}주" for i in range(len(week_nums))]
 
 # 페이지 최초 로드 시에만 데이터 초기화 함수를 실행합니다.
 if "master_page_initialized" not in st.session_state:
-    initialize_page_data(gc, url, name, week_labels)
+    initialize_page_data(gc, url, name, week_labels, year)
 
 # 세션 상태에서 최종 데이터를 가져옵니다.
-df_master = st.session_state["df_master"]
+df_master = dataset_store.frame("df_master")
 df_user_master = st.session_state["df_user_master"]
 
 # 월 정보 및 주차 리스트
@@ -445,29 +340,20 @@ week_labels = [f"{i+1}주" for i in range(len(week_nums))]
 has_weekly = "매주" in df_user_master["주차"].values if not df_user_master.empty else False
 
 # --- 모든 종류의 데이터 로드 ---
-df_saturday = load_saturday_schedule(gc, url, year)
-df_closing_days = load_closing_days(gc, url, year) # <-- [추가] 휴관일 데이터 로드
-df_request = st.session_state.get("df_request", pd.DataFrame())
-df_room_request = st.session_state.get("df_room_request", pd.DataFrame())
+df_saturday = dataset_store.frame("df_saturday_schedule")
+df_closing_days = dataset_store.frame("df_closing_days") # <-- [추가] 휴관일 데이터 로드
+df_request = dataset_store.frame("df_request")
+df_room_request = dataset_store.frame("df_room_request")
 
 # 현재 사용자에 해당하는 데이터 필터링
 df_user_request = df_request[df_request["이름"] == name].copy() if not df_request.empty else pd.DataFrame()
-df_user_room_request = df_room_request[df_room_request["이름"] == name].copy() if not df_room_request.empty else pd.DataFrame()
-
-# [추가] 빠른 조회를 위해 휴관일 날짜 세트 생성
-closing_dates_set = set(df_closing_days['날짜'].dt.date) if not df_closing_days.empty else set()
-
-# --- 각 종류별 이벤트 생성 ---
-# [수정] generate_master_events에 closing_dates_set 전달
-master_events = generate_master_events(df_user_master, year, month, week_labels, closing_dates_set)
-saturday_events = generate_saturday_events(df_saturday, name, year, month)
-request_events = generate_request_events(df_user_request)
-room_request_events = generate_room_request_events(df_user_room_request)
-closing_day_events = generate_closing_day_events(df_closing_days) # <-- [추가] 휴관일 이벤트 생성
 
-# --- 모든 이벤트를 하나로 합치기 ---
-# [수정] closing_day_events를 합산 목록에 추가
-events = master_events + saturday_events + request_events + room_request_events + closing_day_events
+# --- 이벤트 생성 ---
+# 전체 근무자 이벤트 인덱스는 월/데이터 버전별로 한 번만 만들어 모든 세션이 공유하고, 여기서는 본인 것만 꺼냅니다.
+base_version = dataset_store.versions("df_master", "df_saturday_schedule", "df_closing_days")
+request_version = dataset_store.versions("df_request", "df_room_request")
+event_index = calendar_events.get_calendar_event_index(df_master, df_request, df_room_request, df_saturday, df_closing_days, year, month, week_labels, base_version, request_version)
+events = calendar_events.get_user_events(event_index, name)
 
 calendar_options = {
     "initialView": "dayGridMonth",
@@ -503,11 +389,11 @@ with col_btn:
         try:
             with st.spinner("데이터를 다시 불러오는 중입니다..."):
                 st.cache_data.clear()
-                st.session_state["df_master"] = load_master_data_page1(gc, url)
-                st.session_state["df_user_master"] = st.session_state["df_master"][st.session_state["df_master"]["이름"] == name].copy()
-            st.success("데이터가 새로고침되었습니다.")
-            time.sleep(1)
-            st.rerun()
+                df_master = dataset_store.bind("df_master", "마스터", load_master_data_page1(gc, url))
+                dataset_store.bind("df_saturday_schedule", f"{year}년 토요/휴일 스케줄", load_saturday_schedule(gc, url, year))
+                dataset_store.bind("df_closing_days", f"{year}년 휴관일", load_closing_days(gc, url, year))
+                st.session_state["df_user_master"] = df_master[df_master["이름"] == name].copy()
+            flash.rerun("데이터가 새로고침되었습니다.")
         except APIError as e:
             st.warning("⚠️ 너무 많은 요청이 접속되어 딜레이되고 있습니다. 잠시 후 재시도 해주세요.")
             st.error(f"Google Sheets API 오류 (새로고침): {str(e)}")
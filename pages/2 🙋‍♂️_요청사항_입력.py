@@ -3,13 +3,16 @@ import streamlit as st
 import pandas as pd
 import calendar
 import datetime
-import time
 from dateutil.relativedelta import relativedelta
 from streamlit_calendar import calendar as st_calendar
 from google.oauth2.service_account import Credentials
 import gspread
 from gspread.exceptions import WorksheetNotFound, APIError
 import menu
+import flash
+import request_journal
+import calendar_events
+import dataset_store
 
 st.set_page_config(page_title="요청사항 입력", page_icon="🙋‍♂️", layout="wide")
 
@@ -20,9 +23,7 @@ menu.menu()
 
 # 로그인 체크 및 자동 리디렉션
 if not st.session_state.get("login_success", False):
-    st.warning("⚠️ Home 페이지에서 먼저 로그인해주세요.")
-    st.error("1초 후 Home 페이지로 돌아갑니다...")
-    time.sleep(1)
+    flash.flash("Home 페이지에서 먼저 로그인해주세요.", "warning")
     st.switch_page("Home.py")
     st.stop()
 
@@ -80,95 +81,6 @@ except Exception as e:
     st.error(f"초기 설정 중 오류 발생: {str(e)}")
     st.stop()
 
-# 캘린더 이벤트 생성 함수 (마스터, 토요일, 요청사항, 휴관일 모두 처리)
-def create_calendar_events(df_master, df_request, df_saturday_schedule, df_closing_days, current_user_name):
-    events = []
-    
-    # 빠른 조회를 위해 휴관일 날짜를 세트(set)으로 변환
-    closing_dates_set = set(df_closing_days['날짜'].dt.date) if not df_closing_days.empty else set()
-
-    # --- 1. 마스터 데이터(평일)에서 이벤트 생성 (휴관일 제외) ---
-    status_colors_master = {"오전": "#48A6A7", "오후": "#FCB454", "오전 & 오후": "#F38C79"}
-    if not df_master.empty:
-        master_data = {}
-        요일리스트 = ["월", "화", "수", "목", "금"] # 평일만 처리
-        every_week_df = df_master[df_master["주차"] == "매주"]
-        
-        for week in week_labels:
-            master_data[week] = {}
-            week_df = df_master[df_master["주차"] == week]
-            for day in 요일리스트:
-                day_specific = week_df[week_df["요일"] == day]
-                if not day_specific.empty:
-                    master_data[week][day] = day_specific.iloc[0]["근무여부"]
-                elif not every_week_df.empty:
-                    day_every = every_week_df[every_week_df["요일"] == day]
-                    master_data[week][day] = day_every.iloc[0]["근무여부"] if not day_every.empty else "근무없음"
-                else:
-                    master_data[week][day] = "근무없음"
-
-        weekday_map = {0: "월", 1: "화", 2: "수", 3: "목", 4: "금"}
-        _, last_day_of_month = calendar.monthrange(year, month)
-        first_sunday = next((day for day in range(1, 8) if datetime.date(year, month, day).weekday() == 6), None)
-
-        for day_num in range(1, last_day_of_month + 1):
-            date_obj = datetime.date(year, month, day_num)
-            
-            # 만약 해당 날짜가 휴관일이면, 마스터 일정 이벤트를 생성하지 않음
-            if date_obj in closing_dates_set:
-                continue
-
-            if date_obj.weekday() in weekday_map: # 평일(월~금)만 해당
-                day_name = weekday_map[date_obj.weekday()]
-                if first_sunday is None: week_num = (date_obj.day + datetime.date(year, month, 1).weekday()) // 7
-                else: week_num = (day_num - first_sunday) // 7 + 1 if day_num >= first_sunday else 0
-                if week_num >= len(week_labels): continue
-                week = week_labels[week_num]
-                status = master_data.get(week, {}).get(day_name, "근무없음")
-                if status and status != "근무없음":
-                    events.append({"title": f"{status}", "start": date_obj.strftime("%Y-%m-%d"), "color": status_colors_master.get(status, "#E0E0E0")})
-
-    # --- 2. 토요/휴일 스케줄 데이터에서 이벤트 생성 ---
-    status_colors_saturday = {"토요근무": "#6A5ACD", "당직": "#FF6347"}
-    if not df_saturday_schedule.empty:
-        saturdays_in_month = df_saturday_schedule[(df_saturday_schedule['날짜'].dt.year == year) & (df_saturday_schedule['날짜'].dt.month == month)]
-        for _, row in saturdays_in_month.iterrows():
-            date_obj = row['날짜'].date()
-            if isinstance(row.get('근무', ''), str) and current_user_name in row.get('근무', ''):
-                events.append({"title": "토요근무", "start": date_obj.strftime("%Y-%m-%d"), "color": status_colors_saturday.get("토요근무")})
-            if isinstance(row.get('당직', ''), str) and current_user_name == row.get('당직', '').strip():
-                events.append({"title": "당직", "start": date_obj.strftime("%Y-%m-%d"), "color": status_colors_saturday.get("당직")})
-
-    # --- 3. 요청사항 이벤트 생성 ---
-    status_colors_request = {"휴가": "#A1C1D3", "학회": "#B4ABE4", "보충 어려움(오전)": "#FFD3B5", "보충 어려움(오후)": "#FFD3B5", "보충 불가(오전)": "#FFB6C1", "보충 불가(오후)": "#FFB6C1", "꼭 근무(오전)": "#C3E6CB", "꼭 근무(오후)": "#C3E6CB"}
-    label_map = {"휴가": "휴가🎉", "학회": "학회📚", "보충 어려움(오전)": "보충 어려움(오전)", "보충 어려움(오후)": "보충 어려움(오후)", "보충 불가(오전)": "보충 불가(오전)", "보충 불가(오후)": "보충 불가(오후)", "꼭 근무(오전)": "꼭근무(오전)", "꼭 근무(오후)": "꼭근무(오후)"}
-    if not df_request.empty:
-        for _, row in df_request.iterrows():
-            분류, 날짜정보 = row["분류"], row["날짜정보"]
-            if not 날짜정보 or 분류 == "요청 없음": continue
-            if "~" in 날짜정보:
-                시작_str, 종료_str = [x.strip() for x in 날짜정보.split("~")]
-                시작 = datetime.datetime.strptime(시작_str, "%Y-%m-%d").date()
-                종료 = datetime.datetime.strptime(종료_str, "%Y-%m-%d").date()
-                events.append({"title": f"{label_map.get(분류, 분류)}", "start": 시작.strftime("%Y-%m-%d"), "end": (종료 + datetime.timedelta(days=1)).strftime("%Y-%m-%d"), "color": status_colors_request.get(분류, "#E0E0E0")})
-            else:
-                for 날짜 in [d.strip() for d in 날짜정보.split(",")]:
-                    try:
-                        dt = datetime.datetime.strptime(날짜, "%Y-%m-%d").date()
-                        events.append({"title": f"{label_map.get(분류, 분류)}", "start": dt.strftime("%Y-%m-%d"), "color": status_colors_request.get(분류, "#E0E0E0")})
-                    except: continue
-
-    # --- 4. 휴관일 이벤트 생성 ---
-    if not df_closing_days.empty:
-        for date_obj in df_closing_days['날짜']:
-            events.append({
-                "title": "휴관일", 
-                "start": date_obj.strftime("%Y-%m-%d"), 
-                "color": "#DC143C"  # 붉은색 계열 (Crimson)
-            })
-
-    return events
-
 # --- 초기 데이터 로딩 및 세션 상태 초기화 ---
 def initialize_data():
     """페이지에 필요한 모든 데이터를 한 번에 로드하고 세션 상태에 저장합니다."""
@@ -188,16 +100,22 @@ def initialize_data():
             worksheet_request = sheet.add_worksheet(title=sheet_name, rows="100", cols="20")
             worksheet_request.append_row(["이름", "분류", "날짜정보"])
             st.info(f"'{sheet_name}' 시트가 새로 생성되었습니다.")
-        df_request = pd.DataFrame(worksheet_request.get_all_records())
+        # 요청 추가/삭제는 '{sheet_name} 로그' 시트에 append만 하고, 화면에는 기준 시트 + 로그를 합친 현재 요청을 보여줍니다.
+        worksheet_journal = request_journal.get_journal_worksheet(sheet, sheet_name)
+        journal_records = request_journal.with_queued_entries(url, sheet_name, worksheet_journal.get_all_records())
+        # 삭제 표시가 해당 요청만 가리키도록 로그 요청ID를 함께 둡니다.
+        df_request = pd.DataFrame(request_journal.materialize(worksheet_request.get_all_records(), journal_records, with_ids=True))
 
         if df_request.empty:
-            df_request = pd.DataFrame(columns=["이름", "분류", "날짜정보"])
+            df_request = pd.DataFrame(columns=["이름", "분류", "날짜정보", "요청ID"])
 
         # 3. 모든 데이터를 세션 상태에 저장 (worksheet 객체 포함)
         st.session_state["worksheet_master"] = worksheet_master
         st.session_state["worksheet_request"] = worksheet_request
-        st.session_state["df_master"] = df_master
-        st.session_state["df_request"] = df_request
+        df_master = dataset_store.bind("df_master", "마스터", df_master)
+        dataset_store.bind("df_request", sheet_name, df_request)
+        dataset_store.bind("df_saturday_schedule", f"{year}년 토요/휴일 스케줄", load_saturday_schedule(gc, url, year))
+        dataset_store.bind("df_closing_days", f"{year}년 휴관일", load_closing_days(gc, url, year))
         st.session_state["df_user_master"] = df_master[df_master["이름"] == name].copy() if not df_master.empty else pd.DataFrame()
         # st.session_state["df_user_request"] = df_request[df_request["이름"] == name].copy() if not df_request.empty else pd.DataFrame()
 
@@ -251,8 +169,7 @@ def add_request_callback():
 
             날짜정보 = ", ".join(sorted(list(set(날짜목록))))
             if not 날짜목록 and 선택주차 and 선택요일:
-                add_placeholder.warning(f"⚠️ {month_str}에는 해당 주차/요일의 날짜가 없습니다. 다른 조합을 선택해주세요.")
-                time.sleep(1.5)
+                flash.flash(f"{month_str}에는 해당 주차/요일의 날짜가 없습니다. 다른 조합을 선택해주세요.", "warning")
                 return
             
     if not 날짜정보 and 분류 != "요청 없음":
@@ -260,22 +177,19 @@ def add_request_callback():
         return
 
     if 분류 != "요청 없음":
-        existing_request = st.session_state["df_request"][
-            (st.session_state["df_request"]["이름"] == name) &
-            (st.session_state["df_request"]["분류"] == 분류) &
-            (st.session_state["df_request"]["날짜정보"] == 날짜정보)
+        df_request = dataset_store.frame("df_request")
+        existing_request = df_request[
+            (df_request["이름"] == name) &
+            (df_request["분류"] == 분류) &
+            (df_request["날짜정보"] == 날짜정보)
         ]
         if not existing_request.empty:
-            add_placeholder.error("⚠️ 이미 존재하는 요청사항입니다.")
-            time.sleep(1.5)
+            flash.flash("이미 존재하는 요청사항입니다.", "error")
             return
 
     with add_placeholder.container():
         with st.spinner("요청사항을 추가 중입니다..."):
             try:
-                # 세션에서 워크시트 객체를 가져옵니다.
-                worksheet2 = st.session_state["worksheet_request"]
-
                 # '요청 없음'은 특별 처리: 기존 것을 지우고 추가해야 합니다. (아래 삭제 로직 참조)
                 if 분류 == "요청 없음":
                     st.error("'요청 없음' 기능은 기존 모든 요청을 삭제해야 하므로, 삭제 로직과 결합해야 합니다. (별도 구현 필요)")
@@ -286,15 +200,14 @@ def add_request_callback():
                     return
 
                 # --- ▼▼▼ 핵심 수정 부분 ▼▼▼ ---
-                # 시트 맨 끝에 한 줄만 추가합니다.
-                new_request_data = [name, 분류, 날짜정보]
-                worksheet2.append_row(new_request_data)
+                # 요청 로그에 한 줄을 남깁니다. (사전 전체 읽기 없음, write-behind 큐가 몇 초 안에 시트에 반영)
+                request_id = request_journal.queue_request(url, f"{month_str} 요청", name, 분류, 날짜정보)
                 # --- ▲▲▲ 핵심 수정 부분 ▲▲▲ ---
 
                 # 성공 후, 화면에 즉시 반영하기 위해 st.session_state의 DataFrame도 업데이트합니다.
-                df_request = st.session_state["df_request"]
-                new_df = pd.DataFrame([{"이름": name, "분류": 분류, "날짜정보": 날짜정보}])
-                st.session_state["df_request"] = pd.concat([df_request, new_df], ignore_index=True)
+                df_request = dataset_store.frame("df_request")
+                new_df = pd.DataFrame([{"이름": name, "분류": 분류, "날짜정보": 날짜정보, "요청ID": request_id}])
+                dataset_store.bind("df_request", f"{month_str} 요청", pd.concat([df_request, new_df], ignore_index=True))
 
             except gspread.exceptions.APIError as e:
                 st.warning(f"Google Sheets API 오류: {str(e)}")
@@ -303,8 +216,7 @@ def add_request_callback():
                 st.error(f"요청 추가 중 오류 발생: {str(e)}")
                 st.stop()
 
-        st.success("요청이 성공적으로 기록되었습니다.")
-        time.sleep(1.5)
+        flash.flash("요청이 성공적으로 기록되었습니다.")
     
     st.session_state.date_multiselect = []
     st.session_state.week_select = []
@@ -321,33 +233,22 @@ def delete_requests_callback():
     with delete_placeholder.container():
         with st.spinner("요청사항을 삭제 중입니다..."):
             try:
-                worksheet2 = st.session_state["worksheet_request"]
                 selected_items = st.session_state.get("delete_select", []) # UI에서 선택된 항목들
 
                 # --- ▼▼▼ 핵심 수정 부분 ▼▼▼ ---
-                # 1. 시트의 현재 데이터를 모두 실시간으로 다시 가져옵니다.
-                all_records = worksheet2.get_all_records()
-                rows_to_delete_indices = []
-
-                # 2. 삭제할 행의 인덱스를 찾습니다. (헤더가 1행이므로 데이터는 2행부터 시작)
-                for index, record in enumerate(all_records):
-                    # UI에 표시된 형식('분류 - 날짜정보')과 동일하게 문자열 생성
-                    item_str = f"{record['분류']} - {record['날짜정보']}"
-                    # 현재 로그인한 사용자의 요청이고, 삭제 대상으로 선택된 항목인지 확인
-                    if record['이름'] == name and item_str in selected_items:
-                        # gspread는 1-기반 인덱스 사용, +2는 헤더(1행)와 0-기반(enumerate) 때문
-                        rows_to_delete_indices.append(index + 2)
-
-                # 3. 찾은 인덱스의 행들을 삭제합니다. (중요: 인덱스가 엉키지 않게 역순으로 정렬 후 삭제)
-                if rows_to_delete_indices:
-                    for row_index in sorted(rows_to_delete_indices, reverse=True):
-                        worksheet2.delete_rows(row_index)
+                # 현재 사용자의 선택 항목('분류 - 날짜정보')에 삭제 표시를 남깁니다. (write-behind 큐로 일괄 반영)
+                # 행을 물리적으로 지우지 않으므로 다른 사용자가 방금 추가한 행에 영향을 주지 않습니다.
+                df_request = dataset_store.frame("df_request")
+                labels = df_request["분류"].astype(str) + " - " + df_request["날짜정보"].astype(str)
+                mine = df_request["이름"] == name
+                # 내용이 같은 요청이 여러 개여도 선택 하나당 한 건만 지웁니다.
+                target_index = [labels[mine & (labels == item)].index[0] for item in selected_items if (mine & (labels == item)).any()]
+                is_target = df_request.index.isin(target_index)
+                request_journal.queue_tombstones(url, f"{month_str} 요청", df_request[is_target].to_dict("records"))
                 # --- ▲▲▲ 핵심 수정 부분 ▲▲▲ ---
 
                 # 성공 후, 화면에 즉시 반영하기 위해 st.session_state의 DataFrame도 업데이트합니다.
-                # (간단하게는 전체 데이터를 다시 불러오는 것이 가장 정확합니다.)
-                updated_records = worksheet2.get_all_records()
-                st.session_state["df_request"] = pd.DataFrame(updated_records)
+                dataset_store.bind("df_request", f"{month_str} 요청", df_request[~is_target].reset_index(drop=True))
 
 
             except gspread.exceptions.APIError as e:
@@ -357,8 +258,7 @@ def delete_requests_callback():
                 st.error(f"요청 삭제 중 오류 발생: {str(e)}")
                 st.stop()
 
-        st.success("요청이 성공적으로 삭제되었습니다.")
-        time.sleep(1.5)
+        flash.flash("요청이 성공적으로 삭제되었습니다.")
 
 # 토요/휴일 스케줄 데이터 로드 함수 (새로 추가)
 @st.cache_data(show_spinner=False)
@@ -431,9 +331,8 @@ if "initial_load_done_page2" not in st.session_state:
         st.error(f"초기 데이터 로드 중 오류 발생: {str(e)}")
         st.stop()
 
-df_request = st.session_state["df_request"]
+df_request = dataset_store.frame("df_request")
 df_user_request = df_request[df_request["이름"] == name].copy()
-df_user_master = st.session_state["df_master"][st.session_state["df_master"]["이름"] == name].copy()
 
 if 'date_range' not in st.session_state:
     st.session_state.date_range = [] 
@@ -459,14 +358,17 @@ with col_btn:
 st.write("- 휴가 / 보충 불가 / 꼭 근무 관련 요청사항이 있을 경우 반드시 기재해 주세요.\n- 요청사항은 매월 기재해 주셔야 하며, 별도 요청이 없을 경우에도 반드시 '요청 없음'을 입력해 주세요.")
 
 # 토요 스케줄 데이터 로드 (추가)
-df_saturday = load_saturday_schedule(gc, url, year)
+df_saturday = dataset_store.frame("df_saturday_schedule")
 
 # ▼▼▼ [수정됨] 휴관일 데이터를 불러오고, 캘린더와 날짜 선택 목록에 모두 적용 ▼▼▼
-df_closing_days = load_closing_days(gc, url, year)
+df_closing_days = dataset_store.frame("df_closing_days")
 closing_dates_set = set(df_closing_days['날짜'].dt.date) if not df_closing_days.empty else set()
 
-# events_combined 생성 부분 수정 (휴관일 데이터와 사용자 이름 추가)
-events_combined = create_calendar_events(df_user_master, df_user_request, df_saturday, df_closing_days, name)
+# 캘린더 이벤트 (마스터, 토요일, 요청사항, 휴관일) - 월/데이터 버전별 공유 인덱스에서 본인 것만 꺼냅니다.
+base_version = dataset_store.versions("df_master", "df_saturday_schedule", "df_closing_days")
+request_version = dataset_store.versions("df_request")
+event_index = calendar_events.get_calendar_event_index(dataset_store.frame("df_master"), df_request, None, df_saturday, df_closing_days, year, month, week_labels, base_version, request_version)
+events_combined = calendar_events.get_user_events(event_index, name, kinds=("master", "saturday", "request", "closing_day"))
 
 if not events_combined:
     st.info("☑️ 당월에 입력하신 요청사항 또는 마스터 스케줄이 없습니다.")
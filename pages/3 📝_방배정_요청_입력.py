@@ -1,5 +1,3 @@
-from googleapiclient.discovery import build
-import time
 import numpy as np
 import streamlit as st
 import pandas as pd
@@ -11,6 +9,11 @@ from google.oauth2.service_account import Credentials
 import gspread
 from gspread.exceptions import WorksheetNotFound
 import menu
+import flash
+import request_journal
+import sheet_ops
+import calendar_events
+import dataset_store
 import re
 
 # 페이지 설정
@@ -23,9 +26,7 @@ menu.menu()
 
 # 로그인 체크 및 자동 리디렉션
 if not st.session_state.get("login_success", False):
-    st.warning("⚠️ Home 페이지에서 먼저 로그인해주세요.")
-    st.error("1초 후 Home 페이지로 돌아갑니다...")
-    time.sleep(1)
+    flash.flash("Home 페이지에서 먼저 로그인해주세요.", "warning")
     st.switch_page("Home.py")
     st.stop()
 
@@ -70,8 +71,8 @@ def load_request_data_page3(sheet, sheet_name):
         except WorksheetNotFound:
             worksheet = sheet.add_worksheet(title=sheet_name, rows="100", cols="20")
             worksheet.append_row(["이름", "분류", "날짜정보"])
-        data = worksheet.get_all_records()
-        return pd.DataFrame(data) if data else pd.DataFrame(columns=["이름", "분류", "날짜정보"])
+        # 기준 시트 + 아직 압축되지 않은 요청 로그를 합친 현재 요청
+        return request_journal.load_current_requests(sheet, sheet_name)
     except gspread.exceptions.APIError as e:
         st.warning("⚠️ 너무 많은 요청이 접수되어 딜레이되고 있습니다. 잠시 후 재시도 해주세요.")
         st.error(f"Google Sheets API 오류 (요청 데이터): {str(e)}")
@@ -100,111 +101,6 @@ def load_room_request_data_page3(sheet, sheet_name):
         st.error(f"방배정 요청 데이터 로드 중 오류 발생: {str(e)}")
         st.stop()
 
-def generate_saturday_events(df_saturday_schedule, current_user_name, year, month):
-    """토요/휴일 스케줄에서 현재 사용자의 이벤트를 생성하는 함수"""
-    events = []
-    status_colors = {"토요근무": "#6A5ACD", "당직": "#FF6347"}
-
-    if not df_saturday_schedule.empty:
-        # 해당 월의 데이터만 필터링
-        month_schedule = df_saturday_schedule[
-            (df_saturday_schedule['날짜'].dt.year == year) &
-            (df_saturday_schedule['날짜'].dt.month == month)
-        ]
-        
-        for _, row in month_schedule.iterrows():
-            date_obj = row['날짜'].date()
-            # 근무자 확인
-            work_staff = row.get('근무', '')
-            if isinstance(work_staff, str) and current_user_name in work_staff:
-                events.append({"title": "토요근무", "start": date_obj.strftime("%Y-%m-%d"), "color": status_colors.get("토요근무"), "source": "saturday"})
-            # 당직자 확인
-            on_call_staff = row.get('당직', '')
-            if isinstance(on_call_staff, str) and current_user_name == on_call_staff.strip():
-                events.append({"title": "당직", "start": date_obj.strftime("%Y-%m-%d"), "color": status_colors.get("당직"), "source": "saturday"})
-    return events
-
-def generate_master_events(df_user_master, year, month, week_labels, closing_dates_set):
-    master_data = {}
-    요일리스트 = ["월", "화", "수", "목", "금"]
-    
-    every_week_df = df_user_master[df_user_master["주차"] == "매주"]
-    
-    for week in week_labels:
-        master_data[week] = {}
-        week_df = df_user_master[df_user_master["주차"] == week]
-        for day in 요일리스트:
-            day_specific = week_df[week_df["요일"] == day]
-            if not day_specific.empty:
-                master_data[week][day] = day_specific.iloc[0]["근무여부"]
-            elif not every_week_df.empty:
-                day_every = every_week_df[every_week_df["요일"] == day]
-                master_data[week][day] = day_every.iloc[0]["근무여부"] if not day_every.empty else "근무없음"
-            else:
-                master_data[week][day] = "근무없음"
-
-    events = []
-    weekday_map = {0: "월", 1: "화", 2: "수", 3: "목", 4: "금"}
-    _, last_day = calendar.monthrange(year, month)
-    status_colors = {"오전": "#48A6A7", "오후": "#FCB454", "오전 & 오후": "#F38C79"}
-    first_sunday = next((day for day in range(1, 8) if datetime.date(year, month, day).weekday() == 6), None)
-
-    for day in range(1, last_day + 1):
-        date_obj = datetime.date(year, month, day)
-        
-        # ▼▼▼ [수정됨] 휴관일인 경우 마스터 일정을 표시하지 않고 건너뜁니다. ▼▼▼
-        if date_obj in closing_dates_set:
-            continue
-        
-        weekday = date_obj.weekday()
-        if weekday in weekday_map:
-            day_name = weekday_map[weekday]
-            if first_sunday is None: week_num = (date_obj.day + datetime.date(year, month, 1).weekday()) // 7
-            else: week_num = (day - first_sunday) // 7 + 1 if day >= first_sunday else 0
-            if week_num >= len(week_labels): continue
-            week = week_labels[week_num]
-            status = master_data.get(week, {}).get(day_name, "근무없음")
-            
-            if status and status != "근무없음":
-                events.append({"title": f"{status}", "start": date_obj.strftime("%Y-%m-%d"), "color": status_colors.get(status, "#E0E0E0"), "source": "master"})
-    return events
-
-def generate_request_events(df_user_request, today):
-    status_colors_request = {
-        "휴가": "#A1C1D3", "학회": "#B4ABE4", "보충 어려움(오전)": "#FFD3B5", "보충 어려움(오후)": "#FFD3B5",
-        "보충 불가(오전)": "#FFB6C1", "보충 불가(오후)": "#FFB6C1", "꼭 근무(오전)": "#C3E6CB",
-        "꼭 근무(오후)": "#C3E6CB",
-    }
-    label_map = {
-        "휴가": "휴가🎉", "학회": "학회📚", "보충 어려움(오전)": "보충 어려움(오전)", "보충 어려움(오후)": "보충 어려움(오후)",
-        "보충 불가(오전)": "보충 불가(오전)", "보충 불가(오후)": "보충 불가(오후)", "꼭 근무(오전)": "꼭근무(오전)",
-        "꼭 근무(오후)": "꼭근무(오후)"
-    }
-    
-    events = []
-    for _, row in df_user_request.iterrows():
-        분류 = row["분류"]
-        날짜정보 = row["날짜정보"]
-        if not 날짜정보:
-            continue
-        if "~" in 날짜정보:
-            시작_str, 종료_str = [x.strip() for x in 날짜정보.split("~")]
-            시작 = datetime.datetime.strptime(시작_str, "%Y-%m-%d").date()
-            종료 = datetime.datetime.strptime(종료_str, "%Y-%m-%d").date()
-            events.append({"title": label_map.get(분류, 분류), "start": 시작.strftime("%Y-%m-%d"),
-                           "end": (종료 + datetime.timedelta(days=1)).strftime("%Y-%m-%d"),
-                           "color": status_colors_request.get(분류, "#E0E0E0"), "source": "request"})
-        else:
-            for 날짜 in [d.strip() for d in 날짜정보.split(",")]:
-                try:
-                    dt = datetime.datetime.strptime(날짜, "%Y-%m-%d").date()
-                    events.append({"title": label_map.get(분류, 분류), "start": dt.strftime("%Y-%m-%d"),
-                                   "end": dt.strftime("%Y-%m-%d"),
-                                   "color": status_colors_request.get(분류, "#E0E0E0"), "source": "request"})
-                except:
-                    continue
-    return events
-
 def load_saturday_schedule(sheet, year):
     """지정된 연도의 토요/휴일 스케줄 데이터를 로드하는 함수"""
     try:
@@ -248,32 +144,6 @@ def load_closing_days(sheet, year):
         st.error(f"휴관일 로드 중 오류 발생: {str(e)}")
         return pd.DataFrame(columns=["날짜"])
 
-def generate_room_request_events(df_user_room_request, today):
-    label_map = {
-        "1번방": "1번방", "2번방": "2번방", "3번방": "3번방", "4번방": "4번방", "5번방": "5번방",
-        "6번방": "6번방", "7번방": "7번방", "8번방": "8번방", "9번방": "9번방", "10번방": "10번방",
-        "11번방": "11번방", "당직 안됨": "당직🚫", "오전 당직 안됨": "오전당직🚫", "오후 당직 안됨": "오후당직🚫",
-        "당직 아닌 이른방": "당직아닌이른방", "이른방 제외": "이른방 제외", "늦은방 제외": "늦은방 제외",
-        "8:30": "8:30", "9:00": "9:00", "9:30": "9:30", "10:00": "10:00", "오전 당직": "오전당직",
-        "오후 당직": "오후당직",
-    }
-    events = []
-    for _, row in df_user_room_request.iterrows():
-        분류 = row["분류"]
-        날짜정보 = row["날짜정보"]
-        if not 날짜정보 or pd.isna(날짜정보):
-            continue
-        for 날짜 in [d.strip() for d in 날짜정보.split(",")]:
-            try:
-                date_part = 날짜.split(" (")[0]
-                dt = datetime.datetime.strptime(date_part, "%Y-%m-%d").date()
-                events.append({"title": label_map.get(분류, 분류), "start": dt.strftime("%Y-%m-%d"),
-                               "end": dt.strftime("%Y-%m-%d"), "color": "#7C8EC7",
-                               "source": "room_request", "allDay": True})
-            except Exception as e:
-                continue
-    return events
-
 def initialize_and_sync_data(gc, url, name, month_start, month_end):
     """페이지에 필요한 모든 데이터를 로드하고, 동기화하며, 세션 상태에 저장합니다."""
     try:
@@ -319,11 +189,11 @@ def initialize_and_sync_data(gc, url, name, month_start, month_end):
                 pass
         
         # 4. 최종 데이터를 세션 상태에 저장
-        st.session_state["df_master"] = df_master
-        st.session_state["df_request"] = df_request
-        st.session_state["df_room_request"] = df_room_request
-        st.session_state["df_saturday_schedule"] = df_saturday_schedule
-        st.session_state["df_closing_days"] = df_closing_days # <-- [추가] 휴관일 데이터 세션에 저장
+        dataset_store.bind("df_master", "마스터", df_master)
+        dataset_store.bind("df_request", f"{month_str} 요청", df_request)
+        dataset_store.bind("df_room_request", f"{month_str} 방배정 요청", df_room_request)
+        dataset_store.bind("df_saturday_schedule", f"{year}년 토요/휴일 스케줄", df_saturday_schedule)
+        dataset_store.bind("df_closing_days", f"{year}년 휴관일", df_closing_days) # <-- [추가] 휴관일 데이터 세션에 저장
 
     except (gspread.exceptions.APIError, Exception) as e:
         st.error(f"데이터 초기화 및 동기화 중 오류가 발생했습니다: {e}")
@@ -384,9 +254,9 @@ if "initial_load_done" not in st.session_state:
         st.error(f"초기 데이터 로드 중 오류 발생: {str(e)}")
         st.stop()
 
-df_master = st.session_state.get("df_master", pd.DataFrame())
-df_request = st.session_state.get("df_request", pd.DataFrame())
-df_room_request = st.session_state.get("df_room_request", pd.DataFrame())
+df_master = dataset_store.frame("df_master")
+df_request = dataset_store.frame("df_request")
+df_room_request = dataset_store.frame("df_room_request")
 name = st.session_state.get("name")
 
 # 각 데이터프레임에 '이름' 컬럼이 있는지 확인 후 필터링
@@ -406,31 +276,17 @@ else:
     st.session_state["df_user_room_request"] = pd.DataFrame()
 
 # UI 렌더링 시작
-df_saturday = st.session_state.get("df_saturday_schedule", pd.DataFrame())
-df_closing_days = st.session_state.get("df_closing_days", pd.DataFrame()) # <-- [추가] 세션에서 휴관일 데이터 가져오기
+df_saturday = dataset_store.frame("df_saturday_schedule")
+df_closing_days = dataset_store.frame("df_closing_days") # <-- [추가] 세션에서 휴관일 데이터 가져오기
 
 # 빠른 조회를 위해 휴관일 날짜 세트 생성
 closing_dates_set = set(df_closing_days['날짜'].dt.date) if not df_closing_days.empty else set()
 
-# generate_master_events에 closing_dates_set 전달
-master_events = generate_master_events(st.session_state["df_user_master"], year, month, week_labels, closing_dates_set)
-request_events = generate_request_events(st.session_state["df_user_request"], next_month_date)
-room_request_events = generate_room_request_events(st.session_state["df_user_room_request"], next_month_date)
-saturday_events = generate_saturday_events(df_saturday, name, year, month)
-
-# [추가] 휴관일 이벤트 생성
-closing_day_events = []
-if not df_closing_days.empty:
-    for date_obj in df_closing_days['날짜']:
-        closing_day_events.append({
-            "title": "휴관일", 
-            "start": date_obj.strftime("%Y-%m-%d"), 
-            "color": "#DC143C", # 붉은색 계열
-            "source": "closing_day"
-        })
-
-# 모든 이벤트를 하나로 합치기
-all_events = master_events + room_request_events + saturday_events + closing_day_events
+# 전체 근무자 이벤트 인덱스는 월/데이터 버전별로 한 번만 만들어 모든 세션이 공유하고, 여기서는 본인 것만 꺼냅니다.
+base_version = dataset_store.versions("df_master", "df_saturday_schedule", "df_closing_days")
+request_version = dataset_store.versions("df_room_request")
+event_index = calendar_events.get_calendar_event_index(df_master, None, df_room_request, df_saturday, df_closing_days, year, month, week_labels, base_version, request_version)
+all_events = calendar_events.get_user_events(event_index, name, kinds=("master", "room_request", "saturday", "closing_day"))
 
 st.header(f"📅 {name} 님의 {month_str} 방배정 요청", divider='rainbow')
 
@@ -843,7 +699,7 @@ if submit_add:
             sheet = st.session_state["sheet"]
             worksheet2 = sheet.worksheet(f"{month_str} 방배정 요청")
             
-            df_room_request_temp = st.session_state["df_room_request"].copy()
+            df_room_request_temp = dataset_store.frame("df_room_request").copy()
             new_requests = []
             
             # 중복 체크 로직 (기존과 동일)
@@ -866,15 +722,11 @@ if submit_add:
                     # 로컬 데이터(session_state) 업데이트 (기존 로직과 동일)
                     new_request_df = pd.DataFrame(new_requests)
                     df_room_request_temp = pd.concat([df_room_request_temp, new_request_df], ignore_index=True).sort_values(by=["이름", "날짜정보"]).fillna("").reset_index(drop=True)
-                    st.session_state["df_room_request"] = df_room_request_temp
+                    dataset_store.bind("df_room_request", f"{month_str} 방배정 요청", df_room_request_temp)
                     st.session_state["df_user_room_request"] = df_room_request_temp[df_room_request_temp["이름"] == name].copy()
-                    
-                    time.sleep(1)
                 
-                st.success("요청이 성공적으로 기록되었습니다.")
                 st.session_state.clear_inputs = True
-                time.sleep(1.5)
-                st.rerun()
+                flash.rerun("요청이 성공적으로 기록되었습니다.")
             else:
                 st.info("ℹ️ 이미 존재하는 요청사항입니다.") # 기존 로직 유지
         else:
@@ -903,37 +755,26 @@ if not st.session_state.get("df_user_room_request", pd.DataFrame()).empty:
                 worksheet2 = sheet.worksheet(f"{month_str} 방배정 요청")
                 
                 # ▼▼▼ [수정된 부분] clear()/update() 대신 특정 행을 찾아 삭제 ▼▼▼
-                all_records = worksheet2.get_all_records()
-                rows_to_delete_indices = []
-
-                # 삭제할 항목들을 실제 시트에서 찾아 인덱스를 기록
-                for i, record in enumerate(all_records):
-                    # 삭제 대상인지 확인하기 위해 multiselect 옵션과 동일한 문자열 생성
-                    record_str = f"{record['분류']} - {format_date_for_display(record['날짜정보'])}"
-                    if record['이름'] == name and record_str in selected_items:
-                        # gspread는 1-based index, 헤더 포함이므로 i+2
-                        rows_to_delete_indices.append(i + 2)
-
-                # 찾은 인덱스의 행들을 삭제 (역순으로 정렬하여 삭제 시 인덱스 밀림 방지)
-                if rows_to_delete_indices:
-                    for row_index in sorted(rows_to_delete_indices, reverse=True):
-                        worksheet2.delete_rows(row_index)
+                # multiselect 옵션과 같은 문자열로 대상 행을 찾아 한 번의 batch_update로 삭제
+                deleted_count, _ = sheet_ops.delete_records(
+                    worksheet2,
+                    lambda record: record['이름'] == name and f"{record['분류']} - {format_date_for_display(record['날짜정보'])}" in selected_items,
+                )
                 # ▲▲▲ [수정 완료] ▲▲▲
 
+                if deleted_count:
                     # 로컬 데이터(session_state) 업데이트 (기존 로직과 유사)
-                    df_room_request_temp = st.session_state["df_room_request"].copy()
+                    df_room_request_temp = dataset_store.frame("df_room_request").copy()
                     selected_indices = []
                     for item in selected_items:
                         for idx, row in df_room_request_temp.iterrows():
                             if row['이름'] == name and f"{row['분류']} - {format_date_for_display(row['날짜정보'])}" == item:
                                 selected_indices.append(idx)
                     df_room_request_temp = df_room_request_temp.drop(index=selected_indices).reset_index(drop=True)
-                    st.session_state["df_room_request"] = df_room_request_temp
+                    dataset_store.bind("df_room_request", f"{month_str} 방배정 요청", df_room_request_temp)
                     st.session_state["df_user_room_request"] = df_room_request_temp[df_room_request_temp["이름"] == name].copy()
 
-                    st.success("요청이 성공적으로 삭제되었습니다.")
-                    time.sleep(1.5)
-                    st.rerun()
+                    flash.rerun("요청이 성공적으로 삭제되었습니다.")
                 else:
                     st.info("ℹ️ 삭제할 항목을 찾을 수 없습니다.") # 기존 로직 유지
         except Exception as e:
@@ -2,13 +2,16 @@ import streamlit as st
 import pandas as pd
 import gspread
 from google.oauth2.service_account import Credentials
-import time
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 import uuid
 import re
 from zoneinfo import ZoneInfo
 import menu
+import flash
+import write_behind
+import schedule_schema
+import versioned_memo
 import os
 
 # --- 페이지 설정 및 메뉴 호출 ---
@@ -18,9 +21,7 @@ menu.menu()
 
 # --- 로그인 체크 ---
 if not st.session_state.get("login_success", False):
-    st.warning("⚠️ Home 페이지에서 먼저 로그인해주세요.")
-    st.error("1초 후 Home 페이지로 돌아갑니다...")
-    time.sleep(1)
+    flash.flash("Home 페이지에서 먼저 로그인해주세요.", "warning")
     st.switch_page("Home.py")
     st.stop()
 
@@ -83,8 +84,18 @@ def find_latest_schedule_version(sheet, month_str):
     # 가장 높은 버전 번호를 가진 시트의 이름을 반환
     return max(versions, key=versions.get)
 
-@st.cache_data(ttl=30, show_spinner=False)
+REQUEST_HEADERS = ['RequestID', '요청일시', '요청자', '요청자 사번', '변경 요청', '변경 요청한 스케줄']
+
 def get_my_requests(month_str, employee_id):
+    """시트의 내 요청 + 아직 시트에 반영 중인(write-behind 큐) 내 요청."""
+    if not employee_id:
+        return []
+    queued = write_behind.get_queue().rows(st.secrets["google_sheet"]["url"], REQUEST_SHEET_NAME)
+    merged = write_behind.merge_rows(fetch_my_requests(month_str, employee_id), REQUEST_HEADERS, queued, key='RequestID')
+    return [req for req in merged if str(req.get('요청자 사번')) == str(employee_id)]
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_my_requests(month_str, employee_id):
     if not employee_id:
         return []
     try:
@@ -109,67 +120,22 @@ def get_my_requests(month_str, employee_id):
         st.stop()
 
 def add_request_to_sheet(request_data, month_str):
-    try:
-        gc = get_gspread_client()
-        if not gc:
-            return False
-        spreadsheet = gc.open_by_url(st.secrets["google_sheet"]["url"])
-        headers = ['RequestID', '요청일시', '요청자', '요청자 사번', '변경 요청', '변경 요청한 스케줄']
-        try:
-            worksheet = spreadsheet.worksheet(REQUEST_SHEET_NAME)
-            current_headers = worksheet.row_values(1)
-            if not current_headers or current_headers != headers:
-                try:
-                    worksheet.update('A1:F1', [headers])
-                    # st.info(f"'{REQUEST_SHEET_NAME}' 시트의 헤더를 올바른 형식으로 업데이트했습니다.")
-                except gspread.exceptions.APIError as e:
-                    st.warning("⚠️ 너무 많은 요청이 접속되어 딜레이되고 있습니다. 잠시 후 재시도 해주세요.")
-                    st.error(f"Google Sheets API 오류 (헤더 업데이트): {str(e)}")
-                    st.stop()
-        except gspread.exceptions.WorksheetNotFound:
-            try:
-                worksheet = spreadsheet.add_worksheet(title=REQUEST_SHEET_NAME, rows=100, cols=len(headers))
-                worksheet.append_row(headers)
-                # st.info(f"'{REQUEST_SHEET_NAME}' 시트를 새로 생성하고 헤더를 추가했습니다.")
-                
-            except gspread.exceptions.APIError as e:
-                st.warning("⚠️ 너무 많은 요청이 접속되어 딜레이되고 있습니다. 잠시 후 재시도 해주세요.")
-                st.error(f"Google Sheets API 오류 (시트 생성): {str(e)}")
-                st.stop()
-
-        existing_requests = worksheet.get_all_records()
-        new_request_signature = (request_data.get('변경 요청'), request_data.get('변경 요청한 스케줄'))
-        for req in existing_requests:
-            existing_signature = (req.get('변경 요청'), req.get('변경 요청한 스케줄'))
-            if new_request_signature == existing_signature:
-                return "DUPLICATE"
-                            
-        row_to_add = [
-            request_data.get('RequestID'),
-            request_data.get('요청일시'),
-            request_data.get('요청자'),
-            request_data.get('요청자 사번'),
-            request_data.get('변경 요청'),
-            request_data.get('변경 요청한 스케줄')
-        ]
-        try:
-            worksheet.append_row(row_to_add)
-        except gspread.exceptions.APIError as e:
-            st.warning("⚠️ 너무 많은 요청이 접속되어 딜레이되고 있습니다. 잠시 후 재시도 해주세요.")
-            st.error(f"Google Sheets API 오류 (요청 추가): {str(e)}")
-            st.stop()
-        st.cache_data.clear()
-        return "SUCCESS" 
-    except gspread.exceptions.APIError as e:
-        st.warning("⚠️ 너무 많은 요청이 접속되어 딜레이되고 있습니다. 잠시 후 재시도 해주세요.")
-        st.error(f"Google Sheets API 오류 (요청 추가): {str(e)}")
-        st.stop()
-    except Exception as e:
-        st.warning("⚠️ 새로고침 버튼을 눌러 데이터를 다시 로드해주십시오.")
-        st.error(f"교환 요청 저장 실패: {str(e)}")
-        st.stop()
+    """변경 요청을 write-behind 큐에 넣습니다. (시트 반영은 백그라운드에서 몇 초 안에 일괄 처리)"""
+    new_request_signature = (request_data.get('변경 요청'), request_data.get('변경 요청한 스케줄'))
+    # '변경 요청'에 요청자 이름이 들어가므로, 내 요청(큐 대기분 포함)만 보면 중복 여부를 알 수 있습니다.
+    for req in get_my_requests(month_str, request_data.get('요청자 사번')):
+        existing_signature = (req.get('변경 요청'), req.get('변경 요청한 스케줄'))
+        if new_request_signature == existing_signature:
+            return "DUPLICATE"
+
+    row_to_add = [request_data.get(col) for col in REQUEST_HEADERS]
+    write_behind.get_queue().submit(st.secrets["google_sheet"]["url"], REQUEST_SHEET_NAME, row_to_add, header=REQUEST_HEADERS)
+    return "SUCCESS"
 
 def delete_request_from_sheet(request_id, month_str):
+    # 아직 시트에 반영되지 않은 요청이면 큐에서 취소하는 것으로 끝납니다.
+    if write_behind.get_queue().cancel(st.secrets["google_sheet"]["url"], REQUEST_SHEET_NAME, lambda row: row[0] == request_id):
+        return True
     try:
         gc = get_gspread_client()
         if not gc:
@@ -204,102 +170,47 @@ def get_shift_type(col_name):
         return "오후"
     return "기타"
 
-# ✅ 수정된 get_person_shifts 함수
-def get_person_shifts(df, person_name):
-    # 중복을 방지하기 위해 세트(set)를 사용
-    shifts_set = set()
-
-    am_cols_in_df = [col for col in AM_COLS if col in df.columns]
-    oncall_col_in_df = ONCALL_COL if ONCALL_COL in df.columns else None
-    pm_cols_in_df = [col for col in PM_COLS if col in df.columns]
-
-    for _, row in df.iterrows():
-        dt = row['날짜_dt']
-        date_str_display = dt.strftime("%-m월 %-d일") + f" ({'월화수목금토일'[dt.weekday()]})"
-
-        # 1. 온콜 근무 확인
-        if oncall_col_in_df and row[oncall_col_in_df] == person_name:
-            shift_type = '오전당직(온콜)'
-            display_str = f"{date_str_display} - {shift_type}"
-            shifts_set.add((dt.date(), shift_type, display_str, person_name))
-
-        # 2. 일반 오전 근무 확인
-        is_in_am = any(row[col] == person_name for col in am_cols_in_df)
-        if is_in_am:
-            shift_type = '오전'
-            display_str = f"{date_str_display} - {shift_type}"
-            shifts_set.add((dt.date(), shift_type, display_str, person_name))
-
-        # 3. 오후 근무 확인
-        is_in_pm = any(row[col] == person_name for col in pm_cols_in_df)
-        if is_in_pm:
-            shift_type = '오후'
-            display_str = f"{date_str_display} - {shift_type}"
-            shifts_set.add((dt.date(), shift_type, display_str, person_name))
-
-    # 세트를 정렬된 딕셔너리 리스트로 변환하여 반환
-    sorted_shifts = sorted(list(shifts_set), key=lambda x: (x[0], x[1]))
-    return [
-        {'date_obj': date_obj, 'shift_type': stype, 'display_str': dstr, 'person_name': pname}
-        for date_obj, stype, dstr, pname in sorted_shifts
-    ]
-
-def get_all_employee_names(df):
-    all_cols = [col for col in df.columns if col in AM_COLS + PM_COLS]
-    return set(df[all_cols].values.ravel()) - {''}
-
-# ✅ 수정된 is_person_assigned_at_time 함수
-def is_person_assigned_at_time(df, person_name, date_obj, shift_type):
-    row_data = df[df['날짜_dt'].dt.date == date_obj]
-    if row_data.empty:
-        return False
-    row_dict = row_data.iloc[0].to_dict()
-
-    check_cols = []
-    if shift_type == "오전":
-        # '온콜'을 제외한 오전 근무 열만 확인
-        check_cols = [col for col in AM_COLS if col in row_dict]
-    elif shift_type == "오전당직(온콜)":
-        # '온콜' 열만 확인
-        if ONCALL_COL in row_dict:
-            check_cols = [ONCALL_COL]
-    elif shift_type == "오후":
-        check_cols = [col for col in PM_COLS if col in row_dict]
-    else:
-        return False
+# ✅ 스케줄 역색인(schedule_schema.ShiftIndex) 조회 함수
+def get_person_shifts(shift_index, person_name):
+    return shift_index.shifts(person_name)
 
-    # 해당 열들에 이름이 있는지 확인
-    for col in check_cols:
-        if row_dict.get(col) == person_name:
-            return True
-    return False
+def get_all_employee_names(shift_index):
+    return set(shift_index.employees)
+
+def is_person_assigned_at_time(shift_index, person_name, date_obj, shift_type):
+    if shift_type not in ("오전", "오후", ONCALL_COL):
+        return False
+    return shift_index.is_assigned(person_name, date_obj, shift_type)
 
 @st.cache_data(ttl=300, show_spinner=False)
 def load_schedule_data(month_str):
-    """가장 최신 버전의 스케줄 데이터를 불러온 후, 필요한 열만 남도록 필터링하고 이름을 정제합니다.""" # <== 주석 설명 업데이트
+    """가장 최신 버전의 스케줄 데이터를 불러온 후, 필요한 열만 남도록 필터링하고 이름을 정제합니다.
+
+    (표, 시트 이름, 데이터 버전)을 반환합니다. 데이터 버전은 실제로 불러올 때 한 번 정해지며 역색인 캐시의 키로 씁니다.
+    """ # <== 주석 설명 업데이트
     try:
         gc = get_gspread_client()
         if not gc:
-            return pd.DataFrame(), None
+            return pd.DataFrame(), None, None
 
         spreadsheet = gc.open_by_url(st.secrets["google_sheet"]["url"])
         latest_version_name = find_latest_schedule_version(spreadsheet, month_str)
         
         if not latest_version_name:
             st.info(f"{month_str} 스케줄이 아직 배정되지 않았습니다.")
-            return pd.DataFrame(), None
+            return pd.DataFrame(), None, None
 
         worksheet = spreadsheet.worksheet(latest_version_name)
         records = worksheet.get_all_records()
         
         if not records:
             st.info(f"'{latest_version_name}' 시트에 데이터가 없습니다.")
-            return pd.DataFrame(), latest_version_name
+            return pd.DataFrame(), latest_version_name, None
             
         df = pd.DataFrame(records)
         if '날짜' not in df.columns:
             st.info(f"'{latest_version_name}' 시트의 형식이 올바르지 않습니다.")
-            return pd.DataFrame(), latest_version_name
+            return pd.DataFrame(), latest_version_name, None
 
         essential_columns = ['날짜', '요일'] + [str(i) for i in range(1, 13)] + ['오전당직(온콜)'] + [f'오후{i}' for i in range(1, 5)]
         columns_to_keep = [col for col in essential_columns if col in df.columns]
@@ -316,10 +227,10 @@ def load_schedule_data(month_str):
             # .strip()으로 양옆의 공백을 제거합니다.
             df[col] = df[col].apply(lambda x: str(x).split('(')[0].strip())
         
-        df['날짜_dt'] = pd.to_datetime(YEAR_STR + '년 ' + df['날짜'].astype(str), format='%Y년 %m월 %d일', errors='coerce')
+        df['날짜_dt'] = schedule_schema.parse_schedule_dates(df['날짜'], YEAR_STR)
         df.dropna(subset=['날짜_dt'], inplace=True)
         
-        return df, latest_version_name
+        return df, latest_version_name, versioned_memo.new_version(latest_version_name)
 
     except gspread.exceptions.APIError as e:
         st.warning("⚠️ 너무 많은 요청이 접속되어 딜레이되고 있습니다. 잠시 후 재시도 해주세요.")
@@ -327,7 +238,7 @@ def load_schedule_data(month_str):
         st.stop()
     except gspread.exceptions.WorksheetNotFound:
         st.info(f"{month_str} 스케줄이 아직 배정되지 않았습니다.")
-        return pd.DataFrame(), None
+        return pd.DataFrame(), None, None
     except Exception as e:
         st.warning("⚠️ 새로고침 버튼을 눌러 데이터를 다시 로드해주십시오.")
         st.error(f"스케줄 데이터 로드 중 오류 발생: {str(e)}")
@@ -374,7 +285,7 @@ with col_btn:
             st.error(f"새로고침 중 오류 발생: {str(e)}")
             st.stop()
 
-df_schedule, loaded_version = load_schedule_data(month_str)
+df_schedule, loaded_version, data_version = load_schedule_data(month_str)
 
 if df_schedule.empty:
     st.stop()
@@ -426,7 +337,9 @@ else:
     st.markdown("<h6 style='font-weight:bold;'>🟢 나의 스케줄을 상대방과 바꾸기</h6>", unsafe_allow_html=True)
 
     df_schedule = df_schedule[['날짜', '요일', '1', '2', '3', '4', '5', '6', '7', '8', '9', '10', '11', '12', '오전당직(온콜)', '오후1', '오후2', '오후3', '오후4', '날짜_dt']]  # 필요한 열만 남김
-    user_shifts = get_person_shifts(df_schedule, user_name)
+    # 스케줄 버전별로 한 번만 만드는 역색인 (이름→근무, (날짜, 근무형태)→이름)
+    shift_index = schedule_schema.get_shift_index(df_schedule, data_version, AM_COLS, PM_COLS, ONCALL_COL)
+    user_shifts = get_person_shifts(shift_index, user_name)
 
     if not user_shifts:
         st.warning(f"'{user_name}'님의 배정된 스케줄이 없습니다.")
@@ -456,16 +369,15 @@ else:
             if my_selected_date_str and my_selected_shift_type:
                 is_disabled = False
                 my_date = user_date_options[my_selected_date_str]
-                all_colleagues = get_all_employee_names(df_schedule) - {user_name}
+                all_colleagues = get_all_employee_names(shift_index) - {user_name}
                 my_shifts_on_date = {s['shift_type'] for s in user_shifts if s['date_obj'] == my_date}
                 
                 if '오전당직(온콜)' in my_shifts_on_date:
-                    row_data = df_schedule[df_schedule['날짜_dt'].dt.date == my_date].iloc[0]
-                    am_workers = {row_data[col] for col in AM_COLS if col in row_data and row_data[col]} - {user_name, ''}
-                    non_am_workers = {c for c in all_colleagues if not is_person_assigned_at_time(df_schedule, c, my_date, '오전')}
+                    am_workers = shift_index.workers(my_date, '오전') - {user_name}
+                    non_am_workers = {c for c in all_colleagues if not is_person_assigned_at_time(shift_index, c, my_date, '오전')}
                     compatible_colleagues = sorted(list(am_workers | non_am_workers))
                 else:
-                    compatible_colleagues = sorted([c for c in all_colleagues if not is_person_assigned_at_time(df_schedule, c, my_date, my_selected_shift_type)])
+                    compatible_colleagues = sorted([c for c in all_colleagues if not is_person_assigned_at_time(shift_index, c, my_date, my_selected_shift_type)])
                 
                 selectbox_placeholder = "상대방을 선택하세요"
                 if not compatible_colleagues:
@@ -499,13 +411,9 @@ else:
                     
                     # 이제 status == "SUCCESS" 조건이 올바르게 동작합니다.
                     if status == "SUCCESS":
-                        st.success("요청이 성공적으로 기록되었습니다.")
-                        time.sleep(1.5)
-                        st.rerun()
+                        flash.rerun("요청이 성공적으로 기록되었습니다.")
                     elif status == "DUPLICATE":
-                        st.error("이미 존재하는 변경 요청입니다.")
-                        time.sleep(1.5)
-                        st.rerun()
+                        flash.rerun("이미 존재하는 변경 요청입니다.", "error")
                         
         # --- 동적 경고 메시지 표시 ---
         if my_selected_date_str and my_selected_shift_type:
@@ -514,10 +422,9 @@ else:
             
             # 💡 [핵심 수정] 내가 오전당직(온콜)인 날짜를 선택했다면 경고/안내 표시
             if '오전당직(온콜)' in my_shifts_on_date:
-                row_data = df_schedule[df_schedule['날짜_dt'].dt.date == my_date].iloc[0]
-                am_workers_list = sorted(list({row_data[col] for col in AM_COLS if col in row_data and row_data[col]} - {user_name, ''}))
-                all_colleagues = get_all_employee_names(df_schedule) - {user_name}
-                non_am_workers_list = sorted(list({c for c in all_colleagues if not is_person_assigned_at_time(df_schedule, c, my_date, '오전')} - set(am_workers_list)))
+                am_workers_list = sorted(list(shift_index.workers(my_date, '오전') - {user_name}))
+                all_colleagues = get_all_employee_names(shift_index) - {user_name}
+                non_am_workers_list = sorted(list({c for c in all_colleagues if not is_person_assigned_at_time(shift_index, c, my_date, '오전')} - set(am_workers_list)))
 
                 st.warning(f"해당 날짜는 {user_name}님의 오전당직이 있는 날입니다. 그 날의 근무자를 선택하시는 경우 당직이 변경되며, 미근무자를 선택하게 되면 근무가 모두 변경됩니다.")
                 st.info(f"근무자: {', '.join(am_workers_list) if am_workers_list else '없음'}\n\n미근무자: {', '.join(non_am_workers_list) if non_am_workers_list else '없음'}")
@@ -528,11 +435,11 @@ else:
     cols_them_to_my = st.columns([2, 2, 2, 1])
 
     with cols_them_to_my[0]:
-        colleagues = sorted(list(get_all_employee_names(df_schedule) - {user_name}))
+        colleagues = sorted(list(get_all_employee_names(shift_index) - {user_name}))
         selected_colleague_name_them = st.selectbox("상대방 선택", colleagues, index=None, placeholder="상대방을 선택하세요", key="them_colleague")
 
     with cols_them_to_my[1]:
-        colleague_shifts = get_person_shifts(df_schedule, selected_colleague_name_them) if selected_colleague_name_them else []
+        colleague_shifts = get_person_shifts(shift_index, selected_colleague_name_them) if selected_colleague_name_them else []
         colleague_shift_dates = sorted(list(set(s['date_obj'] for s in colleague_shifts)))
         colleague_date_options = {d.strftime("%-m월 %-d일") + f" ({'월화수목금토일'[d.weekday()]})": d for d in colleague_shift_dates}
         selected_colleague_date_str = st.selectbox("상대방 근무일 선택", colleague_date_options.keys(), index=None, placeholder="상대방을 선택하세요", key="them_date", disabled=not selected_colleague_name_them)
@@ -605,13 +512,9 @@ else:
                     status = add_request_to_sheet(new_request, month_str)
 
                 if status == "SUCCESS":
-                    st.success("요청이 성공적으로 기록되었습니다.")
-                    time.sleep(1.5)
-                    st.rerun()
+                    flash.rerun("요청이 성공적으로 기록되었습니다.")
                 elif status == "DUPLICATE":
-                    st.error("이미 존재하는 변경 요청입니다.")
-                    time.sleep(1.5)
-                    st.rerun()
+                    flash.rerun("이미 존재하는 변경 요청입니다.", "error")
 
     st.divider()
     st.markdown(f"#### 📝 {user_name}님의 스케줄 변경 요청 목록")
@@ -678,6 +581,4 @@ else:
                     with message_placeholder:
                         with st.spinner("요청을 삭제하는 중입니다..."):
                             if delete_request_from_sheet(req_id, month_str):
-                                st.success("요청이 성공적으로 삭제되었습니다.")
-                                time.sleep(1.5)
-                                st.rerun()
+                                flash.rerun("요청이 성공적으로 삭제되었습니다.")
@@ -2,13 +2,16 @@ import streamlit as st
 import pandas as pd
 import gspread
 from google.oauth2.service_account import Credentials
-import time
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 import re
 import uuid
 from zoneinfo import ZoneInfo
 import menu
+import flash
+import write_behind
+import schedule_schema
+import versioned_memo
 import os
 
 # --- 페이지 설정 및 메뉴 호출 ---
@@ -18,9 +21,7 @@ menu.menu()
 
 # --- 로그인 체크 ---
 if not st.session_state.get("login_success", False):
-    st.warning("⚠️ Home 페이지에서 먼저 로그인해주세요.")
-    st.error("1초 후 Home 페이지로 돌아갑니다...")
-    time.sleep(1)
+    flash.flash("Home 페이지에서 먼저 로그인해주세요.", "warning")
     st.switch_page("Home.py")
     st.stop()
 
@@ -35,6 +36,7 @@ month_str = "2025년 10월"
 
 YEAR_STR = month_str.split('년')[0]
 REQUEST_SHEET_NAME = f"{month_str} 방배정 변경요청"
+REQUEST_HEADERS = ['RequestID', '요청일시', '요청자', '요청자 사번', '변경 요청', '변경 요청한 방배정']
 
 # --- 함수 정의 ---
 def get_gspread_client():
@@ -55,36 +57,37 @@ def get_gspread_client():
 
 @st.cache_data(ttl=300, show_spinner=False)
 def load_room_data(month_str):
+    """(방배정 표, 데이터 버전). 데이터 버전은 실제로 불러올 때 한 번 정해지며 역색인 캐시의 키로 씁니다."""
     try:
         gc = get_gspread_client()
         if not gc:
             st.info(f"{month_str} 방배정이 아직 완료되지 않았습니다.")
-            return pd.DataFrame()
+            return pd.DataFrame(), None
         spreadsheet = gc.open_by_url(st.secrets["google_sheet"]["url"])
         worksheet = spreadsheet.worksheet(f"{month_str} 방배정")
         records = worksheet.get_all_records()
         if not records:
             st.info(f"{month_str} 방배정이 아직 완료되지 않았습니다.")
-            return pd.DataFrame()
+            return pd.DataFrame(), None
         df = pd.DataFrame(records)
         if '날짜' not in df.columns:
             st.info(f"{month_str} 방배정이 아직 완료되지 않았습니다.")
-            return pd.DataFrame()
+            return pd.DataFrame(), None
         df.fillna('', inplace=True)
         
         # [수정] month_str에서 직접 연도를 추출하여 사용
         target_year = month_str.split('년')[0]
-        df['날짜_dt'] = pd.to_datetime(target_year + '년 ' + df['날짜'].astype(str), format='%Y년 %m월 %d일', errors='coerce')
+        df['날짜_dt'] = schedule_schema.parse_schedule_dates(df['날짜'], target_year)
         
         df.dropna(subset=['날짜_dt'], inplace=True)
-        return df
+        return df, versioned_memo.new_version(f"{month_str} 방배정")
     except gspread.exceptions.APIError as e:
         st.warning("⚠️ 너무 많은 요청이 접속되어 딜레이되고 있습니다. 잠시 후 재시도 해주세요.")
         st.error(f"Google Sheets API 오류 (방배정 데이터 로드): {str(e)}")
         st.stop()
     except gspread.exceptions.WorksheetNotFound:
         st.info(f"{month_str} 방배정이 아직 완료되지 않았습니다.")
-        return pd.DataFrame()
+        return pd.DataFrame(), None
     except Exception as e:
         st.warning("⚠️ 새로고침 버튼을 눌러 데이터를 다시 로드해주십시오.")
         st.info(f"{month_str} 방배정이 아직 완료되지 않았습니다.")
@@ -93,9 +96,10 @@ def load_room_data(month_str):
 
 @st.cache_data(ttl=300, show_spinner=False)
 def load_special_schedules(month_str):
+    """(토요/휴일 스케줄 표, 데이터 버전). 데이터 버전은 load_room_data와 같은 방식으로 정합니다."""
     try:
         gc = get_gspread_client()
-        if not gc: return pd.DataFrame()
+        if not gc: return pd.DataFrame(), None
         
         spreadsheet = gc.open_by_url(st.secrets["google_sheet"]["url"])
         
@@ -105,23 +109,23 @@ def load_special_schedules(month_str):
         worksheet = spreadsheet.worksheet(sheet_name)
         records = worksheet.get_all_records()
         
-        if not records: return pd.DataFrame()
+        if not records: return pd.DataFrame(), None
         
         df = pd.DataFrame(records)
-        if '날짜' not in df.columns: return pd.DataFrame()
+        if '날짜' not in df.columns: return pd.DataFrame(), None
 
         df.fillna('', inplace=True)
         df['날짜_dt'] = pd.to_datetime(df['날짜'], format='%Y-%m-%d', errors='coerce')
         df.dropna(subset=['날짜_dt'], inplace=True)
-        return df
+        return df, versioned_memo.new_version(sheet_name)
         
     except gspread.exceptions.WorksheetNotFound:
         # [수정] 에러 메시지에도 동적 시트 이름 반영
         st.info(f"'{sheet_name}' 시트가 아직 입력되지 않았습니다.")
-        return pd.DataFrame()
+        return pd.DataFrame(), None
     except Exception as e:
         st.error(f"토요/휴일 데이터 로드 중 오류 발생: {str(e)}")
-        return pd.DataFrame()
+        return pd.DataFrame(), None
 
 def get_my_room_requests(month_str, employee_id):
     if not employee_id:
@@ -134,8 +138,11 @@ def get_my_room_requests(month_str, employee_id):
         try:
             worksheet = spreadsheet.worksheet(REQUEST_SHEET_NAME)
         except gspread.exceptions.WorksheetNotFound:
-            return []
-        all_requests = worksheet.get_all_records()
+            worksheet = None
+        all_requests = worksheet.get_all_records() if worksheet is not None else []
+        # 아직 시트에 반영 중인(write-behind 큐) 요청도 함께 보여줍니다.
+        queued = write_behind.get_queue().rows(st.secrets["google_sheet"]["url"], REQUEST_SHEET_NAME)
+        all_requests = write_behind.merge_rows(all_requests, REQUEST_HEADERS, queued, key='RequestID')
         my_requests = [req for req in all_requests if str(req.get('요청자 사번')) == str(employee_id)]
         return my_requests
     except gspread.exceptions.APIError as e:
@@ -148,57 +155,15 @@ def get_my_room_requests(month_str, employee_id):
         st.stop()
 
 def add_room_request_to_sheet(request_data, month_str):
-    try:
-        gc = get_gspread_client()
-        if not gc:
-            return False
-        spreadsheet = gc.open_by_url(st.secrets["google_sheet"]["url"])
-        headers = ['RequestID', '요청일시', '요청자', '요청자 사번', '변경 요청', '변경 요청한 방배정']
-        try:
-            worksheet = spreadsheet.worksheet(REQUEST_SHEET_NAME)
-            current_headers = worksheet.row_values(1)
-            if not current_headers or current_headers != headers:
-                try:
-                    worksheet.update('A1:F1', [headers])
-                    st.info(f"'{REQUEST_SHEET_NAME}' 시트의 헤더를 올바른 형식으로 업데이트했습니다.")
-                except gspread.exceptions.APIError as e:
-                    st.warning("⚠️ 너무 많은 요청이 접속되어 딜레이되고 있습니다. 잠시 후 재시도 해주세요.")
-                    st.error(f"Google Sheets API 오류 (헤더 업데이트): {str(e)}")
-                    st.stop()
-        except gspread.exceptions.WorksheetNotFound:
-            try:
-                worksheet = spreadsheet.add_worksheet(title=REQUEST_SHEET_NAME, rows=100, cols=len(headers))
-                worksheet.append_row(headers)
-            except gspread.exceptions.APIError as e:
-                st.warning("⚠️ 너무 많은 요청이 접속되어 딜레이되고 있습니다. 잠시 후 재시도 해주세요.")
-                st.error(f"Google Sheets API 오류 (시트 생성): {str(e)}")
-                st.stop()
-        row_to_add = [
-            request_data.get('RequestID'),
-            request_data.get('요청일시'),
-            request_data.get('요청자'),
-            request_data.get('요청자 사번'),
-            request_data.get('변경 요청'),
-            request_data.get('변경 요청한 방배정')
-        ]
-        try:
-            worksheet.append_row(row_to_add)
-        except gspread.exceptions.APIError as e:
-            st.warning("⚠️ 너무 많은 요청이 접속되어 딜레이되고 있습니다. 잠시 후 재시도 해주세요.")
-            st.error(f"Google Sheets API 오류 (요청 추가): {str(e)}")
-            st.stop()
-        st.cache_data.clear()
-        return True
-    except gspread.exceptions.APIError as e:
-        st.warning("⚠️ 너무 많은 요청이 접속되어 딜레이되고 있습니다. 잠시 후 재시도 해주세요.")
-        st.error(f"Google Sheets API 오류 (요청 추가): {str(e)}")
-        st.stop()
-    except Exception as e:
-        st.warning("⚠️ 새로고침 버튼을 눌러 데이터를 다시 로드해주십시오.")
-        st.error(f"교환 요청 저장 실패: {str(e)}")
-        st.stop()
+    """방배정 변경 요청을 write-behind 큐에 넣습니다. (시트 반영은 백그라운드에서 몇 초 안에 일괄 처리)"""
+    row_to_add = [request_data.get(col) for col in REQUEST_HEADERS]
+    write_behind.get_queue().submit(st.secrets["google_sheet"]["url"], REQUEST_SHEET_NAME, row_to_add, header=REQUEST_HEADERS)
+    return True
 
 def delete_room_request_from_sheet(request_id, month_str):
+    # 아직 시트에 반영되지 않은 요청이면 큐에서 취소하는 것으로 끝납니다.
+    if write_behind.get_queue().cancel(st.secrets["google_sheet"]["url"], REQUEST_SHEET_NAME, lambda row: row[0] == request_id):
+        return True
     try:
         gc = get_gspread_client()
         if not gc:
@@ -226,62 +191,9 @@ def delete_room_request_from_sheet(request_id, month_str):
         st.error(f"요청 삭제 중 오류 발생: {str(e)}")
         st.stop()
 
-# --- [수정된 함수] ---
-def get_person_room_assignments(df, person_name="", special_schedules_df=None):
-    assignments = []
-    
-    # 빠른 조회를 위해 토요/휴일 날짜를 세트로 만듭니다.
-    special_dates_set = set()
-    if special_schedules_df is not None and not special_schedules_df.empty:
-        special_dates_set = set(special_schedules_df['날짜_dt'].dt.date)
-
-    # 메인 방배정 시트(df_room)에서 모든 배정 정보를 처리합니다.
-    if not df.empty:
-        sorted_df = df.sort_values(by='날짜_dt').reset_index(drop=True)
-        
-        # 배정 열(시간 또는 방 이름)을 식별합니다.
-        assignment_cols = [col for col in df.columns if col not in ['날짜', '요일', '날짜_dt']]
-        
-        for _, row in sorted_df.iterrows():
-            dt = row['날짜_dt']
-            if pd.isna(dt):
-                continue
-
-            display_date_str = dt.strftime("%-m월 %-d일") + f" ({'월화수목금토일'[dt.weekday()]})"
-            sheet_date_str = dt.strftime("%Y-%m-%d")
-            
-            is_special_date = dt.date() in special_dates_set
-
-            for col in assignment_cols:
-                current_person = str(row.get(col, '')).strip()
-                if not current_person: continue
-
-                if (not person_name) or (current_person == person_name):
-                    
-                    # [핵심 수정] 토요/휴일인 경우, 표시 형식을 "날짜 - X번방"으로 변경
-                    if is_special_date:
-                        room_match = re.search(r'\((\d+)\)', str(col))
-                        if room_match:
-                            room_number = room_match.group(1)
-                            display_str = f"{display_date_str} - {room_number}번방"
-                            sheet_str = f"{sheet_date_str} ({col})" # 시트 저장용은 기존 형식 유지
-                        else:
-                            display_str = f"{display_date_str} - {col}" # 방번호 파싱 실패 시 원본 표시
-                            sheet_str = f"{sheet_date_str} ({col})"
-                    else:
-                        # 평일은 기존 형식 유지
-                        display_str = f"{display_date_str} - {col}"
-                        sheet_str = f"{sheet_date_str} ({col})"
-                    
-                    assignments.append({
-                        'date_obj': dt.date(),
-                        'column_name': str(col),
-                        'person_name': str(current_person).strip(),
-                        'display_str': display_str,
-                        'sheet_str': sheet_str
-                    })
-
-    return sorted(assignments, key=lambda x: (x['date_obj'], x['column_name']))
+# --- 방배정 역색인(schedule_schema.RoomAssignmentIndex) 조회 함수 ---
+def get_person_room_assignments(room_index, person_name):
+    return room_index.assignments(person_name)
     
 def get_shift_period(column_name):
     match = re.search(r"(\d{1,2}:\d{2})", str(column_name))
@@ -295,27 +207,9 @@ def get_shift_period(column_name):
         return "기타"
     return "기타"
 
-def is_person_assigned_at_time(df, person_name, date_obj, column_name, special_schedules_df=None):
-    # 일반 스케줄 확인
-    row_data = df[df['날짜_dt'].dt.date == date_obj]
-    if not row_data.empty:
-        row_dict = row_data.iloc[0].to_dict()
-        for col, assigned_person in row_dict.items():
-            if col in ['날짜', '요일', '날짜_dt']:
-                continue
-            if assigned_person == person_name:
-                return True
-    
-    # 토요/휴일 스케줄 확인
-    if special_schedules_df is not None and not special_schedules_df.empty:
-        special_row = special_schedules_df[special_schedules_df['날짜_dt'].dt.date == date_obj]
-        if not special_row.empty:
-            workers = special_row.iloc[0]['근무'].split(', ') if special_row.iloc[0]['근무'] else []
-            cleaned_workers = [re.sub(r'\[\d+\]', '', worker).strip() for worker in workers]
-            if person_name in cleaned_workers:
-                return True
-    
-    return False
+def is_person_assigned_at_time(room_index, person_name, date_obj):
+    # 일반 스케줄 + 토요/휴일 스케줄에서 해당 날짜 근무 여부 확인
+    return room_index.is_assigned(person_name, date_obj)
 
 # --- 메인 로직 ---
 try:
@@ -358,12 +252,12 @@ with col_btn:
             st.error(f"새로고침 중 오류 발생: {str(e)}")
             st.stop()
 
-df_room = load_room_data(month_str)
-df_special = load_special_schedules(month_str)
+df_room, room_version = load_room_data(month_str)
+df_special, special_version = load_special_schedules(month_str)
 
 # --- 데이터 로드 (기존 코드) ---
-df_room = load_room_data(month_str)
-df_special = load_special_schedules(month_str)
+df_room, room_version = load_room_data(month_str)
+df_special, special_version = load_special_schedules(month_str)
 
 # --- ▼▼▼ [추가] 버전 정보 표시 로직 ▼▼▼ ---
 # load_room_data 함수는 현재 DataFrame만 반환하므로, 버전을 알기 위해 별도 로직이 필요합니다.
@@ -430,7 +324,9 @@ else:
     st.write(" ")
     st.markdown("<h6 style='font-weight:bold;'>🟢 나의 방배정을 상대방과 바꾸기</h6>", unsafe_allow_html=True)
     
-    user_assignments_my = get_person_room_assignments(df_room, user_name, df_special)
+    # 방배정/토요·휴일 시트를 불러올 때마다 한 번만 만드는 역색인 (이름→배정, 날짜→근무자)
+    room_index = schedule_schema.get_room_assignment_index(df_room, df_special, (room_version, special_version))
+    user_assignments_my = get_person_room_assignments(room_index, user_name)
     if not user_assignments_my:
         st.warning(f"'{user_name}'님의 배정된 방이 없습니다.")
     else:
@@ -452,14 +348,8 @@ else:
             if st.session_state.get('user_data', None):
                 all_employee_names = set(st.session_state.get('user_data', {}).keys())
             else:
-                time_cols_all = [col for col in df_room.columns if re.search(r"(\d{1,2}:\d{2})", str(col)) or '당직' in str(col) or '온콜' in str(col)]
-                all_employee_names = set()
-                for col in time_cols_all:
-                    for value in df_room[col].values:
-                        if value:
-                            # 이름에서 [방번호] 제거
-                            cleaned_value = re.sub(r'\[\d+\]', '', str(value)).strip()
-                            all_employee_names.add(cleaned_value)
+                # 이름에서 [방번호]를 제거한 근무자 명단 (역색인 생성 시 함께 계산)
+                all_employee_names = set(room_index.employees)
             
             compatible_colleague_names = sorted(list(all_employee_names - {user_name}))
             
@@ -477,7 +367,7 @@ else:
         if my_selected_assignment_str_my and selected_colleague_name:
             my_selected_info = assignment_options_my[my_selected_assignment_str_my]
             
-            is_colleague_occupied = is_person_assigned_at_time(df_room, selected_colleague_name, my_selected_info['date_obj'], my_selected_info['column_name'], df_special)
+            is_colleague_occupied = is_person_assigned_at_time(room_index, selected_colleague_name, my_selected_info['date_obj'])
             
             if is_colleague_occupied:
                 st.warning(f"⚠️ **{selected_colleague_name}**님이 **{my_selected_info['display_str'].split('-')[0].strip()}** ({get_shift_period(my_selected_info['column_name'])})에 이미 근무가 있습니다. 중복 배치가 되지 않도록 **{selected_colleague_name}** 님의 방배정도 변경해 주십시오.")
@@ -499,9 +389,7 @@ else:
                 }
                 with st.spinner("요청을 기록하는 중입니다..."):
                     if add_room_request_to_sheet(new_request, month_str):
-                        st.success("교환 요청이 성공적으로 기록되었습니다.")
-                        time.sleep(1.5)
-                        st.rerun()
+                        flash.rerun("교환 요청이 성공적으로 기록되었습니다.")
 
     # --- 상대방의 방배정을 나와 바꾸기 ---
     st.write(' ')
@@ -513,13 +401,7 @@ else:
     if st.session_state.get('user_data', None):
         all_colleagues_set = set(st.session_state.get('user_data', {}).keys()) - {user_name, ''}
     else:
-        time_cols_all = [col for col in df_room.columns if re.search(r"(\d{1,2}:\d{2})", str(col)) or '당직' in str(col) or '온콜' in str(col)]
-        all_colleagues_set = set()
-        for col in time_cols_all:
-            for value in df_room[col].values:
-                if value:
-                    cleaned_value = re.sub(r'\[\d+\]', '', str(value)).strip()
-                    all_colleagues_set.add(cleaned_value)
+        all_colleagues_set = room_index.employees - {user_name, ''}
 
     for colleague_name in sorted(list(all_colleagues_set)):
         compatible_colleague_names_them.append(colleague_name)
@@ -539,9 +421,9 @@ else:
         is_them_assignment_selected = selected_colleague_name_them is not None
 
         if selected_colleague_name_them:
-            colleague_assignments = get_person_room_assignments(df_room, selected_colleague_name_them, df_special)
+            colleague_assignments = get_person_room_assignments(room_index, selected_colleague_name_them)
 
-            user_occupied_slots = {(s['date_obj'], s['column_name']) for s in get_person_room_assignments(df_room, user_name, df_special)}
+            user_occupied_slots = {(s['date_obj'], s['column_name']) for s in get_person_room_assignments(room_index, user_name)}
             compatible_assignments = [
                 s for s in colleague_assignments if (s['date_obj'], s['column_name']) not in user_occupied_slots
             ]
@@ -582,9 +464,7 @@ else:
             }
             with st.spinner("요청을 기록하는 중입니다..."):
                 if add_room_request_to_sheet(new_request, month_str):
-                    st.success("요청이 성공적으로 기록되었습니다.")
-                    time.sleep(1.5)
-                    st.rerun()
+                    flash.rerun("요청이 성공적으로 기록되었습니다.")
 
     st.divider()
     st.markdown(f"#### 📝 {user_name}님의 방배정 변경 요청 목록")
@@ -632,6 +512,4 @@ else:
                 if st.button("🗑️ 삭제", key=req.get('RequestID', str(uuid.uuid4())), use_container_width=True):
                     with st.spinner("요청을 삭제하는 중입니다..."):
                         if delete_room_request_from_sheet(req.get('RequestID'), month_str):
-                            st.success("요청이 성공적으로 삭제되었습니다.")
-                            time.sleep(1.5)
-                            st.rerun()
+                            flash.rerun("요청이 성공적으로 삭제되었습니다.")
@@ -1,19 +1,10 @@
 import os
 import streamlit as st
-from openai import OpenAI
-from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import FAISS
-# from langchain import create_retrieval_chain                     
-from langchain.chains.combine_documents import create_stuff_documents_chain # 9번 라인: 함수 이름 수정 및 경로 유지
-from langchain_core.output_parsers import StrOutputParser # ★ 이 라인을 추가합니다.
-from langchain_core.runnables import RunnableParallel # 👈 [수정] 이 라인을 추가합니다.
-from langchain_core.prompts import ChatPromptTemplate
-import time
+# langchain / FAISS / knowledge_base는 첫 질문 때 load_rag_chain()에서 불러옵니다. (질문하지 않는 사용자의 첫 화면 지연 방지)
 import menu
-import git
-import shutil
+import flash
+import answer_cache
+import chat_pipeline
 import traceback
 import json
 
@@ -23,9 +14,7 @@ menu.menu()
 
 # 로그인 체크 및 자동 리디렉션
 if not st.session_state.get("login_success", False):
-    st.warning("⚠️ Home 페이지에서 먼저 로그인해주세요.")
-    st.error("1초 후 Home 페이지로 돌아갑니다...")
-    time.sleep(1)
+    flash.flash("Home 페이지에서 먼저 로그인해주세요.", "warning")
     st.switch_page("Home.py")
     st.stop()
 
@@ -36,8 +25,8 @@ if "is_admin" not in st.session_state: ##### 관리자 인증 가능한 부분
 # =========================
 # 0) 상수 설정
 # =========================
-REPO_URL = "https://github.com/HUI135/gc-endoscopy-room.git"
-BRANCH = "main"
+# 임베딩 제공자 ("openai" 또는 오프라인 대체용 "local"). secrets에 없으면 KNOWLEDGE_BASE_EMBEDDINGS 환경 변수 / openai
+EMBEDDING_PROVIDER = st.secrets.get("knowledge_base", {}).get("embedding_provider")
 
 # =========================
 # 1) API 키 설정 및 검사
@@ -49,10 +38,9 @@ except (KeyError, TypeError):
     st.error("⚠️ 시스템 설정 오류가 발생했습니다. 관리자에게 문의하세요.")
     st.stop()
 
-# OpenAI 연결 테스트
+# OpenAI 연결 테스트 (성공 결과는 잠시 캐시)
 try:
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    client.models.list()
+    chat_pipeline.check_openai(OPENAI_API_KEY)
 except Exception as e:
     st.error(f"시스템 연결 오류: {e}")
     st.stop()
@@ -62,51 +50,18 @@ except Exception as e:
 # =========================
 @st.cache_resource(show_spinner="데이터를 준비하는 중...")
 def load_knowledge_base():
-    repo_path = "./temp_repo"
+    # 네트워크 clone 대신 로컬 작업 트리에서, 디스크에 저장된 인덱스를 이어 씁니다. (바뀐 조각만 재임베딩)
+    import knowledge_base
     try:
-        if os.path.exists(repo_path):
-            shutil.rmtree(repo_path, ignore_errors=True)
-
-        git.Repo.clone_from(REPO_URL, repo_path, branch=BRANCH)
-
-        docs = []
-        file_extensions_to_load = ['.py', '.md', '.txt']
-        
-        for root, _, files in os.walk(repo_path):
-            if ".git" in root:
-                continue
-            for file_name in files:
-                if any(file_name.endswith(ext) for ext in file_extensions_to_load):
-                    file_path = os.path.join(root, file_name)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                        doc = Document(page_content=content, metadata={"source": file_path})
-                        docs.append(doc)
-                    except Exception as e:
-                        st.warning(f"'{file_name}' 파일을 읽는 중 오류 발생: {e}")
-
-        if not docs:
-            st.warning("⚠️ 리포지토리에서 .py, .md, .txt 파일을 로드하지 못했습니다. 리포지토리 내용을 확인하세요.")
-            return None
-
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        splits = text_splitter.split_documents(docs)
-
-        if not splits:
-            st.warning("⚠️ 파일을 분석 가능한 텍스트 조각으로 나누지 못했습니다.")
-            return None
-
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small", api_key=OPENAI_API_KEY)
-        vectorstore = FAISS.from_documents(splits, embeddings)
-        return vectorstore
+        vectorstore, stats = knowledge_base.load_vectorstore(api_key=OPENAI_API_KEY, provider=EMBEDDING_PROVIDER)
+        if vectorstore is None:
+            st.warning("⚠️ .py, .md, .txt 파일을 분석 가능한 텍스트 조각으로 나누지 못했습니다. 앱 폴더 내용을 확인하세요.")
+        return vectorstore, stats["version"]
     except Exception as e:
+        # 실패를 None으로 돌려주면 st.cache_resource가 그대로 캐시하므로, 알린 뒤 다시 올려 다음 질문에서 재시도합니다.
         st.error(f"❌ 데이터 로딩 중 오류가 발생했습니다: {e}")
         st.code(traceback.format_exc())
-        return None
-    finally:
-        if os.path.exists(repo_path):
-            shutil.rmtree(repo_path, ignore_errors=True)
+        raise
 
 # =========================
 # 3) Streamlit UI 설정
@@ -116,12 +71,6 @@ st.info("ℹ️ 챗봇에게 궁금한 점을 물어보세요! 예: 앱 기능,
 st.write()
 st.divider()
 
-vectorstore = load_knowledge_base()
-
-if vectorstore is None:
-    st.error("데이터베이스 초기화에 실패했습니다. 위의 로그를 확인하여 원인을 파악하거나 관리자에게 문의하세요.") 
-    st.stop()
-
 # =========================
 # 4) 챗봇 설정
 # =========================
@@ -129,8 +78,6 @@ if vectorstore is None:
 def format_docs(docs):
     return "\n\n".join(doc.page_content for doc in docs)
 
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, api_key=OPENAI_API_KEY)
-
 # 🔽 [추가] LLM에 주입할 '관리자 정책' 문자열 🔽
 ADMIN_POLICY_TRUE = """
 # Admin Disclosure Policy: ENABLED (관리자 모드 활성화됨)
@@ -205,31 +152,51 @@ system_prompt = (
     "\n\nHere is the relevant information from the project files:\n{context}"
 )
 
-# [수정] prompt가 이제 'input', 'context', 'admin_policy'를 변수로 받습니다.
-prompt = ChatPromptTemplate.from_messages(
-    [("system", system_prompt), ("human", "{input}")]
-)
+# 반복 질문용 응답 캐시: 질문 임베딩이 비슷하고 (관리자 여부, 지식베이스 버전)이 같으면 이전 답변을 재사용
+answer_store = answer_cache.get_cache()
 
-retriever = vectorstore.as_retriever()
-
-# [핵심 수정] RAG 체인 전체를 수동으로 재구성합니다.
-# "If/Then" 판단을 LLM이 아닌 Python이 하도록 수정
-rag_chain = (
-    {
-        # 1. 'context': 사용자 입력을 받아 -> retriever로 문서를 검색 -> format_docs 함수로 텍스트 변환
-        "context": (lambda x: x['input']) | retriever | format_docs,
-        
-        # 2. 'input': 사용자 입력을 그대로 전달
-        "input": (lambda x: x['input']),
-        
-        # 3. 'admin_policy': *호출 시점*의 최신 st.session_state 값을 *Python이 직접* 확인하여,
-        #                   True/False에 맞는 '정책 문자열'을 반환
-        "admin_policy": (lambda x: ADMIN_POLICY_TRUE if bool(st.session_state.get("is_admin", False)) else ADMIN_POLICY_FALSE)
-    }
-    | prompt
-    | llm
-    | StrOutputParser()
-)
+
+@st.cache_resource(show_spinner="데이터를 준비하는 중...")
+def load_rag_chain():
+    """첫 질문 때 (벡터 저장소, 생성 체인, 질문 임베딩, 지식베이스 버전)을 만듭니다. 데이터 로드에 실패하면 None."""
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_openai import ChatOpenAI
+    import knowledge_base
+
+    vectorstore, kb_version = load_knowledge_base()
+    if vectorstore is None:
+        return None
+
+    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, api_key=OPENAI_API_KEY)
+
+    # [수정] prompt가 이제 'input', 'context', 'admin_policy'를 변수로 받습니다.
+    prompt = ChatPromptTemplate.from_messages(
+        [("system", system_prompt), ("human", "{input}")]
+    )
+
+    # [핵심 수정] RAG 체인 전체를 수동으로 재구성합니다.
+    # "If/Then" 판단을 LLM이 아닌 Python이 하도록 수정
+    # 검색은 chat_pipeline.start_retrieval로 먼저 시작하고, 이 체인은 생성만 맡아 토큰을 스트리밍합니다.
+    rag_chain = (
+        {
+            # 1. 'context': 백그라운드 검색 결과를 format_docs로 변환한 텍스트 (chat_pipeline.stream_answer가 채움)
+            "context": (lambda x: x['context']),
+
+            # 2. 'input': 사용자 입력을 그대로 전달
+            "input": (lambda x: x['input']),
+
+            # 3. 'admin_policy': *호출 시점*의 최신 st.session_state 값을 *Python이 직접* 확인하여,
+            #                   True/False에 맞는 '정책 문자열'을 반환
+            "admin_policy": (lambda x: ADMIN_POLICY_TRUE if bool(st.session_state.get("is_admin", False)) else ADMIN_POLICY_FALSE)
+        }
+        | prompt
+        | llm
+        | StrOutputParser()
+    )
+
+    _, question_embeddings = knowledge_base.get_embeddings(EMBEDDING_PROVIDER, OPENAI_API_KEY)
+    return vectorstore, rag_chain, question_embeddings, kb_version
 
 # =========================
 # 5) 채팅 UI
@@ -259,20 +226,40 @@ with input_container:
                 st.markdown(user_input)
 
             with st.chat_message("assistant", avatar="🏥"):
-                with st.spinner("답변을 준비하는 중..."):
-                    
-                    # 🔽 [수정] 이 try 블록을 통째로 교체하세요. 🔽
-                    try:
-                        # 1. rag_chain 호출 (response는 이제 딕셔너리가 아닌 문자열입니다)
-                        answer = rag_chain.invoke({"input": user_input})
-                        
-                    except Exception as e:
-                        # 2. 다른 종류의 오류(네트워크, API 등) 발생 시 처리
-                        answer = f"❌ 오류가 발생했습니다: {e}"
-                        # st.code(traceback.format_exc()) # 디버깅용
-                    
+                try:
+                    rag_components = load_rag_chain()
+                    if rag_components is None:
+                        raise RuntimeError("데이터베이스 초기화에 실패했습니다. 위의 로그를 확인하여 원인을 파악하거나 관리자에게 문의하세요.")
+                    vectorstore, rag_chain, question_embeddings, KB_VERSION = rag_components
+                    is_admin = bool(st.session_state.get("is_admin", False))
+                    answer = answer_store.lookup_exact(user_input, is_admin, KB_VERSION)
+                    if answer is None:
+                        # 질문은 한 번만 임베딩해, 그 벡터로 문서 검색(백그라운드)과 응답 캐시 조회를 함께 합니다.
+                        question_vector = question_embeddings.embed_query(user_input)
+                        retrieval = chat_pipeline.start_retrieval(vectorstore.similarity_search_by_vector, question_vector)
+                        answer = answer_store.lookup(question_vector, is_admin, KB_VERSION)
+                        if answer is None:
+                            # 1. 생성 토큰을 받는 즉시 화면에 출력 (st.write_stream은 전체 문자열을 반환)
+                            answer = st.write_stream(chat_pipeline.stream_answer(rag_chain, retrieval, {"input": user_input}, format_docs))
+                            answer_store.store(user_input, question_vector, answer, is_admin, KB_VERSION)
+                        else:
+                            st.markdown(answer)
+                    else:
+                        st.markdown(answer)
+
+                except Exception as e:
+                    # 2. 다른 종류의 오류(네트워크, API 등) 발생 시 처리
+                    answer = f"❌ 오류가 발생했습니다: {e}"
+                    # st.code(traceback.format_exc()) # 디버깅용
                     st.markdown(answer)
-                    st.session_state.messages.append({"role": "assistant", "content": answer})
+
+                st.session_state.messages.append({"role": "assistant", "content": answer})
+
+if st.session_state.get("is_admin", False):
+    cache_stats = answer_store.summary()
+    st.caption(f"📊 응답 캐시: 적중률 {cache_stats['hit_rate']:.0%} ({cache_stats['hits']}/{cache_stats['lookups']}, "
+               f"완전 일치 {cache_stats['exact_hits']}) · 항목 {cache_stats['entries']}개 · "
+               f"LRU 제거 {cache_stats['evicted']} · 만료 {cache_stats['expired']}")
 
 st.markdown(
     """
@@ -12,6 +12,10 @@ import time
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
 import uuid
 import menu
+import flash
+import request_journal
+import master_schedule
+import dataset_store
 import io
 from collections import Counter
 import re # 정규표현식을 사용하기 위해 import 추가
@@ -25,67 +29,12 @@ menu.menu()
 
 # 로그인 체크 및 자동 리디렉션
 if not st.session_state.get("login_success", False):
-    st.warning("⚠️ Home 페이지에서 먼저 로그인해주세요.")
-    st.error("1초 후 Home 페이지로 돌아갑니다...")
-    time.sleep(1)
+    flash.flash("Home 페이지에서 먼저 로그인해주세요.", "warning")
     st.switch_page("Home.py")
     st.stop()
 
 def generate_shift_table(df_master):
-    def split_shift(row):
-        shifts = []
-        if row["근무여부"] == "오전 & 오후":
-            shifts.extend([(row["이름"], row["주차"], row["요일"], "오전"), (row["이름"], row["주차"], row["요일"], "오후")])
-        elif row["근무여부"] in ["오전", "오후"]:
-            shifts.append((row["이름"], row["주차"], row["요일"], row["근무여부"]))
-        return shifts
-
-    shift_list = [shift for _, row in df_master.iterrows() for shift in split_shift(row)]
-    df_split = pd.DataFrame(shift_list, columns=["이름", "주차", "요일", "시간대"])
-
-    weekday_order = ["월", "화", "수", "목", "금"]
-    time_slots = ["오전", "오후"]
-    week_labels = [f"{i}주" for i in range(1, 6)]  # 최대 5주 가정
-    result = {}
-
-    for day in weekday_order:
-        for time in time_slots:
-            key = f"{day} {time}"
-            employees = {}
-            for name in df_split["이름"].unique():
-                every_week = df_split[
-                    (df_split["이름"] == name) & 
-                    (df_split["요일"] == day) & 
-                    (df_split["시간대"] == time) & 
-                    (df_split["주차"] == "매주")
-                ]
-                specific_weeks = sorted(
-                    df_split[
-                        (df_split["이름"] == name) & 
-                        (df_split["요일"] == day) & 
-                        (df_split["시간대"] == time) & 
-                        (df_split["주차"].isin(week_labels))
-                    ]["주차"].tolist(),
-                    key=lambda x: int(x.replace("주", ""))
-                )
-                if not every_week.empty:
-                    employees[name] = None
-                elif specific_weeks:
-                    if set(specific_weeks) == set(week_labels):
-                        employees[name] = None
-                    else:
-                        employees[name] = specific_weeks
-
-            employee_list = []
-            for name, weeks in employees.items():
-                if weeks:
-                    employee_list.append(f"{name}({','.join(weeks)})")
-                else:
-                    employee_list.append(name)
-            
-            result[key] = ", ".join(sorted(employee_list)) if employee_list else ""
-    
-    return pd.DataFrame(list(result.items()), columns=["시간대", "근무"])
+    return master_schedule.generate_shift_table(df_master, week_labels=[f"{i}주" for i in range(1, 6)])  # 최대 5주 가정
 
 def generate_supplement_table(df_result, names_in_master):
     supplement = []
@@ -303,13 +252,14 @@ def load_request_data_page4():
         st.session_state["worksheet4"] = worksheet4
 
         # (이하 나머지 시트 로드 및 세션 상태 저장 코드는 기존과 동일하게 유지)
-        df_request = pd.DataFrame(sheet.worksheet(f"{month_str} 요청").get_all_records()) # 간소화
+        df_request = pd.DataFrame(request_journal.compact(sheet, f"{month_str} 요청")) # 사용자 요청 로그를 압축한 뒤 로드
+        df_shift = generate_shift_table(df_master)
         st.session_state.update({
             "df_map": df_map.sort_values(by="이름"),
             "df_master": df_master,
             "df_request": df_request,
-            "df_shift": generate_shift_table(df_master),
-            "df_supplement": generate_supplement_table(generate_shift_table(df_master), df_master["이름"].unique())
+            "df_shift": df_shift,
+            "df_supplement": generate_supplement_table(df_shift, df_master["이름"].unique())
         })
         load_holiday_schedule()
         load_closing_days_schedule()
@@ -435,13 +385,11 @@ with col_btn:
                 success = False
         if success:
                 st.session_state["data_loaded"] = True
-                st.success("데이터가 성공적으로 새로고침되었습니다!")
                 
                 # ✅ 새로 불러온 원본 데이터로 편집용 화면 데이터를 덮어씌웁니다.
                 st.session_state.edited_df_holiday = st.session_state.get("df_holiday", pd.DataFrame()).copy()
                 
-                time.sleep(1)
-                st.rerun()
+                flash.rerun("데이터가 성공적으로 새로고침되었습니다!")
 
 # ✅✅✅ 위에서 삭제한 자리에 이 코드로 '대체' 하세요 ✅✅✅
 # 앱이 처음 켜졌을 때('data_loaded'가 없을 때) 실행됩니다.
@@ -453,9 +401,7 @@ if "data_loaded" not in st.session_state:
 
     if success:
         st.session_state["data_loaded"] = True
-        st.success("데이터 로드 및 동기화 완료!")
-        time.sleep(1)
-        st.rerun()
+        flash.rerun("데이터 로드 및 동기화 완료!")
     else:
         # 만약 최초 로딩에 실패하면, 오류 메시지를 보여주고 멈춥니다.
         st.error("데이터를 불러오는 데 실패했습니다. 새로고침 버튼을 눌러 다시 시도해주세요.")
@@ -475,8 +421,7 @@ def delete_old_sheets():
         today = now.date()
         cutoff_date = (today - relativedelta(months=2)).replace(day=1)
         
-        st.warning(f"**{cutoff_date.strftime('%Y년 %m월 %d일')}** 이전의 모든 월별 시트를 삭제합니다.")
-        time.sleep(1.5)
+        flash.flash(f"{cutoff_date.strftime('%Y년 %m월 %d일')} 이전의 모든 월별 시트를 삭제합니다.", "info")
 
         # 3. 전체 시트 목록에서 삭제할 시트들을 찾습니다.
         all_worksheets = spreadsheet.worksheets()
@@ -495,8 +440,7 @@ def delete_old_sheets():
                     sheets_to_delete.append(ws)
 
         if not sheets_to_delete:
-            st.success("✅ 삭제할 오래된 시트가 없습니다.")
-            time.sleep(1.5)
+            flash.flash("삭제할 오래된 시트가 없습니다.")
             return
 
         # 5. 찾은 시트들을 삭제합니다.
@@ -506,15 +450,12 @@ def delete_old_sheets():
                 spreadsheet.del_worksheet(worksheet)
                 deleted_count += 1
             except Exception as e:
-                st.error(f"❌ '{worksheet.title}' 시트 삭제 중 오류 발생: {e}")
-                time.sleep(1.5)
+                flash.flash(f"'{worksheet.title}' 시트 삭제 중 오류 발생: {e}", "error")
         
-        st.success(f"✅ 총 {deleted_count}개의 오래된 시트를 성공적으로 삭제했습니다.")
-        time.sleep(1.5)
+        flash.flash(f"총 {deleted_count}개의 오래된 시트를 성공적으로 삭제했습니다.")
 
     except Exception as e:
-        st.error(f"전체 프로세스 중 오류 발생: {e}")
-        time.sleep(1.5)
+        flash.flash(f"전체 프로세스 중 오류 발생: {e}", "error")
 
 # 세션 상태에서 데이터 가져오기
 df_map = st.session_state.get("df_map", pd.DataFrame(columns=["이름", "사번"]))
@@ -562,9 +503,8 @@ with col_delete:
 
         # 취소 버튼도 동일한 너비로
         if st.button("아니요, 취소합니다.", use_container_width=True, key="delete_old_cancel"):
-            st.info("오래된 시트 삭제 작업을 취소하였습니다.")
             st.session_state.confirm_delete = False
-            time.sleep(1)
+            flash.flash("오래된 시트 삭제 작업을 취소하였습니다.", "info")
             st.experimental_rerun()
 
 st.divider()
@@ -634,8 +574,7 @@ with st.form("fixed_form_namelist"):
                                 all_data[i].append('0')
                             update_sheet_with_retry(worksheet4, all_data)
 
-                    st.success(f"{new_employee_name}님을 모든 관련 시트에 추가했습니다.")
-                    time.sleep(1.5) # 사용자가 메시지를 읽을 시간을 줍니다.
+                    flash.flash(f"{new_employee_name}님을 모든 관련 시트에 추가했습니다.")
 
                     # ✅ 데이터를 다시 로드하여 변경사항을 즉시 반영합니다.
                     with st.spinner("최신 명단을 다시 불러오는 중..."):
@@ -688,8 +627,7 @@ with st.form("fixed_form_namelist"):
                         if cell_cum:
                             ws_cum.delete_columns(cell_cum.col)
 
-                st.success(f"{selected_employee_name}님을 모든 관련 시트에서 삭제했습니다.")
-                time.sleep(1.5)
+                flash.flash(f"{selected_employee_name}님을 모든 관련 시트에서 삭제했습니다.")
 
                 # ✅ 데이터를 다시 로드하여 변경사항을 즉시 반영합니다.
                 with st.spinner("최신 명단을 다시 불러오는 중..."):
@@ -792,11 +730,8 @@ with st.expander("📅 월 단위로 일괄 설정"):
                 ]
                 worksheet1.append_rows(new_rows_data)
 
-            st.success("월 단위 수정사항이 저장되었습니다.")
-            time.sleep(1)
-            st.info("새로고침 버튼을 눌러 변경사항을 완전히 적용해주세요.")
-            time.sleep(1.5)
-            st.rerun()
+            flash.flash("월 단위 수정사항이 저장되었습니다.")
+            flash.rerun("새로고침 버튼을 눌러 변경사항을 완전히 적용해주세요.", "info")
         except Exception as e:
             st.error(f"월 단위 저장 중 오류 발생: {e}")
 
@@ -873,9 +808,7 @@ with st.expander("📅 주 단위로 설정"):
                     st.session_state["df_shift"] = generate_shift_table(df_result)
                     st.session_state["df_supplement"] = generate_supplement_table(st.session_state["df_shift"], df_result["이름"].unique())
                 
-                st.success("주 단위 수정사항이 저장되었습니다.")
-                time.sleep(1.5)
-                st.rerun()
+                flash.rerun("주 단위 수정사항이 저장되었습니다.")
             else:
                 st.error("마스터 시트 저장 실패")
                 st.stop()
@@ -947,8 +880,7 @@ if st.button("💾 테이블 수정사항 저장"):
                     
                     update_data = [df_to_save.columns.tolist()] + df_to_save.values.tolist()
                     if update_sheet_with_retry(worksheet_holiday, update_data):
-                        st.success("✅ 테이블 수정사항이 성공적으로 저장되었습니다.")
-                        time.sleep(1.5)
+                        flash.flash("테이블 수정사항이 성공적으로 저장되었습니다.")
                         load_holiday_schedule() 
                         st.session_state.edited_df_holiday = st.session_state.get("df_holiday", pd.DataFrame()).copy()
                         st.rerun()
@@ -986,8 +918,7 @@ with st.expander("➕ 빠른 추가 / 삭제"):
                         worksheet_holiday = st.session_state.get("worksheet_holiday")
                         new_row_data = [new_date.strftime("%Y-%m-%d"), ", ".join(new_workers), new_duty]
                         worksheet_holiday.append_row(new_row_data)
-                        st.success(f"{new_date} 스케줄이 추가되었습니다.")
-                        time.sleep(1.5)
+                        flash.flash(f"{new_date} 스케줄이 추가되었습니다.")
                         load_holiday_schedule()
                         st.session_state.edited_df_holiday = st.session_state.get("df_holiday", pd.DataFrame()).copy()
                         st.rerun()
@@ -1011,8 +942,7 @@ with st.expander("➕ 빠른 추가 / 삭제"):
                         cell_to_delete = worksheet_holiday.find(selected_date_to_delete)
                         if cell_to_delete:
                             worksheet_holiday.delete_rows(cell_to_delete.row)
-                            st.success(f"{selected_date_to_delete} 스케줄이 삭제되었습니다.")
-                            time.sleep(1.5)
+                            flash.flash(f"{selected_date_to_delete} 스케줄이 삭제되었습니다.")
                             load_holiday_schedule()
                             st.session_state.edited_df_holiday = st.session_state.get("df_holiday", pd.DataFrame()).copy()
                             st.rerun()
@@ -1103,8 +1033,7 @@ if st.button("💾 휴관일 테이블 저장"):
                     
                     update_data = [df_to_save.columns.tolist()] + df_to_save.values.tolist()
                     if update_sheet_with_retry(worksheet_closing, update_data):
-                        st.success("✅ 휴관일 정보가 성공적으로 저장되었습니다.")
-                        time.sleep(1.5)
+                        flash.flash("휴관일 정보가 성공적으로 저장되었습니다.")
                         load_closing_days_schedule()
                         st.rerun()
                 else:
@@ -1159,8 +1088,7 @@ with st.expander("➕ 빠른 추가 / 삭제"):
                                 worksheet_closing = st.session_state.get("worksheet_closing")
                                 rows_to_append = [[d.strftime("%Y-%m-%d")] for d in new_dates_to_add]
                                 worksheet_closing.append_rows(rows_to_append)
-                                st.success(f"총 {len(new_dates_to_add)}개의 휴관일이 성공적으로 추가되었습니다.")
-                                time.sleep(1.5)
+                                flash.flash(f"총 {len(new_dates_to_add)}개의 휴관일이 성공적으로 추가되었습니다.")
                                 load_closing_days_schedule()
                                 st.rerun()
                     except Exception as e:
@@ -1184,8 +1112,7 @@ with st.expander("➕ 빠른 추가 / 삭제"):
                         cell_to_delete = worksheet_closing.find(selected_date_to_delete)
                         if cell_to_delete:
                             worksheet_closing.delete_rows(cell_to_delete.row)
-                            st.success(f"{selected_date_to_delete} 휴관일이 삭제되었습니다.")
-                            time.sleep(1.5)
+                            flash.flash(f"{selected_date_to_delete} 휴관일이 삭제되었습니다.")
                             load_closing_days_schedule()
                             st.rerun()
                         else:
@@ -1195,6 +1122,21 @@ with st.expander("➕ 빠른 추가 / 삭제"):
     else:
         st.info("삭제할 휴관일이 없습니다.")
 
+st.divider()
+st.subheader("🧠 메모리 사용량")
+with st.expander("공유 데이터 / 세션별 메모리 보고서"):
+    concurrent_sessions = st.number_input("예상 동시 접속자 수", min_value=1, value=100, step=10, key="memory_report_sessions")
+    df_datasets, df_sessions, memory_summary = dataset_store.memory_report(concurrent_sessions)
+    col_shared, col_sessions, col_private, col_total = st.columns(4)
+    col_shared.metric("공유 데이터", f"{memory_summary['공유 데이터 바이트'] / 1024 ** 2:.1f} MB")
+    col_sessions.metric("기록된 세션", memory_summary["세션 수"])
+    col_private.metric("세션 전용 평균", f"{memory_summary['세션 전용 평균 바이트'] / 1024 ** 2:.2f} MB")
+    col_total.metric(f"{concurrent_sessions}명 예상 합계", f"{memory_summary['예상 합계 바이트'] / 1024 ** 2:.1f} MB")
+    st.caption("데이터별 (같은 워크시트·버전은 모든 세션이 한 벌을 공유합니다)")
+    st.dataframe(df_datasets, use_container_width=True, hide_index=True)
+    st.caption("세션별 (세션 전용 바이트는 마지막 데이터 로드 시점 기준)")
+    st.dataframe(df_sessions, use_container_width=True, hide_index=True)
+
 # --- 페이지 하단 원본 코드 ---
 df_master = st.session_state.get("df_master", pd.DataFrame(columns=["이름", "주차", "요일", "근무여부"]))
 df_request = st.session_state.get("df_request", pd.DataFrame(columns=["이름", "분류", "날짜정보"]))
@@ -8,16 +8,25 @@ import gspread
 from gspread.exceptions import WorksheetNotFound, APIError
 import time
 import io
-import xlsxwriter
 import platform
-import openpyxl
 import random
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Alignment, Font, Border, Side
-from openpyxl.comments import Comment
+import lazy_imports
+# openpyxl은 엑셀 내보내기 때 처음 불러옵니다. (페이지 첫 실행 시간 단축)
+openpyxl = lazy_imports.lazy_module("openpyxl")
+PatternFill, Alignment, Font, Border, Side = lazy_imports.lazy_attrs("openpyxl.styles", "PatternFill", "Alignment", "Font", "Border", "Side")
+Comment = lazy_imports.lazy_attrs("openpyxl.comments", "Comment")
 from datetime import datetime, timedelta
 from collections import Counter
 import menu
+import flash
+import request_journal
+import sheet_ops
+import master_schedule
+import schedule_engine
+import schedule_schema
+import schedule_grid
+import job_runner
+import instrumentation
 import re
 
 st.set_page_config(page_title="스케줄 배정", page_icon="🗓️", layout="wide")
@@ -68,9 +77,7 @@ def get_sort_key(log_string):
 
 # 로그인 체크 및 자동 리디렉션
 if not st.session_state.get("login_success", False):
-    st.warning("⚠️ Home 페이지에서 먼저 로그인해주세요.")
-    st.error("1초 후 Home 페이지로 돌아갑니다...")
-    time.sleep(1)
+    flash.flash("Home 페이지에서 먼저 로그인해주세요.", "warning")
     st.switch_page("Home.py")  # Home 페이지로 이동
     st.stop()
 
@@ -147,6 +154,26 @@ def update_sheet_with_retry(worksheet, data, retries=3, delay=5):
                 st.stop()
     return False
 
+@instrumentation.timed("시트 저장", page="5 스케줄_배정.py")
+def save_assignment_sheets_job(report, gc, sheet_url, month_str, next_month_str, df_schedule_to_save, summary_df_to_save):
+    """[백그라운드 작업] 배정 결과를 '스케줄 ver1.0' / '누적 ver1.0' 시트에 저장합니다."""
+    sheet = gc.open_by_url(sheet_url)
+    report("Google Sheets 연결 완료", 0.1)
+
+    try:
+        worksheet_schedule = sheet.worksheet(f"{month_str} 스케줄 ver1.0")
+    except gspread.exceptions.WorksheetNotFound:
+        worksheet_schedule = sheet.add_worksheet(title=f"{month_str} 스케줄 ver1.0", rows=1000, cols=50) # cols는 여유있게
+    job_runner.write_sheet_with_retry(report, worksheet_schedule, [df_schedule_to_save.columns.tolist()] + df_schedule_to_save.astype(str).values.tolist())
+    report(f"'{month_str} 스케줄 ver1.0' 저장 완료", 0.6)
+
+    try:
+        worksheet_summary = sheet.worksheet(f"{next_month_str} 누적 ver1.0")
+    except gspread.exceptions.WorksheetNotFound:
+        worksheet_summary = sheet.add_worksheet(title=f"{next_month_str} 누적 ver1.0", rows=100, cols=50)
+    job_runner.write_sheet_with_retry(report, worksheet_summary, [summary_df_to_save.columns.tolist()] + summary_df_to_save.values.tolist())
+    report(f"'{next_month_str} 누적 ver1.0' 저장 완료", 1.0)
+
 # 'find_latest_schedule_version' 함수 (수정 필요)
 
 def find_latest_schedule_version(sheet, month_str):
@@ -211,6 +238,7 @@ def find_latest_cumulative_version(sheet, month_str):
     return max(versions, key=versions.get)
 
 @st.cache_data(ttl=600, show_spinner="최신 데이터를 구글 시트에서 불러오는 중...")
+@instrumentation.timed("시트 로드")
 def load_data_page5():
     url = st.secrets["google_sheet"]["url"]
     try:
@@ -233,7 +261,8 @@ def load_data_page5():
     # --- 요청사항 시트 로드 ---
     try:
         ws2 = sheet.worksheet(f"{month_str} 요청")
-        df_request = pd.DataFrame(ws2.get_all_records())
+        # 사용자 요청 로그를 기준 시트로 압축한 뒤 사용 (로그가 비어 있으면 읽기 1회만 추가)
+        df_request = pd.DataFrame(request_journal.compact(sheet, f"{month_str} 요청", ws2))
     except WorksheetNotFound:
         st.warning(f"⚠️ '{month_str} 요청' 시트를 찾을 수 없어 새로 생성합니다.")
         ws2 = sheet.add_worksheet(title=f"{month_str} 요청", rows=100, cols=3)
@@ -297,40 +326,11 @@ def load_data_page5():
             df_cumulative[col] = pd.to_numeric(df_cumulative[col], errors='coerce').fillna(0).astype(int)
 
     # --- 근무/보충 테이블 생성 ---
-    df_shift = generate_shift_table(df_master)
+    df_shift = master_schedule.generate_shift_table(df_master)
     df_supplement = generate_supplement_table(df_shift, master_names_list)
     
     return df_master, df_request, df_cumulative, df_shift, df_supplement
 
-def generate_shift_table(df_master):
-    def split_shift(row):
-        shifts = []
-        if row["근무여부"] == "오전 & 오후":
-            shifts.extend([(row["이름"], row["주차"], row["요일"], "오전"), (row["이름"], row["주차"], row["요일"], "오후")])
-        elif row["근무여부"] in ["오전", "오후"]:
-            shifts.append((row["이름"], row["주차"], row["요일"], row["근무여부"]))
-        return shifts
-
-    shift_list = [shift for _, row in df_master.iterrows() for shift in split_shift(row)]
-    df_split = pd.DataFrame(shift_list, columns=["이름", "주차", "요일", "시간대"])
-
-    weekday_order = ["월", "화", "수", "목", "금"]
-    time_slots = ["오전", "오후"]
-    result = {}
-    for day in weekday_order:
-        for time in time_slots:
-            key = f"{day} {time}"
-            df_filtered = df_split[(df_split["요일"] == day) & (df_split["시간대"] == time)]
-            every_week = df_filtered[df_filtered["주차"] == "매주"]["이름"].unique()
-            specific_weeks = df_filtered[df_filtered["주차"] != "매주"]
-            specific_week_dict = {name: sorted(specific_weeks[specific_weeks["이름"] == name]["주차"].tolist(), 
-                                               key=lambda x: int(x.replace("주", ""))) 
-                                  for name in specific_weeks["이름"].unique() if specific_weeks[specific_weeks["이름"] == name]["주차"].tolist()}
-            employees = list(every_week) + [f"{name}({','.join(weeks)})" for name, weeks in specific_week_dict.items()]
-            result[key] = ", ".join(employees) if employees else ""
-    
-    return pd.DataFrame(list(result.items()), columns=["시간대", "근무"])
-
 def generate_supplement_table(df_result, names_in_master):
     supplement = []
     weekday_order = ["월", "화", "수", "목", "금"]
@@ -507,71 +507,8 @@ def append_final_summary_to_excel(worksheet, df_final_summary, style_args):
             cell.border = style_args['border']
             cell.alignment = Alignment(horizontal='center', vertical='center')
 
-def replace_adjustments(df):
-    """
-    [수정됨] 동일 인물 + 동일 시간대에서 추가보충/추가제외 -> 대체보충/대체휴근로 변경합니다.
-    [★] '주차' 제약을 제거하고 월 전체에서 1:1 매칭을 수행합니다.
-    [★] 메모 형식을 'm/d에서 대체됨', 'm/d로 대체함'으로 변경합니다.
-    """
-    color_priority = {'🟠 주황색': 0, '🟢 초록색': 1, '🟡 노란색': 2, '기본': 3, '🔴 빨간색': 4, '🔵 파란색': 5, '🟣 보라색': 6, '특수근무색': -1}
-
-    # 1. '보충' 또는 '휴근'인 행만 필터링 (주차 정보 포함 필수)
-    adjustments_df = df[df['상태'].isin(['보충', '휴근'])].copy()
-    
-    # 2. 그룹별로 순차 매칭을 위해 날짜순으로 정렬
-    adjustments_df.sort_values(by='날짜', inplace=True)
-
-    # 3. 그룹별로 순차 매칭 수행
-    # --- ▼▼▼ [수정 1] '주차'를 groupby에서 제거 ▼▼▼ ---
-    for (worker, shift), group in adjustments_df.groupby(['근무자', '시간대']):
-    # --- ▲▲▲ [수정 1] 완료 ---
-        
-        # 날짜 순으로 정렬된 추가보충 및 추가제외 레코드 리스트를 얻습니다.
-        bochung_records = group[group['상태'] == '보충'].to_dict('records')
-        jeoe_records = group[group['상태'] == '휴근'].to_dict('records')
-
-        # 대체 가능 횟수 (min(추가보충 수, 추가제외 수))
-        num_swaps = min(len(bochung_records), len(jeoe_records))
-
-        # 4. 최대 가능 횟수만큼 순차적으로 짝짓기
-        for i in range(num_swaps):
-            bochung = bochung_records[i]
-            jeoe = jeoe_records[i]
-            
-            # 매칭 날짜를 YYYY-MM-DD 형식으로 가져옵니다.
-            bochung_date_str = bochung['날짜']
-            jeoe_date_str = jeoe['날짜']
-            
-            # 5. 원본 df에 상태 업데이트 (매칭된 두 레코드에 대해)
-            
-            # 대체보충으로 변경 (추가보충이었던 레코드)
-            bochung_mask = (df['날짜'] == bochung_date_str) & \
-                           (df['시간대'] == shift) & \
-                           (df['근무자'] == worker) & \
-                           (df['상태'] == '보충')
-            
-            df.loc[bochung_mask, '상태'] = '대체보충'
-            df.loc[bochung_mask, '색상'] = '🟢 초록색'
-            # --- ▼▼▼ [수정 2] '대체보충' 메모 형식 변경 (요청사항) ▼▼▼ ---
-            df.loc[bochung_mask, '메모'] = f"{pd.to_datetime(jeoe_date_str).strftime('%-m/%-d')}에서 대체됨"
-            # --- ▲▲▲ [수정 2] 완료 ---
-
-            # 대체휴근로 변경 (추가제외였던 레코드)
-            jeoe_mask = (df['날짜'] == jeoe_date_str) & \
-                        (df['시간대'] == shift) & \
-                        (df['근무자'] == worker) & \
-                        (df['상태'] == '휴근')
-            
-            df.loc[jeoe_mask, '상태'] = '대체휴근'
-            df.loc[jeoe_mask, '색상'] = '🔵 파란색'
-            # --- ▼▼▼ [수정 3] '대체휴근' 메모 형식도 일관되게 변경 ▼▼▼ ---
-            df.loc[jeoe_mask, '메모'] = f"{pd.to_datetime(bochung_date_str).strftime('%-m/%-d')}로 대체함"
-            # --- ▲▲▲ [수정 3] 완료 ---
-            
-    # 6. 최종 결과를 반환합니다. (호출한 곳에서 최종 중복 제거 필요)
-    return df
-
 # --- 1. 최종본(공유용) 엑셀 생성 함수 ---
+@instrumentation.timed("Excel 생성", page="5 스케줄_배정.py")
 def create_final_schedule_excel(initial_df, edited_df, edited_cumulative_df, df_special, df_requests, closing_dates, month_str, df_final_unique, df_schedule):
     """
     [공유용 최종본]
@@ -611,7 +548,7 @@ def create_final_schedule_excel(initial_df, edited_df, edited_cumulative_df, df_
     center_align = Alignment(horizontal='center', vertical='center')
 
     if df_final_unique is None or df_schedule is None:
-        st.error("Excel 생성에 필요한 최종 배정 데이터(df_final_unique or df_schedule)가 함수로 전달되지 않았습니다.")
+        job_runner.ui.error("Excel 생성에 필요한 최종 배정 데이터(df_final_unique or df_schedule)가 함수로 전달되지 않았습니다.")
         wb.save(output)
         return output.getvalue()
         
@@ -646,10 +583,10 @@ def create_final_schedule_excel(initial_df, edited_df, edited_cumulative_df, df_
                     current_date = datetime.strptime(f"{month_str.split('년')[0]}년 {display_date}", "%Y년 %m월 %d일").date()
                     current_date_iso = current_date.strftime('%Y-%m-%d')
                 except ValueError:
-                    st.warning(f"날짜 형식 변환 실패 (Row {r}, Date: {display_date}). 해당 행 건너뜁니다.")
+                    job_runner.ui.warning(f"날짜 형식 변환 실패 (Row {r}, Date: {display_date}). 해당 행 건너뜁니다.")
                     current_date, current_date_iso = None, None
         except Exception as e:
-            st.warning(f"날짜 변환 중 예상치 못한 오류 (Row {r}, Date: {edited_row.get('날짜')}): {e}")
+            job_runner.ui.warning(f"날짜 변환 중 예상치 못한 오류 (Row {r}, Date: {edited_row.get('날짜')}): {e}")
             current_date, current_date_iso = None, None
 
         if not current_date_iso: continue
@@ -662,7 +599,7 @@ def create_final_schedule_excel(initial_df, edited_df, edited_cumulative_df, df_
                     df_special['날짜'] = pd.to_datetime(df_special['날짜'], errors='coerce')
                 is_special_day = current_date in df_special.dropna(subset=['날짜'])['날짜'].dt.date.values if current_date else False
             except Exception as e_special_date:
-                st.warning(f"df_special 날짜 처리 중 오류: {e_special_date}")
+                job_runner.ui.warning(f"df_special 날짜 처리 중 오류: {e_special_date}")
                 is_special_day = False
 
         is_empty_day = (is_row_empty and not is_special_day) or (current_date_iso in closing_dates)
@@ -675,7 +612,7 @@ def create_final_schedule_excel(initial_df, edited_df, edited_cumulative_df, df_
                     oncall_val = special_day_info['당직'].iloc[0]
                     if pd.notna(oncall_val) and oncall_val != "당직 없음": weekend_oncall_worker = str(oncall_val).strip()
             except Exception as e_oncall:
-                st.warning(f"주말 당직자 확인 중 오류: {e_oncall}")
+                job_runner.ui.warning(f"주말 당직자 확인 중 오류: {e_oncall}")
 
 
         for c, col_name in enumerate(final_columns, 1):
@@ -783,6 +720,7 @@ def create_final_schedule_excel(initial_df, edited_df, edited_cumulative_df, df_
     wb.save(output)
     return output.getvalue()
 
+@instrumentation.timed("Excel 생성 (확인용)")
 def create_checking_schedule_excel(initial_df, edited_df, edited_cumulative_df, df_special, df_requests, closing_dates, month_str):
     """
     [관리자 확인용]
@@ -1243,11 +1181,10 @@ with col_btn:
             for key in keys_to_clear:
                 if key in st.session_state:
                     del st.session_state[key]
+            job_runner.forget_job("schedule_job_id")
             # --- 수정 끝 ---
             
-            st.success("데이터가 새로고침되었습니다. 페이지를 다시 로드합니다.")
-            time.sleep(1)
-            st.rerun()
+            flash.rerun("데이터가 새로고침되었습니다. 페이지를 다시 로드합니다.")
         except Exception as e:
             st.error(f"새로고침 중 오류 발생: {type(e).__name__} - {e}")
             st.stop()
@@ -1423,6 +1360,62 @@ def build_final_summary_table(df_cumulative, df_final_unique, all_names):
         
     return pd.DataFrame(summary_data)
 
+@st.fragment
+def cumulative_editor_fragment(df_cumulative_full):
+    """전월 누적 테이블 편집기와 저장 버튼. 셀을 고치면 이 부분만 다시 실행됩니다."""
+    # 1. 표시할 행 이름 정의 및 원본 데이터에서 필터링
+    rows_to_display = ["오전누적", "오후누적", "오전당직누적", "오후당직누적"]
+    df_to_edit = df_cumulative_full[df_cumulative_full['항목'].isin(rows_to_display)]
+
+    # 2. 필터링된 데이터를 data_editor에 표시 (display_cumulative_table 호출 제거)
+    edited_partial_df = st.data_editor(
+        df_to_edit,
+        use_container_width=True,
+        hide_index=True,
+        column_config={"항목": {"editable": False}},
+        key="cumulative_editor" # 고유 키 부여
+    )
+
+    # 3. 저장 버튼 로직
+    if st.button("💾 누적 테이블 수정사항 저장"):
+        try:
+            # 원본 전체 데이터의 복사본 생성
+            df_updated_full = st.session_state["df_cumulative"].copy()
+
+            # '항목'을 인덱스로 설정하여 정확한 위치에 업데이트 준비
+            df_updated_full.set_index('항목', inplace=True)
+            edited_partial_df.set_index('항목', inplace=True)
+
+            # 수정된 내용으로 원본 업데이트
+            df_updated_full.update(edited_partial_df)
+            df_updated_full.reset_index(inplace=True) # 인덱스를 다시 열로 복원
+
+            # 세션 상태 및 Google Sheet 업데이트 (이제 df_updated_full이 최신 전체 데이터임)
+            st.session_state["df_cumulative"] = df_updated_full.copy()
+            st.session_state["edited_df_cumulative"] = df_updated_full.copy()
+
+            gc = get_gspread_client()
+            sheet = gc.open_by_url(url)
+
+            # ▼▼▼ [핵심 수정] 고정된 이름 대신 세션에 저장된 시트 이름을 사용합니다. ▼▼▼
+            target_sheet_name = st.session_state.get("target_cumulative_sheet_name", f"{month_str} 누적")
+            try:
+                worksheet4 = sheet.worksheet(target_sheet_name)
+            except WorksheetNotFound:
+                st.info(f"'{target_sheet_name}' 시트가 없어 새로 생성합니다.")
+                worksheet4 = sheet.add_worksheet(title=target_sheet_name, rows=100, cols=len(df_updated_full.columns) + 5)
+            # ▲▲▲ [수정 완료] ▲▲▲
+
+            update_data = [df_updated_full.columns.tolist()] + df_updated_full.values.tolist()
+
+            if update_sheet_with_retry(worksheet4, update_data):
+                flash.rerun(f"'{target_sheet_name}' 테이블이 성공적으로 저장되었습니다.")
+            else:
+                st.error("누적 테이블 저장 실패")
+                st.stop()
+        except Exception as e:
+            st.error(f"누적 테이블 저장 중 오류 발생: {str(e)}")
+
 df_master, df_request, df_cumulative, df_shift, df_supplement = load_data_page5()
 
 # 세션 상태에 데이터 저장 (기존 코드 유지)
@@ -1495,60 +1488,7 @@ with st.expander("📁 테이블 펼쳐보기"):
             st.stop()
     # --- ✅ 오류 해결 코드 끝 ---
 
-    # 1. 표시할 행 이름 정의 및 원본 데이터에서 필터링
-    rows_to_display = ["오전누적", "오후누적", "오전당직누적", "오후당직누적"]
-    df_to_edit = df_cumulative_full[df_cumulative_full['항목'].isin(rows_to_display)]
-
-    # 2. 필터링된 데이터를 data_editor에 표시 (display_cumulative_table 호출 제거)
-    edited_partial_df = st.data_editor(
-        df_to_edit,
-        use_container_width=True,
-        hide_index=True,
-        column_config={"항목": {"editable": False}},
-        key="cumulative_editor" # 고유 키 부여
-    )
-
-    # 3. 저장 버튼 로직
-    if st.button("💾 누적 테이블 수정사항 저장"):
-        try:
-            # 원본 전체 데이터의 복사본 생성
-            df_updated_full = st.session_state["df_cumulative"].copy()
-
-            # '항목'을 인덱스로 설정하여 정확한 위치에 업데이트 준비
-            df_updated_full.set_index('항목', inplace=True)
-            edited_partial_df.set_index('항목', inplace=True)
-
-            # 수정된 내용으로 원본 업데이트
-            df_updated_full.update(edited_partial_df)
-            df_updated_full.reset_index(inplace=True) # 인덱스를 다시 열로 복원
-
-            # 세션 상태 및 Google Sheet 업데이트 (이제 df_updated_full이 최신 전체 데이터임)
-            st.session_state["df_cumulative"] = df_updated_full.copy()
-            st.session_state["edited_df_cumulative"] = df_updated_full.copy()
-            
-            gc = get_gspread_client()
-            sheet = gc.open_by_url(url)
-
-            # ▼▼▼ [핵심 수정] 고정된 이름 대신 세션에 저장된 시트 이름을 사용합니다. ▼▼▼
-            target_sheet_name = st.session_state.get("target_cumulative_sheet_name", f"{month_str} 누적")
-            try:
-                worksheet4 = sheet.worksheet(target_sheet_name)
-            except WorksheetNotFound:
-                st.info(f"'{target_sheet_name}' 시트가 없어 새로 생성합니다.")
-                worksheet4 = sheet.add_worksheet(title=target_sheet_name, rows=100, cols=len(df_updated_full.columns) + 5)
-            # ▲▲▲ [수정 완료] ▲▲▲
-            
-            update_data = [df_updated_full.columns.tolist()] + df_updated_full.values.tolist()
-            
-            if update_sheet_with_retry(worksheet4, update_data):
-                st.success(f"'{target_sheet_name}' 테이블이 성공적으로 저장되었습니다.")
-                time.sleep(1.5)
-                st.rerun()
-            else:
-                st.error("누적 테이블 저장 실패")
-                st.stop()
-        except Exception as e:
-            st.error(f"누적 테이블 저장 중 오류 발생: {str(e)}")
+    cumulative_editor_fragment(df_cumulative_full)
 
     # 4. 다운로드 버튼 로직
     with st.container():
@@ -1646,25 +1586,17 @@ def add_request_callback():
                 ].empty
 
                 if is_duplicate:
-                    st.error("⚠️ 이미 존재하는 요청사항입니다.")
-                    time.sleep(1.5)
-                    st.rerun()
+                    flash.rerun("이미 존재하는 요청사항입니다.", "error")
                     return
 
-                rows_to_delete = []
-                for i, req in enumerate(all_requests):
-                    if req.get("이름") == 최종_이름:
-                        if 분류 == "요청 없음" or req.get("분류") == "요청 없음":
-                            rows_to_delete.append(i + 2)
-                
-                if rows_to_delete:
-                    for row_idx in sorted(rows_to_delete, reverse=True):
-                        worksheet2.delete_rows(row_idx)
+                sheet_ops.delete_record_rows(
+                    worksheet2, all_requests,
+                    lambda req: req.get("이름") == 최종_이름 and (분류 == "요청 없음" or req.get("분류") == "요청 없음"),
+                )
 
                 worksheet2.append_row([최종_이름, 분류, 날짜정보 if 분류 != "요청 없음" else ""])
                 
-                st.success("요청사항이 저장되었습니다.")
-                time.sleep(1.5)
+                flash.flash("요청사항이 저장되었습니다.")
                 
                 st.session_state.add_employee_select = None
                 st.session_state.new_employee_input = ""
@@ -1755,23 +1687,16 @@ if st.button("📅 삭제"):
                     row = df_request_original.loc[index]
                     items_to_delete_set.add((row['이름'], row['분류'], row['날짜정보']))
 
-                rows_to_delete_indices = []
-                for i, record in enumerate(all_requests):
-                    record_tuple = (record.get('이름'), record.get('분류'), record.get('날짜정보'))
-                    if record_tuple in items_to_delete_set:
-                        rows_to_delete_indices.append(i + 2)
-                
-                if rows_to_delete_indices:
-                    for row_idx in sorted(rows_to_delete_indices, reverse=True):
-                        worksheet2.delete_rows(row_idx)
+                _, remaining_records = sheet_ops.delete_record_rows(
+                    worksheet2, all_requests,
+                    lambda record: (record.get('이름'), record.get('분류'), record.get('날짜정보')) in items_to_delete_set,
+                )
 
-                remaining_requests = worksheet2.findall(selected_employee_id2)
-                if not remaining_requests:
+                # 삭제 후 남은 요청은 같은 읽기 결과로 확인 (시트를 다시 검색하지 않음)
+                if not any(record.get('이름') == selected_employee_id2 for record in remaining_records):
                     worksheet2.append_row([selected_employee_id2, "요청 없음", ""])
                 
-                st.success("요청사항이 삭제되었습니다.")
-                time.sleep(1.5)
-                st.rerun()
+                flash.rerun("요청사항이 삭제되었습니다.")
             else:
                 st.warning("삭제할 요청사항을 선택해주세요.")
         except Exception as e:
@@ -1832,16 +1757,14 @@ def update_worker_status(df, date_str, time_slot, worker, status, memo, color, d
     date_obj = pd.to_datetime(date_str)
     worker_stripped = worker.strip()
     
-    existing_indices = df.index[
-        (df['날짜'] == date_str) &
-        (df['시간대'] == time_slot) &
-        (df['근무자'] == worker_stripped)
-    ].tolist()
+    existing_indices = schedule_schema.find_schedule_rows(df, date_str, time_slot, worker_stripped)
 
     if existing_indices:
+        # typed df_final(schedule_schema.empty_schedule_frame)이면 처음 보는 상태/색상을 범주에 먼저 추가
+        df = schedule_schema.add_schedule_categories(df, {'상태': status, '색상': color})
         df.loc[existing_indices, ['상태', '메모', '색상']] = [status, memo, color]
     else:
-        new_row = pd.DataFrame([{
+        df = schedule_schema.append_schedule_row(df, {
             '날짜': date_str,
             '요일': day_map.get(date_obj.weekday(), ''),
             '주차': week_numbers.get(date_obj.date(), 0),
@@ -1850,8 +1773,7 @@ def update_worker_status(df, date_str, time_slot, worker, status, memo, color, d
             '상태': status,
             '메모': memo,
             '색상': color
-        }])
-        df = pd.concat([df, new_row], ignore_index=True)
+        })
     return df
 
 # 아래 코드로 함수 전체를 교체하세요.
@@ -2044,134 +1966,75 @@ def transform_schedule_for_checking(df_final_unique, df_excel, month_start, mont
     max_am_workers = max(max_am_workers, 12)
     max_pm_workers = max(max_pm_workers, 4)
 
-    date_range = pd.date_range(start=month_start, end=month_end)
-    date_list = [f"{d.month}월 {d.day}일" for d in date_range]
-    weekday_map = {'Mon': '월', 'Tue': '화', 'Wed': '수', 'Thu': '목', 'Fri': '금', 'Sat': '토', 'Sun': '일'}
-    weekdays = [weekday_map[d.strftime('%a')] for d in date_range]
-    target_year = month_start.year
+    month = schedule_grid.month_frame(month_start, month_end)
 
     # [핵심 수정 2] 동적으로 계산된 열 개수로 컬럼 정의
-    columns = ['날짜', '요일'] + \
-              [str(i) for i in range(1, max_am_workers + 1)] + \
-              ['오전당직(온콜)'] + \
-              [f'오후{i}' for i in range(1, max_pm_workers + 1)]
-    result_df = pd.DataFrame(columns=columns)
-
-    for date, weekday in zip(date_list, weekdays):
-        date_key = datetime.strptime(date, '%m월 %d일').replace(year=target_year).strftime('%Y-%m-%d')
-        
-        row_data = {'날짜': date, '요일': weekday}
-
-        # 오전/오후 근무자 정보 처리
-        for time_slot, max_workers, col_prefix in [('오전', max_am_workers, ''), ('오후', max_pm_workers, '오후')]:
-            # 모든 상태의 근무자 정보를 가져옴
-            workers_info = df_final_unique[
-                (df_final_unique['날짜'] == date_key) &
-                (df_final_unique['시간대'] == time_slot)
-            ].sort_values(by=['색상_우선순위', '근무자']).to_dict('records')
-
-            for i in range(max_workers):
-                col_name = f"{col_prefix}{i+1}" if col_prefix else str(i+1)
-                if i < len(workers_info):
-                    info = workers_info[i]
-                    worker_name = info['근무자']
-                    status = info['상태']
-                    
-                    # --- ▼▼▼ [핵심 수정] L2158 로직 이식 ▼▼▼ ---
-                    memo = info.get('메모', '') # 1. 메모 가져오기
-                    
-                    if status == '대체보충' and pd.notna(memo) and str(memo).strip():
-                         # 2. 대체보충이고 메모가 있으면 (메모) 사용
-                         row_data[col_name] = f"{worker_name}({memo})"
-                    elif status not in ['근무', '당직', '기본']:
-                         # 3. 그 외 (휴가, 보충, 대체휴근 등)는 (상태) 사용
-                         row_data[col_name] = f"{worker_name}({status})"
-                    else:
-                         # 4. 기본 근무는 이름만
-                         row_data[col_name] = worker_name
-                    # --- ▲▲▲ [수정 완료] ▲▲▲ ---
-                        
-                else:
-                    row_data[col_name] = ''
-
-        # 당직 및 주말 정보 처리 (이 부분은 원본 L1645 이후와 동일)
-        excel_row = df_excel[df_excel['날짜'] == date]
-        if not excel_row.empty:
-            # '오전당직(온콜)' 열이 df_excel에 있는지 확인
-            if '오전당직(온콜)' in excel_row.columns:
-                row_data['오전당직(온콜)'] = excel_row['오전당직(온콜)'].iloc[0]
-            
-            if weekday in ['토', '일']:
-                for i in range(1, max_am_workers + 1):
-                    col_str = str(i)
-                    if col_str in excel_row.columns and pd.notna(excel_row[col_str].iloc[0]):
-                        row_data[col_str] = excel_row[col_str].iloc[0]
-                    # else:
-                    #     # row_data[col_str] = '' # (이미 위에서 ''로 초기화됨)
-                for i in range(1, max_pm_workers + 1):
-                    row_data[f'오후{i}'] = ''
-        
-        # '오전당직(온콜)'이 row_data에 없는 경우(평일)를 대비해 ''로 초기화
-        if '오전당직(온콜)' not in row_data:
-            row_data['오전당직(온콜)'] = ''
-
-        result_df = pd.concat([result_df, pd.DataFrame([row_data])], ignore_index=True)
-
-    # 누락된 열이 있다면 ''로 채움 (안전장치)
-    for col in columns:
-        if col not in result_df.columns:
-            result_df[col] = ''
-            
-    # 최종 열 순서 맞추기
-    result_df = result_df[columns]
-
-    return result_df
+    am_cols = schedule_grid.am_columns(max_am_workers)
+    pm_cols = schedule_grid.pm_columns(max_pm_workers)
+    columns = ['날짜', '요일'] + am_cols + ['오전당직(온콜)'] + pm_cols
+
+    # 오전/오후 근무자: (날짜, 시간대)별로 색상 우선순위 → 이름 순 순위를 매겨 한 번에 격자로 펼침
+    df_slots = df_final_unique[df_final_unique['시간대'].isin(['오전', '오후'])]
+    df_slots = schedule_grid.rank_within(df_slots, ['날짜', '시간대'], ['색상_우선순위', '근무자'])
+    names = df_slots['근무자']
+    status = df_slots['상태']
+    memo = df_slots['메모'] if '메모' in df_slots.columns else pd.Series('', index=df_slots.index)
+    has_memo = memo.notna() & memo.astype(str).str.strip().ne('')
+    # 대체보충이고 메모가 있으면 (메모), 그 외 (휴가, 보충, 대체휴근 등)는 (상태), 기본 근무는 이름만
+    cell = names.where(status.isin(['근무', '당직', '기본']), names.astype(str) + '(' + status.astype(str) + ')')
+    cell = cell.mask((status == '대체보충') & has_memo, names.astype(str) + '(' + memo.astype(str) + ')')
+    slot_col = (df_slots['순위'] + 1).astype(str)
+    slot_col = slot_col.where(df_slots['시간대'] == '오전', '오후' + slot_col)
+    result_df = schedule_grid.long_to_wide(df_slots.assign(열=slot_col, 값=cell), '날짜', '열', '값',
+                                           index=month['날짜키'], columns=columns)
+    result_df.index = month.index
+    result_df['날짜'] = month['날짜']
+    result_df['요일'] = month['요일']
+
+    # 당직 및 주말 정보: df_excel의 날짜별 첫 행을 조인
+    excel_rows, has_excel = schedule_grid.first_rows_by(df_excel, '날짜', month['날짜'])
+    excel_rows = excel_rows.reset_index(drop=True)
+    if '오전당직(온콜)' in excel_rows.columns:
+        result_df['오전당직(온콜)'] = excel_rows['오전당직(온콜)'].where(has_excel, '')
+    weekend = has_excel & month['요일'].isin(['토', '일']).to_numpy()
+    for col in am_cols:
+        if col in excel_rows.columns:
+            override = weekend & excel_rows[col].notna().to_numpy()
+            result_df.loc[override, col] = excel_rows.loc[override, col]
+    result_df.loc[weekend, pm_cols] = ''
+
+    return result_df[columns]
 
 def transform_schedule_data(df, df_excel, month_start, month_end):
     # 모든 상태 포함 (제외, 추가제외 포함)
-    df = df[['날짜', '시간대', '근무자', '요일', '상태', '색상', '메모']].copy()
-    
-    date_range = pd.date_range(start=month_start, end=month_end)
-    date_list = [f"{d.month}월 {d.day}일" for d in date_range]
-    weekday_list = [d.strftime('%a') for d in date_range]
-    weekday_map = {'Mon': '월', 'Tue': '화', 'Wed': '수', 'Thu': '목', 'Fri': '금', 'Sat': '토', 'Sun': '일'}
-    weekdays = [weekday_map[w] for w in weekday_list]
-    
-    target_year = month_start.year
-
-    columns = ['날짜', '요일'] + [str(i) for i in range(1, 13)] + ['오전당직(온콜)'] + [f'오후{i}' for i in range(1, 5)]
-    result_df = pd.DataFrame(columns=columns)
-    
-    for date, weekday in zip(date_list, weekdays):
-        date_key = datetime.strptime(date, '%m월 %d일').replace(year=target_year).strftime('%Y-%m-%d')
-        date_df = df[df['날짜'] == date_key]
-        
-        # 오전 근무자 (모든 상태 포함)
-        morning_workers = date_df[date_df['시간대'] == '오전'][['근무자', '상태', '색상', '메모']].to_dict('records')
-        morning_data = [''] * 12
-        for i, worker_info in enumerate(morning_workers[:12]):
-            morning_data[i] = worker_info['근무자']
-        
-        # 오후 근무자 (모든 상태 포함)
-        afternoon_workers = date_df[date_df['시간대'] == '오후'][['근무자', '상태', '색상', '메모']].to_dict('records')
-        afternoon_data = [''] * 4
-        for i, worker_info in enumerate(afternoon_workers[:4]):
-            afternoon_data[i] = worker_info['근무자']
-        
-        if weekday in ['토', '일']: 
-            excel_row = df_excel[df_excel['날짜'] == date]
-            if not excel_row.empty:
-                morning_data = [excel_row[str(i)].iloc[0] if str(i) in excel_row.columns and pd.notna(excel_row[str(i)].iloc[0]) else '' for i in range(1, 13)]
-        
-        oncall_worker = ''
-        excel_row = df_excel[df_excel['날짜'] == date]
-        if not excel_row.empty:
-            oncall_worker = excel_row['오전당직(온콜)'].iloc[0] if '오전당직(온콜)' in excel_row.columns else ''
-        
-        row_data = [date, weekday] + morning_data + [oncall_worker] + afternoon_data
-        result_df = pd.concat([result_df, pd.DataFrame([row_data], columns=columns)], ignore_index=True)
-    
-    return result_df
+    df = df[['날짜', '시간대', '근무자', '요일', '상태', '색상', '메모']]
+    month = schedule_grid.month_frame(month_start, month_end)
+
+    am_cols = schedule_grid.am_columns(12)
+    pm_cols = schedule_grid.pm_columns(4)
+    columns = ['날짜', '요일'] + am_cols + ['오전당직(온콜)'] + pm_cols
+
+    # 오전 12명 / 오후 4명까지 기존 행 순서대로 배치 (모든 상태 포함)
+    df_slots = schedule_grid.rank_within(df[df['시간대'].isin(['오전', '오후'])], ['날짜', '시간대'])
+    slot_col = (df_slots['순위'] + 1).astype(str)
+    slot_col = slot_col.where(df_slots['시간대'] == '오전', '오후' + slot_col)
+    result_df = schedule_grid.long_to_wide(df_slots.assign(열=slot_col), '날짜', '열', '근무자',
+                                           index=month['날짜키'], columns=columns)
+    result_df.index = month.index
+    result_df['날짜'] = month['날짜']
+    result_df['요일'] = month['요일']
+
+    # 주말은 오전 열 전체를 토요/휴일 스케줄로, 당직은 df_excel 값으로 채움
+    excel_rows, has_excel = schedule_grid.first_rows_by(df_excel, '날짜', month['날짜'])
+    excel_rows = excel_rows.reset_index(drop=True)
+    weekend = has_excel & month['요일'].isin(['토', '일']).to_numpy()
+    for col in am_cols:
+        values = excel_rows[col] if col in excel_rows.columns else pd.Series('', index=excel_rows.index)
+        result_df.loc[weekend, col] = values[weekend].where(values[weekend].notna(), '')
+    if '오전당직(온콜)' in excel_rows.columns:
+        result_df['오전당직(온콜)'] = excel_rows['오전당직(온콜)'].where(has_excel, '')
+
+    return result_df[columns]
 
 df_cumulative_next = df_cumulative.copy()
 
@@ -2224,7 +2087,7 @@ all_names = sorted(list(names_in_master.union(names_in_request)))
 
 # ▲▲▲ [수정 완료] ▲▲▲  
 
-def find_afternoon_swap_possibility(worker_to_check, original_date_str, df_final, active_weekdays, target_count_pm, df_supplement_processed, df_request, initial_master_assignments, day_map, week_numbers):
+def find_afternoon_swap_possibility(worker_to_check, original_date_str, df_final, active_weekdays, target_count_pm, df_supplement_processed, request_index, initial_master_assignments, day_map, week_numbers):
     shortage_dates = []
     original_date = pd.to_datetime(original_date_str).date()
 
@@ -2263,7 +2126,7 @@ def find_afternoon_swap_possibility(worker_to_check, original_date_str, df_final
         if worker_to_check in initial_master_assignments.get((shortage_date, '오후'), set()):
             continue
 
-        no_supplement_req = {r['이름'] for _, r in df_request.iterrows() if shortage_date in parse_date_range(str(r.get('날짜정보'))) and r.get('분류') == '보충 불가(오후)'}
+        no_supplement_req = request_index.names(shortage_date, '보충 불가(오후)')
         if worker_to_check in no_supplement_req:
             continue
 
@@ -2272,7 +2135,7 @@ def find_afternoon_swap_possibility(worker_to_check, original_date_str, df_final
 
 # 기존 execute_adjustment_pass 함수의 내용을 아래 코드로 전체 교체하세요.
 
-def execute_adjustment_pass(df_final, active_weekdays, time_slot, target_count, initial_master_assignments, df_supplement_processed, df_request, day_map, week_numbers, current_cumulative, df_cumulative, all_names, weekly_counts):
+def execute_adjustment_pass(df_final, active_weekdays, time_slot, target_count, initial_master_assignments, df_supplement_processed, request_index, day_map, week_numbers, current_cumulative, df_cumulative, all_names, weekly_counts):
     from collections import defaultdict
 
     active_weekdays = [pd.to_datetime(date) if isinstance(date, str) else date for date in active_weekdays]
@@ -2305,8 +2168,8 @@ def execute_adjustment_pass(df_final, active_weekdays, time_slot, target_count,
                         candidates.extend(val.replace('🔺', '').strip() for val in supplement_row[col].dropna())
             
             unavailable = set(current_workers)
-            no_supp = {r['이름'] for _, r in df_request.iterrows() if date_str in parse_date_range(str(r.get('날짜정보'))) and r.get('분류') == f'보충 불가({time_slot})'}
-            difficult_supp = {r['이름'] for _, r in df_request.iterrows() if date_str in parse_date_range(str(r.get('날짜정보'))) and r.get('분류') == f'보충 어려움({time_slot})'}
+            no_supp = request_index.names(date_str, f'보충 불가({time_slot})')
+            difficult_supp = request_index.names(date_str, f'보충 어려움({time_slot})')
             candidates = [w for w in candidates if w not in unavailable and w not in no_supp]
             
             if time_slot == '오후' and current_week:
@@ -2336,7 +2199,7 @@ def execute_adjustment_pass(df_final, active_weekdays, time_slot, target_count,
         # [인원 초과 시 제외]
         elif count_diff > 0:
             over_count = count_diff
-            must_work = {r['이름'] for _, r in df_request.iterrows() if date_str in parse_date_range(str(r.get('날짜정보'))) and r.get('분류') == f'꼭 근무({time_slot})'}
+            must_work = request_index.names(date_str, f'꼭 근무({time_slot})')
 
             for _ in range(over_count):
                 # --- ▼▼▼ [핵심 수정 3] '꼭 근무' 포함 ▼▼▼ ---
@@ -2377,28 +2240,11 @@ def execute_adjustment_pass(df_final, active_weekdays, time_slot, target_count,
 
     return df_final, current_cumulative, weekly_counts
 
-from collections import defaultdict
-
-def calculate_weekly_counts(df_final, all_names, week_numbers):
-    """지정된 주차 정보에 따라 모든 인원의 주간 오전/오후 근무 횟수를 계산합니다."""
-    weekly_counts = {worker: {'오전': defaultdict(int), '오후': defaultdict(int)} for worker in all_names}
-    
-    for _, row in df_final.iterrows():
-        if row['상태'] in ['근무', '대체보충', '보충']:
-            try:
-                date_obj = pd.to_datetime(row['날짜']).date()
-                week = week_numbers.get(date_obj) # .get()으로 안전하게 접근
-                if week and row['근무자'] in weekly_counts:
-                    weekly_counts[row['근무자']][row['시간대']][week] += 1
-            except (KeyError, ValueError):
-                continue
-    return weekly_counts
-
 def balance_weekly_and_cumulative(
     df_final, 
     active_weekdays_am_sorted, active_weekdays_pm_sorted,
     initial_master_assignments, df_supplement_processed, 
-    df_request, day_map, week_numbers, current_cumulative, all_names, df_cumulative,
+    request_index, day_map, week_numbers, current_cumulative, all_names, df_cumulative,
     weekly_counts 
 ):
     df_cum_indexed = df_cumulative.set_index('항목').T
@@ -2423,12 +2269,12 @@ def balance_weekly_and_cumulative(
             
             swap_found_in_iteration = False
             
-            for date in active_weekdays: # [수정] active_weekdays_to_use -> active_weekdays
+            for date in sorted(active_weekdays_am_sorted): # [수정] active_weekdays_to_use -> active_weekdays (날짜순)
                 date_str = date.strftime('%Y-%m-%d')
                 date_obj = date.date() # 날짜 객체
                 current_week = week_numbers.get(date_obj) # 현재 주차
                 
-                must_work = {r['이름'] for _, r in df_request.iterrows() if date_str in parse_date_range(str(r.get('날짜정보'))) and r.get('분류') == f'꼭 근무({time_slot})'}
+                must_work = request_index.names(date_str, f'꼭 근무({time_slot})')
                 if w_h in must_work: continue
 
                 # --- ▼▼▼ [핵심 수정] '꼭 근무' 포함하여 확인 ▼▼▼ ---
@@ -2440,7 +2286,7 @@ def balance_weekly_and_cumulative(
                 can_supp = any(w_l in s_row[col].dropna().str.replace('🔺', '').str.strip().tolist() for col in s_row.columns if col.startswith('보충'))
                 if not can_supp: continue
                 
-                no_supp = {r['이름'] for _, r in df_request.iterrows() if date_str in parse_date_range(str(r.get('날짜정보'))) and r.get('분류') == f'보충 불가({time_slot})'}
+                no_supp = request_index.names(date_str, f'보충 불가({time_slot})')
                 if w_l in no_supp: continue
 
                 if time_slot == '오후':
@@ -2477,7 +2323,7 @@ def balance_weekly_and_cumulative(
                 break
         
         else:
-            st.warning(f"⚠️ {time_slot} 균형 조정이 최대 반복 횟수({i+1}회)에 도달했습니다.")
+            job_runner.ui.warning(f"⚠️ {time_slot} 균형 조정이 최대 반복 횟수({i+1}회)에 도달했습니다.")
     
     # [수정] weekly_counts는 상위에서 관리하므로 반환값에서 제거
     return df_final, current_cumulative
@@ -2489,7 +2335,7 @@ from collections import Counter # <-- 함수 상단에 추가 (혹시 없다면)
 def balance_final_cumulative_with_weekly_check(
     df_final,
     active_weekdays_am_sorted, active_weekdays_pm_sorted,
-    df_supplement_processed, df_request, day_map, week_numbers,
+    df_supplement_processed, request_index, day_map, week_numbers,
     current_cumulative, all_names, df_cumulative, initial_master_assignments,
     df_master,
     weekly_counts 
@@ -2504,15 +2350,9 @@ def balance_final_cumulative_with_weekly_check(
     MIN_AM_PER_WEEK = 3
     MIN_PM_PER_WEEK = 1
 
-    # 시간대별 마스터 근무자 목록 계산
-    master_workers_am = set()
-    master_workers_pm = set()
-    if not df_master.empty:
-        for _, row in df_master.iterrows():
-            worker = row['이름']
-            shift_type = row['근무여부'] # 컬럼명 확인
-            if shift_type in ['오전', '오전 & 오후']: master_workers_am.add(worker)
-            if shift_type in ['오후', '오전 & 오후']: master_workers_pm.add(worker)
+    # 시간대별 마스터 근무자 목록 (배정 행렬에 미리 계산되어 있음)
+    master_workers_am = initial_master_assignments.slot_workers('오전')
+    master_workers_pm = initial_master_assignments.slot_workers('오후')
 
     for time_slot in ['오전', '오후']:
 
@@ -2543,15 +2383,15 @@ def balance_final_cumulative_with_weekly_check(
             
             # 5. [수정] 유효 대상이 1명 이하면 조정 불가
             if not valid_scores or len(valid_scores) < 2: 
-                 st.info(f"ℹ️ [{time_slot}] 균형 조정을 고려할 유효 대상 인원이 부족합니다.")
+                 job_runner.ui.info(f"ℹ️ [{time_slot}] 균형 조정을 고려할 유효 대상 인원이 부족합니다.")
                  # 실패 메시지 출력 전에 실제 편차 확인 (유효 대상이 없어도 전체 편차가 2 이하일 수 있음)
                  if current_true_diff > 2:
-                      st.error(f"⚠️ [{time_slot}] 최종 균형 조정 중단: 유효 대상 부족. (현재 전체 편차: {current_true_diff})")
+                      job_runner.ui.error(f"⚠️ [{time_slot}] 최종 균형 조정 중단: 유효 대상 부족. (현재 전체 편차: {current_true_diff})")
                  # (유효 대상이 없지만, 전체 편차가 2 이하면? 이미 v11의 맨 위에서 걸러졌어야 함. 
                  #  하지만 v12에서는 여기서 걸러야 함. -> [수정] 성공 조건도 여기서 체크)
                  elif current_true_diff <= 2:
                       excluded_info = f" - (균형 조정 제외: {', '.join(sorted(excluded_workers))})" if excluded_workers else ""
-                      st.success(f"✅ [{time_slot}] 최종 누적 편차 2 이하 달성! (전체 편차: {current_true_diff}){excluded_info}")
+                      job_runner.ui.success(f"✅ [{time_slot}] 최종 누적 편차 2 이하 달성! (전체 편차: {current_true_diff}){excluded_info}")
                  break # i 루프 중단
 
             valid_worker_scores_sorted = sorted(valid_scores.items(), key=lambda item: item[1])
@@ -2564,7 +2404,7 @@ def balance_final_cumulative_with_weekly_check(
             if current_valid_diff <= 2:
                 # 성공 메시지에는 '유효 편차'와 '전체 편차'를 모두 표시
                 excluded_info = f" - (균형 조정 제외: {', '.join(sorted(excluded_workers))})" if excluded_workers else ""
-                st.success(f"✅ [{time_slot}] 최종 누적 편차 2 이하 달성! (유효 편차: {current_valid_diff}, 전체 편차: {current_true_diff}){excluded_info}")
+                job_runner.ui.success(f"✅ [{time_slot}] 최종 누적 편차 2 이하 달성! (유효 편차: {current_valid_diff}, 전체 편차: {current_true_diff}){excluded_info}")
                 break # i 루프 중단
             # --- ▲▲▲ 성공 조건 수정 완료 ▲▲▲ ---
 
@@ -2584,7 +2424,7 @@ def balance_final_cumulative_with_weekly_check(
             # 9-1. 유효 최고점자가 교체할 근무가 없으면 포기 -> 중단!
             if not has_shifts_to_give:
                 # 실패 메시지에는 '실제 전체 편차' 사용
-                st.error(f"⚠️ [{time_slot}] 최종 균형 조정 중단: 유효 최고점자({w_h}, {s_h}회)가 교체할 근무가 없어 조정 불가. (현재 전체 편차: {current_true_diff})")
+                job_runner.ui.error(f"⚠️ [{time_slot}] 최종 균형 조정 중단: 유효 최고점자({w_h}, {s_h}회)가 교체할 근무가 없어 조정 불가. (현재 전체 편차: {current_true_diff})")
                 break # i 루프 중단
 
             # 10. 교체 지점 탐색 (오직 유효 w_h -> 유효 w_l 만 시도)
@@ -2601,7 +2441,7 @@ def balance_final_cumulative_with_weekly_check(
                 # (조건 2) w_l이 이 날 보충 가능한가?
                 is_already_working = not df_final[(df_final['날짜'] == date_str) & (df_final['시간대'] == time_slot) & (df_final['근무자'] == w_l)].empty
                 if is_already_working: continue
-                no_supp_req = {r['이름'] for _, r in df_request.iterrows() if date_str in parse_date_range(str(r.get('날짜정보'))) and r.get('분류') == f'보충 불가({time_slot})'}
+                no_supp_req = request_index.names(date_str, f'보충 불가({time_slot})')
                 if w_l in no_supp_req: continue
                 day_name = day_map.get(date.weekday())
                 supplement_row = df_supplement_processed[df_supplement_processed['시간대'] == f"{day_name} {time_slot}"]
@@ -2647,11 +2487,11 @@ def balance_final_cumulative_with_weekly_check(
             # 12. 교체 대상을 못 찾았다면, 최종 중단
             if not swap_found_this_pair:
                 # 실패 메시지에도 '실제 전체 편차' 사용
-                st.error(f"⚠️ [{time_slot}] 최종 균형 조정 중단: 최고점자({w_h})와 최저점자({w_l}) 간 교체 가능한 날짜를 찾지 못했습니다. (현재 전체 편차: {current_true_diff})")
+                job_runner.ui.error(f"⚠️ [{time_slot}] 최종 균형 조정 중단: 최고점자({w_h})와 최저점자({w_l}) 간 교체 가능한 날짜를 찾지 못했습니다. (현재 전체 편차: {current_true_diff})")
                 break # 'i' 루프 중단
 
         else: # for문이 break 없이 50회를 모두 돌았다면
-            st.warning(f"⚠️ [{time_slot}] 최종 균형 조정이 최대 반복 횟수({i+1}회)에 도달했습니다.")
+            job_runner.ui.warning(f"⚠️ [{time_slot}] 최종 균형 조정이 최대 반복 횟수({i+1}회)에 도달했습니다.")
 
     return df_final, current_cumulative
 
@@ -2661,6 +2501,7 @@ initialize_schedule_session_state()
 
 st.divider()
 # 1단계: 메인 배정 실행 버튼
+instrumentation.profile_toggle("profile_page5")
 if st.button("🚀 스케줄 배정 수행", type="primary", use_container_width=True, disabled=st.session_state.get("show_confirmation_warning", False)):
     gc = get_gspread_client()
     sheet = gc.open_by_url(st.secrets["google_sheet"]["url"])
@@ -2681,6 +2522,7 @@ if st.button("🚀 스케줄 배정 수행", type="primary", use_container_width
         st.session_state.editor_has_changes = False # 1. 수정 플래그 리셋
         st.session_state.editor_key_version += 1 # 2. 에디터 키 버전을 올려 강제 리셋
         # --- ▲▲▲ [수정 완료] ▲▲▲ ---
+        job_runner.forget_job("schedule_job_id")
             
         st.rerun()
 
@@ -2706,6 +2548,7 @@ if st.session_state.get("show_confirmation_warning", False):
             st.session_state.editor_has_changes = False # 1. 수정 플래그 리셋
             st.session_state.editor_key_version += 1 # 2. 에디터 키 버전을 올려 강제 리셋
             # --- ▲▲▲ [수정 완료] ▲▲▲ ---
+            job_runner.forget_job("schedule_job_id")
                 
             st.rerun()
     with col2:
@@ -2713,754 +2556,968 @@ if st.session_state.get("show_confirmation_warning", False):
             st.session_state.show_confirmation_warning = False
             st.rerun()
 
-if st.session_state.get('assigned', False):
+@st.fragment
+def assignment_editors_fragment(results, month_str, next_month_str):
+    """배정 스케줄·누적 테이블 편집기, 수정사항 로그, 저장/다운로드 버튼. 셀을 고치면 이 부분만 다시 실행됩니다."""
+    # --- [핵심 수정] 1. 스케줄 테이블 data_editor *반환값*을 변수에 저장 ---
+    if "df_schedule_for_display" in results:
+        st.divider()
+        st.markdown(f"**➕ {month_str} 배정 스케줄 (수정 가능)**")
+        st.warning("⚠️ 아래에서 내용을 수정하신 후, **'수정사항 저장'** 버튼을 누르면 Google Sheets에 반영됩니다.")
+
+        # 1. 표시용 데이터 준비 (상태 텍스트 추가)
+        df_to_edit_schedule = results["df_schedule_for_display"].copy()
+        df_final_unique = results.get("df_final_unique_sorted")
+        df_schedule = results.get("df_schedule")
+
+        if df_final_unique is not None and df_schedule is not None:
+            # [★수정★] 상태와 메모를 모두 저장하는 딕셔너리로 변경
+            status_lookup = {}
+            for _, row in df_final_unique.iterrows():
+                key = (row['날짜'], row['시간대'], row['근무자'])
+                # (상태, 메모) 튜플로 저장
+                status_lookup[key] = (row['상태'], row.get('메모', '')) 
+
+            for idx, row in df_to_edit_schedule.iterrows():
+                if idx not in df_schedule.index: continue
+                date_str = df_schedule.at[idx, '날짜'] # YYYY-MM-DD
+
+                for col_name in df_to_edit_schedule.columns:
+
+                    # 1. 시간대 먼저 결정
+                    time_slot = None
+                    if col_name.isdigit(): time_slot = '오전'
+                    elif col_name.startswith("오후"): time_slot = '오후'
+                    elif col_name == '오전당직(온콜)': time_slot = '오전당직'
+
+                    # 2. 근무, 보충, 당직 셀인 경우에만
+                    if time_slot:
+                        worker_name_cell = str(row[col_name] or '').strip()
+                        if not worker_name_cell: # 셀이 비어있으면 건너뛰기
+                            continue
 
-    if st.session_state.get('assignment_results') is None:
-        with st.spinner("근무 배정 중..."):
-            st.session_state.request_logs = []
-            st.session_state.swap_logs = []
-            st.session_state.adjustment_logs = []
-            st.session_state.oncall_logs = []
-                    
-            time.sleep(1)
-            
-            df_monthly_schedule, df_display = load_monthly_special_schedules(month_str)
-
-            special_schedules = []
-            if not df_monthly_schedule.empty:
-                for index, row in df_monthly_schedule.iterrows():
-                    date_str = row['날짜'].strftime('%Y-%m-%d')
-                    oncall_person = row['당직']
-                    workers_str = row.get('근무', '')
-                    
-                    if workers_str and isinstance(workers_str, str):
-                        workers_list = [name.strip() for name in workers_str.split(',')]
-                    else:
-                        workers_list = []
-                    
-                    special_schedules.append((date_str, workers_list, oncall_person))
-
-            df_final = pd.DataFrame(columns=['날짜', '요일', '주차', '시간대', '근무자', '상태', '메모', '색상'])
-            month_dt = datetime.strptime(month_str, "%Y년 %m월")
-            _, last_day = calendar.monthrange(month_dt.year, month_dt.month) 
-            all_month_dates = pd.date_range(start=month_dt, end=month_dt.replace(day=last_day))
-            weekdays = [d for d in all_month_dates if d.weekday() < 5]
-            active_weekdays = [d for d in weekdays if d.strftime('%Y-%m-%d') not in holiday_dates]
-            day_map = {0: '월', 1: '화', 2: '수', 3: '목', 4: '금', 5: '토', 6: '일'}
-
-            # --- ✨ 주차 계산 로직 변경 ---
-            # 1. 월 내 모든 날짜의 ISO 주차 번호(연간 기준, 월요일 시작)를 중복 없이 구합니다.
-            iso_weeks_in_month = sorted(list(set(d.isocalendar()[1] for d in all_month_dates)))
-            
-            # 2. ISO 주차 번호를 해당 월의 1, 2, 3... 주차로 매핑하는 사전을 만듭니다.
-            # 예: {35주차: 1, 36주차: 2, 37주차: 3, ...}
-            iso_to_monthly_week_map = {iso_week: i + 1 for i, iso_week in enumerate(iso_weeks_in_month)}
-            
-            # 3. 최종적으로 모든 날짜에 대해 '월 기준 주차'를 할당합니다.
-            week_numbers = {d.to_pydatetime().date(): iso_to_monthly_week_map[d.isocalendar()[1]] for d in all_month_dates}
-            # --- 로직 변경 끝 ---
-
-            initial_master_assignments = {}
-            for date in active_weekdays:
-                date_str, day_name, week_num = date.strftime('%Y-%m-%d'), day_map[date.weekday()], week_numbers[date.date()]
-                for ts in ['오전', '오후']:
-                    shift_key, base_workers = f"{day_name} {ts}", set()
-                    shift_row = df_shift_processed[df_shift_processed['시간대'] == shift_key]
-                    if not shift_row.empty:
-                        for col in shift_row.columns[1:]:
-                            worker_info = shift_row[col].values[0]
-                            if pd.notna(worker_info):
-                                worker_name = str(worker_info).split('(')[0].strip()
-                                if '(' in str(worker_info) and f'{week_num}주' in str(worker_info):
-                                    base_workers.add(worker_name)
-                                elif '(' not in str(worker_info):
-                                    base_workers.add(worker_name)
-                    initial_master_assignments[(date_str, ts)] = base_workers
-            
-            # --- ▼▼▼ [핵심 수정] 오전/오후 마스터 수에 따라 별도의 날짜 리스트 2개 생성 ▼▼▼ ---
-            # st.info("🔄 오전/오후 마스터 수를 기준으로 2개의 날짜 처리 순서를 생성합니다...")
-            
-            # 1. 오전 난이도 계산
-            date_am_master_counts = {}
-            for date in active_weekdays: # (원본 시간순 리스트)
-                date_str = date.strftime('%Y-%m-%d')
-                am_masters = initial_master_assignments.get((date_str, '오전'), set())
-                date_am_master_counts[date] = len(am_masters)
-            
-            # 2. 오후 난이도 계산
-            date_pm_master_counts = {}
-            for date in active_weekdays:
-                date_str = date.strftime('%Y-%m-%d')
-                pm_masters = initial_master_assignments.get((date_str, '오후'), set())
-                date_pm_master_counts[date] = len(pm_masters)
-
-            # 3. '오전용' 날짜 리스트 생성 (마스터 적은 날짜 우선)
-            active_weekdays_am_sorted = sorted(active_weekdays, key=lambda d: date_am_master_counts.get(d, 999))
-            # 4. '오후용' 날짜 리스트 생성 (마스터 적은 날짜 우선)
-            active_weekdays_pm_sorted = sorted(active_weekdays, key=lambda d: date_pm_master_counts.get(d, 999))
-
-            # 재정렬된 순서 로그 출력 (확인용)
-            am_log = [f"{d.strftime('%-m/%d')}({date_am_master_counts.get(d, 'N/A')}명)" for d in active_weekdays_am_sorted[:5]]
-            pm_log = [f"{d.strftime('%-m/%d')}({date_pm_master_counts.get(d, 'N/A')}명)" for d in active_weekdays_pm_sorted[:5]]
-            # st.info(f"✨ 오전 처리 순서 (상위 5개): {', '.join(am_log)} ...")
-            # st.info(f"✨ 오후 처리 순서 (상위 5개): {', '.join(pm_log)} ...")
-            # time.sleep(1) # 로그를 볼 수 있도록 잠시 대기
-            # --- ▲▲▲ [핵심 수정 완료] ▲▲▲ ---
-
-            current_cumulative = {'오전': {}, '오후': {}}
-            weekly_counts = calculate_weekly_counts(df_final, all_names, week_numbers)
-
-            time_slot_am = '오전'
-            target_count_am = 12
-
-            # 오전 초기 배정
-            for date in active_weekdays_am_sorted: # <-- [유지] 오전 정렬 리스트 사용
-                date_str = date.strftime('%Y-%m-%d')
-                requests_on_date = df_request[df_request['날짜정보'].apply(lambda x: date_str in parse_date_range(str(x)))]
-                vacationers = set(requests_on_date[requests_on_date['분류'].isin(['휴가', '학회'])]['이름'].tolist())
-                base_workers = initial_master_assignments.get((date_str, time_slot_am), set())
-                must_work = set(requests_on_date[requests_on_date['분류'] == f'꼭 근무({time_slot_am})']['이름'].tolist())
-                final_workers = (base_workers - vacationers) | (must_work - vacationers)
-                
-                for worker in final_workers:
-                    # [핵심] '꼭 근무' 요청자는 '꼭 근무' 상태로, 나머지는 '근무' 상태로 저장
-                    status = '꼭 근무' if worker in must_work else '근무'
-                    color = '🟠 주황색' if worker in must_work else '기본'
-                    df_final = update_worker_status(df_final, date_str, time_slot_am, worker, status, '', color, day_map, week_numbers)
-                
-                weekday_map_korean = {0: '월', 1: '화', 2: '수', 3: '목', 4: '금', 5: '토', 6: '일'}
-
-                # [유지] 휴가자 처리 로직
-                for vac in (vacationers & base_workers):
-                    if vac in final_workers: continue # '꼭 근무'가 우선
-                        
-                    korean_day = weekday_map_korean[date.weekday()]
-                    log_date = f"{date.strftime('%-m월 %-d일')} ({korean_day})"
-                    reason_series = requests_on_date[(requests_on_date['이름'] == vac) & (requests_on_date['분류'].isin(['휴가', '학회']))]['분류']
-                    reason = reason_series.iloc[0] if not reason_series.empty else "휴가"
-                    
-                    st.session_state.request_logs.append(f"• {log_date} {vac} - {reason}로 인한 제외")
-                    df_final = update_worker_status(df_final, date_str, time_slot_am, vac, reason, f'{reason}로 인한 제외', '🔴 빨간색', day_map, week_numbers)
+                        # 3. 셀에 괄호가 이미 있는지 확인
+                        match = re.match(r'.+?\((.+)\)', worker_name_cell)
 
-            weekly_counts = calculate_weekly_counts(df_final, all_names, week_numbers)
-            # 오전 배정 후 동기화
-            # [수정] weekly_counts 전달 및 반환
-            df_final, changed, current_cumulative, weekly_counts = sync_am_to_pm_exclusions(df_final, active_weekdays_am_sorted, day_map, week_numbers, initial_master_assignments, current_cumulative, weekly_counts) 
-            
-            # 오전 균형 맞추기 (execute_adjustment_pass)
-            df_before_pass = df_final.copy()
-            # [수정] weekly_counts 전달 및 반환
-            df_final, current_cumulative, weekly_counts = execute_adjustment_pass(
-                df_final, active_weekdays_am_sorted, time_slot_am, target_count_am, initial_master_assignments,
-                df_supplement_processed, df_request, day_map, week_numbers, current_cumulative, df_cumulative, all_names,
-                weekly_counts 
-            )
-            
-            # 오전 조정 후 동기화
-            # [수정] weekly_counts 전달 및 반환
-            df_final, changed, current_cumulative, weekly_counts = sync_am_to_pm_exclusions(df_final, active_weekdays_am_sorted, day_map, week_numbers, initial_master_assignments, current_cumulative, weekly_counts) 
+                        if match:
+                            pass # 이미 괄호가 있으면 (수동 편집) 그대로 둠
+                        else:
+                            worker_name_only = worker_name_cell # 괄호가 없으니 이게 이름
+
+                            key = (date_str, time_slot, worker_name_only)
+                            lookup_result = status_lookup.get(key)
+
+                            # 4. [★수정★] 상태와 메모를 분리하여 조건에 맞게 괄호 추가
+                            if lookup_result:
+                                status, memo = lookup_result
+
+                                # [요청사항] '대체보충'이고 유효한 메모가 있으면 (메모)를 표시
+                                if status == '대체보충' and pd.notna(memo) and str(memo).strip():
+                                    df_to_edit_schedule.at[idx, col_name] = f"{worker_name_only}({memo})"
+                                # [유지] 그 외 (휴가, 보충, '대체휴근' 등)
+                                elif status and status not in ['근무', '당직', '기본']:
+                                    df_to_edit_schedule.at[idx, col_name] = f"{worker_name_only}({status})"
+
+        if "df_schedule_for_comparison" not in results:
+            st.session_state.assignment_results["df_schedule_for_comparison"] = df_to_edit_schedule.copy()
+        # --- ▲▲▲ [저장 완료] ▲▲▲ ---
+
+        edited_schedule_df = st.data_editor(
+            df_to_edit_schedule,
+            # ▼▼▼ [핵심 수정] key를 동적으로 변경하여 강제 리셋 ▼▼▼
+            key=f"edited_schedule_table_{st.session_state.editor_key_version}",
+            use_container_width=True,
+            hide_index=True,
+            disabled=['날짜', '요일'],
+            on_change=set_editor_changed_flag # <--- [수정] 콜백 추가
+        )
+    else:
+        st.warning("⚠️ 배정 스케줄 테이블 데이터를 불러올 수 없습니다.")
+        edited_schedule_df = pd.DataFrame() # 오류 방지용 빈 DataFrame
+
+    # --- ▼▼▼ [신규] 스케줄 수정사항 로그 로직 ▼▼▼ ---
+    st.markdown("📝 **스케줄 수정사항**")
+    schedule_change_log = []
+    schedule_has_changed = False
+
+    # [수정] 'results.get("df_excel_initial")' (괄호 없는 원본) 대신,
+    # 에디터에 '입력(input)'으로 사용된 'df_to_edit_schedule' (괄호가 이미 추가된)을 
+    # 비교할 원본으로 사용합니다.
+    original_schedule_df = df_to_edit_schedule
+    if original_schedule_df is not None and not edited_schedule_df.equals(original_schedule_df):
+        schedule_has_changed = True # <--- ★★★ [ 2. 이 줄을 추가 ] ★★★
+        try:
+            # (파일 상단에 'import numpy as np'가 필요합니다)
+            import numpy as np 
+            diff_indices = np.where(edited_schedule_df.astype(str).ne(original_schedule_df.astype(str)))
+            changed_cells = set(zip(diff_indices[0], diff_indices[1])) # 중복 로그 방지
 
-            time_slot_pm = '오후'
-            target_count_pm = 4
+            for row_idx, col_idx in changed_cells:
+                date_str = edited_schedule_df.iloc[row_idx, 0] # '날짜' 열 (예: "10월 1일")
+                slot_name = edited_schedule_df.columns[col_idx] # 변경된 열 이름 (예: "1")
 
-            # 오후 초기 배정
-            for date in active_weekdays_pm_sorted: # <-- [유지] 오후 정렬 리스트 사용
-                date_str = date.strftime('%Y-%m-%d')
-                # [수정] 오전 근무자 셀 때 '꼭 근무' 포함
-                morning_workers = set(df_final[(df_final['날짜'] == date_str) & (df_final['시간대'] == '오전') & (df_final['상태'].isin(['근무', '대체보충', '보충', '꼭 근무']))]['근무자'])
-                requests_on_date = df_request[df_request['날짜정보'].apply(lambda x: date_str in parse_date_range(str(x)))]
-                vacationers = set(requests_on_date[requests_on_date['분류'].isin(['휴가', '학회'])]['이름'].tolist())
-                base_workers = initial_master_assignments.get((date_str, time_slot_pm), set())
-                must_work = set(requests_on_date[requests_on_date['분류'] == f'꼭 근무({time_slot_pm})']['이름'].tolist())
-                
-                eligible_workers = morning_workers | must_work
-                final_workers = (base_workers & eligible_workers) - vacationers | must_work
-                
-                for worker in final_workers:
-                    # [핵심] '꼭 근무' 요청자는 '꼭 근무' 상태로, 나머지는 '근무' 상태로 저장
-                    status = '꼭 근무' if worker in must_work else '근무'
-                    color = '🟠 주황색' if worker in must_work else '기본'
-                    df_final = update_worker_status(df_final, date_str, time_slot_pm, worker, status, '', color, day_map, week_numbers)
-                
-                # [유지] 오후 휴가자 처리 로직
-                for vac in (vacationers & base_workers):
-                    if vac in final_workers: continue # '꼭 근무'가 우선
+                # [수정] 원본 값을 'original_schedule_df' (df_to_edit_schedule)에서 가져옵니다.
+                old_value = original_schedule_df.iloc[row_idx, col_idx]
+                new_value = edited_schedule_df.iloc[row_idx, col_idx]
 
-                    existing_record = df_final[(df_final['날짜'] == date_str) & (df_final['시간대'] == time_slot_pm) & (df_final['근무자'] == vac)]
-                    if not existing_record.empty and existing_record.iloc[0]['상태'] not in ['근무', '기본']:
-                         continue
-                    
-                    reason_series = requests_on_date[(requests_on_date['이름'] == vac) & (requests_on_date['분류'].isin(['휴가', '학회']))]['분류']
-                    reason = reason_series.iloc[0] if not reason_series.empty else "휴가"
-                    
-                    df_final = update_worker_status(df_final, date_str, time_slot_pm, vac, reason, f'{reason}로 제외', '🔴 빨간색', day_map, week_numbers)
+                log_msg = f"{date_str} '{slot_name}' 변경: '{old_value or '빈 값'}' → '{new_value or '빈 값'}'"
+                schedule_change_log.append(log_msg)
+        except Exception as e:
+            schedule_change_log.append(f"[로그 오류] 스케줄 변경사항 비교 중 오류: {e}")
 
-            # ▼▼▼ [핵심 수정] 오후 초기 배정 후, 주간 횟수를 즉시 재계산 ▼▼▼
-            # (이 코드가 없으면, execute_adjustment_pass가 마스터 횟수를 0으로 착각함)
-            weekly_counts = calculate_weekly_counts(df_final, all_names, week_numbers)
-            # ▲▲▲ [수정 완료] ▲▲▲
+    if schedule_change_log:
+        st.code("\n".join(f"• {msg}" for msg in sorted(schedule_change_log)), language='text')
+    else:
+        st.info("수정된 사항이 없습니다.")
+    # --- ▲▲▲ [신규] 스케줄 로그 끝 (수정본) ---
 
-            # 오후 배정 후 동기화
-            # [수정] weekly_counts 전달 및 반환
-            df_final, changed, current_cumulative, weekly_counts = sync_am_to_pm_exclusions(df_final, active_weekdays_pm_sorted, day_map, week_numbers, initial_master_assignments, current_cumulative, weekly_counts)
-            
-            # 오후 조정 패스
-            # [수정] weekly_counts 전달 및 반환
-            df_final, current_cumulative, weekly_counts = execute_adjustment_pass(
-                df_final, active_weekdays_pm_sorted, time_slot_pm, target_count_pm, initial_master_assignments,
-                df_supplement_processed, df_request, day_map, week_numbers, current_cumulative, df_cumulative, all_names,
-                weekly_counts 
-            )
+    # [기존 코드] (L1682 근처)
+    # --- [핵심 수정] 2. 누적 테이블 data_editor *반환값*을 변수에 저장 ---
+    if "summary_df_for_display" in results:
+        st.divider()
+        st.markdown(f"**➕ {next_month_str} 누적 테이블 (수정 가능)**")
 
-            # [수정] 최종 균형 맞추기 전, weekly_counts를 한 번 더 최신화
-            weekly_counts = calculate_weekly_counts(df_final, all_names, week_numbers)
+        # [★수정★] 누적 테이블이 자동 재계산됨을 안내
+        st.write("- 누적 테이블은 '배정 스케줄' 편집기에 반영된 내용을 바탕으로 자동 재계산됩니다.\n- 주의) 대체보충은 수정 시 누적 테이블을 직접 수정해주셔야 합니다.")
 
-            df_final, current_cumulative = balance_weekly_and_cumulative(
-                df_final, 
-                active_weekdays_am_sorted, active_weekdays_pm_sorted, 
-                initial_master_assignments, df_supplement_processed,
-                df_request, day_map, week_numbers, current_cumulative, all_names,
-                df_cumulative,
-                weekly_counts # [수정] weekly_counts 전달
-            )
+        # --- ▼▼▼ [ ★ L1725~L1741을 이 블록으로 교체 ★ ] ▼▼▼ ---
+        if schedule_has_changed:
+            try:
+                df_cumulative_initial = st.session_state["df_cumulative"] # GSheet 원본(A)
+                all_names_list = results.get("all_names", [])
+                df_schedule_mapping = results.get("df_schedule")
 
-            # [수정] 진짜 최종 균형 맞추기 전, weekly_counts를 한 번 더 최신화
-            weekly_counts = calculate_weekly_counts(df_final, all_names, week_numbers)
-
-            df_final, current_cumulative = balance_final_cumulative_with_weekly_check(
-                df_final,
-                active_weekdays_am_sorted, active_weekdays_pm_sorted,
-                df_supplement_processed, df_request,
-                day_map, week_numbers, current_cumulative, all_names, df_cumulative,
-                initial_master_assignments,
-                df_master,
-                weekly_counts # [수정] weekly_counts 전달
-            )
+                if not all_names_list or df_schedule_mapping is None:
+                    st.error("자동 재계산에 필요한 'all_names' 또는 'df_schedule' 데이터가 없습니다.")
+                    summary_df_input = results["summary_df_initial"] 
+                else:
+                    # '수정된' 스케줄(edited_schedule_df)로 재계산 (B)
+                    summary_df_input = recalculate_summary_from_schedule(
+                        edited_schedule_df,
+                        df_cumulative_initial,
+                        all_names_list,
+                        df_schedule_mapping
+                    )
+            except Exception as e_recalc:
+                st.error(f"누적 테이블 자동 재계산 중 오류 발생: {e_recalc}")
+                summary_df_input = results["summary_df_initial"] 
+        else:
+            # 2. 상단 스케줄이 수정되지 않음 (페이지 첫 로드) -> 원본(A) 표시
+            summary_df_input = results.get("summary_df_initial", pd.DataFrame()).copy() # 원본(A)을 그대로 사용
+        # --- ▲▲▲ [ 교체 완료 ] ▲▲▲ ---
+
+        # [수정] st.data_editor가 'summary_df_input' (재계산된 값)을 사용
+        edited_summary_df = st.data_editor(
+            summary_df_input, # <-- 재계산된 데이터를 입력
+            # ▼▼▼ [핵심 수정] key를 동적으로 변경하여 강제 리셋 ▼▼▼
+            key=f"edited_summary_table_{st.session_state.editor_key_version}",
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                summary_df_input.columns[0]: st.column_config.Column(disabled=True),
+                **{col: st.column_config.NumberColumn(format="%d") 
+                    for col in summary_df_input.columns[1:]}
+            },
+            disabled=False,
+            on_change=set_editor_changed_flag 
+        )
+    else:
+        st.warning("⚠️ 누적 테이블 데이터를 불러올 수 없습니다.")
+        edited_summary_df = pd.DataFrame() # 오류 방지용 빈 DataFrame
 
-            df_final = replace_adjustments(df_final)
+    # --- ▼▼▼ [누적 테이블 수동 수정사항 로그 로직 (수정됨)] ▼▼▼ ---
+    st.markdown("📝 **누적 테이블 수정사항**")
+    summary_change_log = [] # 리스트 초기화
 
-            df_final_unique_sorted = df_final.sort_values(by=['날짜', '시간대', '근무자']).drop_duplicates(
-                subset=['날짜', '시간대', '근무자'], keep='last'
-            ).copy()
+    original_summary_df = results.get("summary_df_initial") # (A)
 
-            # 대체 로그 생성
-            df_replacements = df_final_unique_sorted[
-                df_final_unique_sorted['상태'].isin(['대체보충', '대체휴근'])
-            ].copy()
-            df_replacements['주차'] = df_replacements['날짜'].apply(
-                lambda x: week_numbers.get(pd.to_datetime(x).date())
-            )
+    cumulative_has_changed = False # <-- [★ 1. 이 줄을 추가하세요]
 
-            weekly_swap_dates = {}
-            for (week, worker, time_slot), group in df_replacements.groupby(['주차', '근무자', '시간대']):
-                dates_excluded = sorted(group[group['상태'] == '대체휴근']['날짜'].tolist())
-                dates_supplemented = sorted(group[group['상태'] == '대체보충']['날짜'].tolist())
-
-                if dates_excluded and dates_supplemented:
-                    key = (week, worker, time_slot)
-                    weekly_swap_dates[key] = {
-                        '제외일': dates_excluded,
-                        '보충일': dates_supplemented
-                    }
-                    
-                    # 메모 업데이트
-                    memo_for_exclusion = f"{', '.join([pd.to_datetime(d).strftime('%-m월 %-d일') for d in dates_supplemented])}일과 대체"
-                    memo_for_supplement = f"{', '.join([pd.to_datetime(d).strftime('%-m월 %-d일') for d in dates_excluded])}일과 대체"
-
-                    df_final_unique_sorted.loc[
-                        (df_final_unique_sorted['근무자'] == worker) &
-                        (df_final_unique_sorted['시간대'] == time_slot) &
-                        (df_final_unique_sorted['날짜'].isin(dates_excluded)), '메모'
-                    ] = memo_for_exclusion
-
-                    df_final_unique_sorted.loc[
-                        (df_final_unique_sorted['근무자'] == worker) &
-                        (df_final_unique_sorted['시간대'] == time_slot) &
-                        (df_final_unique_sorted['날짜'].isin(dates_supplemented)), '메모'
-                    ] = memo_for_supplement
-
-            # 로그 생성
-            st.session_state.swap_logs, st.session_state.adjustment_logs = [], []
-            weekday_map_korean = {0: '월', 1: '화', 2: '수', 3: '목', 4: '금', 5: '토', 6: '일'}
-
-            # 대체 로그
-            for (week, worker, time_slot), swap_info in weekly_swap_dates.items():
-                excluded_dates_str = [pd.to_datetime(d).strftime('%-m월 %-d일') for d in sorted(swap_info['제외일'])]
-                supplemented_dates_str = [pd.to_datetime(d).strftime('%-m월 %-d일') for d in sorted(swap_info['보충일'])]
-                log_message = f"• {worker} ({time_slot}): {', '.join(excluded_dates_str)}(대체 제외) ➔ {', '.join(supplemented_dates_str)}(대체 보충)"
-                if log_message not in st.session_state.swap_logs:
-                    st.session_state.swap_logs.append(log_message)
-
-            # 추가 보충/제외 로그
-            for _, row in df_final_unique_sorted.iterrows():
-                if row['상태'] in ['보충', '휴근']:
-                    date_obj = pd.to_datetime(row['날짜'])
-                    log_date_info = f"{date_obj.strftime('%-m월 %-d일')} ({weekday_map_korean[date_obj.weekday()]}) {row['시간대']}"
-                    if row['상태'] == '휴근':
-                        st.session_state.adjustment_logs.append(f"• {log_date_info} {row['근무자']} - {row['메모'] or '인원 초과'}로 추가 제외")
-                    elif row['상태'] == '보충':
-                        st.session_state.adjustment_logs.append(f"• {log_date_info} {row['근무자']} - {row['메모'] or '인원 부족'}으로 추가 보충")
-                        
-            # 모든 로그를 날짜 기준으로 정렬합니다.
-            st.session_state.request_logs.sort(key=get_sort_key)
-            st.session_state.swap_logs.sort(key=get_sort_key)
-            st.session_state.adjustment_logs.sort(key=get_sort_key)          
-            st.session_state.request_logs.sort(key=get_sort_key)
-            st.session_state.swap_logs.sort(key=get_sort_key)
-            st.session_state.adjustment_logs.sort(key=get_sort_key)
-
-            df_cumulative_next = df_cumulative.copy()  # 인덱스 설정 제거
-            for worker, count in current_cumulative.get('오전', {}).items():
-                if worker not in df_cumulative_next.columns:
-                    df_cumulative_next[worker] = 0  # 새로운 근무자 열 추가
-                if '오전누적' not in df_cumulative_next['항목'].values:
-                    new_row = pd.DataFrame([[0] * len(df_cumulative_next.columns)], columns=df_cumulative_next.columns)
-                    new_row['항목'] = '오전누적'
-                    df_cumulative_next = pd.concat([df_cumulative_next, new_row], ignore_index=True)
-                df_cumulative_next.loc[df_cumulative_next['항목'] == '오전누적', worker] += count
-
-            for worker, count in current_cumulative.get('오후', {}).items():
-                if worker not in df_cumulative_next.columns:
-                    df_cumulative_next[worker] = 0  # 새로운 근무자 열 추가
-                if '오후누적' not in df_cumulative_next['항목'].values:
-                    new_row = pd.DataFrame([[0] * len(df_cumulative_next.columns)], columns=df_cumulative_next.columns)
-                    new_row['항목'] = '오후누적'
-                    df_cumulative_next = pd.concat([df_cumulative_next, new_row], ignore_index=True)
-                df_cumulative_next.loc[df_cumulative_next['항목'] == '오후누적', worker] += count
-
-            if special_schedules:
-                for date_str, workers, oncall in special_schedules:
-                    if not df_final.empty: df_final = df_final[df_final['날짜'] != date_str].copy()
-                    for worker in workers:
-                        df_final = update_worker_status(df_final, date_str, '오전', worker, '근무', '', '특수근무색', day_map, week_numbers)
-
-            color_priority = {'🟠 주황색': 0, '🟢 초록색': 1, '🟡 노란색': 2, '기본': 3, '🔴 빨간색': 4, '🔵 파란색': 5, '🟣 보라색': 6, '특수근무색': -1}
-            df_final['색상_우선순위'] = df_final['색상'].map(color_priority)
-            df_final_unique = df_final.sort_values(by=['날짜', '시간대', '근무자', '색상_우선순위']).drop_duplicates(subset=['날짜', '시간대', '근무자'], keep='last')
-
-            all_month_dates = pd.date_range(start=month_dt, end=month_dt.replace(day=last_day))
-            weekdays = [d for d in all_month_dates if d.weekday() < 5]
-            active_weekdays = [d for d in weekdays if d.strftime('%Y-%m-%d') not in holiday_dates]
-            day_map = {0: '월', 1: '화', 2: '수', 3: '목', 4: '금', 5: '토', 6: '일'}
-            week_numbers = {d.to_pydatetime().date(): (d.day - 1) // 7 + 1 for d in all_month_dates}
-
-            df_schedule = pd.DataFrame({
-                '날짜': [d.strftime('%Y-%m-%d') for d in all_month_dates], 
-                '요일': [day_map.get(d.weekday()) for d in all_month_dates],
-                '날짜_표시': [f"{d.month}월 {d.day}일" for d in all_month_dates] # <-- 이 줄이 추가되었습니다.
-            })
-            worker_counts_all = df_final_unique.groupby(['날짜', '시간대'])['근무자'].nunique().unstack(fill_value=0)
-            max_morning_workers = int(worker_counts_all.get('오전', pd.Series(data=0)).max())
-            max_afternoon_workers = int(worker_counts_all.get('오후', pd.Series(data=0)).max())
-            columns = ['날짜', '요일'] + [str(i) for i in range(1, max_morning_workers + 1)] + [''] + ['오전당직(온콜)'] + [f'오후{i}' for i in range(1, max_afternoon_workers + 1)]
-            df_excel = pd.DataFrame(index=df_schedule.index, columns=columns)
-
-            for idx, row in df_schedule.iterrows():
-                date = row['날짜']
-                date_obj = datetime.strptime(date, '%Y-%m-%d')
-                df_excel.at[idx, '날짜'] = f"{date_obj.month}월 {date_obj.day}일"
-                df_excel.at[idx, '요일'] = row['요일']
-                df_excel.fillna("", inplace=True)
-                
-                morning_workers_for_excel = df_final_unique[(df_final_unique['날짜'] == date) & (df_final_unique['시간대'] == '오전')]
-                morning_workers_for_excel_sorted = morning_workers_for_excel.sort_values(by=['색상_우선순위', '근무자'])['근무자'].tolist()
-                for i, worker_name in enumerate(morning_workers_for_excel_sorted, 1):
-                    if i <= max_morning_workers: df_excel.at[idx, str(i)] = worker_name
-                
-                afternoon_workers_for_excel = df_final_unique[(df_final_unique['날짜'] == date) & (df_final_unique['시간대'] == '오후')]
-                afternoon_workers_for_excel_sorted = afternoon_workers_for_excel.sort_values(by=['색상_우선순위', '근무자'])['근무자'].tolist()
-                for i, worker_name in enumerate(afternoon_workers_for_excel_sorted, 1):
-                    if i <= max_afternoon_workers: df_excel.at[idx, f'오후{i}'] = worker_name
-                
-                for special_date, workers, oncall in special_schedules:
-                    if date == special_date:
-                        workers_padded = workers[:10] + [''] * (10 - len(workers[:10]))
-                        for i in range(1, 11): df_excel.at[idx, str(i)] = workers_padded[i-1]
-                        df_excel.at[idx, '오전당직(온콜)'] = oncall if oncall != "당직 없음" else ''
-
-            ### 시작: 오전당직 배정 로직 ###
-            df_cum_indexed = df_cumulative.set_index('항목')
-            
-            # --- ▼▼▼ [핵심 수정 1] 'oncall_targets'가 0회 목표자도 포함하도록 수정 ▼▼▼ ---
-            all_workers_in_cum = [col for col in df_cumulative.columns if col != '항목']
-            oncall_targets = {}
-            oncall_live_counts = {}
-            if '오전당직누적' in df_cum_indexed.index: # "합계" -> "누적"
-                for w in all_workers_in_cum:
-                    target_val = df_cum_indexed.loc['오전당직누적'].get(w) # "합계" -> "누적"            else:
-                # '오전당직' 행 자체가 없는 경우
-                oncall_targets = {w: 0 for w in all_workers_in_cum}
-            # --- ▲▲▲ [수정 완료] ▲▲▲ ---
+    if original_summary_df is not None and not edited_summary_df.equals(original_summary_df): # (A) vs (C)
+        cumulative_has_changed = True # <-- [★ 2. 이 줄을 추가하세요]
+        try:
+            import numpy as np
+            # 1번 수정으로 A와 C의 숫자 타입이 int로 통일되었으므로 astype(str) 비교가 안전합니다.
+            stats_orig_str = original_summary_df.astype(str) # (A)
+            stats_edit_str = edited_summary_df.astype(str) # (C)
 
-            ### 시작: 오전당직 배정 로직 ###
-            
-            # 1. (유지) 배정 가능한 날짜 목록을 시간순으로 정렬
-            assignable_dates = sorted([d for d in df_final_unique['날짜'].unique() if d not in {s[0] for s in special_schedules}])
-            
-            # 2. [신규] 날짜별 후보자 목록 및 '총 당직 가능 횟수' 집계
-            daily_candidates = {}
-            total_eligibility_counts = Counter() # <--- [신규] 총 가능 횟수
-            
-            for date in assignable_dates:
-                morning_workers = set(df_final_unique[(df_final_unique['날짜'] == date) & (df_final_unique['시간대'] == '오전') & (df_final_unique['상태'].isin(['근무', '대체보충', '보충', '꼭 근무']))]['근무자'])
-                afternoon_workers = set(df_final_unique[(df_final_unique['날짜'] == date) & (df_final_unique['시간대'] == '오후') & (df_final_unique['상태'].isin(['근무', '대체보충', '보충', '꼭 근무']))]['근무자'])
-                
-                candidates = list(morning_workers - afternoon_workers)
-                daily_candidates[date] = candidates
-                
-                # [신규] 총 당직 가능 횟수 집계
-                for worker in candidates:
-                    total_eligibility_counts[worker] += 1
+            diff_indices_stats = np.where(stats_edit_str.ne(stats_orig_str))
+            changed_cells_stats = set(zip(diff_indices_stats[0], diff_indices_stats[1])) 
 
-            # 3. [수정] 실시간 누적 횟수(oncall_live_counts)를 '전월' 누적치로 초기화
-            df_cum_indexed = df_cumulative.set_index('항목')
-            all_workers_in_cum = [col for col in df_cumulative.columns if col != '항목']
-            
-            oncall_live_counts = {}
-            if '오전당직누적' in df_cum_indexed.index:
-                for w in all_workers_in_cum:
-                    target_val = df_cum_indexed.loc['오전당직누적'].get(w)
-                    
-                    # ▼▼▼ [핵심 버그 수정] 누락된 할당 코드 추가 ▼▼▼
-                    oncall_live_counts[w] = int(target_val) if pd.notna(target_val) else 0
-                    # ▲▲▲ [수정 완료] ▲▲▲
-            else:
-                oncall_live_counts = {w: 0 for w in all_workers_in_cum}
+            for row_idx, col_idx in changed_cells_stats:
+                item_name = edited_summary_df.iloc[row_idx, 0] 
+                person_name = edited_summary_df.columns[col_idx]
 
-            oncall = {} # 최종 배정 결과 (날짜 -> 근무자)
-            actual_oncall_counts_this_month = Counter() # 이번 달 배정 횟수 (로그용)
-            assigned_workers_by_date = {} # 연속 근무 체크용
+                # [핵심] old_value를 'original_summary_df'(A)에서 가져옵니다.
+                old_value = original_summary_df.iloc[row_idx, col_idx]
+                new_value = edited_summary_df.iloc[row_idx, col_idx]
 
-            # 4. (유지) 날짜를 순차적으로(sequentially) 반복
-            for date in assignable_dates: 
-                date_str = date
-                candidates_on_date = daily_candidates.get(date, [])
-                
-                if not candidates_on_date:
-                    continue 
-
-                # 5. (유지) 연속 근무자 제외 로직
-                date_index = assignable_dates.index(date)
-                previous_oncall_person = None
-                if date_index > 0:
-                    previous_date = assignable_dates[date_index - 1]
-                    previous_oncall_person = assigned_workers_by_date.get(previous_date)
-
-                if previous_oncall_person and len(candidates_on_date) > 1:
-                    eligible_candidates = [p for p in candidates_on_date if p != previous_oncall_person]
-                    if not eligible_candidates: 
-                        eligible_candidates = candidates_on_date
+                log_msg = f"'{person_name}'의 '{item_name}' 변경: {old_value} → {new_value}"
+                summary_change_log.append(log_msg)
+        except Exception as e:
+            summary_change_log.append(f"[로그 오류] 누적 테이블 변경사항 비교 중 오류: {e}")
+
+    if summary_change_log:
+        log_text_stats = "\n".join(f"• {msg}" for msg in sorted(summary_change_log))
+        st.code(log_text_stats, language='text')
+    else:
+        st.info("수정된 사항이 없습니다.")
+    # --- ▲▲▲ [누적 테이블 로그 끝 (수정 완료)] ---
+
+    st.divider() # 구분선 추가
+
+    # --- ▼▼▼ [핵심 수정] 3. 저장 및 다운로드 버튼 영역 수정 ▼▼▼ ---
+    col1, col2 = st.columns(2)
+
+    with col1:
+        # --- 1. Google Sheets 저장 버튼 ---
+
+        # [★ 3. .equals() 비교 결과로 실제 변경 유무를 최종 판정 ★]
+        # (schedule_has_changed는 L1822에서 이미 정의됨)
+        real_has_unsaved_changes = schedule_has_changed or cumulative_has_changed
+
+        if st.button("💾 수정사항 Google Sheet에 저장", 
+                     type="primary", 
+                     use_container_width=True, 
+                     disabled=not real_has_unsaved_changes # <-- [수정 완료]
+                    ):
+            # [수정] st.session_state 대신 위에서 할당받은 *변수* 사용
+            if not edited_schedule_df.empty and not edited_summary_df.empty:
+                with st.spinner("수정된 데이터 저장 중..."):
+                    try:
+                        # edited_schedule_df 와 edited_summary_df 변수를 직접 사용
+                        df_to_save_gsheet = edited_schedule_df.copy()
+
+                        gc = get_gspread_client()
+                        sheet = gc.open_by_url(url)
+                        schedule_sheet_name = f"{month_str} 스케줄 ver1.0"
+                        summary_sheet_name = f"{next_month_str} 누적 ver1.0"
+
+                        # 스케줄 시트 저장
+                        try: ws_sched = sheet.worksheet(schedule_sheet_name)
+                        except WorksheetNotFound: ws_sched = sheet.add_worksheet(title=schedule_sheet_name, rows=1000, cols=len(df_to_save_gsheet.columns)+5)
+                        # update_sheet_with_retry가 성공하면 True 반환
+                        success_sched = update_sheet_with_retry(ws_sched, [df_to_save_gsheet.columns.tolist()] + df_to_save_gsheet.astype(str).fillna('').values.tolist())
+
+                        # 누적 시트 저장
+                        try: ws_summ = sheet.worksheet(summary_sheet_name)
+                        except WorksheetNotFound: ws_summ = sheet.add_worksheet(title=summary_sheet_name, rows=100, cols=len(edited_summary_df.columns)+5)
+                        success_summ = update_sheet_with_retry(ws_summ, [edited_summary_df.columns.tolist()] + edited_summary_df.astype(str).fillna('').values.tolist())
+
+                        if success_sched and success_summ:
+                            flash.flash(f"'{schedule_sheet_name}' 및 '{summary_sheet_name}' 시트에 수정된 내용이 저장되었습니다.")
+
+                            # 저장 성공 후 초기 상태 업데이트
+                            # st.session_state.assignment_results["df_excel_initial"] = edited_schedule_df.copy()
+                            # st.session_state.assignment_results["summary_df_initial"] = edited_summary_df.copy()
+                            st.session_state.assignment_results["df_schedule_for_display"] = edited_schedule_df.copy()
+                            st.session_state.assignment_results["summary_df_for_display"] = edited_summary_df.copy()
+
+                            # ▼▼▼ [핵심 수정] 플래그 리셋 및 리런 ▼▼▼
+                            st.session_state.editor_has_changes = False 
+                            st.rerun()
+                            # ▲▲▲ [핵심 수정] ▲▲▲
+
+                        else:
+                            # update_sheet_with_retry가 False를 반환했지만 에러를 raise하지 않은 경우
+                            st.error("Google Sheets 업데이트가 완료되지 않았습니다. API 오류 로그를 확인해주세요.")
+
+                    except Exception as e:
+                        st.error(f"Google Sheets 저장 중 오류 발생: {e}")
+                        # 에러 발생 시 플래그를 True로 유지 (다운로드 방지 상태)
+                        st.session_state.editor_has_changes = True
+
+            else:
+                st.error("편집된 데이터가 없습니다.")
+
+    with col2:
+        # --- 2. Excel 다운로드 버튼 (두 종류) ---
+        if not edited_schedule_df.empty and not edited_summary_df.empty:
+            try:
+                # --- 데이터 로드 (기존과 동일) ---
+                results = st.session_state.get('assignment_results', {})
+                initial_schedule_df = results.get("df_schedule_for_comparison")
+                # initial_summary_df는 사용되지 않음 (콜백 플래그가 대체)
+                df_special_dl = results.get("df_special")
+                df_requests_dl = results.get("df_requests")
+                closing_dates_dl = results.get("closing_dates")
+                month_str_dl = results.get("month_str")
+                df_final_unique_dl = results.get("df_final_unique_sorted")
+                df_schedule_dl = results.get("df_schedule")
+
+                # --- ▼▼▼ [핵심 수정] 플래그 확인 ▼▼▼
+                # 'editor_has_changes' 플래그가 True이면 다운로드를 막습니다.
+                has_unsaved_changes = real_has_unsaved_changes
+                # --- ▲▲▲ [핵심 수정] 완료 ▲▲▲ ---
+
+                if has_unsaved_changes:
+                    st.error("⚠️ 수정사항이 감지되었습니다. 먼저 '수정사항 Google Sheet에 저장' 버튼을 눌러주세요.")
+                    # [수정] 버튼이 아예 보이지 않도록 하거나, 여기에 disabled된 버튼을 추가할 수 있습니다.
+                    # 여기서는 st.error 메시지만 표시합니다.
                 else:
-                    eligible_candidates = candidates_on_date
-                
-                if not eligible_candidates:
-                    continue 
+                    # 변경 사항이 없거나 저장된 상태일 때만 다운로드 버튼 표시
+                    if initial_schedule_df is None or month_str_dl is None or df_final_unique_dl is None or df_schedule_dl is None:
+                        st.error("Excel 생성에 필요한 초기 데이터가 없습니다. 페이지를 새로고침 해주세요.")
+                    else:
+                        # --- 1. 최종본(공유용) Excel 생성 및 다운로드 버튼 ---
+                        excel_data_final = create_final_schedule_excel(
+                            initial_df=initial_schedule_df,
+                            edited_df=edited_schedule_df,
+                            edited_cumulative_df=edited_summary_df,
+                            df_special=df_special_dl if df_special_dl is not None else pd.DataFrame(),
+                            df_requests=df_requests_dl if df_requests_dl is not None else pd.DataFrame(),
+                            closing_dates=closing_dates_dl if closing_dates_dl is not None else [],
+                            month_str=month_str_dl,
+                            df_final_unique=df_final_unique_dl,
+                            df_schedule=df_schedule_dl
+                        )
+                        st.download_button(
+                            label="📥 스케줄 ver1.0 다운로드",
+                            data=excel_data_final,
+                            file_name=f"{month_str_dl} 스케줄 ver1.0.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.sheet",
+                            use_container_width=True,
+                            type="primary",
+                            key="download_edited_final"
+                        )
 
-                # 6. [핵심 수정] 후보자 정렬: '비율'이 아닌 '절대 횟수'가 가장 낮은 사람 우선
-                def sort_key(worker):
-                    # 1순위: 현재 누적 횟수 (전월 + 이번 달)
-                    current_count = oncall_live_counts.get(worker, 0)
-                    
-                    # 2순위: (동점일 경우) 당직 가능 총 횟수가 적은 사람 (기회가 적은 사람)
-                    total_eligible = total_eligibility_counts.get(worker, 1) 
-                    
-                    # (비율 로직 'ratio = current_count / total_eligible' 삭제)
-                    
-                    # 1순위: 'current_count'가 낮은 사람
-                    # 2순위: 'total_eligible'이 낮은 사람
-                    return (current_count, total_eligible)
+                        # --- 2. 배정 확인용 Excel 생성 및 다운로드 버튼 ---
+                        excel_data_checking = create_checking_schedule_excel(
+                            initial_df=results.get("df_schedule_for_comparison"), # (C_orig)
+                            edited_df=edited_schedule_df,
+                            edited_cumulative_df=edited_summary_df,
+                            df_special=df_special_dl if df_special_dl is not None else pd.DataFrame(),
+                            df_requests=df_requests_dl if df_requests_dl is not None else pd.DataFrame(),
+                            closing_dates=closing_dates_dl if closing_dates_dl is not None else [],
+                            month_str=month_str_dl
+                        )
+                        st.download_button(
+                            label="📥 스케줄 ver1.0 다운로드 (배정 확인용)",
+                            data=excel_data_checking,
+                            file_name=f"{month_str_dl} 스케줄 ver1.0 (배정 확인용).xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.sheet",
+                            use_container_width=True,
+                            type="secondary",
+                            key="download_edited_checking"
+                        )
+            except Exception as e:
+                st.error(f"Excel 파일 생성 또는 변경 사항 확인 중 오류가 발생했습니다: {e}")
+                st.exception(e)
+        else:
+            st.info("🔄 스케줄 데이터 로딩 중...")
 
-                eligible_candidates.sort(key=sort_key)
-                
-                # 7. (유지) 최고 우선순위 후보자(0번 인덱스) 배정
-                best_worker = eligible_candidates[0]
-                oncall[date] = best_worker
-                
-                # 8. (유지) 실시간 누적 횟수 업데이트
-                oncall_live_counts[best_worker] = oncall_live_counts.get(best_worker, 0) + 1
-                
-                # 9. (유지) 로그 및 연속체크용 변수 업데이트
-                actual_oncall_counts_this_month[best_worker] += 1
-                assigned_workers_by_date[date] = best_worker
-
-            # --- 배정 종료 ---
-
-            # --- (유지) 최종 배정 결과 로그 생성 ---
-            st.session_state.oncall_logs = [] 
-            for worker, count in sorted(actual_oncall_counts_this_month.items()):
-                if count > 0:
-                    log_message = f"• {worker}: {count}회 배정"
-                    st.session_state.oncall_logs.append(log_message)
-
-            # (유지) 엑셀 시트에 배정 결과 업데이트
-            for idx, row in df_schedule.iterrows():
-                date = row['날짜']
-                df_excel.at[idx, '오전당직(온콜)'] = oncall.get(date, '')
-            
-            ### 끝: 오전당직 배정 로직 ###
-
-            # ✨ [핵심 수정 1] 배정된 oncall 결과를 df_final에 '오전당직' 시간대로 추가
-            oncall_df = pd.DataFrame([
-                {
-                    '날짜': date, '요일': day_map.get(pd.to_datetime(date).weekday(), ''),
-                    '주차': week_numbers.get(pd.to_datetime(date).date(), 0),
-                    '시간대': '오전당직', '근무자': worker, '상태': '당직',
-                    '메모': '', '색상': '기본'
-                } for date, worker in oncall.items()
-            ])
-            if not oncall_df.empty:
-                df_final = pd.concat([df_final, oncall_df], ignore_index=True)
-
-            # ✨ [핵심 수정 2] 모든 배정이 끝난 후, 최종 데이터를 정리
-            color_priority = {'🟠 주황색': 0, '🟢 초록색': 1, '🟡 노란색': 2, '기본': 3, '🔴 빨간색': 4, '🔵 파란색': 5, '🟣 보라색': 6, '특수근무색': -1}
-            df_final['색상_우선순위'] = df_final['색상'].map(color_priority)
-            df_final_unique_sorted = df_final.sort_values(by=['날짜', '시간대', '근무자', '색상_우선순위']).drop_duplicates(
-                subset=['날짜', '시간대', '근무자'], keep='last'
-            )
-            # create_final_schedule_excel 함수에 전달할 df_final_unique 변수도 여기서 최종본으로 다시 정의
-            df_final_unique = df_final_unique_sorted 
-
-            # ✨ [핵심 수정 3] 요약 테이블 생성에 필요한 변수들을 정의
-            month_dt = datetime.strptime(month_str, "%Y년 %m월")
-            next_month_dt = (month_dt + relativedelta(months=1)).replace(day=1)
-            next_month_str = next_month_dt.strftime("%Y년 %-m월")
-
-            # ✨ [핵심 수정 4] 올바른 최종 데이터로 요약 테이블 생성
-            summary_df = build_summary_table(
-                df_cumulative, all_names, next_month_str,
-                df_final_unique=df_final_unique_sorted
-            )
+def run_schedule_assignment_job(report, month_str, df_master, df_request, df_cumulative, df_supplement_processed, all_names,
+                                df_monthly_schedule, holiday_dates, gc, sheet_url, profile=False):
+    """[백그라운드 작업] 근무 배정 알고리즘 실행 후 '스케줄 ver1.0' / '누적 ver1.0' 시트까지 저장합니다.
 
-            if platform.system() == "Windows":
-                font_name = "맑은 고딕"  
+    입력은 제출 시점의 스냅샷만 쓰고(세션 상태를 읽지 않음), 화면에 필요한 결과는 반환값으로 돌려줍니다.
+    """
+    pipeline_laps = instrumentation.Laps(page="5 스케줄_배정.py")
+    pipeline_profiler = instrumentation.start_job_profile(profile)
+    request_logs = []
+    swap_logs = []
+    adjustment_logs = []
+    oncall_logs = []
+
+
+    special_schedules = []
+    if not df_monthly_schedule.empty:
+        for index, row in df_monthly_schedule.iterrows():
+            date_str = row['날짜'].strftime('%Y-%m-%d')
+            oncall_person = row['당직']
+            workers_str = row.get('근무', '')
+
+            if workers_str and isinstance(workers_str, str):
+                workers_list = [name.strip() for name in workers_str.split(',')]
             else:
-                font_name = "Arial"  
-
-            duty_font = Font(name=font_name, size=9, bold=True, color="FF69B4")  
-            default_font = Font(name=font_name, size=9)  
-
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "스케줄"
-
-            color_map = {
-                '🔴 빨간색': 'DA9694',  
-                '🟠 주황색': 'FABF8F',  
-                '🟢 초록색': 'A9D08E',  
-                '🟡 노란색': 'FFF28F',  
-                '🔵 파란색': '95B3D7',  
-                '🟣 보라색': 'B1A0C7',  
-                '기본': 'FFFFFF',        
-                '특수근무색': 'D0E0E3'   
+                workers_list = []
+
+            special_schedules.append((date_str, workers_list, oncall_person))
+
+    # 배정/조정 단계는 typed df_final(날짜 datetime64, 시간대·근무자·상태·색상 Categorical)로 수행하고,
+    # 균형 조정이 끝나면 로그/Excel/시트 저장을 위해 문자열 열로 되돌립니다.
+    df_final = schedule_schema.empty_schedule_frame(all_names)
+    month_dt = datetime.strptime(month_str, "%Y년 %m월")
+    _, last_day = calendar.monthrange(month_dt.year, month_dt.month) 
+    all_month_dates = pd.date_range(start=month_dt, end=month_dt.replace(day=last_day))
+    weekdays = [d for d in all_month_dates if d.weekday() < 5]
+    active_weekdays = [d for d in weekdays if d.strftime('%Y-%m-%d') not in holiday_dates]
+    day_map = {0: '월', 1: '화', 2: '수', 3: '목', 4: '금', 5: '토', 6: '일'}
+
+    # --- ✨ 주차 계산 로직 변경 ---
+    # 1. 월 내 모든 날짜의 ISO 주차 번호(연간 기준, 월요일 시작)를 중복 없이 구합니다.
+    iso_weeks_in_month = sorted(list(set(d.isocalendar()[1] for d in all_month_dates)))
+
+    # 2. ISO 주차 번호를 해당 월의 1, 2, 3... 주차로 매핑하는 사전을 만듭니다.
+    # 예: {35주차: 1, 36주차: 2, 37주차: 3, ...}
+    iso_to_monthly_week_map = {iso_week: i + 1 for i, iso_week in enumerate(iso_weeks_in_month)}
+
+    # 3. 최종적으로 모든 날짜에 대해 '월 기준 주차'를 할당합니다.
+    week_numbers = {d.to_pydatetime().date(): iso_to_monthly_week_map[d.isocalendar()[1]] for d in all_month_dates}
+    # --- 로직 변경 끝 ---
+
+    # 마스터 시트에서 근무자 × 날짜 × 시간대 배정 행렬을 계산 (마스터 내용 해시 기준으로 재실행 간 캐싱)
+    initial_master_assignments = master_schedule.get_master_assignment_matrix(df_master, active_weekdays, week_numbers, day_map)
+    pipeline_laps.lap("마스터 전개")
+    report("마스터 전개 완료", 0.1)
+
+    # --- ▼▼▼ [핵심 수정] 오전/오후 마스터 수에 따라 별도의 날짜 리스트 2개 생성 ▼▼▼ ---
+    # st.info("🔄 오전/오후 마스터 수를 기준으로 2개의 날짜 처리 순서를 생성합니다...")
+
+    # 1. 오전 난이도 계산
+    am_counts_by_str = initial_master_assignments.counts('오전')
+    date_am_master_counts = {date: am_counts_by_str[date.strftime('%Y-%m-%d')] for date in active_weekdays}
+
+    # 2. 오후 난이도 계산
+    pm_counts_by_str = initial_master_assignments.counts('오후')
+    date_pm_master_counts = {date: pm_counts_by_str[date.strftime('%Y-%m-%d')] for date in active_weekdays}
+
+    # 3. '오전용' 날짜 리스트 생성 (마스터 적은 날짜 우선)
+    active_weekdays_am_sorted = sorted(active_weekdays, key=lambda d: date_am_master_counts.get(d, 999))
+    # 4. '오후용' 날짜 리스트 생성 (마스터 적은 날짜 우선)
+    active_weekdays_pm_sorted = sorted(active_weekdays, key=lambda d: date_pm_master_counts.get(d, 999))
+
+    # 재정렬된 순서 로그 출력 (확인용)
+    am_log = [f"{d.strftime('%-m/%d')}({date_am_master_counts.get(d, 'N/A')}명)" for d in active_weekdays_am_sorted[:5]]
+    pm_log = [f"{d.strftime('%-m/%d')}({date_pm_master_counts.get(d, 'N/A')}명)" for d in active_weekdays_pm_sorted[:5]]
+    # st.info(f"✨ 오전 처리 순서 (상위 5개): {', '.join(am_log)} ...")
+    # st.info(f"✨ 오후 처리 순서 (상위 5개): {', '.join(pm_log)} ...")
+    # time.sleep(1) # 로그를 볼 수 있도록 잠시 대기
+    # --- ▲▲▲ [핵심 수정 완료] ▲▲▲ ---
+
+    current_cumulative = {'오전': {}, '오후': {}}
+    weekly_counts = schedule_engine.calculate_weekly_counts(df_final, all_names, week_numbers)
+    # 요청사항을 (날짜, 분류)별 이름 집합으로 한 번만 펼쳐 두고 모든 배정/조정 단계에 넘김 (날짜마다 날짜정보를 다시 파싱하지 않음)
+    request_index = schedule_schema.RequestDateIndex(schedule_schema.explode_request_dates(df_request, parse_date_range))
+
+    time_slot_am = '오전'
+    target_count_am = 12
+
+    # 오전 초기 배정
+    for date in active_weekdays_am_sorted: # <-- [유지] 오전 정렬 리스트 사용
+        date_str = date.strftime('%Y-%m-%d')
+        vacationers = request_index.names(date_str, ['휴가', '학회'])
+        base_workers = initial_master_assignments.get((date_str, time_slot_am), set())
+        must_work = request_index.names(date_str, f'꼭 근무({time_slot_am})')
+        final_workers = (base_workers - vacationers) | (must_work - vacationers)
+
+        for worker in final_workers:
+            # [핵심] '꼭 근무' 요청자는 '꼭 근무' 상태로, 나머지는 '근무' 상태로 저장
+            status = '꼭 근무' if worker in must_work else '근무'
+            color = '🟠 주황색' if worker in must_work else '기본'
+            df_final = update_worker_status(df_final, date_str, time_slot_am, worker, status, '', color, day_map, week_numbers)
+
+        weekday_map_korean = {0: '월', 1: '화', 2: '수', 3: '목', 4: '금', 5: '토', 6: '일'}
+
+        # [유지] 휴가자 처리 로직
+        for vac in (vacationers & base_workers):
+            if vac in final_workers: continue # '꼭 근무'가 우선
+
+            korean_day = weekday_map_korean[date.weekday()]
+            log_date = f"{date.strftime('%-m월 %-d일')} ({korean_day})"
+            reason = request_index.category_of(date_str, vac, ['휴가', '학회'], default="휴가")
+
+            request_logs.append(f"• {log_date} {vac} - {reason}로 인한 제외")
+            df_final = update_worker_status(df_final, date_str, time_slot_am, vac, reason, f'{reason}로 인한 제외', '🔴 빨간색', day_map, week_numbers)
+
+    weekly_counts = schedule_engine.calculate_weekly_counts(df_final, all_names, week_numbers)
+    # 오전 배정 후 동기화
+    # [수정] weekly_counts 전달 및 반환
+    df_final, changed, current_cumulative, weekly_counts = sync_am_to_pm_exclusions(df_final, active_weekdays_am_sorted, day_map, week_numbers, initial_master_assignments, current_cumulative, weekly_counts) 
+
+    # 오전 균형 맞추기 (execute_adjustment_pass)
+    df_before_pass = df_final.copy()
+    # [수정] weekly_counts 전달 및 반환
+    df_final, current_cumulative, weekly_counts = execute_adjustment_pass(
+        df_final, active_weekdays_am_sorted, time_slot_am, target_count_am, initial_master_assignments,
+        df_supplement_processed, request_index, day_map, week_numbers, current_cumulative, df_cumulative, all_names,
+        weekly_counts 
+    )
+
+    # 오전 조정 후 동기화
+    # [수정] weekly_counts 전달 및 반환
+    df_final, changed, current_cumulative, weekly_counts = sync_am_to_pm_exclusions(df_final, active_weekdays_am_sorted, day_map, week_numbers, initial_master_assignments, current_cumulative, weekly_counts) 
+    pipeline_laps.lap("오전 배정")
+    report("오전 배정 완료", 0.3)
+
+    time_slot_pm = '오후'
+    target_count_pm = 4
+
+    # 오후 초기 배정
+    for date in active_weekdays_pm_sorted: # <-- [유지] 오후 정렬 리스트 사용
+        date_str = date.strftime('%Y-%m-%d')
+        # [수정] 오전 근무자 셀 때 '꼭 근무' 포함
+        morning_workers = set(df_final[(df_final['날짜'] == date_str) & (df_final['시간대'] == '오전') & (df_final['상태'].isin(['근무', '대체보충', '보충', '꼭 근무']))]['근무자'])
+        vacationers = request_index.names(date_str, ['휴가', '학회'])
+        base_workers = initial_master_assignments.get((date_str, time_slot_pm), set())
+        must_work = request_index.names(date_str, f'꼭 근무({time_slot_pm})')
+
+        eligible_workers = morning_workers | must_work
+        final_workers = (base_workers & eligible_workers) - vacationers | must_work
+
+        for worker in final_workers:
+            # [핵심] '꼭 근무' 요청자는 '꼭 근무' 상태로, 나머지는 '근무' 상태로 저장
+            status = '꼭 근무' if worker in must_work else '근무'
+            color = '🟠 주황색' if worker in must_work else '기본'
+            df_final = update_worker_status(df_final, date_str, time_slot_pm, worker, status, '', color, day_map, week_numbers)
+
+        # [유지] 오후 휴가자 처리 로직
+        for vac in (vacationers & base_workers):
+            if vac in final_workers: continue # '꼭 근무'가 우선
+
+            existing_record = df_final[(df_final['날짜'] == date_str) & (df_final['시간대'] == time_slot_pm) & (df_final['근무자'] == vac)]
+            if not existing_record.empty and existing_record.iloc[0]['상태'] not in ['근무', '기본']:
+                 continue
+
+            reason = request_index.category_of(date_str, vac, ['휴가', '학회'], default="휴가")
+
+            df_final = update_worker_status(df_final, date_str, time_slot_pm, vac, reason, f'{reason}로 제외', '🔴 빨간색', day_map, week_numbers)
+
+    # ▼▼▼ [핵심 수정] 오후 초기 배정 후, 주간 횟수를 즉시 재계산 ▼▼▼
+    # (이 코드가 없으면, execute_adjustment_pass가 마스터 횟수를 0으로 착각함)
+    weekly_counts = schedule_engine.calculate_weekly_counts(df_final, all_names, week_numbers)
+    # ▲▲▲ [수정 완료] ▲▲▲
+
+    # 오후 배정 후 동기화
+    # [수정] weekly_counts 전달 및 반환
+    df_final, changed, current_cumulative, weekly_counts = sync_am_to_pm_exclusions(df_final, active_weekdays_pm_sorted, day_map, week_numbers, initial_master_assignments, current_cumulative, weekly_counts)
+
+    # 오후 조정 패스
+    # [수정] weekly_counts 전달 및 반환
+    df_final, current_cumulative, weekly_counts = execute_adjustment_pass(
+        df_final, active_weekdays_pm_sorted, time_slot_pm, target_count_pm, initial_master_assignments,
+        df_supplement_processed, request_index, day_map, week_numbers, current_cumulative, df_cumulative, all_names,
+        weekly_counts 
+    )
+    pipeline_laps.lap("오후 배정")
+    report("오후 배정 완료", 0.5)
+
+    # [수정] 최종 균형 맞추기 전, weekly_counts를 한 번 더 최신화
+    weekly_counts = schedule_engine.calculate_weekly_counts(df_final, all_names, week_numbers)
+
+    df_final, current_cumulative = balance_weekly_and_cumulative(
+        df_final, 
+        active_weekdays_am_sorted, active_weekdays_pm_sorted, 
+        initial_master_assignments, df_supplement_processed,
+        request_index, day_map, week_numbers, current_cumulative, all_names,
+        df_cumulative,
+        weekly_counts # [수정] weekly_counts 전달
+    )
+
+    # [수정] 진짜 최종 균형 맞추기 전, weekly_counts를 한 번 더 최신화
+    weekly_counts = schedule_engine.calculate_weekly_counts(df_final, all_names, week_numbers)
+
+    df_final, current_cumulative = balance_final_cumulative_with_weekly_check(
+        df_final,
+        active_weekdays_am_sorted, active_weekdays_pm_sorted,
+        df_supplement_processed, request_index,
+        day_map, week_numbers, current_cumulative, all_names, df_cumulative,
+        initial_master_assignments,
+        df_master,
+        weekly_counts # [수정] weekly_counts 전달
+    )
+
+    df_final = schedule_engine.replace_adjustments(df_final)
+    df_final = schedule_schema.schedule_to_strings(df_final)
+    pipeline_laps.lap("균형 조정")
+    report("균형 조정 완료", 0.7)
+
+    df_final_unique_sorted = df_final.sort_values(by=['날짜', '시간대', '근무자']).drop_duplicates(
+        subset=['날짜', '시간대', '근무자'], keep='last'
+    ).copy()
+
+    # 대체 로그 생성
+    df_replacements = df_final_unique_sorted[
+        df_final_unique_sorted['상태'].isin(['대체보충', '대체휴근'])
+    ].copy()
+    df_replacements['주차'] = df_replacements['날짜'].apply(
+        lambda x: week_numbers.get(pd.to_datetime(x).date())
+    )
+
+    weekly_swap_dates = {}
+    for (week, worker, time_slot), group in df_replacements.groupby(['주차', '근무자', '시간대']):
+        dates_excluded = sorted(group[group['상태'] == '대체휴근']['날짜'].tolist())
+        dates_supplemented = sorted(group[group['상태'] == '대체보충']['날짜'].tolist())
+
+        if dates_excluded and dates_supplemented:
+            key = (week, worker, time_slot)
+            weekly_swap_dates[key] = {
+                '제외일': dates_excluded,
+                '보충일': dates_supplemented
             }
-            special_day_fill = PatternFill(start_color='95B3D7', end_color='95B3D7', fill_type='solid')
-            empty_day_fill = PatternFill(start_color='808080', end_color='808080', fill_type='solid')
-            default_day_fill = PatternFill(start_color='FFF2CC', end_color='FFF2CC', fill_type='solid')
-
-            for col_idx, col_name in enumerate(df_excel.columns, 1):
-                cell = ws.cell(row=1, column=col_idx, value=col_name)
-                cell.fill = PatternFill(start_color='000000', end_color='000000', fill_type='solid')
-                cell.font = Font(name=font_name, size=9, color='FFFFFF', bold=True)
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-                cell.border = Border(left=Side(style='thin', color='000000'),
-                                    right=Side(style='thin', color='000000'),
-                                    top=Side(style='thin', color='000000'),
-                                    bottom=Side(style='thin', color='000000'))
-
-            border = Border(left=Side(style='thin', color='000000'),
+
+            # 메모 업데이트
+            memo_for_exclusion = f"{', '.join([pd.to_datetime(d).strftime('%-m월 %-d일') for d in dates_supplemented])}일과 대체"
+            memo_for_supplement = f"{', '.join([pd.to_datetime(d).strftime('%-m월 %-d일') for d in dates_excluded])}일과 대체"
+
+            df_final_unique_sorted.loc[
+                (df_final_unique_sorted['근무자'] == worker) &
+                (df_final_unique_sorted['시간대'] == time_slot) &
+                (df_final_unique_sorted['날짜'].isin(dates_excluded)), '메모'
+            ] = memo_for_exclusion
+
+            df_final_unique_sorted.loc[
+                (df_final_unique_sorted['근무자'] == worker) &
+                (df_final_unique_sorted['시간대'] == time_slot) &
+                (df_final_unique_sorted['날짜'].isin(dates_supplemented)), '메모'
+            ] = memo_for_supplement
+
+    # 로그 생성
+    swap_logs, adjustment_logs = [], []
+    weekday_map_korean = {0: '월', 1: '화', 2: '수', 3: '목', 4: '금', 5: '토', 6: '일'}
+
+    # 대체 로그
+    for (week, worker, time_slot), swap_info in weekly_swap_dates.items():
+        excluded_dates_str = [pd.to_datetime(d).strftime('%-m월 %-d일') for d in sorted(swap_info['제외일'])]
+        supplemented_dates_str = [pd.to_datetime(d).strftime('%-m월 %-d일') for d in sorted(swap_info['보충일'])]
+        log_message = f"• {worker} ({time_slot}): {', '.join(excluded_dates_str)}(대체 제외) ➔ {', '.join(supplemented_dates_str)}(대체 보충)"
+        if log_message not in swap_logs:
+            swap_logs.append(log_message)
+
+    # 추가 보충/제외 로그
+    for _, row in df_final_unique_sorted.iterrows():
+        if row['상태'] in ['보충', '휴근']:
+            date_obj = pd.to_datetime(row['날짜'])
+            log_date_info = f"{date_obj.strftime('%-m월 %-d일')} ({weekday_map_korean[date_obj.weekday()]}) {row['시간대']}"
+            if row['상태'] == '휴근':
+                adjustment_logs.append(f"• {log_date_info} {row['근무자']} - {row['메모'] or '인원 초과'}로 추가 제외")
+            elif row['상태'] == '보충':
+                adjustment_logs.append(f"• {log_date_info} {row['근무자']} - {row['메모'] or '인원 부족'}으로 추가 보충")
+
+    # 모든 로그를 날짜 기준으로 정렬합니다.
+    request_logs.sort(key=get_sort_key)
+    swap_logs.sort(key=get_sort_key)
+    adjustment_logs.sort(key=get_sort_key)          
+    request_logs.sort(key=get_sort_key)
+    swap_logs.sort(key=get_sort_key)
+    adjustment_logs.sort(key=get_sort_key)
+
+    df_cumulative_next = df_cumulative.copy()  # 인덱스 설정 제거
+    for worker, count in current_cumulative.get('오전', {}).items():
+        if worker not in df_cumulative_next.columns:
+            df_cumulative_next[worker] = 0  # 새로운 근무자 열 추가
+        if '오전누적' not in df_cumulative_next['항목'].values:
+            new_row = pd.DataFrame([[0] * len(df_cumulative_next.columns)], columns=df_cumulative_next.columns)
+            new_row['항목'] = '오전누적'
+            df_cumulative_next = pd.concat([df_cumulative_next, new_row], ignore_index=True)
+        df_cumulative_next.loc[df_cumulative_next['항목'] == '오전누적', worker] += count
+
+    for worker, count in current_cumulative.get('오후', {}).items():
+        if worker not in df_cumulative_next.columns:
+            df_cumulative_next[worker] = 0  # 새로운 근무자 열 추가
+        if '오후누적' not in df_cumulative_next['항목'].values:
+            new_row = pd.DataFrame([[0] * len(df_cumulative_next.columns)], columns=df_cumulative_next.columns)
+            new_row['항목'] = '오후누적'
+            df_cumulative_next = pd.concat([df_cumulative_next, new_row], ignore_index=True)
+        df_cumulative_next.loc[df_cumulative_next['항목'] == '오후누적', worker] += count
+
+    if special_schedules:
+        for date_str, workers, oncall in special_schedules:
+            if not df_final.empty: df_final = df_final[df_final['날짜'] != date_str].copy()
+            for worker in workers:
+                df_final = update_worker_status(df_final, date_str, '오전', worker, '근무', '', '특수근무색', day_map, week_numbers)
+
+    color_priority = {'🟠 주황색': 0, '🟢 초록색': 1, '🟡 노란색': 2, '기본': 3, '🔴 빨간색': 4, '🔵 파란색': 5, '🟣 보라색': 6, '특수근무색': -1}
+    df_final['색상_우선순위'] = df_final['색상'].map(color_priority)
+    df_final_unique = df_final.sort_values(by=['날짜', '시간대', '근무자', '색상_우선순위']).drop_duplicates(subset=['날짜', '시간대', '근무자'], keep='last')
+
+    all_month_dates = pd.date_range(start=month_dt, end=month_dt.replace(day=last_day))
+    weekdays = [d for d in all_month_dates if d.weekday() < 5]
+    active_weekdays = [d for d in weekdays if d.strftime('%Y-%m-%d') not in holiday_dates]
+    day_map = {0: '월', 1: '화', 2: '수', 3: '목', 4: '금', 5: '토', 6: '일'}
+    week_numbers = {d.to_pydatetime().date(): (d.day - 1) // 7 + 1 for d in all_month_dates}
+
+    df_schedule = pd.DataFrame({
+        '날짜': [d.strftime('%Y-%m-%d') for d in all_month_dates], 
+        '요일': [day_map.get(d.weekday()) for d in all_month_dates],
+        '날짜_표시': [f"{d.month}월 {d.day}일" for d in all_month_dates] # <-- 이 줄이 추가되었습니다.
+    })
+    worker_counts_all = df_final_unique.groupby(['날짜', '시간대'])['근무자'].nunique().unstack(fill_value=0)
+    max_morning_workers = int(worker_counts_all.get('오전', pd.Series(data=0)).max())
+    max_afternoon_workers = int(worker_counts_all.get('오후', pd.Series(data=0)).max())
+    columns = ['날짜', '요일'] + [str(i) for i in range(1, max_morning_workers + 1)] + [''] + ['오전당직(온콜)'] + [f'오후{i}' for i in range(1, max_afternoon_workers + 1)]
+    df_excel = pd.DataFrame(index=df_schedule.index, columns=columns)
+
+    for idx, row in df_schedule.iterrows():
+        date = row['날짜']
+        date_obj = datetime.strptime(date, '%Y-%m-%d')
+        df_excel.at[idx, '날짜'] = f"{date_obj.month}월 {date_obj.day}일"
+        df_excel.at[idx, '요일'] = row['요일']
+        df_excel.fillna("", inplace=True)
+
+        morning_workers_for_excel = df_final_unique[(df_final_unique['날짜'] == date) & (df_final_unique['시간대'] == '오전')]
+        morning_workers_for_excel_sorted = morning_workers_for_excel.sort_values(by=['색상_우선순위', '근무자'])['근무자'].tolist()
+        for i, worker_name in enumerate(morning_workers_for_excel_sorted, 1):
+            if i <= max_morning_workers: df_excel.at[idx, str(i)] = worker_name
+
+        afternoon_workers_for_excel = df_final_unique[(df_final_unique['날짜'] == date) & (df_final_unique['시간대'] == '오후')]
+        afternoon_workers_for_excel_sorted = afternoon_workers_for_excel.sort_values(by=['색상_우선순위', '근무자'])['근무자'].tolist()
+        for i, worker_name in enumerate(afternoon_workers_for_excel_sorted, 1):
+            if i <= max_afternoon_workers: df_excel.at[idx, f'오후{i}'] = worker_name
+
+        for special_date, workers, oncall in special_schedules:
+            if date == special_date:
+                workers_padded = workers[:10] + [''] * (10 - len(workers[:10]))
+                for i in range(1, 11): df_excel.at[idx, str(i)] = workers_padded[i-1]
+                df_excel.at[idx, '오전당직(온콜)'] = oncall if oncall != "당직 없음" else ''
+
+    ### 시작: 오전당직 배정 로직 ###
+    df_cum_indexed = df_cumulative.set_index('항목')
+
+    # --- ▼▼▼ [핵심 수정 1] 'oncall_targets'가 0회 목표자도 포함하도록 수정 ▼▼▼ ---
+    all_workers_in_cum = [col for col in df_cumulative.columns if col != '항목']
+    oncall_targets = {}
+    oncall_live_counts = {}
+    if '오전당직누적' in df_cum_indexed.index: # "합계" -> "누적"
+        for w in all_workers_in_cum:
+            target_val = df_cum_indexed.loc['오전당직누적'].get(w) # "합계" -> "누적"            else:
+        # '오전당직' 행 자체가 없는 경우
+        oncall_targets = {w: 0 for w in all_workers_in_cum}
+    # --- ▲▲▲ [수정 완료] ▲▲▲ ---
+
+    ### 시작: 오전당직 배정 로직 ###
+
+    # 1. (유지) 배정 가능한 날짜 목록을 시간순으로 정렬
+    assignable_dates = sorted([d for d in df_final_unique['날짜'].unique() if d not in {s[0] for s in special_schedules}])
+
+    # 2. [신규] 날짜별 후보자 목록 및 '총 당직 가능 횟수' 집계
+    daily_candidates = {}
+    total_eligibility_counts = Counter() # <--- [신규] 총 가능 횟수
+
+    for date in assignable_dates:
+        morning_workers = set(df_final_unique[(df_final_unique['날짜'] == date) & (df_final_unique['시간대'] == '오전') & (df_final_unique['상태'].isin(['근무', '대체보충', '보충', '꼭 근무']))]['근무자'])
+        afternoon_workers = set(df_final_unique[(df_final_unique['날짜'] == date) & (df_final_unique['시간대'] == '오후') & (df_final_unique['상태'].isin(['근무', '대체보충', '보충', '꼭 근무']))]['근무자'])
+
+        candidates = list(morning_workers - afternoon_workers)
+        daily_candidates[date] = candidates
+
+        # [신규] 총 당직 가능 횟수 집계
+        for worker in candidates:
+            total_eligibility_counts[worker] += 1
+
+    # 3. [수정] 실시간 누적 횟수(oncall_live_counts)를 '전월' 누적치로 초기화
+    df_cum_indexed = df_cumulative.set_index('항목')
+    all_workers_in_cum = [col for col in df_cumulative.columns if col != '항목']
+
+    oncall_live_counts = {}
+    if '오전당직누적' in df_cum_indexed.index:
+        for w in all_workers_in_cum:
+            target_val = df_cum_indexed.loc['오전당직누적'].get(w)
+
+            # ▼▼▼ [핵심 버그 수정] 누락된 할당 코드 추가 ▼▼▼
+            oncall_live_counts[w] = int(target_val) if pd.notna(target_val) else 0
+            # ▲▲▲ [수정 완료] ▲▲▲
+    else:
+        oncall_live_counts = {w: 0 for w in all_workers_in_cum}
+
+    oncall = {} # 최종 배정 결과 (날짜 -> 근무자)
+    actual_oncall_counts_this_month = Counter() # 이번 달 배정 횟수 (로그용)
+    assigned_workers_by_date = {} # 연속 근무 체크용
+
+    # 4. (유지) 날짜를 순차적으로(sequentially) 반복
+    for date in assignable_dates: 
+        date_str = date
+        candidates_on_date = daily_candidates.get(date, [])
+
+        if not candidates_on_date:
+            continue 
+
+        # 5. (유지) 연속 근무자 제외 로직
+        date_index = assignable_dates.index(date)
+        previous_oncall_person = None
+        if date_index > 0:
+            previous_date = assignable_dates[date_index - 1]
+            previous_oncall_person = assigned_workers_by_date.get(previous_date)
+
+        if previous_oncall_person and len(candidates_on_date) > 1:
+            eligible_candidates = [p for p in candidates_on_date if p != previous_oncall_person]
+            if not eligible_candidates: 
+                eligible_candidates = candidates_on_date
+        else:
+            eligible_candidates = candidates_on_date
+
+        if not eligible_candidates:
+            continue 
+
+        # 6. [핵심 수정] 후보자 정렬: '비율'이 아닌 '절대 횟수'가 가장 낮은 사람 우선
+        def sort_key(worker):
+            # 1순위: 현재 누적 횟수 (전월 + 이번 달)
+            current_count = oncall_live_counts.get(worker, 0)
+
+            # 2순위: (동점일 경우) 당직 가능 총 횟수가 적은 사람 (기회가 적은 사람)
+            total_eligible = total_eligibility_counts.get(worker, 1) 
+
+            # (비율 로직 'ratio = current_count / total_eligible' 삭제)
+
+            # 1순위: 'current_count'가 낮은 사람
+            # 2순위: 'total_eligible'이 낮은 사람
+            return (current_count, total_eligible)
+
+        eligible_candidates.sort(key=sort_key)
+
+        # 7. (유지) 최고 우선순위 후보자(0번 인덱스) 배정
+        best_worker = eligible_candidates[0]
+        oncall[date] = best_worker
+
+        # 8. (유지) 실시간 누적 횟수 업데이트
+        oncall_live_counts[best_worker] = oncall_live_counts.get(best_worker, 0) + 1
+
+        # 9. (유지) 로그 및 연속체크용 변수 업데이트
+        actual_oncall_counts_this_month[best_worker] += 1
+        assigned_workers_by_date[date] = best_worker
+
+    # --- 배정 종료 ---
+
+    # --- (유지) 최종 배정 결과 로그 생성 ---
+    oncall_logs = [] 
+    for worker, count in sorted(actual_oncall_counts_this_month.items()):
+        if count > 0:
+            log_message = f"• {worker}: {count}회 배정"
+            oncall_logs.append(log_message)
+
+    # (유지) 엑셀 시트에 배정 결과 업데이트
+    for idx, row in df_schedule.iterrows():
+        date = row['날짜']
+        df_excel.at[idx, '오전당직(온콜)'] = oncall.get(date, '')
+
+    ### 끝: 오전당직 배정 로직 ###
+
+    # ✨ [핵심 수정 1] 배정된 oncall 결과를 df_final에 '오전당직' 시간대로 추가
+    oncall_df = pd.DataFrame([
+        {
+            '날짜': date, '요일': day_map.get(pd.to_datetime(date).weekday(), ''),
+            '주차': week_numbers.get(pd.to_datetime(date).date(), 0),
+            '시간대': '오전당직', '근무자': worker, '상태': '당직',
+            '메모': '', '색상': '기본'
+        } for date, worker in oncall.items()
+    ])
+    if not oncall_df.empty:
+        df_final = pd.concat([df_final, oncall_df], ignore_index=True)
+
+    # ✨ [핵심 수정 2] 모든 배정이 끝난 후, 최종 데이터를 정리
+    color_priority = {'🟠 주황색': 0, '🟢 초록색': 1, '🟡 노란색': 2, '기본': 3, '🔴 빨간색': 4, '🔵 파란색': 5, '🟣 보라색': 6, '특수근무색': -1}
+    df_final['색상_우선순위'] = df_final['색상'].map(color_priority)
+    df_final_unique_sorted = df_final.sort_values(by=['날짜', '시간대', '근무자', '색상_우선순위']).drop_duplicates(
+        subset=['날짜', '시간대', '근무자'], keep='last'
+    )
+    # create_final_schedule_excel 함수에 전달할 df_final_unique 변수도 여기서 최종본으로 다시 정의
+    df_final_unique = df_final_unique_sorted 
+
+    # ✨ [핵심 수정 3] 요약 테이블 생성에 필요한 변수들을 정의
+    month_dt = datetime.strptime(month_str, "%Y년 %m월")
+    next_month_dt = (month_dt + relativedelta(months=1)).replace(day=1)
+    next_month_str = next_month_dt.strftime("%Y년 %-m월")
+
+    # ✨ [핵심 수정 4] 올바른 최종 데이터로 요약 테이블 생성
+    summary_df = build_summary_table(
+        df_cumulative, all_names, next_month_str,
+        df_final_unique=df_final_unique_sorted
+    )
+
+    if platform.system() == "Windows":
+        font_name = "맑은 고딕"  
+    else:
+        font_name = "Arial"  
+
+    duty_font = Font(name=font_name, size=9, bold=True, color="FF69B4")  
+    default_font = Font(name=font_name, size=9)  
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "스케줄"
+
+    color_map = {
+        '🔴 빨간색': 'DA9694',  
+        '🟠 주황색': 'FABF8F',  
+        '🟢 초록색': 'A9D08E',  
+        '🟡 노란색': 'FFF28F',  
+        '🔵 파란색': '95B3D7',  
+        '🟣 보라색': 'B1A0C7',  
+        '기본': 'FFFFFF',        
+        '특수근무색': 'D0E0E3'   
+    }
+    special_day_fill = PatternFill(start_color='95B3D7', end_color='95B3D7', fill_type='solid')
+    empty_day_fill = PatternFill(start_color='808080', end_color='808080', fill_type='solid')
+    default_day_fill = PatternFill(start_color='FFF2CC', end_color='FFF2CC', fill_type='solid')
+
+    for col_idx, col_name in enumerate(df_excel.columns, 1):
+        cell = ws.cell(row=1, column=col_idx, value=col_name)
+        cell.fill = PatternFill(start_color='000000', end_color='000000', fill_type='solid')
+        cell.font = Font(name=font_name, size=9, color='FFFFFF', bold=True)
+        cell.alignment = Alignment(horizontal='center', vertical='center')
+        cell.border = Border(left=Side(style='thin', color='000000'),
                             right=Side(style='thin', color='000000'),
                             top=Side(style='thin', color='000000'),
                             bottom=Side(style='thin', color='000000'))
 
-            for row_idx, (idx, row) in enumerate(df_excel.iterrows(), 2):
-                date_str_lookup = df_schedule.at[idx, '날짜']
-                special_schedule_dates_set = {s[0] for s in special_schedules}
-                is_special_day = date_str_lookup in special_schedule_dates_set
-                is_empty_day = df_final_unique[df_final_unique['날짜'] == date_str_lookup].empty and not is_special_day
-
-                oncall_person_for_row = str(row['오전당직(온콜)']).strip() if pd.notna(row['오전당직(온콜)']) else ""
-
-                weekend_oncall_worker = None
-                if is_special_day:
-                    for s in special_schedules:
-                        if s[0] == date_str_lookup and s[2] != "당직 없음":
-                            weekend_oncall_worker = s[2]
-                            break
-
-                for col_idx, col_name in enumerate(df_excel.columns, 1):
-                    cell = ws.cell(row=row_idx, column=col_idx)
-                    cell.value = row[col_name]
-                    cell.font = default_font  
-                    cell.border = border
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-
-                    if is_empty_day:
-                        cell.fill = empty_day_fill
-                        continue
-
-                    if col_name == '날짜':
-                        cell.fill = empty_day_fill
-                    elif col_name == '요일':
-                        cell.fill = special_day_fill if is_special_day else default_day_fill
-                    elif str(col_name).isdigit():  
-                        worker = str(row[col_name]).strip()
-                        if worker and pd.notna(worker):
-                            if is_special_day and worker == weekend_oncall_worker:
-                                cell.font = duty_font
-
-                            worker_data = df_final_unique[(df_final_unique['날짜'] == date_str_lookup) & (df_final_unique['시간대'] == '오전') & (df_final_unique['근무자'] == worker)]
-                            if not worker_data.empty:
-                                color_name = worker_data.iloc[0]['색상']
-                                cell.fill = PatternFill(start_color=color_map.get(color_name, 'FFFFFF'), end_color=color_map.get(color_name, 'FFFFFF'), fill_type='solid')
-                                memo_text = worker_data.iloc[0]['메모']
-                                if memo_text and ('보충' in memo_text or '이동' in memo_text or '대체' in memo_text):
-                                    cell.comment = Comment(memo_text, "Schedule Bot")
-                                    
-                    elif '오후' in str(col_name):  
-                        worker = str(row[col_name]).strip()
-                        if worker and pd.notna(worker):
-                            worker_data = df_final_unique[(df_final_unique['날짜'] == date_str_lookup) & (df_final_unique['시간대'] == '오후') & (df_final_unique['근무자'] == worker)]
-                            if not worker_data.empty:
-                                color_name = worker_data.iloc[0]['색상']
-                                cell.fill = PatternFill(start_color=color_map.get(color_name, 'FFFFFF'), end_color=color_map.get(color_name, 'FFFFFF'), fill_type='solid')
-                                memo_text = worker_data.iloc[0]['메모']
-                                if memo_text and ('보충' in memo_text or '이동' in memo_text or '대체' in memo_text):
-                                    cell.comment = Comment(memo_text, "Schedule Bot")
-
-                    elif col_name == '오전당직(온콜)':
-                        if oncall_person_for_row:
-                            cell.font = duty_font
-
-            ws.column_dimensions['A'].width = 11
-            for col in ws.columns:
-                 if col[0].column_letter != 'A':
-                     ws.column_dimensions[col[0].column_letter].width = 9
-
-            month_dt = datetime.strptime(month_str, "%Y년 %m월")
-            next_month_dt = (month_dt + relativedelta(months=1)).replace(day=1)
-            next_month_str = next_month_dt.strftime("%Y년 %-m월")
-            month_start = month_dt.replace(day=1)
-            month_end = (month_start + relativedelta(months=1)) - timedelta(days=1)
-
-            summary_df = build_summary_table(
-                df_cumulative,
-                all_names,
-                next_month_str,
-                df_final_unique=df_final_unique_sorted
-            )
-            style_args = {
-                'font': default_font,
-                'bold_font': Font(name=font_name, size=9, bold=True),
-                'border': border,
-            }
-            append_summary_table_to_excel(ws, summary_df, style_args)
+    border = Border(left=Side(style='thin', color='000000'),
+                    right=Side(style='thin', color='000000'),
+                    top=Side(style='thin', color='000000'),
+                    bottom=Side(style='thin', color='000000'))
 
-            output = io.BytesIO()
-            wb.save(output)
-            output.seek(0)
-            st.session_state.output = output
-            
-            summary_df = build_summary_table(
-                df_cumulative,
-                all_names,
-                next_month_str,
-                df_final_unique=df_final_unique_sorted
-            )
+    for row_idx, (idx, row) in enumerate(df_excel.iterrows(), 2):
+        date_str_lookup = df_schedule.at[idx, '날짜']
+        special_schedule_dates_set = {s[0] for s in special_schedules}
+        is_special_day = date_str_lookup in special_schedule_dates_set
+        is_empty_day = df_final_unique[df_final_unique['날짜'] == date_str_lookup].empty and not is_special_day
 
-            # 사용자의 함수 정의에 맞는 인수만 전달하도록 수정
-            wb_final_bytes = create_final_schedule_excel(
-                initial_df=df_excel.copy(), # 초기 상태 df 전달
-                edited_df=df_excel,         # 현재 상태 df 전달
-                edited_cumulative_df=summary_df, # build_summary_table 결과
-                df_special=df_monthly_schedule, # 로드된 토요/휴일 데이터
-                df_requests=df_request,         # 로드된 요청사항 데이터
-                closing_dates=holiday_dates,    # 로드된 휴관일 데이터
-                month_str=month_str,            # 현재 월 문자열
-                # ▼▼▼ 추가된 인수 전달 ▼▼▼
-                df_final_unique=df_final_unique_sorted, # 최종 배정 결과
-                df_schedule=df_schedule             # 날짜 매핑용 df
-                # ▲▲▲ 추가 인수 전달 완료 ▲▲▲
-            )
-            # 함수가 bytes를 반환하므로 바로 BytesIO로 읽음
-            output_final = io.BytesIO(wb_final_bytes)
-            output_final.seek(0)
-            
-            month_dt = datetime.strptime(month_str, "%Y년 %m월")
-            next_month_dt = (month_dt + relativedelta(months=1)).replace(day=1)
-            next_month_str = next_month_dt.strftime("%Y년 %-m월")
-            month_start = month_dt.replace(day=1)
-            month_end = (month_start + relativedelta(months=1)) - timedelta(days=1)
+        oncall_person_for_row = str(row['오전당직(온콜)']).strip() if pd.notna(row['오전당직(온콜)']) else ""
 
-            try:
-                gc = get_gspread_client()
-                sheet = gc.open_by_url(st.secrets["google_sheet"]["url"])
-                
-                # 이 함수가 이제 동적으로 열이 생성된 데이터프레임을 반환합니다.
-                df_schedule_to_save = transform_schedule_for_checking(df_final_unique, df_excel, month_start, month_end)
-                
-                try:
-                    worksheet_schedule = sheet.worksheet(f"{month_str} 스케줄 ver1.0")
-                except gspread.exceptions.WorksheetNotFound:
-                    worksheet_schedule = sheet.add_worksheet(title=f"{month_str} 스케줄 ver1.0", rows=1000, cols=50) # cols는 여유있게
-                
-                update_sheet_with_retry(worksheet_schedule, [df_schedule_to_save.columns.tolist()] + df_schedule_to_save.astype(str).values.tolist())
-                
-                try:
-                    # 시트 이름을 "누적 요약"으로 변경하여 기존 시트와 구분하는 것을 권장합니다.
-                    worksheet_summary = sheet.worksheet(f"{next_month_str} 누적 ver1.0")
-                except gspread.exceptions.WorksheetNotFound:
-                    worksheet_summary = sheet.add_worksheet(title=f"{next_month_str} 누적 ver1.0", rows=100, cols=50)
-                
-                # [핵심] df_cumulative_next 대신 summary_df 변수를 사용하여 시트를 업데이트합니다.
-                summary_df_to_save = build_summary_table(
-                    df_cumulative, all_names, next_month_str,
-                    df_final_unique=df_final_unique_sorted
-                )
+        weekend_oncall_worker = None
+        if is_special_day:
+            for s in special_schedules:
+                if s[0] == date_str_lookup and s[2] != "당직 없음":
+                    weekend_oncall_worker = s[2]
+                    break
+
+        for col_idx, col_name in enumerate(df_excel.columns, 1):
+            cell = ws.cell(row=row_idx, column=col_idx)
+            cell.value = row[col_name]
+            cell.font = default_font  
+            cell.border = border
+            cell.alignment = Alignment(horizontal='center', vertical='center')
 
-                update_sheet_with_retry(worksheet_summary, [summary_df_to_save.columns.tolist()] + summary_df_to_save.values.tolist())
+            if is_empty_day:
+                cell.fill = empty_day_fill
+                continue
 
-            except Exception as e:
-                st.error(f"Google Sheets 저장 중 오류 발생: {e}")
-                st.stop()
-            
-            try:
-                # 배정 확인용 테이블 생성 (GSheet 저장용)
-                df_schedule_to_save_for_gsheet = transform_schedule_for_checking(
-                    df_final_unique_sorted,
-                    df_excel,
-                    month_start,
-                    month_end
-                )
+            if col_name == '날짜':
+                cell.fill = empty_day_fill
+            elif col_name == '요일':
+                cell.fill = special_day_fill if is_special_day else default_day_fill
+            elif str(col_name).isdigit():  
+                worker = str(row[col_name]).strip()
+                if worker and pd.notna(worker):
+                    if is_special_day and worker == weekend_oncall_worker:
+                        cell.font = duty_font
 
-                # [수정] 세션 상태 저장을 try 블록 안으로 이동
-                st.session_state.assignment_results = {
-                    # --- 편집 및 다운로드에 필요한 핵심 데이터 ---
-                    "df_excel_initial": df_excel.copy(),
-                    "summary_df_initial": summary_df.copy(),
-                    "df_schedule_for_display": df_excel,
-                    "summary_df_for_display": summary_df,
-                    "df_schedule_to_save_for_gsheet": df_schedule_to_save_for_gsheet, # <-- 이제 안전
-                    # --- Excel 생성 시 필요한 추가 데이터 ---
-                    "df_final_unique_sorted": df_final_unique_sorted,
-                    "df_schedule": df_schedule,
-                    "df_special": df_monthly_schedule, # df_special -> df_monthly_schedule 로 변경 (변수명 일치 확인 필요)
-                    "df_requests": df_request,
-                    "closing_dates": holiday_dates,
-                    "month_str": month_str,
-                    "all_names": all_names, # <-- [★이 줄을 추가하세요★]
-                    # --- 로그 데이터 ---
-                    "request_logs": st.session_state.request_logs,
-                    "swap_logs": st.session_state.swap_logs,
-                    "adjustment_logs": st.session_state.adjustment_logs,
-                    "oncall_logs": st.session_state.oncall_logs,
-                }
-                # --- 세션 상태 저장 끝 ---
-
-            except Exception as e_transform:
-                # 함수 실행 중 오류 발생 시 메시지 출력 및 중단
-                st.error(f"⚠️ 데이터 처리 중 오류 발생 (transform_schedule_for_checking 함수 또는 세션 상태 저장 중)")
-                st.exception(e_transform) # 상세 오류 traceback 출력
-                st.stop() # 스크립트 실행 중단
+                    worker_data = df_final_unique[(df_final_unique['날짜'] == date_str_lookup) & (df_final_unique['시간대'] == '오전') & (df_final_unique['근무자'] == worker)]
+                    if not worker_data.empty:
+                        color_name = worker_data.iloc[0]['색상']
+                        cell.fill = PatternFill(start_color=color_map.get(color_name, 'FFFFFF'), end_color=color_map.get(color_name, 'FFFFFF'), fill_type='solid')
+                        memo_text = worker_data.iloc[0]['메모']
+                        if memo_text and ('보충' in memo_text or '이동' in memo_text or '대체' in memo_text):
+                            cell.comment = Comment(memo_text, "Schedule Bot")
+
+            elif '오후' in str(col_name):  
+                worker = str(row[col_name]).strip()
+                if worker and pd.notna(worker):
+                    worker_data = df_final_unique[(df_final_unique['날짜'] == date_str_lookup) & (df_final_unique['시간대'] == '오후') & (df_final_unique['근무자'] == worker)]
+                    if not worker_data.empty:
+                        color_name = worker_data.iloc[0]['색상']
+                        cell.fill = PatternFill(start_color=color_map.get(color_name, 'FFFFFF'), end_color=color_map.get(color_name, 'FFFFFF'), fill_type='solid')
+                        memo_text = worker_data.iloc[0]['메모']
+                        if memo_text and ('보충' in memo_text or '이동' in memo_text or '대체' in memo_text):
+                            cell.comment = Comment(memo_text, "Schedule Bot")
+
+            elif col_name == '오전당직(온콜)':
+                if oncall_person_for_row:
+                    cell.font = duty_font
+
+    ws.column_dimensions['A'].width = 11
+    for col in ws.columns:
+         if col[0].column_letter != 'A':
+             ws.column_dimensions[col[0].column_letter].width = 9
 
     month_dt = datetime.strptime(month_str, "%Y년 %m월")
     next_month_dt = (month_dt + relativedelta(months=1)).replace(day=1)
@@ -3468,382 +3525,149 @@ if st.session_state.get('assigned', False):
     month_start = month_dt.replace(day=1)
     month_end = (month_start + relativedelta(months=1)) - timedelta(days=1)
 
-    if st.session_state.get('assigned', False):
-        results = st.session_state.get('assignment_results', {})
-        if results:
-            with st.expander("🔍 배정 과정 상세 로그 보기", expanded=True):
-                st.markdown("**📋 요청사항 반영 로그**"); st.code("\n".join(results.get("request_logs", [])) if results.get("request_logs") else "반영된 요청사항(휴가/학회)이 없습니다.", language='text')
-                st.markdown("---"); st.markdown("**📞 오전당직(온콜) 배정 로그**"); st.code("\n".join(results.get("oncall_logs", [])) if results.get("oncall_logs") else "모든 오전당직(온콜)이 누적 횟수에 맞게 정상 배정되었습니다.", language='text')
+    summary_df = build_summary_table(
+        df_cumulative,
+        all_names,
+        next_month_str,
+        df_final_unique=df_final_unique_sorted
+    )
+    style_args = {
+        'font': default_font,
+        'bold_font': Font(name=font_name, size=9, bold=True),
+        'border': border,
+    }
+    append_summary_table_to_excel(ws, summary_df, style_args)
 
-            # --- [핵심 수정] 1. 스케줄 테이블 data_editor *반환값*을 변수에 저장 ---
-            if "df_schedule_for_display" in results:
-                st.divider()
-                st.markdown(f"**➕ {month_str} 배정 스케줄 (수정 가능)**")
-                st.warning("⚠️ 아래에서 내용을 수정하신 후, **'수정사항 저장'** 버튼을 누르면 Google Sheets에 반영됩니다.")
-
-                # 1. 표시용 데이터 준비 (상태 텍스트 추가)
-                df_to_edit_schedule = results["df_schedule_for_display"].copy()
-                df_final_unique = results.get("df_final_unique_sorted")
-                df_schedule = results.get("df_schedule")
-
-                if df_final_unique is not None and df_schedule is not None:
-                    # [★수정★] 상태와 메모를 모두 저장하는 딕셔너리로 변경
-                    status_lookup = {}
-                    for _, row in df_final_unique.iterrows():
-                        key = (row['날짜'], row['시간대'], row['근무자'])
-                        # (상태, 메모) 튜플로 저장
-                        status_lookup[key] = (row['상태'], row.get('메모', '')) 
-
-                    for idx, row in df_to_edit_schedule.iterrows():
-                        if idx not in df_schedule.index: continue
-                        date_str = df_schedule.at[idx, '날짜'] # YYYY-MM-DD
-                        
-                        for col_name in df_to_edit_schedule.columns:
-                            
-                            # 1. 시간대 먼저 결정
-                            time_slot = None
-                            if col_name.isdigit(): time_slot = '오전'
-                            elif col_name.startswith("오후"): time_slot = '오후'
-                            elif col_name == '오전당직(온콜)': time_slot = '오전당직'
-
-                            # 2. 근무, 보충, 당직 셀인 경우에만
-                            if time_slot:
-                                worker_name_cell = str(row[col_name] or '').strip()
-                                if not worker_name_cell: # 셀이 비어있으면 건너뛰기
-                                    continue
-
-                                # 3. 셀에 괄호가 이미 있는지 확인
-                                match = re.match(r'.+?\((.+)\)', worker_name_cell)
-                                
-                                if match:
-                                    pass # 이미 괄호가 있으면 (수동 편집) 그대로 둠
-                                else:
-                                    worker_name_only = worker_name_cell # 괄호가 없으니 이게 이름
-                                    
-                                    key = (date_str, time_slot, worker_name_only)
-                                    lookup_result = status_lookup.get(key)
-                                    
-                                    # 4. [★수정★] 상태와 메모를 분리하여 조건에 맞게 괄호 추가
-                                    if lookup_result:
-                                        status, memo = lookup_result
-                                        
-                                        # [요청사항] '대체보충'이고 유효한 메모가 있으면 (메모)를 표시
-                                        if status == '대체보충' and pd.notna(memo) and str(memo).strip():
-                                            df_to_edit_schedule.at[idx, col_name] = f"{worker_name_only}({memo})"
-                                        # [유지] 그 외 (휴가, 보충, '대체휴근' 등)
-                                        elif status and status not in ['근무', '당직', '기본']:
-                                            df_to_edit_schedule.at[idx, col_name] = f"{worker_name_only}({status})"
-
-                if "df_schedule_for_comparison" not in results:
-                    st.session_state.assignment_results["df_schedule_for_comparison"] = df_to_edit_schedule.copy()
-                # --- ▲▲▲ [저장 완료] ▲▲▲ ---
-
-                edited_schedule_df = st.data_editor(
-                    df_to_edit_schedule,
-                    # ▼▼▼ [핵심 수정] key를 동적으로 변경하여 강제 리셋 ▼▼▼
-                    key=f"edited_schedule_table_{st.session_state.editor_key_version}",
-                    use_container_width=True,
-                    hide_index=True,
-                    disabled=['날짜', '요일'],
-                    on_change=set_editor_changed_flag # <--- [수정] 콜백 추가
-                )
-            else:
-                st.warning("⚠️ 배정 스케줄 테이블 데이터를 불러올 수 없습니다.")
-                edited_schedule_df = pd.DataFrame() # 오류 방지용 빈 DataFrame
-
-            # --- ▼▼▼ [신규] 스케줄 수정사항 로그 로직 ▼▼▼ ---
-            st.markdown("📝 **스케줄 수정사항**")
-            schedule_change_log = []
-            schedule_has_changed = False
-
-            # [수정] 'results.get("df_excel_initial")' (괄호 없는 원본) 대신,
-            # 에디터에 '입력(input)'으로 사용된 'df_to_edit_schedule' (괄호가 이미 추가된)을 
-            # 비교할 원본으로 사용합니다.
-            original_schedule_df = df_to_edit_schedule
-            if original_schedule_df is not None and not edited_schedule_df.equals(original_schedule_df):
-                schedule_has_changed = True # <--- ★★★ [ 2. 이 줄을 추가 ] ★★★
-                try:
-                    # (파일 상단에 'import numpy as np'가 필요합니다)
-                    import numpy as np 
-                    diff_indices = np.where(edited_schedule_df.astype(str).ne(original_schedule_df.astype(str)))
-                    changed_cells = set(zip(diff_indices[0], diff_indices[1])) # 중복 로그 방지
-                    
-                    for row_idx, col_idx in changed_cells:
-                        date_str = edited_schedule_df.iloc[row_idx, 0] # '날짜' 열 (예: "10월 1일")
-                        slot_name = edited_schedule_df.columns[col_idx] # 변경된 열 이름 (예: "1")
-                        
-                        # [수정] 원본 값을 'original_schedule_df' (df_to_edit_schedule)에서 가져옵니다.
-                        old_value = original_schedule_df.iloc[row_idx, col_idx]
-                        new_value = edited_schedule_df.iloc[row_idx, col_idx]
-                        
-                        log_msg = f"{date_str} '{slot_name}' 변경: '{old_value or '빈 값'}' → '{new_value or '빈 값'}'"
-                        schedule_change_log.append(log_msg)
-                except Exception as e:
-                    schedule_change_log.append(f"[로그 오류] 스케줄 변경사항 비교 중 오류: {e}")
-                    
-            if schedule_change_log:
-                st.code("\n".join(f"• {msg}" for msg in sorted(schedule_change_log)), language='text')
-            else:
-                st.info("수정된 사항이 없습니다.")
-            # --- ▲▲▲ [신규] 스케줄 로그 끝 (수정본) ---
-
-            # [기존 코드] (L1682 근처)
-            # --- [핵심 수정] 2. 누적 테이블 data_editor *반환값*을 변수에 저장 ---
-            if "summary_df_for_display" in results:
-                st.divider()
-                st.markdown(f"**➕ {next_month_str} 누적 테이블 (수정 가능)**")
-                
-                # [★수정★] 누적 테이블이 자동 재계산됨을 안내
-                st.write("- 누적 테이블은 '배정 스케줄' 편집기에 반영된 내용을 바탕으로 자동 재계산됩니다.\n- 주의) 대체보충은 수정 시 누적 테이블을 직접 수정해주셔야 합니다.")
+    output = io.BytesIO()
+    wb.save(output)
+    output.seek(0)
 
-                # --- ▼▼▼ [ ★ L1725~L1741을 이 블록으로 교체 ★ ] ▼▼▼ ---
-                if schedule_has_changed:
-                    try:
-                        df_cumulative_initial = st.session_state["df_cumulative"] # GSheet 원본(A)
-                        all_names_list = results.get("all_names", [])
-                        df_schedule_mapping = results.get("df_schedule")
+    summary_df = build_summary_table(
+        df_cumulative,
+        all_names,
+        next_month_str,
+        df_final_unique=df_final_unique_sorted
+    )
 
-                        if not all_names_list or df_schedule_mapping is None:
-                            st.error("자동 재계산에 필요한 'all_names' 또는 'df_schedule' 데이터가 없습니다.")
-                            summary_df_input = results["summary_df_initial"] 
-                        else:
-                            # '수정된' 스케줄(edited_schedule_df)로 재계산 (B)
-                            summary_df_input = recalculate_summary_from_schedule(
-                                edited_schedule_df,
-                                df_cumulative_initial,
-                                all_names_list,
-                                df_schedule_mapping
-                            )
-                    except Exception as e_recalc:
-                        st.error(f"누적 테이블 자동 재계산 중 오류 발생: {e_recalc}")
-                        summary_df_input = results["summary_df_initial"] 
-                else:
-                    # 2. 상단 스케줄이 수정되지 않음 (페이지 첫 로드) -> 원본(A) 표시
-                    summary_df_input = results.get("summary_df_initial", pd.DataFrame()).copy() # 원본(A)을 그대로 사용
-                # --- ▲▲▲ [ 교체 완료 ] ▲▲▲ ---
-
-                # [수정] st.data_editor가 'summary_df_input' (재계산된 값)을 사용
-                edited_summary_df = st.data_editor(
-                    summary_df_input, # <-- 재계산된 데이터를 입력
-                    # ▼▼▼ [핵심 수정] key를 동적으로 변경하여 강제 리셋 ▼▼▼
-                    key=f"edited_summary_table_{st.session_state.editor_key_version}",
-                    use_container_width=True,
-                    hide_index=True,
-                    column_config={
-                        summary_df_input.columns[0]: st.column_config.Column(disabled=True),
-                        **{col: st.column_config.NumberColumn(format="%d") 
-                            for col in summary_df_input.columns[1:]}
-                    },
-                    disabled=False,
-                    on_change=set_editor_changed_flag 
-                )
-            else:
-                st.warning("⚠️ 누적 테이블 데이터를 불러올 수 없습니다.")
-                edited_summary_df = pd.DataFrame() # 오류 방지용 빈 DataFrame
-
-            # --- ▼▼▼ [누적 테이블 수동 수정사항 로그 로직 (수정됨)] ▼▼▼ ---
-            st.markdown("📝 **누적 테이블 수정사항**")
-            summary_change_log = [] # 리스트 초기화
-
-            # --- ▼▼▼ [신규] 항목 순서 정렬을 위한 맵(Map) 정의 ▼▼▼ ---
-            desired_order = [
-                "오전보충", "임시보충", "오전합계", "오전누적", 
-                "오후보충", "온콜검사", "오후합계", "오후누적", 
-                "오전당직", "오전당직누적", "오후당직", "오후당직누적"
-            ]
-            # 항목 이름을 정렬 순서(숫자)로 매핑
-            order_map = {item_name: index for index, item_name in enumerate(desired_order)}
+    # 사용자의 함수 정의에 맞는 인수만 전달하도록 수정
+    wb_final_bytes = create_final_schedule_excel(
+        initial_df=df_excel.copy(), # 초기 상태 df 전달
+        edited_df=df_excel,         # 현재 상태 df 전달
+        edited_cumulative_df=summary_df, # build_summary_table 결과
+        df_special=df_monthly_schedule, # 로드된 토요/휴일 데이터
+        df_requests=df_request,         # 로드된 요청사항 데이터
+        closing_dates=holiday_dates,    # 로드된 휴관일 데이터
+        month_str=month_str,            # 현재 월 문자열
+        # ▼▼▼ 추가된 인수 전달 ▼▼▼
+        df_final_unique=df_final_unique_sorted, # 최종 배정 결과
+        df_schedule=df_schedule             # 날짜 매핑용 df
+        # ▲▲▲ 추가 인수 전달 완료 ▲▲▲
+    )
+    # 함수가 bytes를 반환하므로 바로 BytesIO로 읽음
+    output_final = io.BytesIO(wb_final_bytes)
+    output_final.seek(0)
 
-            original_summary_df = results.get("summary_df_initial") # (A)
+    month_dt = datetime.strptime(month_str, "%Y년 %m월")
+    next_month_dt = (month_dt + relativedelta(months=1)).replace(day=1)
+    next_month_str = next_month_dt.strftime("%Y년 %-m월")
+    month_start = month_dt.replace(day=1)
+    month_end = (month_start + relativedelta(months=1)) - timedelta(days=1)
 
-            cumulative_has_changed = False # <-- [★ 1. 이 줄을 추가하세요]
+    # 이 함수가 이제 동적으로 열이 생성된 데이터프레임을 반환합니다.
+    df_schedule_to_save = transform_schedule_for_checking(df_final_unique, df_excel, month_start, month_end)
 
-            if original_summary_df is not None and not edited_summary_df.equals(original_summary_df): # (A) vs (C)
-                cumulative_has_changed = True # <-- [★ 2. 이 줄을 추가하세요]
-                try:
-                    import numpy as np
-                    # 1번 수정으로 A와 C의 숫자 타입이 int로 통일되었으므로 astype(str) 비교가 안전합니다.
-                    stats_orig_str = original_summary_df.astype(str) # (A)
-                    stats_edit_str = edited_summary_df.astype(str) # (C)
-                    
-                    diff_indices_stats = np.where(stats_edit_str.ne(stats_orig_str))
-                    changed_cells_stats = set(zip(diff_indices_stats[0], diff_indices_stats[1])) 
-
-                    for row_idx, col_idx in changed_cells_stats:
-                        item_name = edited_summary_df.iloc[row_idx, 0] 
-                        person_name = edited_summary_df.columns[col_idx]
-                        
-                        # [핵심] old_value를 'original_summary_df'(A)에서 가져옵니다.
-                        old_value = original_summary_df.iloc[row_idx, col_idx]
-                        new_value = edited_summary_df.iloc[row_idx, col_idx]
-                        
-                        log_msg = f"'{person_name}'의 '{item_name}' 변경: {old_value} → {new_value}"
-                        summary_change_log.append(log_msg)
-                except Exception as e:
-                    summary_change_log.append(f"[로그 오류] 누적 테이블 변경사항 비교 중 오류: {e}")
-
-            if summary_change_log:
-                log_text_stats = "\n".join(f"• {msg}" for msg in sorted(summary_change_log))
-                st.code(log_text_stats, language='text')
-            else:
-                st.info("수정된 사항이 없습니다.")
-            # --- ▲▲▲ [누적 테이블 로그 끝 (수정 완료)] ---
+    # [핵심] df_cumulative_next 대신 summary_df 변수를 사용하여 시트를 업데이트합니다.
+    summary_df_to_save = build_summary_table(
+        df_cumulative, all_names, next_month_str,
+        df_final_unique=df_final_unique_sorted
+    )
 
-            st.divider() # 구분선 추가
+    # 배정 확인용 테이블 생성 (GSheet 저장용)
+    df_schedule_to_save_for_gsheet = transform_schedule_for_checking(
+        df_final_unique_sorted,
+        df_excel,
+        month_start,
+        month_end
+    )
 
-            # --- ▼▼▼ [핵심 수정] 3. 저장 및 다운로드 버튼 영역 수정 ▼▼▼ ---
-            col1, col2 = st.columns(2)
+    assignment_results = {
+        # --- 편집 및 다운로드에 필요한 핵심 데이터 ---
+        "df_excel_initial": df_excel.copy(),
+        "summary_df_initial": summary_df.copy(),
+        "df_schedule_for_display": df_excel,
+        "summary_df_for_display": summary_df,
+        "df_schedule_to_save_for_gsheet": df_schedule_to_save_for_gsheet,
+        # --- Excel 생성 시 필요한 추가 데이터 ---
+        "df_final_unique_sorted": df_final_unique_sorted,
+        "df_schedule": df_schedule,
+        "df_special": df_monthly_schedule,
+        "df_requests": df_request,
+        "closing_dates": holiday_dates,
+        "month_str": month_str,
+        "all_names": all_names,
+        # --- 로그 데이터 ---
+        "request_logs": request_logs,
+        "swap_logs": swap_logs,
+        "adjustment_logs": adjustment_logs,
+        "oncall_logs": oncall_logs,
+    }
+    report("근무 배정 완료", 0.8)
 
-            with col1:
-                # --- 1. Google Sheets 저장 버튼 ---
+    # 시트 저장이 실패해도 배정 결과는 화면에 남도록 오류만 알립니다.
+    try:
+        save_assignment_sheets_job(
+            lambda message, fraction=None: report(message, None if fraction is None else 0.8 + 0.2 * fraction),
+            gc, sheet_url, month_str, next_month_str, df_schedule_to_save, summary_df_to_save,
+        )
+    except Exception as e:
+        report(f"❌ Google Sheets 저장 실패: {type(e).__name__} - {e}")
+        job_runner.ui.error(f"Google Sheets 저장 중 오류 발생: {type(e).__name__} - {e}")
 
-                # [★ 3. .equals() 비교 결과로 실제 변경 유무를 최종 판정 ★]
-                # (schedule_has_changed는 L1822에서 이미 정의됨)
-                real_has_unsaved_changes = schedule_has_changed or cumulative_has_changed
-                
-                if st.button("💾 수정사항 Google Sheet에 저장", 
-                             type="primary", 
-                             use_container_width=True, 
-                             disabled=not real_has_unsaved_changes # <-- [수정 완료]
-                            ):
-                    # [수정] st.session_state 대신 위에서 할당받은 *변수* 사용
-                    if not edited_schedule_df.empty and not edited_summary_df.empty:
-                        with st.spinner("수정된 데이터 저장 중..."):
-                            try:
-                                # edited_schedule_df 와 edited_summary_df 변수를 직접 사용
-                                df_to_save_gsheet = edited_schedule_df.copy()
-
-                                gc = get_gspread_client()
-                                sheet = gc.open_by_url(url)
-                                schedule_sheet_name = f"{month_str} 스케줄 ver1.0"
-                                summary_sheet_name = f"{next_month_str} 누적 ver1.0"
-
-                                # 스케줄 시트 저장
-                                try: ws_sched = sheet.worksheet(schedule_sheet_name)
-                                except WorksheetNotFound: ws_sched = sheet.add_worksheet(title=schedule_sheet_name, rows=1000, cols=len(df_to_save_gsheet.columns)+5)
-                                # update_sheet_with_retry가 성공하면 True 반환
-                                success_sched = update_sheet_with_retry(ws_sched, [df_to_save_gsheet.columns.tolist()] + df_to_save_gsheet.astype(str).fillna('').values.tolist())
-
-                                # 누적 시트 저장
-                                try: ws_summ = sheet.worksheet(summary_sheet_name)
-                                except WorksheetNotFound: ws_summ = sheet.add_worksheet(title=summary_sheet_name, rows=100, cols=len(edited_summary_df.columns)+5)
-                                success_summ = update_sheet_with_retry(ws_summ, [edited_summary_df.columns.tolist()] + edited_summary_df.astype(str).fillna('').values.tolist())
-
-                                if success_sched and success_summ:
-                                    st.success(f"✅ '{schedule_sheet_name}' 및 '{summary_sheet_name}' 시트에 수정된 내용이 저장되었습니다.")
-
-                                    # 저장 성공 후 초기 상태 업데이트
-                                    # st.session_state.assignment_results["df_excel_initial"] = edited_schedule_df.copy()
-                                    # st.session_state.assignment_results["summary_df_initial"] = edited_summary_df.copy()
-                                    st.session_state.assignment_results["df_schedule_for_display"] = edited_schedule_df.copy()
-                                    st.session_state.assignment_results["summary_df_for_display"] = edited_summary_df.copy()
-                                    
-                                    # ▼▼▼ [핵심 수정] 플래그 리셋 및 리런 ▼▼▼
-                                    st.session_state.editor_has_changes = False 
-                                    time.sleep(1)
-                                    st.rerun()
-                                    # ▲▲▲ [핵심 수정] ▲▲▲
-                                
-                                else:
-                                    # update_sheet_with_retry가 False를 반환했지만 에러를 raise하지 않은 경우
-                                    st.error("Google Sheets 업데이트가 완료되지 않았습니다. API 오류 로그를 확인해주세요.")
-
-                            except Exception as e:
-                                st.error(f"Google Sheets 저장 중 오류 발생: {e}")
-                                # 에러 발생 시 플래그를 True로 유지 (다운로드 방지 상태)
-                                st.session_state.editor_has_changes = True
+    return {
+        "assignment_results": assignment_results,
+        "output": output,
+        "profile": instrumentation.profile_result(pipeline_profiler),
+    }
 
-                    else:
-                        st.error("편집된 데이터가 없습니다.")
 
-            with col2:
-                # --- 2. Excel 다운로드 버튼 (두 종류) ---
-                if not edited_schedule_df.empty and not edited_summary_df.empty:
-                    try:
-                        # --- 데이터 로드 (기존과 동일) ---
-                        results = st.session_state.get('assignment_results', {})
-                        initial_schedule_df = results.get("df_schedule_for_comparison")
-                        # initial_summary_df는 사용되지 않음 (콜백 플래그가 대체)
-                        df_special_dl = results.get("df_special")
-                        df_requests_dl = results.get("df_requests")
-                        closing_dates_dl = results.get("closing_dates")
-                        month_str_dl = results.get("month_str")
-                        df_final_unique_dl = results.get("df_final_unique_sorted")
-                        df_schedule_dl = results.get("df_schedule")
-
-                        # --- ▼▼▼ [핵심 수정] 플래그 확인 ▼▼▼
-                        # 'editor_has_changes' 플래그가 True이면 다운로드를 막습니다.
-                        has_unsaved_changes = real_has_unsaved_changes
-                        # --- ▲▲▲ [핵심 수정] 완료 ▲▲▲ ---
-
-                        if has_unsaved_changes:
-                            st.error("⚠️ 수정사항이 감지되었습니다. 먼저 '수정사항 Google Sheet에 저장' 버튼을 눌러주세요.")
-                            # [수정] 버튼이 아예 보이지 않도록 하거나, 여기에 disabled된 버튼을 추가할 수 있습니다.
-                            # 여기서는 st.error 메시지만 표시합니다.
-                        else:
-                            # 변경 사항이 없거나 저장된 상태일 때만 다운로드 버튼 표시
-                            if initial_schedule_df is None or month_str_dl is None or df_final_unique_dl is None or df_schedule_dl is None:
-                                st.error("Excel 생성에 필요한 초기 데이터가 없습니다. 페이지를 새로고침 해주세요.")
-                            else:
-                                # --- 스타일 변수 재정의 (로직 유지) ---
-                                if platform.system() == "Windows": font_name = "맑은 고딕"
-                                else: font_name = "Arial"
-                                default_font = Font(name=font_name, size=9)
-                                bold_font = Font(name=font_name, size=9, bold=True)
-                                duty_font = Font(name=font_name, size=9, bold=True, color="FF69B4")
-                                border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-                                color_map = {
-                                        '🔴 빨간색': 'DA9694', '🟠 주황색': 'FABF8F', '🟢 초록색': 'A9D08E',
-                                        '🟡 노란색': 'FFF28F', '🔵 파란색': '95B3D7', '🟣 보라색': 'B1A0C7',
-                                        '기본': 'FFFFFF', '특수근무색': 'D0E0E3'
-                                    }
-                                special_day_fill = PatternFill(start_color='95B3D7', fill_type='solid')
-                                empty_day_fill = PatternFill(start_color='808080', fill_type='solid')
-                                default_day_fill = PatternFill(start_color='FFF2CC', fill_type='solid')
-
-                                # --- 1. 최종본(공유용) Excel 생성 및 다운로드 버튼 ---
-                                excel_data_final = create_final_schedule_excel(
-                                    initial_df=initial_schedule_df,
-                                    edited_df=edited_schedule_df,
-                                    edited_cumulative_df=edited_summary_df,
-                                    df_special=df_special_dl if df_special_dl is not None else pd.DataFrame(),
-                                    df_requests=df_requests_dl if df_requests_dl is not None else pd.DataFrame(),
-                                    closing_dates=closing_dates_dl if closing_dates_dl is not None else [],
-                                    month_str=month_str_dl,
-                                    df_final_unique=df_final_unique_dl,
-                                    df_schedule=df_schedule_dl
-                                )
-                                st.download_button(
-                                    label="📥 스케줄 ver1.0 다운로드",
-                                    data=excel_data_final,
-                                    file_name=f"{month_str_dl} 스케줄 ver1.0.xlsx",
-                                    mime="application/vnd.openxmlformats-officedocument.sheet",
-                                    use_container_width=True,
-                                    type="primary",
-                                    key="download_edited_final"
-                                )
-
-                                # --- 2. 배정 확인용 Excel 생성 및 다운로드 버튼 ---
-                                excel_data_checking = create_checking_schedule_excel(
-                                    initial_df=results.get("df_schedule_for_comparison"), # (C_orig)
-                                    edited_df=edited_schedule_df,
-                                    edited_cumulative_df=edited_summary_df,
-                                    df_special=df_special_dl if df_special_dl is not None else pd.DataFrame(),
-                                    df_requests=df_requests_dl if df_requests_dl is not None else pd.DataFrame(),
-                                    closing_dates=closing_dates_dl if closing_dates_dl is not None else [],
-                                    month_str=month_str_dl
-                                )
-                                st.download_button(
-                                    label="📥 스케줄 ver1.0 다운로드 (배정 확인용)",
-                                    data=excel_data_checking,
-                                    file_name=f"{month_str_dl} 스케줄 ver1.0 (배정 확인용).xlsx",
-                                    mime="application/vnd.openxmlformats-officedocument.sheet",
-                                    use_container_width=True,
-                                    type="secondary",
-                                    key="download_edited_checking"
-                                )
-                    except Exception as e:
-                        st.error(f"Excel 파일 생성 또는 변경 사항 확인 중 오류가 발생했습니다: {e}")
-                        st.exception(e)
-                else:
-                    st.info("🔄 스케줄 데이터 로딩 중...")
\ No newline at end of file
+# 배정 알고리즘과 시트 저장은 백그라운드 작업 하나로 실행하고, 결과는 작업 ID로 저장되어 새로고침 후에도 복원됨
+schedule_job_id = job_runner.current_job_id("schedule_job_id", "schedule")
+if schedule_job_id and st.session_state.get('assignment_results') is None:
+    st.session_state.assigned = True
+
+if st.session_state.get('assigned', False):
+
+    if st.session_state.get('assignment_results') is None:
+        if not schedule_job_id:
+            schedule_job_id = job_runner.get_job_runner().submit(
+                "schedule", run_schedule_assignment_job,
+                month_str, df_master.copy(), df_request.copy(), df_cumulative.copy(), df_supplement_processed.copy(),
+                list(all_names), df_monthly_schedule.copy(), holiday_dates, get_gspread_client(),
+                st.secrets["google_sheet"]["url"], st.session_state.get("profile_page5", False),
+            )
+            job_runner.remember_job("schedule_job_id", schedule_job_id)
+        schedule_job = job_runner.get_job_runner().status(schedule_job_id)
+        if schedule_job and schedule_job["state"] == "done" and schedule_job["result"]:
+            st.session_state.assignment_results = schedule_job["result"]["assignment_results"]
+            st.session_state.output = schedule_job["result"]["output"]
+            if schedule_job["result"]["profile"]:
+                st.session_state["profile_page5_result"] = schedule_job["result"]["profile"]
+
+    month_dt = datetime.strptime(month_str, "%Y년 %m월")
+    next_month_dt = (month_dt + relativedelta(months=1)).replace(day=1)
+    next_month_str = next_month_dt.strftime("%Y년 %-m월")
+    month_start = month_dt.replace(day=1)
+    month_end = (month_start + relativedelta(months=1)) - timedelta(days=1)
+
+    if st.session_state.get('assigned', False):
+        results = st.session_state.get('assignment_results', {})
+        schedule_job_id = job_runner.current_job_id("schedule_job_id", "schedule")
+        if schedule_job_id:
+            job_runner.render_job_progress(schedule_job_id, "근무 배정 및 Google Sheets 저장")
+        if results:
+            with st.expander("🔍 배정 과정 상세 로그 보기", expanded=True):
+                st.markdown("**📋 요청사항 반영 로그**"); st.code("\n".join(results.get("request_logs", [])) if results.get("request_logs") else "반영된 요청사항(휴가/학회)이 없습니다.", language='text')
+                st.markdown("---"); st.markdown("**📞 오전당직(온콜) 배정 로그**"); st.code("\n".join(results.get("oncall_logs", [])) if results.get("oncall_logs") else "모든 오전당직(온콜)이 누적 횟수에 맞게 정상 배정되었습니다.", language='text')
+
+            instrumentation.render_profile("profile_page5")
+            assignment_editors_fragment(results, month_str, next_month_str)
\ No newline at end of file
@@ -17,12 +17,16 @@ from gspread.exceptions import WorksheetNotFound, APIError
 
 # 엑셀 생성을 위한 라이브러리
 import io
-import openpyxl
-from openpyxl.styles import PatternFill, Alignment, Font, Border, Side
-from openpyxl.comments import Comment
+import lazy_imports
+# openpyxl은 엑셀 내보내기 때 처음 불러옵니다. (페이지 첫 실행 시간 단축)
+openpyxl = lazy_imports.lazy_module("openpyxl")
+PatternFill, Alignment, Font, Border, Side = lazy_imports.lazy_attrs("openpyxl.styles", "PatternFill", "Alignment", "Font", "Border", "Side")
+Comment = lazy_imports.lazy_attrs("openpyxl.comments", "Comment")
 
 # 사용자 정의 메뉴 모듈
 import menu
+import swap_engine
+import flash
 import os
 st.session_state.current_page = os.path.basename(__file__)
 
@@ -32,9 +36,7 @@ menu.menu()
 
 # --- 로그인 확인 ---
 if not st.session_state.get("login_success", False):
-    st.warning("⚠️ Home 페이지에서 먼저 로그인해주세요.")
-    st.error("1초 후 Home 페이지로 돌아갑니다...")
-    time.sleep(1)
+    flash.flash("Home 페이지에서 먼저 로그인해주세요.", "warning")
     st.switch_page("Home.py")
     st.stop()
 
@@ -272,34 +274,41 @@ def load_data(month_str, schedule_sheet_name):
 # --- ▲▲▲ [교체] load_data 함수 교체 끝 ▲▲▲ ---
 
 def apply_schedule_swaps(original_schedule_df, swap_requests_df):
-    df_modified = original_schedule_df.copy(); change_log = []; messages = []; applied_count = 0
-    for _, request_row in swap_requests_df.iterrows():
-        try:
-            change_request_str = str(request_row.get('변경 요청', '')).strip(); schedule_info_str = str(request_row.get('변경 요청한 스케줄', '')).strip()
-            if '➡️' not in change_request_str: continue
-            person_before, person_after = [p.strip() for p in change_request_str.split('➡️')]; date_match = re.match(r'(\d{4}-\d{2}-\d{2}) \((.+)\)', schedule_info_str)
-            if not date_match: continue
-            date_part, time_period = date_match.groups(); date_obj = datetime.strptime(date_part, '%Y-%m-%d').date(); formatted_date_in_df = f"{date_obj.month}월 {date_obj.day}일"
-            target_rows = df_modified[df_modified['날짜'] == formatted_date_in_df]
-            if target_rows.empty: continue
-            target_row_idx = target_rows.index[0]; on_call_person = str(df_modified.at[target_row_idx, '오전당직(온콜)']).strip()
-            if time_period == '오전당직(온콜)' or person_before == on_call_person:
-                cols_with_person_before = [c for c in df_modified.columns if str(df_modified.at[target_row_idx, c]).strip() == person_before]
-                if not cols_with_person_before: messages.append(('error', f"❌ {schedule_info_str} - '{person_before}' 당직 근무가 없습니다.")); continue
-                cols_with_person_after = [c for c in df_modified.columns if str(df_modified.at[target_row_idx, c]).strip() == person_after]
-                for col in cols_with_person_before: df_modified.at[target_row_idx, col] = person_after
-                for col in cols_with_person_after: df_modified.at[target_row_idx, col] = person_before
-                change_log.append({'날짜': f"{formatted_date_in_df} (당직 맞교환)", '변경 전': person_before, '변경 후': person_after})
-            else:
-                target_cols = [str(i) for i in range(1, 18)] if time_period == '오전' else [f'오후{i}' for i in range(1, 10)]; personnel_in_period = {str(df_modified.at[target_row_idx, c]).strip() for c in target_cols if c in df_modified.columns}
-                if person_after in personnel_in_period: messages.append(('warning', f"🟡 {schedule_info_str} - '{person_after}'님은 이미 해당 시간 근무자입니다.")); continue
-                found_and_replaced = False
-                for col in target_cols:
-                    if col in df_modified.columns and str(df_modified.at[target_row_idx, col]).strip() == person_before:
-                        df_modified.at[target_row_idx, col] = person_after; change_log.append({'날짜': f"{schedule_info_str}", '변경 전': person_before, '변경 후': person_after}); found_and_replaced = True; break
-                if not found_and_replaced: messages.append(('error', f"❌ {schedule_info_str} - '{person_before}' 근무자를 찾을 수 없습니다.")); continue
-            applied_count += 1
-        except Exception as e: messages.append(('error', f"요청 처리 중 오류: {e}"))
+    """변경 요청을 한 번에 파싱하고, (날짜, 시간대)별 충돌/순환을 걸러낸 순서로 적용합니다. (swap_engine)"""
+    change_log = []; messages = []; applied_count = 0
+    requests = swap_engine.parse_swap_requests(swap_requests_df, '변경 요청한 스케줄')
+    grid_cols = [c for c in original_schedule_df.columns if c not in ('날짜', '요일')]
+    on_call_by_date = dict(zip(original_schedule_df['날짜'].astype(str)[::-1], original_schedule_df['오전당직(온콜)'].astype(str).str.strip()[::-1])) if '오전당직(온콜)' in original_schedule_df.columns else {}
+
+    def group_of(req):
+        if req['슬롯'] == '오전당직(온콜)' or req['변경 전'] == on_call_by_date.get(req['날짜표시']): return (req['날짜표시'], '오전당직(온콜)')
+        return (req['날짜표시'], '오전' if req['슬롯'] == '오전' else '오후')
+
+    def apply_one(grid, req):
+        person_before, person_after, schedule_info_str, time_period, formatted_date_in_df = req['변경 전'], req['변경 후'], req['슬롯 정보'], req['슬롯'], req['날짜표시']
+        target_row_idx = grid.row(formatted_date_in_df)
+        if target_row_idx is None: return swap_engine.REJECTED, None
+        on_call_person = grid.get(target_row_idx, '오전당직(온콜)') if '오전당직(온콜)' in grid.col_index else ''
+        if time_period == '오전당직(온콜)' or person_before == on_call_person:
+            cols_with_person_before = grid.find(target_row_idx, person_before)
+            if not cols_with_person_before: return swap_engine.REJECTED, ('error', f"❌ {schedule_info_str} - '{person_before}' 당직 근무가 없습니다.")
+            cols_with_person_after = grid.find(target_row_idx, person_after)
+            for col in cols_with_person_before: grid.set(target_row_idx, col, person_after)
+            for col in cols_with_person_after: grid.set(target_row_idx, col, person_before)
+            return swap_engine.APPLIED, {'날짜': f"{formatted_date_in_df} (당직 맞교환)", '변경 전': person_before, '변경 후': person_after}
+        target_cols = [str(i) for i in range(1, 18)] if time_period == '오전' else [f'오후{i}' for i in range(1, 10)]
+        if person_after in grid.people(target_row_idx, target_cols): return swap_engine.REJECTED, ('warning', f"🟡 {schedule_info_str} - '{person_after}'님은 이미 해당 시간 근무자입니다.")
+        matched_cols = grid.find(target_row_idx, person_before, target_cols)
+        if not matched_cols: return swap_engine.REJECTED, ('error', f"❌ {schedule_info_str} - '{person_before}' 근무자를 찾을 수 없습니다.")
+        grid.set(target_row_idx, matched_cols[0], person_after)
+        return swap_engine.APPLIED, {'날짜': f"{schedule_info_str}", '변경 전': person_before, '변경 후': person_after}
+
+    df_modified, results = swap_engine.apply_swap_requests(original_schedule_df, requests, grid_cols, apply_one, group_of=group_of)
+    for req, status, value in results:
+        if status == swap_engine.APPLIED: applied_count += 1; change_log.append(value)
+        elif status == swap_engine.FAILED: messages.append(('error', f"요청 처리 중 오류: {value}"))
+        elif isinstance(value, tuple): messages.append(value)
+        elif value: messages.append(('warning', f"🟡 {req['슬롯 정보']} - {req['요청']} 적용 건너뜀: {value}"))
     if applied_count > 0: messages.insert(0, ('success', f"✅ 총 {applied_count}건의 스케줄 변경 요청이 반영되었습니다."))
     elif not messages: messages.append(('info', "새롭게 적용할 스케줄 변경 요청이 없습니다."))
     st.session_state["change_log"] = change_log; return df_modified, messages
@@ -351,8 +360,7 @@ def delete_schedule_version(month_str, sheet_to_delete):
             except WorksheetNotFound:
                 st.warning(f"'{cum_sheet_name}' 시트를 찾을 수 없어 삭제를 건너뜁니다.")
         
-        st.success("선택한 버전이 성공적으로 삭제되었습니다.")
-        time.sleep(2)
+        flash.flash("선택한 버전이 성공적으로 삭제되었습니다.")
         
         st.cache_data.clear()
         st.cache_resource.clear()
@@ -1103,8 +1111,7 @@ def save_schedule(month_str, sheet_name, df_to_save, df_cum_to_save):
             st.session_state.save_successful = True # (기존)
             st.session_state.last_saved_sheet_name = sheet_name # (기존)
             
-            st.success(f"🎉 스케줄과 익월 누적 데이터가 '{sheet_name}' 버전에 맞게 저장되었습니다.")
-            time.sleep(1)
+            flash.flash(f"스케줄과 익월 누적 데이터가 '{sheet_name}' 버전에 맞게 저장되었습니다.")
             st.cache_data.clear()
             st.cache_resource.clear()
             st.rerun()
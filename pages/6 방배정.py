@@ -1,4 +1,5 @@
 import re
+import copy
 import streamlit as st
 import pandas as pd
 import gspread
@@ -8,10 +9,20 @@ import random
 import time
 from datetime import datetime, date, timedelta
 from io import BytesIO
-import openpyxl
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-from openpyxl.comments import Comment
+import lazy_imports
+# openpyxl은 엑셀 내보내기 때 처음 불러옵니다. (페이지 첫 실행 시간 단축)
+openpyxl = lazy_imports.lazy_module("openpyxl")
+PatternFill, Alignment, Font, Border, Side = lazy_imports.lazy_attrs("openpyxl.styles", "PatternFill", "Alignment", "Font", "Border", "Side")
+Comment = lazy_imports.lazy_attrs("openpyxl.comments", "Comment")
 import menu
+import flash
+import sheet_ops
+import schedule_schema
+import schedule_grid
+import swap_engine
+import versioned_memo
+import job_runner
+import instrumentation
 import numpy as np
 from dateutil.relativedelta import relativedelta
 import platform
@@ -25,9 +36,7 @@ menu.menu()
 
 # 로그인 체크 및 자동 리디렉션
 if not st.session_state.get("login_success", False):
-    st.warning("⚠️ Home 페이지에서 먼저 로그인해주세요.")
-    st.error("1초 후 Home 페이지로 돌아갑니다...")
-    time.sleep(1)
+    flash.flash("Home 페이지에서 먼저 로그인해주세요.", "warning")
     st.switch_page("Home.py")
     st.stop()
 
@@ -141,12 +150,12 @@ def update_sheet_with_retry(worksheet, data, retries=5, delay=10):
             return True
         except Exception as e:
             if "Quota exceeded" in str(e):
-                st.warning(f"API 쿼터 초과, {delay}초 후 재시도 ({attempt+1}/{retries})")
+                job_runner.ui.warning(f"API 쿼터 초과, {delay}초 후 재시도 ({attempt+1}/{retries})")
                 time.sleep(delay)
             else:
-                st.error(f"업데이트 실패, {delay}초 후 재시도 ({attempt+1}/{retries}): {str(e)}")
+                job_runner.ui.error(f"업데이트 실패, {delay}초 후 재시도 ({attempt+1}/{retries}): {str(e)}")
                 time.sleep(delay)
-    st.error("Google Sheets 업데이트 실패: 재시도 횟수 초과")
+    job_runner.ui.error("Google Sheets 업데이트 실패: 재시도 횟수 초과")
     return False
 
 # --- find_latest_version 함수를 아래 코드로 완전히 교체하세요 ---
@@ -235,6 +244,7 @@ def check_final_sheets_exist(month_str, next_month_str):
         return False # API 오류 등 기타 문제
 
 # 데이터 로드 함수
+@instrumentation.timed("시트 로드")
 def load_data_page6_no_cache(month_str):
     try:
         gc = get_gspread_client()
@@ -370,7 +380,7 @@ def load_schedule_data(month_str):
         # ▲▲▲ [핵심 수정] ▲▲▲
             
         df.fillna('', inplace=True)
-        df['날짜_dt'] = pd.to_datetime(YEAR_STR + '년 ' + df['날짜'].astype(str), format='%Y년 %m월 %d일', errors='coerce')
+        df['날짜_dt'] = schedule_schema.parse_schedule_dates(df['날짜'], YEAR_STR)
         df.dropna(subset=['날짜_dt'], inplace=True)
         
         return df, latest_version_name
@@ -388,8 +398,17 @@ def load_schedule_data(month_str):
         st.stop()
 
 # 근무 가능 일자 계산
-@st.cache_data(show_spinner=False)
-def get_user_available_dates(name, df_schedule, month_start, month_end, month_str):
+def get_user_available_dates(name, df_schedule, month_start, month_end, month_str, data_version):
+    """data_version(스케줄을 불러올 때 받은 버전 키)과 이름·기간별로 한 번만 계산합니다. (df_schedule은 해시하지 않음)"""
+    available_dates = versioned_memo.memoize(
+        data_version, ("available_dates", name, month_start, month_end, month_str),
+        lambda: _compute_user_available_dates(name, df_schedule, month_start, month_end, month_str))
+    if available_dates is None:
+        st.warning(f"'{name}'님은 이번 달 근무자로 등록되어 있지 않습니다.")
+        return []
+    return available_dates
+
+def _compute_user_available_dates(name, df_schedule, month_start, month_end, month_str):
     available_dates = []
     weekday_map = {0: "월", 1: "화", 2: "수", 3: "목", 4: "금", 5: "토", 6: "일"}
     
@@ -400,8 +419,7 @@ def get_user_available_dates(name, df_schedule, month_start, month_end, month_st
     all_personnel = set(p.strip() for col in personnel_columns if col in df_schedule.columns for p in df_schedule[col].dropna().astype(str))
 
     if name not in all_personnel:
-        st.warning(f"'{name}'님은 이번 달 근무자로 등록되어 있지 않습니다.")
-        return []
+        return None
 
     for _, row in df_schedule.iterrows():
         date_str = row['날짜']
@@ -446,126 +464,111 @@ def create_df_schedule_md(df_schedule):
     if '오전당직(온콜)' in df_schedule.columns:
         df_schedule_md['오전당직(온콜)'] = df_schedule['오전당직(온콜)'].apply(clean_name)
 
-    # 행별로 근무자 재배치
-    for idx, row in df_schedule.iterrows():
-        oncall_person = clean_name(str(row.get('오전당직(온콜)', '')))
-        
-        # 오전 근무자 (이름 정리 및 중복 제거)
-        am_original_cols = [str(i) for i in range(1, 13)]
-        am_personnel_list = [
-            clean_name(row[col]) for col in am_original_cols
-            if col in df_schedule.columns and clean_name(row[col]) and clean_name(row[col]) != oncall_person
-        ]
-        am_personnel_unique = list(dict.fromkeys(am_personnel_list))
-        am_display_cols = [str(i) for i in range(1, 12)]
-        for i, col in enumerate(am_display_cols):
-            df_schedule_md.at[idx, col] = am_personnel_unique[i] if i < len(am_personnel_unique) else ''
-        
-        # 오후 근무자 (이름 정리 및 중복 제거)
-        pm_original_cols = [f'오후{i}' for i in range(1, 6)]
-        pm_personnel_list = [
-            clean_name(row[col]) for col in pm_original_cols
-            if col in df_schedule.columns and clean_name(row[col]) and clean_name(row[col]) != oncall_person
-        ]
-        pm_personnel_unique = list(dict.fromkeys(pm_personnel_list))
-        pm_display_cols = [f'오후{i}' for i in range(1, 5)]
-        for i, col in enumerate(pm_display_cols):
-            df_schedule_md.at[idx, col] = pm_personnel_unique[i] if i < len(pm_personnel_unique) else ''
-            
+    # 근무자 칸을 long 표로 펼쳐 이름 정리 → 당직자·빈 칸·중복 제거 → 행별 순위로 다시 격자화
+    oncall = df_schedule['오전당직(온콜)'] if '오전당직(온콜)' in df_schedule.columns else pd.Series('', index=df_schedule.index)
+    oncall_by_row = oncall.astype(str).map(clean_name)
+    for original_cols, slot_cols in [([str(i) for i in range(1, 13)], [str(i) for i in range(1, 12)]),
+                                     ([f'오후{i}' for i in range(1, 6)], [f'오후{i}' for i in range(1, 5)])]:
+        df_long = schedule_grid.wide_to_long(df_schedule, original_cols, value_name='이름')
+        raw_names = df_long['이름'].astype(object)
+        cleaned = {value: clean_name(value) for value in raw_names.dropna().unique()}
+        df_long['이름'] = raw_names.map(cleaned).fillna('')
+        df_long = df_long[df_long['이름'].ne('') & df_long['이름'].ne(df_long['행'].map(oncall_by_row))]
+        df_long = schedule_grid.rank_within(df_long.drop_duplicates(['행', '이름']), ['행'])
+        df_long['열'] = df_long['순위'].map(dict(enumerate(slot_cols)))
+        grid = schedule_grid.long_to_wide(df_long, '행', '열', '이름', index=df_schedule.index, columns=slot_cols)
+        df_schedule_md[slot_cols] = grid
+
     return df_schedule_md
 
 # ✂️ 복사 & 붙여넣기용 최종 apply_schedule_swaps 함수
 def apply_schedule_swaps(original_schedule_df, swap_requests_df, special_df):
-    df_modified = original_schedule_df.copy()
-    applied_count = 0
+    """변경 요청을 한 번에 파싱하고, (날짜, 시간대)별 충돌/순환을 걸러낸 순서로 적용합니다. (swap_engine)"""
     total_requests = len(swap_requests_df)
     swapped_assignments = st.session_state.get("swapped_assignments", set())
     batch_change_log = []
     messages = []
 
-    for _, request_row in swap_requests_df.iterrows():
-        try:
-            change_request_str = str(request_row.get('변경 요청', '')).strip()
-            schedule_info_str = str(request_row.get('변경 요청한 스케줄', '')).strip()
-            formatted_schedule_info = format_sheet_date_for_display(schedule_info_str)
-
-            if '➡️' not in change_request_str: continue
+    am_cols = [str(i) for i in range(1, 18)]
+    pm_cols = [f'오후{i}' for i in range(1, 10)]
+    all_cols = am_cols + ['오전당직(온콜)'] + pm_cols
+    requests = swap_engine.parse_swap_requests(swap_requests_df, '변경 요청한 스케줄')
+
+    # 원본 표 기준 날짜별 오전당직자: 당직자가 넘기는 요청은 그날 전체 맞교환이므로 별도 그룹으로 묶습니다.
+    on_call_by_date = {}
+    if '오전당직(온콜)' in original_schedule_df.columns:
+        for label, person in zip(original_schedule_df['날짜'].astype(str), original_schedule_df['오전당직(온콜)']):
+            on_call_by_date.setdefault(label, clean_name(person))
+
+    def group_of(req):
+        if req['변경 전'] == on_call_by_date.get(req['날짜표시']):
+            return (req['날짜표시'], '오전당직(온콜)')
+        return (req['날짜표시'], '오전' if req['슬롯'] == '오전' else '오후')
+
+    def apply_one(grid, req):
+        person_before, person_after = req['변경 전'], req['변경 후']
+        change_request_str = req['요청']
+        formatted_schedule_info = format_sheet_date_for_display(req['슬롯 정보'])
+        formatted_date_in_df = req['날짜표시']
+        date_obj = req['날짜']
+        time_period_from_request = req['슬롯']
+        target_row_idx = grid.row(formatted_date_in_df)
+        if target_row_idx is None:
+            return swap_engine.REJECTED, None
+
+        on_call_person = grid.get(target_row_idx, '오전당직(온콜)') if '오전당직(온콜)' in grid.col_index else ""
+        if person_before == on_call_person:
+            cols_with_person_before = grid.find(target_row_idx, person_before)
+            cols_with_person_after = grid.find(target_row_idx, person_after)
+
+            if not cols_with_person_before:
+                return swap_engine.REJECTED, ('error', f"❌ {formatted_schedule_info} - {change_request_str} 적용 실패: {formatted_date_in_df}에 '{person_before}' 당직 근무가 배정되어 있지 않습니다.")
+
+            for col in cols_with_person_before: grid.set(target_row_idx, col, person_after)
+            for col in cols_with_person_after: grid.set(target_row_idx, col, person_before)
 
-            person_before, person_after = [p.strip() for p in change_request_str.split('➡️')]
-            date_match = re.match(r'(\d{4}-\d{2}-\d{2}) \((.+)\)', schedule_info_str)
-            if not date_match: continue
+            # (날짜, 시간, 변경 전, 변경 후) 4-tuple로 저장
+            swapped_assignments.add((formatted_date_in_df, '오전', person_before, person_after))
+            swapped_assignments.add((formatted_date_in_df, '오후', person_before, person_after))
+            swapped_assignments.add((formatted_date_in_df, '오전당직(온콜)', person_before, person_after))
+            return swap_engine.APPLIED, {
+                '날짜': f"{formatted_date_in_df} ({'월화수목금토일'[date_obj.weekday()]}) - 오전당직 변경",
+                '변경 전 인원': person_before, '변경 후 인원': person_after,
+            }
 
-            date_part, time_period_from_request = date_match.groups()
-            date_obj = datetime.strptime(date_part, '%Y-%m-%d').date()
-            formatted_date_in_df = f"{date_obj.month}월 {date_obj.day}일"
-            target_row_indices = df_modified[df_modified['날짜'] == formatted_date_in_df].index
-            if target_row_indices.empty: continue
-            target_row_idx = target_row_indices[0]
+        target_cols = am_cols if time_period_from_request == '오전' else pm_cols
+        matched_cols = grid.find(target_row_idx, person_before, target_cols)
+        if not matched_cols:
+            return swap_engine.REJECTED, ('error', f"❌ {formatted_schedule_info} - {change_request_str} 적용 실패: {formatted_date_in_df} '{time_period_from_request}'에 '{person_before}'님이 배정되어 있지 않습니다.")
 
-            all_cols = [str(i) for i in range(1, 18)] + ['오전당직(온콜)'] + [f'오후{i}' for i in range(1, 10)]
-            available_cols = [col for col in all_cols if col in df_modified.columns]
-            
-            on_call_person = clean_name(df_modified.at[target_row_idx, '오전당직(온콜)'])
-            is_on_call_swap = (person_before == on_call_person)
+        if person_after in grid.people(target_row_idx, target_cols):
+            return swap_engine.REJECTED, ('warning', f"🟡 {formatted_schedule_info} - {change_request_str} 적용 건너뜀: '{person_after}'님은 이미 {formatted_date_in_df} '{time_period_from_request}' 근무에 배정되어 있습니다.")
 
-            if is_on_call_swap:
-                cols_with_person_before = [c for c in available_cols if clean_name(df_modified.at[target_row_idx, c]) == person_before]
-                cols_with_person_after = [c for c in available_cols if clean_name(df_modified.at[target_row_idx, c]) == person_after]
+        for col in matched_cols:
+            grid.set(target_row_idx, col, person_after)
 
-                if not cols_with_person_before:
-                    error_msg = f"❌ {formatted_schedule_info} - {change_request_str} 적용 실패: {formatted_date_in_df}에 '{person_before}' 당직 근무가 배정되어 있지 않습니다."
-                    messages.append(('error', error_msg))
-                    continue
+        # (날짜, 시간, 변경 전, 변경 후) 4-tuple로 저장
+        swapped_assignments.add((formatted_date_in_df, time_period_from_request, person_before, person_after))
+        return swap_engine.APPLIED, {
+            '날짜': f"{formatted_schedule_info}", '변경 전 인원': person_before, '변경 후 인원': person_after,
+        }
 
-                for col in cols_with_person_before: df_modified.at[target_row_idx, col] = person_after
-                for col in cols_with_person_after: df_modified.at[target_row_idx, col] = person_before
-
-                # --- ▼▼▼ [ 1. 핵심 수정 ] ▼▼▼ ---
-                # (날짜, 시간, 변경 전, 변경 후) 4-tuple로 저장
-                swapped_assignments.add((formatted_date_in_df, '오전', person_before, person_after))
-                swapped_assignments.add((formatted_date_in_df, '오후', person_before, person_after))
-                swapped_assignments.add((formatted_date_in_df, '오전당직(온콜)', person_before, person_after))
-                # --- ▲▲▲ [ 수정 완료 ] ▲▲▲
-
-                batch_change_log.append({
-                    '날짜': f"{formatted_date_in_df} ({'월화수목금토일'[date_obj.weekday()]}) - 오전당직 변경",
-                    '변경 전 인원': person_before, '변경 후 인원': person_after,
-                })
-                applied_count += 1
-                continue
+    df_modified, results = swap_engine.apply_swap_requests(
+        original_schedule_df, requests, all_cols, apply_one, group_of=group_of, clean=clean_name
+    )
 
-            target_cols = [str(i) for i in range(1, 18)] if time_period_from_request == '오전' else [f'오후{i}' for i in range(1, 10)]
-            available_target_cols = [col for col in target_cols if col in df_modified.columns]
-            
-            matched_cols = [col for col in available_target_cols if clean_name(df_modified.loc[target_row_idx, col]) == person_before]
-            if not matched_cols:
-                error_msg = f"❌ {formatted_schedule_info} - {change_request_str} 적용 실패: {formatted_date_in_df} '{time_period_from_request}'에 '{person_before}'님이 배정되어 있지 않습니다."
-                messages.append(('error', error_msg))
-                continue
-            
-            personnel_in_target_period = {clean_name(df_modified.loc[target_row_idx, col]) for col in available_target_cols}
-            if person_after in personnel_in_target_period:
-                warning_msg = f"🟡 {formatted_schedule_info} - {change_request_str} 적용 건너뜀: '{person_after}'님은 이미 {formatted_date_in_df} '{time_period_from_request}' 근무에 배정되어 있습니다."
-                messages.append(('warning', warning_msg))
-                continue
-            
-            for col in matched_cols:
-                df_modified.at[target_row_idx, col] = person_after
-            
-            # --- ▼▼▼ [ 2. 핵심 수정 ] ▼▼▼ ---
-            # (날짜, 시간, 변경 전, 변경 후) 4-tuple로 저장
-            swapped_assignments.add((formatted_date_in_df, time_period_from_request, person_before, person_after))
-            # --- ▲▲▲ [ 수정 완료 ] ▲▲▲
-            
-            batch_change_log.append({
-                '날짜': f"{formatted_schedule_info}", '변경 전 인원': person_before, '변경 후 인원': person_after,
-            })
+    applied_count = 0
+    for req, status, value in results:
+        if status == swap_engine.APPLIED:
             applied_count += 1
+            batch_change_log.append(value)
+        elif status == swap_engine.FAILED:
+            messages.append(('error', f"요청 처리 중 오류 발생: {type(value).__name__} - {str(value)}"))
+        elif isinstance(value, tuple):
+            messages.append(value)
+        elif value:
+            messages.append(('warning', f"🟡 {format_sheet_date_for_display(req['슬롯 정보'])} - {req['요청']} 적용 건너뜀: {value}"))
 
-        except Exception as e:
-            messages.append(('error', f"요청 처리 중 오류 발생: {type(e).__name__} - {str(e)}"))
-            continue
-    
     if applied_count > 0 or messages:
         summary = f"✅ 총 {total_requests}건 중 {applied_count}건의 스케줄 변경 요청이 성공적으로 반영되었습니다."
         messages.insert(0, ('success', summary))
@@ -628,6 +631,7 @@ def load_special_schedules(month_str):
         st.error(f"토요/휴일 데이터 로드 중 오류 발생: {str(e)}")
         return pd.DataFrame()
 
+@instrumentation.timed("Excel 생성", page="6 방배정.py")
 def generate_excel_output(df_room, stats_df, columns, special_dates, special_df, date_cache, request_cells, swapped_assignments, morning_duty_slot, month_str, change_log_map=None):
     """
     [수정됨]
@@ -954,6 +958,7 @@ with col_btn:
         if "assignment_results" in st.session_state:
             del st.session_state["assignment_results"]
         st.session_state.show_assignment_results = False # 결과 보기 스위치 끄기
+        job_runner.forget_job("room_job_id")
         
         st.rerun()
 
@@ -1175,7 +1180,7 @@ else:
                                             st.info(f"ℹ️ '{sheet_name}' 시트가 이미 존재하지 않습니다.")
                                     
                                     if deleted_count > 0:
-                                        st.info("초기화가 완료되었습니다. 페이지를 새로고침합니다.")
+                                        flash.flash("초기화가 완료되었습니다. 페이지를 새로고침합니다.", "info")
                                         st.session_state["data_loaded"] = False
                                         st.cache_data.clear()
                                         keys_to_clear = [
@@ -1187,7 +1192,6 @@ else:
                                             if key in st.session_state:
                                                 del st.session_state[key]
                                         st.session_state.show_assignment_results = False
-                                        time.sleep(2)
                                         st.rerun()
                                     else:
                                         st.warning("삭제할 '최종' 시트가 없습니다.")
@@ -1218,6 +1222,7 @@ if not st.session_state.get("data_loaded", False):
         st.session_state["df_schedule_md"] = create_df_schedule_md(st.session_state["df_schedule"])
         st.session_state["df_schedule_md_initial"] = st.session_state["df_schedule_md"].copy()
         st.session_state["loaded_version"] = loaded_version # 버전 정보 세션에 저장
+        st.session_state["schedule_data_version"] = versioned_memo.new_version(loaded_version or month_str)
 
         special_schedules_data = []
         special_dates_data = set()
@@ -1485,86 +1490,95 @@ if "batch_apply_messages" in st.session_state and st.session_state["batch_apply_
     # 메시지를 표시한 후 세션 상태에서 제거
     del st.session_state["batch_apply_messages"]
 
-# 데이터 에디터 UI
-edited_df_md = st.data_editor(df_to_display, use_container_width=True, key="schedule_editor", disabled=['날짜', '요일'])
+@st.fragment
+def schedule_editor_fragment(df_to_display):
+    """스케줄 편집기와 변경사항 미리보기. 셀을 고치면 페이지 전체 대신 이 부분만 다시 실행됩니다.
 
-# --- 실시간 변경사항 로그 ---
-st.write(" ")
-st.caption("📝 변경사항 미리보기")
-
-# 1. 수동 변경사항 계산
-base_df_for_manual_diff = st.session_state.get("df_schedule_md_modified", st.session_state.get("df_schedule_md_initial"))
-manual_change_log = []
-oncall_warning_messages = []
-if not edited_df_md.equals(base_df_for_manual_diff):
-    diff_indices = np.where(edited_df_md.ne(base_df_for_manual_diff))
-    for row_idx, col_idx in zip(diff_indices[0], diff_indices[1]):
-        date_str_raw = edited_df_md.iloc[row_idx, 0]
-        col_name = edited_df_md.columns[col_idx]
-        old_value = base_df_for_manual_diff.iloc[row_idx, col_idx]
-        new_value = edited_df_md.iloc[row_idx, col_idx]
-        try:
-            original_row = st.session_state["df_schedule_original"][st.session_state["df_schedule_original"]['날짜'] == date_str_raw].iloc[0]
-            weekday = original_row['요일']
-        except IndexError:
-            weekday = ''
-        if col_name == '오전당직(온콜)':
-            time_period = '오전당직'
-            
-            # --- ▼▼▼ [경고 메시지 생성 로직 추가] ▼▼▼ ---
-            old_val_str = str(old_value).strip()
-            new_val_str = str(new_value).strip()
-            
-            # 1. 값이 둘 다 있는 경우 (A -> B)
-            if old_val_str and new_val_str:
-                msg = f"• {date_str_raw}: '{old_val_str}' 님의 오전당직 누적 -1, '{new_val_str}' 님의 누적 +1"
-                oncall_warning_messages.append(msg)
-            # 2. 값 B가 비어있는 경우 (A -> 빈 값)
-            elif old_val_str:
-                msg = f"• {date_str_raw}: '{old_val_str}' 님의 오전당직 누적 -1"
-                oncall_warning_messages.append(msg)
-            # 3. 값 A가 비어있는 경우 (빈 값 -> B)
-            elif new_val_str:
-                msg = f"• {date_str_raw}: '{new_val_str}' 님의 오전당직 누적 +1"
-                oncall_warning_messages.append(msg)
-            # --- ▲▲▲ [추가 완료] ▲▲▲ ---
-
-        elif col_name.startswith('오후'):
-            time_period = '오후'
-        else:
-            time_period = '오전'
-        # ▲▲▲ [수정 완료] ▲▲▲
+    페이지 전체가 실행될 때 반환하는 편집 결과를 아래 방배정/저장 로직이 사용합니다.
+    """
+    # 데이터 에디터 UI
+    edited_df_md = st.data_editor(df_to_display, use_container_width=True, key="schedule_editor", disabled=['날짜', '요일'])
+
+    # --- 실시간 변경사항 로그 ---
+    st.write(" ")
+    st.caption("📝 변경사항 미리보기")
+
+    # 1. 수동 변경사항 계산
+    base_df_for_manual_diff = st.session_state.get("df_schedule_md_modified", st.session_state.get("df_schedule_md_initial"))
+    manual_change_log = []
+    oncall_warning_messages = []
+    if not edited_df_md.equals(base_df_for_manual_diff):
+        diff_indices = np.where(edited_df_md.ne(base_df_for_manual_diff))
+        for row_idx, col_idx in zip(diff_indices[0], diff_indices[1]):
+            date_str_raw = edited_df_md.iloc[row_idx, 0]
+            col_name = edited_df_md.columns[col_idx]
+            old_value = base_df_for_manual_diff.iloc[row_idx, col_idx]
+            new_value = edited_df_md.iloc[row_idx, col_idx]
+            try:
+                original_row = st.session_state["df_schedule_original"][st.session_state["df_schedule_original"]['날짜'] == date_str_raw].iloc[0]
+                weekday = original_row['요일']
+            except IndexError:
+                weekday = ''
+            if col_name == '오전당직(온콜)':
+                time_period = '오전당직'
+
+                # --- ▼▼▼ [경고 메시지 생성 로직 추가] ▼▼▼ ---
+                old_val_str = str(old_value).strip()
+                new_val_str = str(new_value).strip()
+
+                # 1. 값이 둘 다 있는 경우 (A -> B)
+                if old_val_str and new_val_str:
+                    msg = f"• {date_str_raw}: '{old_val_str}' 님의 오전당직 누적 -1, '{new_val_str}' 님의 누적 +1"
+                    oncall_warning_messages.append(msg)
+                # 2. 값 B가 비어있는 경우 (A -> 빈 값)
+                elif old_val_str:
+                    msg = f"• {date_str_raw}: '{old_val_str}' 님의 오전당직 누적 -1"
+                    oncall_warning_messages.append(msg)
+                # 3. 값 A가 비어있는 경우 (빈 값 -> B)
+                elif new_val_str:
+                    msg = f"• {date_str_raw}: '{new_val_str}' 님의 오전당직 누적 +1"
+                    oncall_warning_messages.append(msg)
+                # --- ▲▲▲ [추가 완료] ▲▲▲ ---
+
+            elif col_name.startswith('오후'):
+                time_period = '오후'
+            else:
+                time_period = '오전'
+            # ▲▲▲ [수정 완료] ▲▲▲
+
+            formatted_date_str = f"{date_str_raw} ({weekday.replace('요일', '')}) - {time_period}"
+            manual_change_log.append({
+                '날짜': formatted_date_str, 
+                '변경 전 인원': str(old_value), 
+                '변경 후 인원': str(new_value)
+            })
 
-        formatted_date_str = f"{date_str_raw} ({weekday.replace('요일', '')}) - {time_period}"
-        manual_change_log.append({
-            '날짜': formatted_date_str, 
-            '변경 전 인원': str(old_value), 
-            '변경 후 인원': str(new_value)
-        })
-
-# 2. 일괄 적용 로그와 수동 변경 로그를 합쳐서 표시
-batch_log = st.session_state.get("swapped_assignments_log", [])
-st.session_state["final_change_log"] = batch_log + manual_change_log
-
-if st.session_state["final_change_log"]:
-    log_df = pd.DataFrame(st.session_state["final_change_log"])
-    st.dataframe(log_df, use_container_width=True, hide_index=True)
-else:
-    st.info("기록된 변경사항이 없습니다.")
+    # 2. 일괄 적용 로그와 수동 변경 로그를 합쳐서 표시
+    batch_log = st.session_state.get("swapped_assignments_log", [])
+    st.session_state["final_change_log"] = batch_log + manual_change_log
 
-# --- ▼▼▼ [경고 메시지 표시 로직 추가] (L1448 다음 줄) ▼▼▼ ---
-if oncall_warning_messages:
-    # 리스트의 중복을 제거하고 날짜순으로 정렬
-    sorted_warnings = sorted(list(set(oncall_warning_messages)))
-    
-    # [수정] 경고 메시지에 안내 문구 추가
-    warning_text = (
-        "🔔 **오전당직 누적 수치 변경 알림**\n\n" +
-        "\n".join(sorted_warnings) +
-        "\n\n(하단 '방배정 수행' 버튼을 누르면 이 누적 수치가 최종 저장됩니다.)"
-    )
-    st.warning(warning_text)
-# --- ▲▲▲ [추가 완료] ▲▲▲
+    if st.session_state["final_change_log"]:
+        log_df = pd.DataFrame(st.session_state["final_change_log"])
+        st.dataframe(log_df, use_container_width=True, hide_index=True)
+    else:
+        st.info("기록된 변경사항이 없습니다.")
+
+    # --- ▼▼▼ [경고 메시지 표시 로직 추가] (L1448 다음 줄) ▼▼▼ ---
+    if oncall_warning_messages:
+        # 리스트의 중복을 제거하고 날짜순으로 정렬
+        sorted_warnings = sorted(list(set(oncall_warning_messages)))
+
+        # [수정] 경고 메시지에 안내 문구 추가
+        warning_text = (
+            "🔔 **오전당직 누적 수치 변경 알림**\n\n" +
+            "\n".join(sorted_warnings) +
+            "\n\n(하단 '방배정 수행' 버튼을 누르면 이 누적 수치가 최종 저장됩니다.)"
+        )
+        st.warning(warning_text)
+    # --- ▲▲▲ [추가 완료] ▲▲▲
+    return edited_df_md
+
+edited_df_md = schedule_editor_fragment(df_to_display)
 
 # --- 기존 '변경사항 저장' 버튼 관련 코드를 아래 블록으로 교체하세요 ---
 # --- 1. [수정] 버튼을 표시하기 전에 다음 버전 번호를 미리 계산 ---
@@ -1758,9 +1772,10 @@ def save_to_gsheet(name, categories, selected_save_dates, month_str, worksheet):
         if not name or not categories or not selected_save_dates:
             return None, "input_error"
 
-        # [수정] 시트에서 직접 최신 데이터를 읽어 중복 검사
-        all_requests = worksheet.get_all_records()
-        df_live_requests = pd.DataFrame(all_requests)
+        # 직원들도 같은 시트에 방배정 요청을 추가하므로(3 📝_방배정_요청_입력), 세션 데이터가 아니라 시트의 최신 데이터로 중복 검사
+        df_live_requests = pd.DataFrame(worksheet.get_all_records())
+        if df_live_requests.empty:
+            df_live_requests = pd.DataFrame(columns=["이름", "분류", "날짜정보"])
         
         new_requests_to_append = []
         is_duplicate = False
@@ -1779,12 +1794,12 @@ def save_to_gsheet(name, categories, selected_save_dates, month_str, worksheet):
 
         if not new_requests_to_append:
             # 추가할 요청은 없는데 중복이 발견된 경우
-            return st.session_state["df_room_request"], "duplicate"
+            return df_live_requests, "duplicate"
 
         # [수정] append_rows로 안전하게 새 요청만 추가
         worksheet.append_rows(new_requests_to_append, value_input_option='USER_ENTERED')
         
-        # 성공 후 최신 데이터 다시 로드하여 반환
+        # 성공 후 최신 데이터 다시 로드하여 반환 (그 사이 직원이 추가한 요청도 배정 입력에 포함)
         updated_df = pd.DataFrame(worksheet.get_all_records())
         return updated_df, "success"
 
@@ -1830,8 +1845,8 @@ with col3:
     processed_dates = {}
     date_to_obj_map = {}
     if st.session_state.get("add_name"):
-        st.cache_data.clear()
-        available_dates = get_user_available_dates(st.session_state.add_name, st.session_state["df_schedule"], this_month_start, this_month_end, month_str)
+        available_dates = get_user_available_dates(st.session_state.add_name, st.session_state["df_schedule"], this_month_start, this_month_end, month_str,
+                                                   st.session_state.get("schedule_data_version"))
         for display_str, save_str in available_dates:
             parts = display_str.split(' ')
             date_part, time_part = ' '.join(parts[:-1]), parts[-1]
@@ -1897,9 +1912,8 @@ if add_button_clicked:
 if "add_request_status" in st.session_state:
     status = st.session_state.add_request_status
     if status == "success":
-        st.success("요청이 성공적으로 추가되었습니다.")
+        flash.flash("요청이 성공적으로 추가되었습니다.")
         st.session_state.reset_form = True
-        time.sleep(2)  # 메시지 표시를 위해 2초 대기
     elif status == "duplicate":
         st.warning("이미 존재하는 요청사항입니다.")
     elif status == "input_error":
@@ -1941,27 +1955,17 @@ if not st.session_state["df_room_request"].empty:
             with st.spinner("요청을 삭제하는 중입니다..."):
                 try:
                     worksheet = st.session_state["worksheet_room_request"]
-                    all_requests = worksheet.get_all_records()
-                    
                     # 삭제할 항목 정보를 set으로 만들어 빠른 조회 가능
                     items_to_delete_set = set(selected_items)
                     
-                    # 삭제할 행의 인덱스를 뒤에서부터 찾아서 기록 (삭제 시 인덱스 밀림 방지)
-                    rows_to_delete_indices = []
-                    for i, record in reversed(list(enumerate(all_requests))):
-                        record_str = f"{record.get('분류')} - {record.get('날짜정보')}"
-                        if record.get('이름') == selected_employee and record_str in items_to_delete_set:
-                            rows_to_delete_indices.append(i + 2) # gspread는 1-based, 헤더 포함
-                    
-                    # 찾은 행들을 삭제
-                    if rows_to_delete_indices:
-                        for row_idx in rows_to_delete_indices:
-                            worksheet.delete_rows(row_idx)
+                    # 대상 행을 한 번의 batch_update로 삭제 (아래쪽 행부터 처리되어 인덱스 밀림 없음)
+                    sheet_ops.delete_records(
+                        worksheet,
+                        lambda record: record.get('이름') == selected_employee and f"{record.get('분류')} - {record.get('날짜정보')}" in items_to_delete_set,
+                    )
 
                     st.cache_data.clear()
-                    st.success("요청사항이 삭제되었습니다.")
-                    time.sleep(1.5)
-                    st.rerun()
+                    flash.rerun("요청사항이 삭제되었습니다.")
 
                 except Exception as e:
                     st.error(f"요청 삭제 중 오류 발생: {type(e).__name__} - {e}")
@@ -1976,11 +1980,12 @@ def parse_date_info(date_info):
         parsed_date = date_obj.strftime('%Y-%m-%d')
         return parsed_date, is_morning
     except ValueError as e:
-        st.warning(f"Failed to parse date_info: {date_info}, error: {str(e)}")
+        job_runner.ui.warning(f"Failed to parse date_info: {date_info}, error: {str(e)}")
         return None, False
 
 # 🔼 기존 assign_special_date 함수를 지우고 아래 코드로 교체하세요.
 
+@instrumentation.timed("방 배정 (토요/휴일 1일)", page="6 방배정.py")
 def assign_special_date(personnel_for_day, date_str, formatted_date, settings, special_df_for_month, df_room_request):
     """
     [수정된 함수]
@@ -2008,7 +2013,7 @@ def assign_special_date(personnel_for_day, date_str, formatted_date, settings, s
             if not duty_person_row.empty:
                 duty_person = duty_person_row['당직'].iloc[0]
         except Exception as e:
-            st.warning(f"당직자 정보 조회 중 오류: {e}")
+            job_runner.ui.warning(f"당직자 정보 조회 중 오류: {e}")
 
     # 1. 당직 인원 우선 배정
     if duty_person and duty_person in personnel_for_day and duty_room and duty_room != "선택 안 함":
@@ -2058,6 +2063,7 @@ from collections import Counter
 import random
 import streamlit as st
 
+@instrumentation.timed("방 배정 (평일 1일)", page="6 방배정.py")
 def random_assign(personnel, slots, request_assignments, time_groups, total_stats, morning_personnel, afternoon_personnel, afternoon_duty_counts):
     assignment = [None] * len(slots)
     assigned_personnel_morning = set()
@@ -2093,10 +2099,10 @@ def random_assign(personnel, slots, request_assignments, time_groups, total_stat
                 if (slot in morning_slots and person in morning_personnel) or \
                    (slot in afternoon_slots and person in afternoon_personnel):
                     if slot in morning_slots and person in assigned_personnel_morning:
-                        st.warning(f"중복 배정 방지: {person}은 이미 오전 시간대({slot})에 배정됨")
+                        job_runner.ui.warning(f"중복 배정 방지: {person}은 이미 오전 시간대({slot})에 배정됨")
                         continue
                     if slot in afternoon_slots and person in assigned_personnel_afternoon:
-                        st.warning(f"중복 배정 방지: {person}은 이미 오후 시간대({slot})에 배정됨")
+                        job_runner.ui.warning(f"중복 배정 방지: {person}은 이미 오후 시간대({slot})에 배정됨")
                         continue
 
                     assignment[slot_idx] = person
@@ -2116,9 +2122,9 @@ def random_assign(personnel, slots, request_assignments, time_groups, total_stat
                     elif slot.startswith('13:30') and slot.endswith('_당직'):
                         daily_stats['afternoon_duty'][person] += 1
                 else:
-                    st.warning(f"{date_str}({slot}): {person}님의 방배정 요청 무시됨: 해당 시간대({'오전' if slot in morning_slots else '오후'})에 근무하지 않습니다.")
+                    job_runner.ui.warning(f"{date_str}({slot}): {person}님의 방배정 요청 무시됨: 해당 시간대({'오전' if slot in morning_slots else '오후'})에 근무하지 않습니다.")
             else:
-                st.warning(f"배정 요청 충돌: {person}을 {date_str}({slot})에 배정할 수 없음. 이미 배정됨: {assignment[slot_idx]}")
+                job_runner.ui.warning(f"배정 요청 충돌: {person}을 {date_str}({slot})에 배정할 수 없음. 이미 배정됨: {assignment[slot_idx]}")
 
     # 오후 당직 배정
     afternoon_duty_slot_idx = slots.index(afternoon_duty_slot[0]) if afternoon_duty_slot else None
@@ -2198,7 +2204,7 @@ def random_assign(personnel, slots, request_assignments, time_groups, total_stat
                     best_slot_idx = slot_idx
         
         if best_slot_idx is None or best_person is None:
-            st.warning(f"오전 슬롯 배정 불가: 더 이상 배정 가능한 인원 없음")
+            job_runner.ui.warning(f"오전 슬롯 배정 불가: 더 이상 배정 가능한 인원 없음")
             break
         
         slot = slots[best_slot_idx]
@@ -2244,7 +2250,7 @@ def random_assign(personnel, slots, request_assignments, time_groups, total_stat
                     best_slot_idx = slot_idx
         
         if best_slot_idx is None or best_person is None:
-            st.warning(f"오후 슬롯 배정 불가: 더 이상 배정 가능한 인원 없음")
+            job_runner.ui.warning(f"오후 슬롯 배정 불가: 더 이상 배정 가능한 인원 없음")
             break
         
         slot = slots[best_slot_idx]
@@ -2298,7 +2304,7 @@ def random_assign(personnel, slots, request_assignments, time_groups, total_stat
                     assigned_personnel_morning.add(person)
                 else:
                     assigned_personnel_afternoon.add(person)
-                st.warning(f"슬롯 {slot} 공란 방지: {person} 배정 (스코어: {min_score})")
+                job_runner.ui.warning(f"슬롯 {slot} 공란 방지: {person} 배정 (스코어: {min_score})")
             else:
                 available_personnel = morning_personnel if slot in morning_slots else afternoon_personnel
                 if available_personnel:
@@ -2329,9 +2335,9 @@ def random_assign(personnel, slots, request_assignments, time_groups, total_stat
                             best_person = person
                     
                     person = best_person
-                    st.warning(f"슬롯 {slot} 공란 방지: 이미 배정된 {person} 재배정 (스코어: {min_score})")
+                    job_runner.ui.warning(f"슬롯 {slot} 공란 방지: 이미 배정된 {person} 재배정 (스코어: {min_score})")
                 else:
-                    st.warning(f"슬롯 {slot} 공란 방지 불가: 배정 가능한 인원 없음")
+                    job_runner.ui.warning(f"슬롯 {slot} 공란 방지 불가: 배정 가능한 인원 없음")
                     continue
             
             assignment[slot_idx] = person
@@ -2356,203 +2362,1058 @@ def random_assign(personnel, slots, request_assignments, time_groups, total_stat
 
     return assignment, daily_stats
 
-st.divider()
-st.markdown(f"**➕ 지난달까지의 오후당직 누적 테이블**")
+def count_room_stats(df_room, slot_columns, special_dates, time_slots, morning_duty_slot, month_str):
+    """방배정 표에서 인원별 오전/오후 당직, 이른방/늦은방, 슬롯별 배정 횟수를 셉니다. (토요/휴일 제외)
 
-# 세션 상태에 저장된 원본 df_cumulative_original 데이터를 가져옵니다.
-df_cumulative_original = st.session_state.get("df_cumulative_original", pd.DataFrame())
+    표를 schedule_schema.room_assignments_long으로 펼쳐 (슬롯, 근무자) 코드별로 한 번에 집계하고,
+    슬롯 분류는 슬롯 범주마다 한 번만 판단합니다.
+    """
+    total_stats = {
+        'early': Counter(),
+        'late': Counter(),
+        'morning_duty': Counter(),
+        'afternoon_duty': Counter(),
+        'rooms': {str(i): Counter() for i in range(1, 13)},
+        'time_room_slots': {s: Counter() for s in time_slots.keys()}
+    }
+    room_long = schedule_schema.room_assignments_long(df_room, slot_columns, int(month_str.split('년')[0]), special_dates)
+
+    def slot_kind(slot_name):
+        if slot_name == morning_duty_slot:
+            return 'morning_duty'
+        if slot_name.startswith('13:30') and slot_name.endswith('_당직'):
+            return 'afternoon_duty'
+        if slot_name.startswith('8:30') and '_당직' not in slot_name:
+            return 'early'
+        if slot_name.startswith('10:00'):
+            return 'late'
+        return None
 
-if not df_cumulative_original.empty:
-    # 1. 표시할 데이터 필터링: '오후당직' 행만 선택
-    df_to_display = df_cumulative_original[df_cumulative_original['항목'] == '오후당직누적'].copy()
+    kinds = {slot_name: slot_kind(slot_name) for slot_name in room_long['슬롯'].cat.categories}
+    for (slot_name, person), count in room_long.groupby(['슬롯', '근무자'], observed=True).size().items():
+        count = int(count)
+        if kinds[slot_name]:
+            total_stats[kinds[slot_name]][person] += count
+        if slot_name in total_stats['time_room_slots']:
+            total_stats['time_room_slots'][slot_name][person] += count
+    return total_stats
 
-    # 2. data_editor를 사용하여 편집 가능한 테이블을 만듭니다.
-    edited_df_display = st.data_editor(
-        df_to_display,
-        use_container_width=True,
-        hide_index=True,
-        key="cumulative_editor",
-        disabled=["항목"]  # '항목' 열은 편집 불가
-    )
 
-    if st.button("💾 누적 데이터 저장", type="primary"):
-        with st.spinner("수정된 누적 데이터를 Google Sheets에 저장 중입니다..."):
-            try:
-                # 3. 저장할 전체 데이터 준비
-                # 원본 데이터의 복사본을 만듭니다.
-                df_to_save = df_cumulative_original.copy()
-                
-                # 원본에서 '오후당직누적' 행의 인덱스를 찾습니다.
-                idx_to_update = df_to_save.index[df_to_save['항목'] == '오후당직누적'][0]
+# 방배정 작업이 읽는 세션 상태 키 (제출 시점에 복사해 작업에 넘깁니다)
+ROOM_JOB_SESSION_KEYS = (
+    "time_slots", "time_groups", "memo_rules", "special_schedules", "swapped_assignments",
+    "weekend_room_settings", "df_room_request", "df_schedule_md", "df_schedule_original",
+    "df_cumulative", "df_cumulative_original", "latest_cumulative_name",
+)
 
-                # 해당 인덱스의 행을 편집된 내용으로 교체합니다.
-                df_to_save.iloc[idx_to_update] = edited_df_display.iloc[0]
 
-                # 4. Google Sheets에 저장
-                gc = get_gspread_client()
-                sheet = gc.open_by_url(st.secrets["google_sheet"]["url"])
-                cumulative_sheet_name = st.session_state.get("latest_cumulative_name")
+def run_room_assignment_job(report, inputs, session, gc, sheet_url, profile=False):
+    """[백그라운드 작업] 토요/휴일 근무 동기화 → 방배정 → 통계·로그·Excel 생성 → 결과 시트 저장까지 실행합니다.
 
-                if cumulative_sheet_name:
-                    worksheet_to_update = sheet.worksheet(cumulative_sheet_name)
-                    
-                    data_to_save_list = [df_to_save.columns.tolist()] + df_to_save.fillna('').values.tolist()
-                    
-                    if update_sheet_with_retry(worksheet_to_update, data_to_save_list):
-                        st.success(f"🎉 '{cumulative_sheet_name}' 시트가 성공적으로 업데이트되었습니다.")
-                        # 변경사항 즉시 반영을 위해 세션 데이터도 업데이트
-                        st.session_state["df_cumulative_original"] = df_to_save
-                        df_transposed = df_to_save.set_index('항목')
-                        st.session_state["df_cumulative"] = df_transposed.transpose().reset_index().rename(columns={'index': '이름'})
-                        time.sleep(1.5)
-                        st.rerun()
-                    else:
-                        st.error("Google Sheets 업데이트에 실패했습니다.")
-                else:
-                    st.error("업데이트할 누적 시트의 이름을 찾을 수 없습니다. 페이지를 새로고침 해주세요.")
+    입력은 제출 시점의 스냅샷(inputs: 화면 값, session: 세션 상태 일부)만 쓰고, 화면에 필요한 결과는 반환값으로 돌려줍니다.
+    """
+    room_profiler = instrumentation.start_job_profile(profile)
+    month_str = inputs["month_str"]
+    edited_df_md = inputs["edited_df_md"]
+    special_schedules = inputs["special_schedules"]
+    special_df = inputs["special_df"]
+    valid_requests_df = inputs["valid_requests_df"]
+    applied_messages = inputs["applied_messages"]
+    unapplied_messages = inputs["unapplied_messages"]
+    time_slots = inputs["time_slots"]
+    all_slots = inputs["all_slots"]
+    columns = inputs["columns"]
+    morning_duty_slot = inputs["morning_duty_slot"]
 
-            except Exception as e:
-                st.error(f"저장 중 오류 발생: {e}")
+    try:
+        target_year = int(month_str.split('년')[0])
 
-# afternoon_duty_counts는 기존 로직(transpose된 df_cumulative)을 그대로 사용해야 하므로 이 부분은 수정하지 않습니다.
-df_cumulative = st.session_state.get("df_cumulative", pd.DataFrame())
-if df_cumulative.empty:
-    st.error("❌ 방배정 실패: 누적 데이터를 불러올 수 없습니다.")
-    st.stop()
-    
-afternoon_duty_counts = {row['이름']: int(row['오후당직누적']) for _, row in df_cumulative.iterrows() if pd.notna(row.get('오후당직누적'))}
+        # 토요/휴일 날짜 목록 ('m월 d일' 형식)
+        special_dates_str_set = {s[1] for s in session.get("special_schedules", [])}
 
-# 1. 다음 달 문자열 계산
-target_month_dt = datetime.strptime(month_str, "%Y년 %m월")
-next_month_dt = target_month_dt + relativedelta(months=1)
-next_month_str_for_check = next_month_dt.strftime("%Y년 %-m월")
+        # edited_df_md에서 토요/휴일 데이터만 필터링
+        final_special_df_md = edited_df_md[edited_df_md['날짜'].isin(special_dates_str_set)].copy()
 
-# 2. 캐시된 함수를 호출하여 3개 시트의 존재 여부 확인
-final_sheets_exist = check_final_sheets_exist(month_str, next_month_str_for_check)
+        date_to_personnel_map = {}
+        if not final_special_df_md.empty:
+            # 날짜 형식 변환 및 근무자 목록 생성
+            for _, row in final_special_df_md.iterrows():
+                try:
+                    # 'm월 d일' -> 'YYYY-MM-DD'
+                    date_obj = datetime.strptime(row['날짜'], '%m월 %d일').replace(year=target_year)
+                    date_key = date_obj.strftime('%Y-%m-%d')
 
-st.divider()
+                    # 해당 날짜의 모든 근무자 추출 (중복 제거 및 정렬)
+                    personnel_cols = [str(i) for i in range(1, 12)] + ['오전당직(온콜)'] + [f'오후{i}' for i in range(1, 5)]
+                    personnel_list = [str(row[col]).strip() for col in personnel_cols if col in row and pd.notna(row[col]) and str(row[col]).strip()]
+                    unique_personnel = sorted(list(dict.fromkeys(personnel_list)))
 
-if final_sheets_exist:
-    st.warning(
-        "⚠️ **덮어쓰기 경고**\n\n"
-        "이미 Google Sheets에 다음달의 방배정 결과 시트가 존재합니다.\n\n"
-        "배정을 다시 수행하면 '이어서 작업'되지 않으며, 현재 화면의 설정을 기준으로 **처음부터 다시 계산하여 기존 시트들을 덮어쓰기**합니다."
-    )
+                    date_to_personnel_map[date_key] = ", ".join(unique_personnel)
+                except (ValueError, TypeError):
+                    continue
 
-if st.button("🚀 방배정 수행", type="primary", use_container_width=True):
-    # base_df_for_diff 비교 대상 결정 (현재 화면 기준)
-    base_df_for_diff = st.session_state.get("df_schedule_md_modified", st.session_state.get("df_schedule_md_initial"))
-    # edited_df_md는 data_editor 결과 변수
+        # Google Sheets 업데이트
+        if date_to_personnel_map:
+            sheet = gc.open_by_url(sheet_url)
+            special_sheet_name = f"{target_year}년 토요/휴일 스케줄"
+            worksheet_special = sheet.worksheet(special_sheet_name)
+            df_yearly = pd.DataFrame(worksheet_special.get_all_records())
 
-    manual_change_log_for_save = []
-    swapped_set_for_save = st.session_state.get("swapped_assignments", set())
+            if not df_yearly.empty:
+                # '날짜' 열을 기준으로 '근무' 열 업데이트
+                df_yearly['근무'] = df_yearly.apply(lambda r: date_to_personnel_map.get(str(r['날짜']), r['근무']), axis=1)
 
-    diff_indices = np.where(edited_df_md.ne(base_df_for_diff))
-    for row_idx, col_idx in zip(diff_indices[0], diff_indices[1]):
-        date_str_raw = edited_df_md.iloc[row_idx, 0]
-        col_name = edited_df_md.columns[col_idx]
-        old_value = base_df_for_diff.iloc[row_idx, col_idx]
-        new_value = edited_df_md.iloc[row_idx, col_idx]
-        try:
-            original_row = st.session_state["df_schedule_original"][st.session_state["df_schedule_original"]['날짜'] == date_str_raw].iloc[0]
-            weekday = original_row['요일']
-        except IndexError:
-            weekday = ''
-        time_period = '오후' if col_name.startswith('오후') else '오전'
-        formatted_date_str = f"{date_str_raw} ({weekday.replace('요일', '')}) - {time_period}"
+                if update_sheet_with_retry(worksheet_special, [df_yearly.columns.tolist()] + df_yearly.fillna('').values.tolist()):
+                    # job_runner.ui.success(f"✅ '{special_sheet_name}' 시트의 근무 정보가 성공적으로 동기화되었습니다.")
+                    pass
+                else:
+                    job_runner.ui.error(f"❌ '{special_sheet_name}' 시트 동기화에 실패했습니다.")
 
-        # 로그 기록 (기존과 동일)
-        manual_change_log_for_save.append({'날짜': formatted_date_str, '변경 전 인원': str(old_value), '변경 후 인원': str(new_value)})
+    except gspread.exceptions.WorksheetNotFound:
+        job_runner.ui.warning(f"'{special_sheet_name}' 시트를 찾을 수 없어 토요/휴일 스케줄을 동기화할 수 없습니다.")
+    except Exception as e:
+        job_runner.ui.error(f"토요/휴일 스케줄 동기화 중 오류 발생: {type(e).__name__} - {e}")
+    report("토요/휴일 근무 동기화 완료", 0.1)
 
-        swapped_set_for_save.add((date_str_raw.strip(), time_period, str(old_value).strip(), str(new_value).strip()))
+    # --- 배정 로직 ---
+    total_stats = {'early': Counter(), 'late': Counter(), 'morning_duty': Counter(), 'afternoon_duty': Counter(), 'rooms': {str(i): Counter() for i in range(1, 13)}, 'time_room_slots': {s: Counter() for s in time_slots}}
+    df_cumulative = session["df_cumulative"]
+    afternoon_duty_counts = {row['이름']: int(row['오후당직누적']) for _, row in df_cumulative.iterrows() if pd.notna(row.get('오후당직누적'))}
 
-    # "일괄 적용" 시 생성된 세트도 여기에 합쳐줍니다.
-    batch_swapped_set = st.session_state.get("swapped_assignments", set()) # 이미 위에서 가져왔으므로 중복될 수 있으나 set이 처리
-    swapped_set_for_save.update(batch_swapped_set)
+    assignments, date_cache, request_cells, result_data = {}, {}, {}, []
+    assignable_slots = [s for s in session["time_slots"].keys() if not (s.startswith('8:30') and s.endswith('_당직'))]
+    weekday_map = {0: '월', 1: '화', 2: '수', 3: '목', 4: '금', 5: '토', 6: '일'}
 
-    # 최종 변경 기록 세트를 세션에 저장 -> 엑셀 생성 시 사용됨
-    st.session_state["swapped_assignments"] = swapped_set_for_save
-    st.session_state["final_change_log_at_run"] = st.session_state.get("swapped_assignments_log", []) + manual_change_log_for_save
+    special_dates = [date_str for _, date_str, _ in special_schedules]
 
-    # 버튼을 누를 때마다 항상 새로 계산하도록 이전 결과를 삭제합니다.
-    if "assignment_results" in st.session_state:
-        del st.session_state["assignment_results"]
+    target_year = int(month_str.split('년')[0])
 
-    if "assignment_results" not in st.session_state or st.session_state.assignment_results is None:
-        with st.spinner("방배정 중..."):
-            # --- 요청사항 처리 결과 추적을 위한 초기화 ---
-            applied_messages = []
-            unapplied_messages = []
-            weekday_map = {0: '월', 1: '화', 2: '수', 3: '목', 4: '금', 5: '토', 6: '일'}
-            save_errors = []
+    # [수정] for 루프 이전에 special_df 변수를 명확히 정의
+    special_df_for_assignment = special_df 
 
-            # 날짜 파싱 성능을 위해 근무일 정보 미리 생성
-            work_days_map = {}
-            target_year = int(month_str.split('년')[0])
-            df_schedule_for_check = st.session_state.get("df_schedule_md_modified", st.session_state.get("df_schedule_md_initial"))
+    for _, row in edited_df_md.iterrows():
+        date_str = row['날짜']
+        try:
+            date_obj = datetime.strptime(date_str, '%m월 %d일').replace(year=target_year) if "월" in date_str else datetime.strptime(date_str, '%Y-%m-%d')
+            formatted_date = date_obj.strftime('%Y-%m-%d').strip()
+            date_cache[date_str] = formatted_date
+            day_of_week = weekday_map[date_obj.weekday()]
+        except (ValueError, TypeError):
+            continue
 
-            for _, schedule_row in df_schedule_for_check.iterrows():
-                date_str = schedule_row['날짜']
-                try:
-                    date_obj = datetime.strptime(date_str, '%m월 %d일').replace(year=target_year)
-                    formatted_date = date_obj.strftime('%Y-%m-%d')
-                    
-                    morning_workers = set(p.strip() for p in schedule_row.iloc[2:13].dropna() if p and p.strip())
-                    afternoon_workers = set(p.strip() for p in schedule_row.iloc[13:].dropna() if p and p.strip())
-                    on_call_worker = str(schedule_row.get('오전당직(온콜)', '')).strip()
+        result_row = [date_str, day_of_week]
 
-                    if on_call_worker:
-                        morning_workers.add(on_call_worker)
-                        afternoon_workers.add(on_call_worker)
-                    
-                    work_days_map[formatted_date] = {
-                        "morning": morning_workers,
-                        "afternoon": afternoon_workers,
-                        "on_call": on_call_worker
-                    }
-                except (ValueError, TypeError):
-                    continue
+        # --- 토요/휴일 배정 로직 ---
+        if date_str in special_dates:
+            personnel = [p for p in row.iloc[2:].dropna() if p]
+            settings = session["weekend_room_settings"].get(date_str, {})
 
-            # 유효성 검사를 통과한 요청만 실제 배정에 사용
-            valid_requests_indices = []
-            for index, req in st.session_state["df_room_request"].iterrows():
-                req_date, is_morning = parse_date_info(req['날짜정보'])
-                person = req['이름']
-                category = req['분류']
-                
-                is_valid = True
+            assignment_dict, sorted_rooms = assign_special_date(personnel, date_str, formatted_date, settings, special_df_for_assignment, valid_requests_df)
 
-                # 날짜 포맷팅 ('MM월 DD일(요일) (오전/오후)')
-                date_obj = datetime.strptime(req_date, '%Y-%m-%d')
-                day_of_week = weekday_map[date_obj.weekday()]
-                date_str_display = f"{date_obj.strftime('%m월 %d일')}({day_of_week})"
-                time_str_display = '오전' if is_morning else '오후'
-                
-                # 1. 근무일이 아닌 경우 검사
-                time_period_key = "morning" if is_morning else "afternoon"
-                if req_date not in work_days_map or person not in work_days_map[req_date][time_period_key]:
-                    msg = f"⚠️ {person}: {date_str_display} ({time_str_display})이 근무일이 아니므로 '{category}' 요청을 처리할 수 없습니다."
-                    unapplied_messages.append(msg)
-                    is_valid = False
+            # (이하 로직은 기존 코드를 그대로 따르되, 하드코딩된 부분만 제거)
+            room_to_first_slot_idx = {}
+            for slot_idx, slot_name in enumerate(columns[2:]):
+                room_match = re.search(r'\((\d+)\)', str(slot_name))
+                if room_match:
+                    room_num = room_match.group(1)
+                    if room_num not in room_to_first_slot_idx:
+                        room_to_first_slot_idx[room_num] = slot_idx
+
+            # ▼▼▼ [새로 추가할 부분] 토요/휴일 요청사항도 request_cells에 기록하여 메모 기능 활성화 ▼▼▼
+            if not session["df_room_request"].empty:
+                requests_for_day = session["df_room_request"][
+                    session["df_room_request"]['날짜정보'].str.startswith(formatted_date)
+                ]
+                for _, req in requests_for_day.iterrows():
+                    person_req = req['이름']
+                    category_req = req['분류'] # 예: "7번방"
+                    room_match_req = re.match(r'(\d+)번방', category_req)
+
+                    if room_match_req:
+                        room_num_req = room_match_req.group(1)
+                        # 이 요청이 실제로 배정에 반영되었는지 확인
+                        if f"방({room_num_req})" in assignment_dict and assignment_dict[f"방({room_num_req})"] == person_req:
+                            # 해당 방 번호에 해당하는 슬롯 이름을 찾음
+                            if room_num_req in room_to_first_slot_idx:
+                                slot_idx = room_to_first_slot_idx[room_num_req]
+                                slot_name = columns[slot_idx + 2] # +2 for '날짜', '요일' columns
+                                request_cells[(formatted_date, slot_name)] = {'이름': person_req, '분류': category_req}
+
+            mapped_assignment = [None] * (len(columns) - 2)
+
+            # sorted_rooms를 기준으로 배정하여 순서 보장
+            for room_num in sorted_rooms:
+                slot_key = f"방({room_num})"
+                if slot_key in assignment_dict:
+                    person = assignment_dict[slot_key]
+                    if room_num in room_to_first_slot_idx:
+                        slot_idx = room_to_first_slot_idx[room_num]
+                        mapped_assignment[slot_idx] = person
+
+            result_data.append(result_row + mapped_assignment)
+            continue # 평일 로직 건너뛰기
+
+        has_person = any(val for val in row.iloc[2:-1] if pd.notna(val) and val)
+        personnel_for_the_day = [p for p in row.iloc[2:].dropna() if p]
+
+        # 이 코드는 사용자의 기존 `if date_str in special_dates:` 블록을 대체합니다.
+        if date_str in special_dates:
+            found_special_schedule = False
+            # 해당 날짜의 특별 근무 일정을 찾습니다.
+            for date_obj, special_date_str, personnel in special_schedules:
+                if special_date_str == date_str:
+                    # Streamlit 세션 상태에서 해당 날짜의 주말/공휴일 설정을 가져옵니다.
+                    settings = session["weekend_room_settings"].get(date_str, {})
+                    duty_person = settings.get("duty_person", None)
+                    duty_room = settings.get("duty_room", None)
+
+                    # 설정된 인원과 방 정보를 바탕으로 배정 계획을 생성합니다.
+                    # assignment_dict는 {"방번호": "담당자"} 형태의 딕셔너리입니다.
+                    assignment_dict, sorted_rooms = assign_special_date(personnel, date_str, formatted_date, settings, special_df_for_assignment, valid_requests_df)
 
-                # 2. [수정] 평일 당직방 및 토요/휴일 요청 검사
-                is_special_day = req_date in [d.strftime('%Y-%m-%d') for d, _, _ in st.session_state.get("special_schedules", [])]
-                
-                if is_valid and is_special_day:
-                    # 2-1. 토요/휴일 방 요청 차단 (어떤 요청이든)
-                    msg = f"⛔️ {person}: {date_str_display} ({time_str_display})의 '{category}' 요청은 토요/휴일입니다. (요청사항 반영 안 됨)"
-                    unapplied_messages.append(msg)
-                    is_valid = False
+                    # 배정된 인원 수가 방 수보다 적을 경우 경고 메시지를 표시합니다.
+                    if len(assignment_dict) < len(sorted_rooms):
+                        job_runner.ui.warning(f"{date_str}: 인원 수({len(personnel)}) 부족으로 {len(sorted_rooms) - len(assignment_dict)}개 방배정 안 됨.")
 
-                elif is_valid and not is_special_day:
-                    # 2-2. 평일 당직방 요청 차단
-                    room_match = re.match(r'(\d+)번방', category)
-                    if room_match:
-                        req_room_num = room_match.group(1)
-                        morning_duty_room = st.session_state["room_settings"].get("830_duty")
-                        afternoon_duty_room = st.session_state["room_settings"].get("1330_duty")
+                    # 1. 각 방 번호와 매칭되는 첫 번째 오전 슬롯의 인덱스를 찾습니다.
+                    room_to_first_slot_idx = {}
+                    # DataFrame의 최종 컬럼을 기준으로 슬롯을 순회하여 길이 불일치 문제를 해결합니다.
+                    for slot_idx, slot in enumerate(columns[2:]):
+                        # 오후(13:30) 슬롯이나 '온콜' 등 배정 대상이 아닌 슬롯은 건너뜁니다.
+                        slot_str = str(slot)
+                        if '13:30' in slot_str or '온콜' in slot_str:
+                            continue
 
-                        if is_morning and req_room_num == morning_duty_room:
+                        # 정규식을 사용해 슬롯 이름에서 방 번호를 추출합니다. 예: "8:30(1)_당직" -> "1"
+                        room_match = re.search(r'\((\d+)\)', slot_str)
+                        if room_match:
+                            room_num = room_match.group(1)
+                            # 아직 맵에 없는 방 번호일 경우에만 추가하여, 각 방의 '첫 번째' 슬롯만 매핑되도록 합니다.
+                            if room_num not in room_to_first_slot_idx:
+                                room_to_first_slot_idx[room_num] = slot_idx
+
+                    # 2. 배정 결과를 최종 슬롯 리스트에 매핑합니다.
+                    # 최종 결과(엑셀의 한 행)를 담을 리스트를 'columns' 길이에 맞춰 초기화합니다.
+                    mapped_assignment = [None] * (len(columns) - 2)
+                    # 중복 배정을 방지하기 위해 이미 배정된 인원을 기록하는 세트입니다.
+                    assigned_personnel = set()
+
+                    # `assignment_dict`의 모든 항목(방-사람)을 순회하며 배정합니다.
+                    for room_num, person_with_room in assignment_dict.items():
+                        # 담당자 이름만 추출합니다. (예: "강승주[3]" -> "강승주")
+                        person = person_with_room.split('[')[0].strip()
+
+                        # 해당 방 번호가 배정 대상인 오전 슬롯에 포함되어 있는지 확인합니다.
+                        if room_num in room_to_first_slot_idx:
+                            # 이미 다른 방에 배정된 인원인지 확인하여 중복을 방지합니다.
+                            if person in assigned_personnel:
+                                job_runner.ui.warning(f"{date_str}: {person}님이 중복 배정되었습니다. 확인이 필요합니다.")
+                                continue
+
+                            # 배정할 슬롯의 인덱스를 가져옵니다.
+                            slot_idx = room_to_first_slot_idx[room_num]
+
+                            # 최종 배정 리스트의 해당 위치에 담당자 이름을 할당합니다.
+                            mapped_assignment[slot_idx] = person
+                            # 이 담당자를 '배정 완료' 세트에 추가합니다.
+                            assigned_personnel.add(person)
+
+                    # 완성된 배정 결과를 전체 결과 데이터에 추가합니다.
+                    full_row = result_row + mapped_assignment
+                    result_data.append(full_row)
+                    found_special_schedule = True
+                    break  # 해당 날짜의 처리가 끝났으므로 내부 루프를 종료합니다.
+
+            # 특별 근무 일정이 없는 경우 (예: 공휴일이지만 근무자가 없는 날) 빈 행을 추가합니다.
+            if not found_special_schedule:
+                result_data.append(result_row + [None] * (len(columns) - 2))
+
+            # special_date 처리가 끝났으므로, 평일 배정 로직을 건너뛰고 다음 날짜로 넘어갑니다.
+            continue
+
+        # 기존 평일 처리
+        # 2. '소수 인원 근무'로 판단할 기준 인원수를 설정합니다.
+        # SMALL_TEAM_THRESHOLD = 15
+
+        # # 3. 근무 인원수가 설정된 기준보다 적으면, 방배정 없이 순서대로 나열합니다.
+        # if len(personnel_for_the_day) < SMALL_TEAM_THRESHOLD and has_person:
+        #     result_row.append(None)
+        #     result_row.extend(personnel_for_the_day)
+        #     num_slots_to_fill = len(all_slots)
+        #     slots_filled_count = len(personnel_for_the_day) + 1  # 근무자 수 + 비워둔 1칸
+        #     padding_needed = num_slots_to_fill - slots_filled_count
+        #     if padding_needed > 0:
+        #         result_row.extend([None] * padding_needed)
+        #     result_data.append(result_row)
+        #     continue
+
+        morning_personnel = [row[str(i)] for i in range(1, 12) if pd.notna(row[str(i)]) and row[str(i)]]
+        afternoon_personnel = [row[f'오후{i}'] for i in range(1, 5) if pd.notna(row[f'오후{i}']) and row[f'오후{i}']]
+
+        if not (morning_personnel or afternoon_personnel):
+            result_row.extend([None] * len(all_slots))
+            result_data.append(result_row)
+            continue
+
+        # ✨ --- 여기가 수정된 요청사항 처리 로직입니다 --- ✨
+        request_assignments = {}
+        # 그날에 해당하는 유효한 요청만 필터링
+        requests_for_day = valid_requests_df[valid_requests_df['날짜정보'].str.startswith(formatted_date)]
+
+        if not requests_for_day.empty:
+            # 1단계: '특정 방' 요청 먼저 처리 (충돌 가능성 높음)
+            room_reqs = requests_for_day[requests_for_day['분류'].str.contains('번방')].sort_index()
+            for _, req in room_reqs.iterrows():
+                person, category = req['이름'], req['분류']
+                # 이 사람/시간대에 대한 요청이 이미 처리되었는지 확인
+                if any(p == person for p in request_assignments.values()): continue
+
+                slots_for_category = session["memo_rules"].get(category, [])
+                if slots_for_category:
+                    # '1번방' 요청은 슬롯이 하나뿐이므로, 그 슬롯이 비어있으면 배정
+                    target_slot = slots_for_category[0]
+                    if target_slot not in request_assignments:
+                        request_assignments[target_slot] = person
+                        request_cells[(formatted_date, target_slot)] = {'이름': person, '분류': category}
+
+            # 2단계: '특정 시간대' 및 기타 요청 처리
+            other_reqs = requests_for_day[~requests_for_day['분류'].str.contains('번방')].sort_index()
+            for _, req in other_reqs.iterrows():
+                person, category, date_info = req['이름'], req['분류'], req['날짜정보']
+                is_morning = '(오전)' in date_info
+                if any(p == person for p in request_assignments.values()): continue
+
+                # 요청을 만족하는 '아직 비어있는' 슬롯 찾기
+                possible_slots = [s for s in session["memo_rules"].get(category, []) if s not in request_assignments]
+                if possible_slots:
+                    selected_slot = random.choice(possible_slots)
+                    request_assignments[selected_slot] = person
+                    request_cells[(formatted_date, selected_slot)] = {'이름': person, '분류': category}
+
+        # `random_assign` 호출은 기존과 동일합니다.
+        assignment, _ = random_assign(list(set(morning_personnel)|set(afternoon_personnel)), assignable_slots, request_assignments, session["time_groups"], total_stats, list(morning_personnel), list(afternoon_personnel), afternoon_duty_counts)
+
+        for slot in all_slots:
+            person = row['오전당직(온콜)'] if slot == morning_duty_slot or slot == '온콜' else (assignment[assignable_slots.index(slot)] if slot in assignable_slots and assignment else None)
+            result_row.append(person if has_person else None)
+
+        # [추가] 중복 배정 검증 로직
+        assignments_for_day = dict(zip(all_slots, result_row[2:]))
+        morning_slots_check = [s for s in all_slots if s.startswith(('8:30', '9:00', '9:30', '10:00'))]
+        afternoon_slots_check = [s for s in all_slots if s.startswith('13:30')]
+
+        morning_counts = Counter(p for s, p in assignments_for_day.items() if s in morning_slots_check and p)
+        for person, count in morning_counts.items():
+            if count > 1:
+                duplicated_slots = [s for s, p in assignments_for_day.items() if p == person and s in morning_slots_check]
+                job_runner.ui.error(f"⚠️ {date_str}: '{person}'님이 오전에 중복 배정되었습니다 (슬롯: {', '.join(duplicated_slots)}).")
+
+        afternoon_counts = Counter(p for s, p in assignments_for_day.items() if s in afternoon_slots_check and p)
+        for person, count in afternoon_counts.items():
+            if count > 1:
+                duplicated_slots = [s for s, p in assignments_for_day.items() if p == person and s in afternoon_slots_check]
+                job_runner.ui.error(f"⚠️ {date_str}: '{person}'님이 오후/온콜에 중복 배정되었습니다 (슬롯: {', '.join(duplicated_slots)}).")
+
+        result_data.append(result_row)
+
+    df_room = pd.DataFrame(result_data, columns=columns)
+
+    # 1. 'df_room' (최종 방배정 결과)를 기반으로 'total_stats'를 (재)계산합니다.
+    total_stats = count_room_stats(df_room, columns[2:], special_dates, session["time_slots"], morning_duty_slot, month_str)
+
+    # 2. 통계 DataFrame을 생성합니다.
+    stats_data = []
+    all_personnel_stats = set(p for _, r in session["df_schedule_md"].iterrows() for p in r[2:].dropna() if p)
+
+    # --- [수정] 화면 원본(df_cumulative_original)에서 4가지 값을 모두 가져옵니다 ---
+    df_source_raw = session.get("df_cumulative_original", pd.DataFrame())
+
+    # 맵 초기화
+    map_pm_cum = {} # 오후당직누적
+    map_pm_src = {} # 오후당직
+    map_am_cum = {} # 오전당직누적
+    map_am_src = {} # 오전당직
+
+    if not df_source_raw.empty:
+        first_col = df_source_raw.columns[0]
+
+        # 데이터 매핑 함수 (행 이름 -> 딕셔너리)
+        def get_row_map(row_name):
+            row = df_source_raw[df_source_raw[first_col].astype(str).str.strip() == row_name]
+            result = {}
+            if not row.empty:
+                for col in df_source_raw.columns[1:]:
+                    try:
+                        val = row.iloc[0][col]
+                        result[str(col).strip()] = int(val) if val not in [None, ''] else 0
+                    except:
+                        result[str(col).strip()] = 0
+            return result
+
+        map_pm_cum = get_row_map('오후당직누적')
+        map_pm_src = get_row_map('오후당직')
+        map_am_cum = get_row_map('오전당직누적')
+        map_am_src = get_row_map('오전당직')
+
+    # --- 통계 계산 루프 ---
+    for person in sorted(all_personnel_stats):
+        person_key = str(person).strip()
+
+        # [오후당직] 공식: (시트누적 - 시트당월) + 이번달배정
+        pm_sheet_cum = map_pm_cum.get(person_key, 0)
+        pm_sheet_src = map_pm_src.get(person_key, 0)
+        pm_this_month = total_stats['afternoon_duty'][person]
+
+        pm_final = (pm_sheet_cum - pm_sheet_src) + pm_this_month
+
+        # [오전당직] 공식: (시트누적 - 시트당월) + 이번달배정
+        am_sheet_cum = map_am_cum.get(person_key, 0)
+        am_sheet_src = map_am_src.get(person_key, 0)
+        am_this_month = total_stats['morning_duty'][person]
+
+        am_final = (am_sheet_cum - am_sheet_src) + am_this_month
+
+        stats_entry = {
+            '인원': person,
+            '이른방 합계': total_stats['early'][person],
+            '늦은방 합계': total_stats['late'][person],
+            '오전당직': am_this_month,
+            '오전당직 누적': am_final,
+            '오후당직': pm_this_month,
+            '오후당직 누적': pm_final
+        }
+
+        for slot in session["time_slots"].keys():
+            if not slot.endswith('_당직'):
+                stats_entry[f'{slot} 합계'] = total_stats['time_room_slots'].get(slot, Counter())[person]
+
+        stats_data.append(stats_entry)
+
+    time_order = ['8:30', '9:00', '9:30', '10:00', '13:30']
+
+    # [수정] 컬럼 목록에 '오전당직 누적' 추가
+    sorted_columns = ['인원', '이른방 합계', '늦은방 합계', '오전당직', '오전당직 누적', '오후당직', '오후당직 누적']
+
+    time_slots_sorted = sorted(
+        [slot for slot in session["time_slots"].keys() if not slot.endswith('_당직')],
+        key=lambda x: (time_order.index(x.split('(')[0]), int(x.split('(')[1].split(')')[0]))
+    )
+    sorted_columns.extend([f'{slot} 합계' for slot in time_slots_sorted])
+    stats_df_names_as_rows = pd.DataFrame(stats_data)[sorted_columns]
+    # [신규] (항목-행) 기준으로 Transpose 하여 최종 stats_df 생성
+    stats_df = stats_df_names_as_rows.set_index('인원').transpose().reset_index().rename(columns={'index': '항목'})
+
+    # --- [수정 3] 배정 완료 후, 모든 로그 생성 ---
+
+    # 3-1. 방배정 요청 로그 생성
+    applied_request_keys = set((key[0], value['이름'], value['분류']) for key, value in request_cells.items())
+
+    # ▼▼▼ [수정] 이 블록 전체를 교체하세요. (1594~1608 라인) ▼▼▼
+
+    # [FIX] 휴일 날짜 문자열 세트를 미리 생성 (예: '10월 18일')
+    special_dates_str_set = {s[1] for s in session.get("special_schedules", [])}
+
+    for _, req in valid_requests_df.iterrows():
+        req_date, is_morning = parse_date_info(req['날짜정보'])
+        if not req_date: continue
+        person, category = req['이름'], req['분류']
+
+        date_obj = datetime.strptime(req_date, '%Y-%m-%d')
+        # [FIX] 날짜 형식을 '10월 18일' (m월 d일)로 변경 (휴일 세트와 비교하기 위함)
+        date_str_display_for_check = f"{date_obj.month}월 {date_obj.day}일"
+        # 화면 표시용 날짜 (요일 포함)
+        date_str_display = f"{date_str_display_for_check}({weekday_map[date_obj.weekday()]})"
+        time_str_display = '오전' if is_morning else '오후'
+
+        if (req_date, person, category) in applied_request_keys:
+            msg = f"✅ {person}: {date_str_display} ({time_str_display})의 '{category}' 요청이 적용되었습니다."
+            applied_messages.append(msg)
+        else:
+            # [FIX] 이 요청이 실패한 요청인지 확인
+
+            # 1. 이 날짜가 휴일인지 확인
+            is_special_day_log = date_str_display_for_check in special_dates_str_set
+
+            if is_special_day_log:
+                # [FIX] 날짜가 휴일(토요일 포함)이기만 하면, 실패 시 무조건 수기 수정 메시지
+                msg = f"⛔️ {person}: {date_str_display} ({time_str_display})의 '{category}' 요청은 토요 방입니다. 수기로 수정해 주십시오."
+            else:
+                # 평일 요청이 실패한 경우 (배정 균형)
+                msg = f"⚠️ {person}: {date_str_display} ({time_str_display})의 '{category}' 요청이 배정 균형을 위해 반영되지 않았습니다."
+
+            unapplied_messages.append(msg)
+        # ▲▲▲ [수정] 교체 완료 ▲▲▲
+
+    # 3-2. 오후당직 배정 로그 생성
+    oncall_logs = []
+    actual_duty_counts = total_stats.get('afternoon_duty', Counter())
+
+    # [수정] 오후당직 배정 로그를 횟수별로 그룹화합니다.
+    # 1. 횟수별로 인원을 저장할 딕셔너리 초기화
+    counts_to_workers = {}
+
+    # 2. 모든 인원(all_personnel_stats)을 순회하며 횟수별 딕셔너리에 추가
+    # (actual_duty_counts에 없는 0회 배정자도 포함하기 위함)
+    for person in all_personnel_stats: # L1879에서 정의된 변수
+        count = actual_duty_counts.get(person, 0) # 배정 못 받았으면 0
+        if count not in counts_to_workers:
+            counts_to_workers[count] = []
+        counts_to_workers[count].append(person)
+
+    # 3. oncall_logs 리스트 생성 (횟수(key) 기준으로 정렬)
+    for count, workers in sorted(counts_to_workers.items()):
+        if workers: # 해당 횟수에 배정된 사람이 있을 경우에만 로그 생성
+            sorted_workers = sorted(workers) # 이름순으로 정렬
+            log_message = f"- {count}회 배정: {', '.join(sorted_workers)}"
+            oncall_logs.append(log_message)
+
+    # --- Google Sheets 저장은 백그라운드 작업으로 실행 (스크립트 재실행/새로고침과 무관하게 계속 진행) ---
+    df_schedule_original = session["df_schedule_original"]
+    latest_cumulative_name_next = session.get("latest_cumulative_name")
+
+    def save_room_assignment_sheets_job(report):
+        """[백그라운드 작업] 스케줄 최종 / 방배정 ver1.0 / 다음달 누적 최종 시트를 저장합니다."""
+        save_errors = []
+        try:
+            sheet = gc.open_by_url(sheet_url)
+
+            # --- 1. [신규 삽입] "스케줄 최종" 저장 로직 (L1448-L1542 코드) ---
+            try:
+                df_schedule_to_save = df_schedule_original.copy()
+
+                # 'edited_df_md' (L1377에서 정의됨)는 현재 data_editor의 상태입니다.
+                edited_df_md_for_save = edited_df_md 
+
+                # L1450-L1455: robust_parse_date 함수 정의
+                target_year_for_save = int(month_str.split('년')[0]) 
+                def robust_parse_date(date_str, year=target_year_for_save):
+                    try:
+                        if "월" in str(date_str): return datetime.strptime(str(date_str), '%m월 %d일').replace(year=year).date()
+                        else: return pd.to_datetime(date_str).date()
+                    except: return None
+
+                df_schedule_to_save['parsed_date'] = df_schedule_to_save['날짜'].apply(robust_parse_date)
+
+                # L1456-L1522: edited_df_md_for_save를 순회하며 df_schedule_to_save 업데이트
+                for _, edited_row in edited_df_md_for_save.iterrows():
+                    edited_date_obj = robust_parse_date(edited_row['날짜'])
+                    if edited_date_obj is None: continue
+                    target_indices = df_schedule_to_save[df_schedule_to_save['parsed_date'] == edited_date_obj].index
+                    if target_indices.empty: continue
+                    original_row_idx = target_indices[0]
+
+                    # (L1464) 수정된 내용 가져오기
+                    oncall_person = str(edited_row.get('오전당직(온콜)', '')).strip()
+                    am_editor_cols = [str(i) for i in range(1, 12)]
+                    am_personnel = [str(edited_row[col]).strip() for col in am_editor_cols if col in edited_row and pd.notna(edited_row[col]) and str(edited_row[col]).strip()]
+                    pm_editor_cols = [f'오후{i}' for i in range(1, 5)]
+                    pm_personnel = [str(edited_row[col]).strip() for col in pm_editor_cols if col in edited_row and pd.notna(edited_row[col]) and str(edited_row[col]).strip()]
+
+                    # (L1477) 원본 스케줄의 숨겨진 근무자 파싱
+                    original_schedule_row = df_schedule_original.loc[original_row_idx]
+                    pm_hidden_cols = [f'오후{i}' for i in range(5, 10)]
+                    pm_hidden_personnel = [
+                        clean_name(original_schedule_row[col]) for col in pm_hidden_cols
+                        if col in original_schedule_row and pd.notna(original_schedule_row[col]) and clean_name(original_schedule_row[col])
+                    ]
+                    am_hidden_cols = [str(i) for i in range(12, 18)]
+                    am_hidden_personnel = [
+                        clean_name(original_schedule_row[col]) for col in am_hidden_cols
+                        if col in original_schedule_row and pd.notna(original_schedule_row[col]) and clean_name(original_schedule_row[col])
+                    ]
+
+                    # (L1501) 저장할 DataFrame의 모든 관련 열 초기화
+                    cols_to_clear_am = [str(i) for i in range(1, 18)]
+                    for col in cols_to_clear_am:
+                        if col in df_schedule_to_save.columns: df_schedule_to_save.at[original_row_idx, col] = ''
+                    cols_to_clear_pm = [f'오후{i}' for i in range(1, 10)]
+                    for col in cols_to_clear_pm:
+                        if col in df_schedule_to_save.columns: df_schedule_to_save.at[original_row_idx, col] = ''
+
+                    # (L1510) 수정된 내용으로 다시 채워넣기
+                    df_schedule_to_save.at[original_row_idx, '오전당직(온콜)'] = oncall_person
+
+                    am_save_list = list(dict.fromkeys(am_personnel + ([oncall_person] if oncall_person else []) + am_hidden_personnel))
+                    for i, person in enumerate(am_save_list, 1):
+                        col_name_am = str(i)
+                        if col_name_am in df_schedule_to_save.columns:
+                            df_schedule_to_save.at[original_row_idx, col_name_am] = person
+
+                    pm_save_list = list(dict.fromkeys(pm_personnel + pm_hidden_personnel))
+                    for i, person in enumerate(pm_save_list, 1):
+                        col_name_pm = f'오후{i}'
+                        if col_name_pm in df_schedule_to_save.columns:
+                            df_schedule_to_save.at[original_row_idx, col_name_pm] = person
+
+                df_schedule_to_save.drop(columns=['parsed_date'], inplace=True, errors='ignore')
+
+                # (L1524) "스케줄 최종" 시트에 저장
+                schedule_sheet_name = f"{month_str} 스케줄 최종"
+                try:
+                    worksheet_schedule = sheet.worksheet(schedule_sheet_name)
+                except gspread.exceptions.WorksheetNotFound:
+                    worksheet_schedule = sheet.add_worksheet(title=schedule_sheet_name, rows=100, cols=30) 
+
+                # [수정] 원본 df_schedule_original의 컬럼을 기준으로 저장할 컬럼을 정함
+                columns_to_save_requested = df_schedule_original.columns.tolist()
+
+                # 불필요한 열 제거
+                if 'parsed_date' in columns_to_save_requested:
+                     columns_to_save_requested.remove('parsed_date')
+                if '날짜_dt' in columns_to_save_requested:
+                     columns_to_save_requested.remove('날짜_dt')
+
+                columns_to_save = [col for col in columns_to_save_requested if col in df_schedule_to_save.columns]
+                schedule_data = [columns_to_save] + df_schedule_to_save[columns_to_save].fillna('').values.tolist()
+
+                if job_runner.write_sheet_with_retry(report, worksheet_schedule, schedule_data):
+                    report(f"✅ '{schedule_sheet_name}' 시트 저장을 완료하였습니다.", 0.4)
+                else:
+                    save_errors.append(f"'{schedule_sheet_name}' 시트 저장에 실패하였습니다.")
+
+            except Exception as e:
+                report(f"Google Sheets '스케줄 최종' 시트 저장 중 오류 발생: {type(e).__name__} - {e}")
+                save_errors.append(f"'스케줄 최종' 시트 저장 실패: {e}")
+            # --- ▲▲▲ [신규 삽입] "스케줄 최종" 저장 로직 종료 ▲▲▲ ---
+
+
+            # --- 2. '방배정' 시트 저장 (기존 로직) ---
+            try:
+                try:
+                    worksheet_result = sheet.worksheet(f"{month_str} 방배정 ver1.0")
+                except gspread.exceptions.WorksheetNotFound:
+                    worksheet_result = sheet.add_worksheet(f"{month_str} 방배정 ver1.0", rows=100, cols=len(df_room.columns))
+
+                if job_runner.write_sheet_with_retry(report, worksheet_result, [df_room.columns.tolist()] + df_room.fillna('').values.tolist()):
+                    report(f"✅ {month_str} 방배정 ver1.0 테이블이 Google Sheets에 저장되었습니다.", 0.7)
+                else:
+                    save_errors.append(f"'{month_str} 방배정 ver1.0' 시트 저장에 실패하였습니다.")
+
+            except Exception as e:
+                report(f"Google Sheets '방배정' 시트 저장 중 오류 발생: {type(e).__name__} - {e}")
+                save_errors.append(f"'방배정' 시트 저장 실패: {e}")
+
+            # --- 3. '다음달 누적 최종' 시트 업데이트 (기존 로직) ---
+            try:
+                target_month_dt = datetime.strptime(month_str, "%Y년 %m월")
+                next_month_dt = target_month_dt + relativedelta(months=1)
+                next_month_str = next_month_dt.strftime("%Y년 %-m월")
+
+
+                if not latest_cumulative_name_next:
+                    save_errors.append(f"'{next_month_str} 누적' 시트를 찾을 수 없어 업데이트 불가.")
+                else:
+                    worksheet_cumulative_next = sheet.worksheet(latest_cumulative_name_next)
+                    all_data = worksheet_cumulative_next.get_all_values() 
+
+                    if not all_data or len(all_data) < 2:
+                        save_errors.append(f"'{latest_cumulative_name_next}' 시트가 비어있거나 형식이 잘못됨.")
+                    else:
+                        headers, rows = all_data[0], all_data[1:]
+
+                        for r_idx, row_data in enumerate(rows):
+                            for c_idx, cell_value in enumerate(row_data):
+                                if c_idx == 0: continue
+                                try:
+                                    if cell_value != '':
+                                        rows[r_idx][c_idx] = int(cell_value)
+                                except (ValueError, TypeError):
+                                    pass
+
+                        # [1단계] 오전/오후 인덱스 변수 초기화
+                        pm_target_row_index = -1 # '오후당직누적'
+                        pm_source_row_index = -1 # '오후당직'
+                        am_target_row_index = -1 # '오전당직누적'
+                        am_source_row_index = -1 # '오전당직'
+
+                        # [2단계] 4개 행의 인덱스 찾기
+                        for i, row_data in enumerate(rows):
+                            if row_data[0] == '오후당직누적':
+                                pm_target_row_index = i
+                            if row_data[0] == '오후당직':
+                                pm_source_row_index = i
+                            if row_data[0] == '오전당직누적':
+                                am_target_row_index = i
+                            if row_data[0] == '오전당직':
+                                am_source_row_index = i
+
+                        # [3단계] 4개 행을 모두 찾았는지 확인
+                        if all(idx != -1 for idx in [pm_target_row_index, pm_source_row_index, am_target_row_index, am_source_row_index]):
+
+                            # [4단계 & 5단계 통합 수정] 이미 계산된 'stats_data'를 사용하여 시트 데이터(rows) 업데이트
+                            # 이유: 화면에 보이는 결과와 100% 일치시키기 위함
+
+                            # 1. 계산된 통계 데이터를 이름 기준으로 빠르게 찾을 수 있게 딕셔너리로 변환
+                            # key: 이름, value: 해당 인원의 통계 딕셔너리
+                            calculated_stats_map = {item['인원']: item for item in stats_data}
+
+                            # 2. 시트의 헤더(이름)를 순회하며 값 대입
+                            for col_idx, name in enumerate(headers):
+                                if col_idx == 0: continue # 첫 번째 열(항목) 건너뜀
+                                name_strip = str(name).strip()
+
+                                if name_strip in calculated_stats_map:
+                                    stat_item = calculated_stats_map[name_strip]
+
+                                    # --- 오후 당직 & 누적 업데이트 ---
+                                    if pm_source_row_index != -1:
+                                        # '오후당직' 행에 금방 계산된 '오후당직' 값 대입
+                                        rows[pm_source_row_index][col_idx] = stat_item['오후당직']
+
+                                    if pm_target_row_index != -1:
+                                        # '오후당직누적' 행에 금방 계산된 '오후당직 누적' 값 대입
+                                        rows[pm_target_row_index][col_idx] = stat_item['오후당직 누적']
+
+                                    # --- 오전 당직 & 누적 업데이트 ---
+                                    if am_source_row_index != -1:
+                                        # '오전당직' 행에 금방 계산된 '오전당직' 값 대입
+                                        rows[am_source_row_index][col_idx] = stat_item['오전당직']
+
+                                    if am_target_row_index != -1:
+                                        # '오전당직누적' 행에 금방 계산된 '오전당직 누적' 값 대입
+                                        rows[am_target_row_index][col_idx] = stat_item['오전당직 누적']
+
+                            final_cumulative_sheet_name = f"{next_month_str} 누적 최종"
+                            try:
+                                worksheet_final_cumulative = sheet.worksheet(final_cumulative_sheet_name)
+                            except gspread.exceptions.WorksheetNotFound:
+                                worksheet_final_cumulative = sheet.add_worksheet(title=final_cumulative_sheet_name,
+                                                                                rows=len(all_data) + 5,
+                                                                                cols=len(headers) + 5)
+
+                            if job_runner.write_sheet_with_retry(report, worksheet_final_cumulative, [headers] + rows):
+                                # [수정] 누적 시트는 숫자로 인식되어 우측 정렬되도록, 강제 텍스트 변환 함수 대신 기본 update 사용
+                                try:
+                                    worksheet_final_cumulative.clear()
+                                    # value_input_option='USER_ENTERED'를 쓰면 파이썬의 int/float가 시트의 숫자로 자동 인식됨
+                                    worksheet_final_cumulative.update(
+                                        range_name='A1', 
+                                        values=[headers] + rows, 
+                                        value_input_option='USER_ENTERED'
+                                    )
+                                    report(f"✅ '{final_cumulative_sheet_name}' 시트 업데이트가 완료되었습니다.", 1.0)
+
+                                except Exception as e:
+                                    # API 쿼터 초과 시 1회 재시도 로직
+                                    if "Quota exceeded" in str(e):
+                                        time.sleep(5)
+                                        try:
+                                            worksheet_final_cumulative.update(
+                                                range_name='A1', 
+                                                values=[headers] + rows, 
+                                                value_input_option='USER_ENTERED'
+                                            )
+                                            report(f"✅ '{final_cumulative_sheet_name}' 시트 업데이트가 완료되었습니다. (재시도 성공)", 1.0)
+                                        except Exception as e2:
+                                            save_errors.append(f"'{final_cumulative_sheet_name}' 시트 업데이트에 실패하였습니다: {e2}")
+                                    else:
+                                        save_errors.append(f"'{final_cumulative_sheet_name}' 시트 업데이트에 실패하였습니다: {e}")
+                            else:
+                                save_errors.append(f"'{final_cumulative_sheet_name}' 시트 업데이트에 실패하였습니다.")
+
+                        # [6단계] 오류 메시지 수정
+                        elif pm_target_row_index == -1: 
+                            save_errors.append(f"'{latest_cumulative_name_next}' 시트에서 '오후당직누적' 항목을 찾을 수 없습니다.")
+                        elif pm_source_row_index == -1: 
+                            save_errors.append(f"'{latest_cumulative_name_next}' 시트에서 '오후당직' 항목을 찾을 수 없습니다.")
+                        elif am_target_row_index == -1: 
+                            save_errors.append(f"'{latest_cumulative_name_next}' 시트에서 '오전당직누적' 항목을 찾을 수 없습니다.")
+                        elif am_source_row_index == -1: 
+                            save_errors.append(f"'{latest_cumulative_name_next}' 시트에서 '오전당직' 항목을 찾을 수 없습니다.")
+
+            except Exception as e:
+                report(f"Google Sheets '누적 최종' 시트 저장 중 오류 발생: {type(e).__name__} - {e}")
+                save_errors.append(f"'누적 최종' 시트 저장 실패: {e}")
+                time.sleep(5)
+
+        except Exception as e:
+            # gc = get_gspread_client() 자체에서 오류가 난 경우
+            report(f"Google Sheets 연결 중 오류 발생: {type(e).__name__} - {e}")
+            save_errors.append(f"Google Sheets 연결 실패: {e}")
+
+        for error_msg in save_errors:
+            report(f"❌ {error_msg}")
+        if save_errors:
+            raise RuntimeError(f"{len(save_errors)}건의 시트 저장 오류가 발생했습니다.")
+
+    # --- [수정] Excel 생성 함수 호출 ---
+    output = generate_excel_output(
+        df_room=df_room,
+        stats_df=stats_df,
+        columns=columns,
+        special_dates=special_dates,
+        special_df=special_df,
+        date_cache=date_cache,
+        request_cells=request_cells,
+        swapped_assignments=session.get("swapped_assignments", set()), # 이 시점엔 비어있음
+        morning_duty_slot=morning_duty_slot,
+        month_str=month_str,
+    )
+    # --- [수정 완료] ---
+
+    save_errors = [] # 저장 오류 기록용
+
+    assignment_results = {
+        "df_room": df_room,
+        "stats_df": stats_df,
+        "excel_output": output, # <-- 방금 생성한 output
+        "applied_messages": applied_messages,
+        "unapplied_messages": unapplied_messages,
+        "oncall_logs": oncall_logs,
+        "save_errors": save_errors,
+        "actual_duty_counts": actual_duty_counts, # <-- [핵심 수정] 이 줄을 추가하세요.
+
+        # ▼▼▼ [수정] 다운로드 재성성을 위해 이 변수들을 추가합니다 ▼▼▼
+        "columns": columns,
+        "special_dates": special_dates,
+        "date_cache": date_cache,
+        "request_cells": request_cells,
+        "morning_duty_slot": morning_duty_slot,
+        "all_personnel_stats": all_personnel_stats,
+        "time_slots": session["time_slots"],
+        "time_order": time_order,
+        "all_slots": all_slots,
+    }
+
+    # 저장 오류가 있으면 화면에 표시
+    if save_errors:
+        for error_msg in save_errors:
+            job_runner.ui.error(f"❌ {error_msg}")
+
+    # --- [수정] assignment_results에 통계 재계산을 위한 '설정값'도 함께 저장 ---
+    assignment_results = {
+        "df_room": df_room,
+        "stats_df": stats_df,
+        "excel_output": output,
+        "applied_messages": applied_messages,
+        "unapplied_messages": unapplied_messages,
+        "oncall_logs": oncall_logs,
+        "save_errors": save_errors,
+        "actual_duty_counts": actual_duty_counts, # <-- [핵심 수정] 이 줄을 추가하세요.
+
+        # ▼▼▼ 통계 재계산을 위해 이 7줄을 추가하세요 ▼▼▼
+        "columns": columns,
+        "date_cache": date_cache,
+        "all_slots": all_slots,
+        "request_cells": request_cells, # <-- 이 줄이 누락되었습니다.
+        "morning_duty_slot": morning_duty_slot,
+        "special_dates": special_dates,
+        "time_slots": session["time_slots"],
+        "time_order": time_order,
+        "all_personnel_stats": all_personnel_stats 
+    }
+    # --- [수정 완료] ---
+
+    report("방배정 완료", 0.8)
+
+    # 시트 저장이 실패해도 배정 결과는 화면에 남도록 오류만 알립니다.
+    try:
+        save_room_assignment_sheets_job(lambda message, fraction=None: report(message, None if fraction is None else 0.8 + 0.2 * fraction))
+    except Exception as e:
+        job_runner.ui.error(f"Google Sheets 저장 중 오류 발생: {type(e).__name__} - {e}")
+
+    return {
+        "assignment_results": assignment_results,
+        "profile": instrumentation.profile_result(room_profiler),
+    }
+
+
+st.divider()
+st.markdown(f"**➕ 지난달까지의 오후당직 누적 테이블**")
+
+# 세션 상태에 저장된 원본 df_cumulative_original 데이터를 가져옵니다.
+df_cumulative_original = st.session_state.get("df_cumulative_original", pd.DataFrame())
+
+if not df_cumulative_original.empty:
+    # 1. 표시할 데이터 필터링: '오후당직' 행만 선택
+    df_to_display = df_cumulative_original[df_cumulative_original['항목'] == '오후당직누적'].copy()
+
+    # 2. data_editor를 사용하여 편집 가능한 테이블을 만듭니다.
+    edited_df_display = st.data_editor(
+        df_to_display,
+        use_container_width=True,
+        hide_index=True,
+        key="cumulative_editor",
+        disabled=["항목"]  # '항목' 열은 편집 불가
+    )
+
+    if st.button("💾 누적 데이터 저장", type="primary"):
+        with st.spinner("수정된 누적 데이터를 Google Sheets에 저장 중입니다..."):
+            try:
+                # 3. 저장할 전체 데이터 준비
+                # 원본 데이터의 복사본을 만듭니다.
+                df_to_save = df_cumulative_original.copy()
+                
+                # 원본에서 '오후당직누적' 행의 인덱스를 찾습니다.
+                idx_to_update = df_to_save.index[df_to_save['항목'] == '오후당직누적'][0]
+
+                # 해당 인덱스의 행을 편집된 내용으로 교체합니다.
+                df_to_save.iloc[idx_to_update] = edited_df_display.iloc[0]
+
+                # 4. Google Sheets에 저장
+                gc = get_gspread_client()
+                sheet = gc.open_by_url(st.secrets["google_sheet"]["url"])
+                cumulative_sheet_name = st.session_state.get("latest_cumulative_name")
+
+                if cumulative_sheet_name:
+                    worksheet_to_update = sheet.worksheet(cumulative_sheet_name)
+                    
+                    data_to_save_list = [df_to_save.columns.tolist()] + df_to_save.fillna('').values.tolist()
+                    
+                    if update_sheet_with_retry(worksheet_to_update, data_to_save_list):
+                        # 변경사항 즉시 반영을 위해 세션 데이터도 업데이트
+                        st.session_state["df_cumulative_original"] = df_to_save
+                        df_transposed = df_to_save.set_index('항목')
+                        st.session_state["df_cumulative"] = df_transposed.transpose().reset_index().rename(columns={'index': '이름'})
+                        flash.rerun(f"'{cumulative_sheet_name}' 시트가 성공적으로 업데이트되었습니다.")
+                    else:
+                        st.error("Google Sheets 업데이트에 실패했습니다.")
+                else:
+                    st.error("업데이트할 누적 시트의 이름을 찾을 수 없습니다. 페이지를 새로고침 해주세요.")
+
+            except Exception as e:
+                st.error(f"저장 중 오류 발생: {e}")
+
+# afternoon_duty_counts는 기존 로직(transpose된 df_cumulative)을 그대로 사용해야 하므로 이 부분은 수정하지 않습니다.
+df_cumulative = st.session_state.get("df_cumulative", pd.DataFrame())
+if df_cumulative.empty:
+    st.error("❌ 방배정 실패: 누적 데이터를 불러올 수 없습니다.")
+    st.stop()
+    
+afternoon_duty_counts = {row['이름']: int(row['오후당직누적']) for _, row in df_cumulative.iterrows() if pd.notna(row.get('오후당직누적'))}
+
+# 1. 다음 달 문자열 계산
+target_month_dt = datetime.strptime(month_str, "%Y년 %m월")
+next_month_dt = target_month_dt + relativedelta(months=1)
+next_month_str_for_check = next_month_dt.strftime("%Y년 %-m월")
+
+# 2. 캐시된 함수를 호출하여 3개 시트의 존재 여부 확인
+final_sheets_exist = check_final_sheets_exist(month_str, next_month_str_for_check)
+
+st.divider()
+
+if final_sheets_exist:
+    st.warning(
+        "⚠️ **덮어쓰기 경고**\n\n"
+        "이미 Google Sheets에 다음달의 방배정 결과 시트가 존재합니다.\n\n"
+        "배정을 다시 수행하면 '이어서 작업'되지 않으며, 현재 화면의 설정을 기준으로 **처음부터 다시 계산하여 기존 시트들을 덮어쓰기**합니다."
+    )
+
+instrumentation.profile_toggle("profile_page6")
+if st.button("🚀 방배정 수행", type="primary", use_container_width=True):
+    # base_df_for_diff 비교 대상 결정 (현재 화면 기준)
+    base_df_for_diff = st.session_state.get("df_schedule_md_modified", st.session_state.get("df_schedule_md_initial"))
+    # edited_df_md는 data_editor 결과 변수
+
+    manual_change_log_for_save = []
+    swapped_set_for_save = st.session_state.get("swapped_assignments", set())
+
+    diff_indices = np.where(edited_df_md.ne(base_df_for_diff))
+    for row_idx, col_idx in zip(diff_indices[0], diff_indices[1]):
+        date_str_raw = edited_df_md.iloc[row_idx, 0]
+        col_name = edited_df_md.columns[col_idx]
+        old_value = base_df_for_diff.iloc[row_idx, col_idx]
+        new_value = edited_df_md.iloc[row_idx, col_idx]
+        try:
+            original_row = st.session_state["df_schedule_original"][st.session_state["df_schedule_original"]['날짜'] == date_str_raw].iloc[0]
+            weekday = original_row['요일']
+        except IndexError:
+            weekday = ''
+        time_period = '오후' if col_name.startswith('오후') else '오전'
+        formatted_date_str = f"{date_str_raw} ({weekday.replace('요일', '')}) - {time_period}"
+
+        # 로그 기록 (기존과 동일)
+        manual_change_log_for_save.append({'날짜': formatted_date_str, '변경 전 인원': str(old_value), '변경 후 인원': str(new_value)})
+
+        swapped_set_for_save.add((date_str_raw.strip(), time_period, str(old_value).strip(), str(new_value).strip()))
+
+    # "일괄 적용" 시 생성된 세트도 여기에 합쳐줍니다.
+    batch_swapped_set = st.session_state.get("swapped_assignments", set()) # 이미 위에서 가져왔으므로 중복될 수 있으나 set이 처리
+    swapped_set_for_save.update(batch_swapped_set)
+
+    # 최종 변경 기록 세트를 세션에 저장 -> 엑셀 생성 시 사용됨
+    st.session_state["swapped_assignments"] = swapped_set_for_save
+    st.session_state["final_change_log_at_run"] = st.session_state.get("swapped_assignments_log", []) + manual_change_log_for_save
+
+    # 버튼을 누를 때마다 항상 새로 계산하도록 이전 결과를 삭제합니다.
+    if "assignment_results" in st.session_state:
+        del st.session_state["assignment_results"]
+    job_runner.forget_job("room_job_id")
+
+    if "assignment_results" not in st.session_state or st.session_state.assignment_results is None:
+        with st.spinner("방배정 중..."):
+            # --- 요청사항 처리 결과 추적을 위한 초기화 ---
+            applied_messages = []
+            unapplied_messages = []
+            weekday_map = {0: '월', 1: '화', 2: '수', 3: '목', 4: '금', 5: '토', 6: '일'}
+
+            # 날짜 파싱 성능을 위해 근무일 정보 미리 생성
+            work_days_map = {}
+            target_year = int(month_str.split('년')[0])
+            df_schedule_for_check = st.session_state.get("df_schedule_md_modified", st.session_state.get("df_schedule_md_initial"))
+
+            for _, schedule_row in df_schedule_for_check.iterrows():
+                date_str = schedule_row['날짜']
+                try:
+                    date_obj = datetime.strptime(date_str, '%m월 %d일').replace(year=target_year)
+                    formatted_date = date_obj.strftime('%Y-%m-%d')
+                    
+                    morning_workers = set(p.strip() for p in schedule_row.iloc[2:13].dropna() if p and p.strip())
+                    afternoon_workers = set(p.strip() for p in schedule_row.iloc[13:].dropna() if p and p.strip())
+                    on_call_worker = str(schedule_row.get('오전당직(온콜)', '')).strip()
+
+                    if on_call_worker:
+                        morning_workers.add(on_call_worker)
+                        afternoon_workers.add(on_call_worker)
+                    
+                    work_days_map[formatted_date] = {
+                        "morning": morning_workers,
+                        "afternoon": afternoon_workers,
+                        "on_call": on_call_worker
+                    }
+                except (ValueError, TypeError):
+                    continue
+
+            # 유효성 검사를 통과한 요청만 실제 배정에 사용
+            valid_requests_indices = []
+            for index, req in st.session_state["df_room_request"].iterrows():
+                req_date, is_morning = parse_date_info(req['날짜정보'])
+                person = req['이름']
+                category = req['분류']
+                
+                is_valid = True
+
+                # 날짜 포맷팅 ('MM월 DD일(요일) (오전/오후)')
+                date_obj = datetime.strptime(req_date, '%Y-%m-%d')
+                day_of_week = weekday_map[date_obj.weekday()]
+                date_str_display = f"{date_obj.strftime('%m월 %d일')}({day_of_week})"
+                time_str_display = '오전' if is_morning else '오후'
+                
+                # 1. 근무일이 아닌 경우 검사
+                time_period_key = "morning" if is_morning else "afternoon"
+                if req_date not in work_days_map or person not in work_days_map[req_date][time_period_key]:
+                    msg = f"⚠️ {person}: {date_str_display} ({time_str_display})이 근무일이 아니므로 '{category}' 요청을 처리할 수 없습니다."
+                    unapplied_messages.append(msg)
+                    is_valid = False
+
+                # 2. [수정] 평일 당직방 및 토요/휴일 요청 검사
+                is_special_day = req_date in [d.strftime('%Y-%m-%d') for d, _, _ in st.session_state.get("special_schedules", [])]
+                
+                if is_valid and is_special_day:
+                    # 2-1. 토요/휴일 방 요청 차단 (어떤 요청이든)
+                    msg = f"⛔️ {person}: {date_str_display} ({time_str_display})의 '{category}' 요청은 토요/휴일입니다. (요청사항 반영 안 됨)"
+                    unapplied_messages.append(msg)
+                    is_valid = False
+
+                elif is_valid and not is_special_day:
+                    # 2-2. 평일 당직방 요청 차단
+                    room_match = re.match(r'(\d+)번방', category)
+                    if room_match:
+                        req_room_num = room_match.group(1)
+                        morning_duty_room = st.session_state["room_settings"].get("830_duty")
+                        afternoon_duty_room = st.session_state["room_settings"].get("1330_duty")
+
+                        if is_morning and req_room_num == morning_duty_room:
                             # (오전 당직방)
                             msg = f"⛔️ {person}: {date_str_display} ({time_str_display})의 '{req_room_num}번방' 요청은 '오전 당직방'입니다. (요청사항 반영 안 됨)"
                             unapplied_messages.append(msg)
@@ -2568,57 +3429,6 @@ if st.button("🚀 방배정 수행", type="primary", use_container_width=True):
             
             # 유효한 요청들만 필터링하여 DataFrame 생성
             valid_requests_df = st.session_state["df_room_request"].loc[valid_requests_indices].copy()
-            time.sleep(1)
-
-            try:
-                target_year = int(month_str.split('년')[0])
-                
-                # 토요/휴일 날짜 목록 ('m월 d일' 형식)
-                special_dates_str_set = {s[1] for s in st.session_state.get("special_schedules", [])}
-                
-                # edited_df_md에서 토요/휴일 데이터만 필터링
-                final_special_df_md = edited_df_md[edited_df_md['날짜'].isin(special_dates_str_set)].copy()
-
-                date_to_personnel_map = {}
-                if not final_special_df_md.empty:
-                    # 날짜 형식 변환 및 근무자 목록 생성
-                    for _, row in final_special_df_md.iterrows():
-                        try:
-                            # 'm월 d일' -> 'YYYY-MM-DD'
-                            date_obj = datetime.strptime(row['날짜'], '%m월 %d일').replace(year=target_year)
-                            date_key = date_obj.strftime('%Y-%m-%d')
-                            
-                            # 해당 날짜의 모든 근무자 추출 (중복 제거 및 정렬)
-                            personnel_cols = [str(i) for i in range(1, 12)] + ['오전당직(온콜)'] + [f'오후{i}' for i in range(1, 5)]
-                            personnel_list = [str(row[col]).strip() for col in personnel_cols if col in row and pd.notna(row[col]) and str(row[col]).strip()]
-                            unique_personnel = sorted(list(dict.fromkeys(personnel_list)))
-                            
-                            date_to_personnel_map[date_key] = ", ".join(unique_personnel)
-                        except (ValueError, TypeError):
-                            continue
-
-                # Google Sheets 업데이트
-                if date_to_personnel_map:
-                    gc = get_gspread_client()
-                    sheet = gc.open_by_url(st.secrets["google_sheet"]["url"])
-                    special_sheet_name = f"{target_year}년 토요/휴일 스케줄"
-                    worksheet_special = sheet.worksheet(special_sheet_name)
-                    df_yearly = pd.DataFrame(worksheet_special.get_all_records())
-                    
-                    if not df_yearly.empty:
-                        # '날짜' 열을 기준으로 '근무' 열 업데이트
-                        df_yearly['근무'] = df_yearly.apply(lambda r: date_to_personnel_map.get(str(r['날짜']), r['근무']), axis=1)
-                        
-                        if update_sheet_with_retry(worksheet_special, [df_yearly.columns.tolist()] + df_yearly.fillna('').values.tolist()):
-                            # st.success(f"✅ '{special_sheet_name}' 시트의 근무 정보가 성공적으로 동기화되었습니다.")
-                            pass
-                        else:
-                            st.error(f"❌ '{special_sheet_name}' 시트 동기화에 실패했습니다.")
-            
-            except gspread.exceptions.WorksheetNotFound:
-                st.warning(f"'{special_sheet_name}' 시트를 찾을 수 없어 토요/휴일 스케줄을 동기화할 수 없습니다.")
-            except Exception as e:
-                st.error(f"토요/휴일 스케줄 동기화 중 오류 발생: {type(e).__name__} - {e}")
 
             # --- 최종 당직 정보 입력 검증 ---
             # 이 부분은 이전에 생성된 special_schedules와 special_df를 사용합니다.
@@ -2650,822 +3460,81 @@ if st.button("🚀 방배정 수행", type="primary", use_container_width=True):
                     slot = f"8:30({room})_당직" if room == duty_830 else f"8:30({room})"
                     time_slots[slot] = len(time_slots)
                     time_groups.setdefault('8:30', []).append(slot)
-                for room in rooms_900:
-                    slot = f"9:00({room})"
-                    time_slots[slot] = len(time_slots)
-                    time_groups.setdefault('9:00', []).append(slot)
-                for room in rooms_930:
-                    slot = f"9:30({room})"
-                    time_slots[slot] = len(time_slots)
-                    time_groups.setdefault('9:30', []).append(slot)
-                for room in rooms_1000:
-                    slot = f"10:00({room})"
-                    time_slots[slot] = len(time_slots)
-                    time_groups.setdefault('10:00', []).append(slot)
-                for room in rooms_1330:
-                    slot = f"13:30({room})_당직" if room == duty_1330 else f"13:30({room})"
-                    time_slots[slot] = len(time_slots)
-                    time_groups.setdefault('13:30', []).append(slot)
-
-                memo_rules = {
-                    **{f'{i}번방': [s for s in time_slots if f'({i})' in s and '_당직' not in s] for i in range(1, 13)},
-                    '당직 아닌 이른방': [s for s in time_slots if s.startswith('8:30') and '_당직' not in s],
-                    '이른방 제외': [s for s in time_slots if s.startswith(('9:00', '9:30', '10:00'))],
-                    '늦은방 제외': [s for s in time_slots if s.startswith(('8:30', '9:00', '9:30'))],
-                    '8:30': [s for s in time_slots if s.startswith('8:30') and '_당직' not in s],
-                    '9:00': [s for s in time_slots if s.startswith('9:00')],
-                    '9:30': [s for s in time_slots if s.startswith('9:30')],
-                    '10:00': [s for s in time_slots if s.startswith('10:00')],
-                    '오후 당직 제외': [s for s in time_slots if s.startswith('13:30') and '_당직' not in s]
-                }
-
-                st.session_state.update({"time_slots": time_slots, "time_groups": time_groups, "memo_rules": memo_rules})
-
-            # 1. time_slots 딕셔너리는 L1007-L1022에서 이미 사용자 입력 순서대로 생성됨
-            #    (Python 3.7+ 딕셔너리는 삽입 순서를 보장함)
-            all_time_slots_ordered = list(time_slots.keys())
-            
-            # 2. 시간대별로 (순서가 유지된 채) 리스트를 분리
-            slots_830 = [s for s in all_time_slots_ordered if s.startswith('8:30')]
-            slots_900 = [s for s in all_time_slots_ordered if s.startswith('9:00')]
-            slots_930 = [s for s in all_time_slots_ordered if s.startswith('9:30')]
-            slots_1000 = [s for s in all_time_slots_ordered if s.startswith('10:00')]
-            slots_1330 = [s for s in all_time_slots_ordered if s.startswith('13:30')]
-
-            # 3. [수정] sorted() 함수를 제거하고, 순서가 보장된 리스트를 그대로 조합
-            all_slots = slots_830 + slots_900 + slots_930 + slots_1000 + \
-                        ['온콜'] + \
-                        slots_1330
-            
-            # 4. (필수) 'morning_duty_slot' 변수는 이후 로직(L1048, L1082)에서 사용되므로, 
-            #    all_slots 생성 후에도 올바른 값을 갖도록 여기서 정의합니다.
-            morning_duty_slot = f"8:30({duty_830})_당직"
-
-            columns = ['날짜', '요일'] + all_slots
-
-            # --- 배정 로직 ---
-            total_stats = {'early': Counter(), 'late': Counter(), 'morning_duty': Counter(), 'afternoon_duty': Counter(), 'rooms': {str(i): Counter() for i in range(1, 13)}, 'time_room_slots': {s: Counter() for s in time_slots}}
-            df_cumulative = st.session_state["df_cumulative"]
-            afternoon_duty_counts = {row['이름']: int(row['오후당직누적']) for _, row in df_cumulative.iterrows() if pd.notna(row.get('오후당직누적'))}
-            
-            assignments, date_cache, request_cells, result_data = {}, {}, {}, []
-            assignable_slots = [s for s in st.session_state["time_slots"].keys() if not (s.startswith('8:30') and s.endswith('_당직'))]
-            weekday_map = {0: '월', 1: '화', 2: '수', 3: '목', 4: '금', 5: '토', 6: '일'}
-
-            special_dates = [date_str for _, date_str, _ in special_schedules]
-
-            target_year = int(month_str.split('년')[0])
-            
-            # [수정] for 루프 이전에 special_df 변수를 명확히 정의
-            special_df_for_assignment = special_df 
-
-            for _, row in edited_df_md.iterrows():
-                date_str = row['날짜']
-                try:
-                    date_obj = datetime.strptime(date_str, '%m월 %d일').replace(year=target_year) if "월" in date_str else datetime.strptime(date_str, '%Y-%m-%d')
-                    formatted_date = date_obj.strftime('%Y-%m-%d').strip()
-                    date_cache[date_str] = formatted_date
-                    day_of_week = weekday_map[date_obj.weekday()]
-                except (ValueError, TypeError):
-                    continue
-
-                result_row = [date_str, day_of_week]
-
-                # --- 토요/휴일 배정 로직 ---
-                if date_str in special_dates:
-                    personnel = [p for p in row.iloc[2:].dropna() if p]
-                    settings = st.session_state["weekend_room_settings"].get(date_str, {})
-                    
-                    assignment_dict, sorted_rooms = assign_special_date(personnel, date_str, formatted_date, settings, special_df_for_assignment, valid_requests_df)
-
-                    # (이하 로직은 기존 코드를 그대로 따르되, 하드코딩된 부분만 제거)
-                    room_to_first_slot_idx = {}
-                    for slot_idx, slot_name in enumerate(columns[2:]):
-                        room_match = re.search(r'\((\d+)\)', str(slot_name))
-                        if room_match:
-                            room_num = room_match.group(1)
-                            if room_num not in room_to_first_slot_idx:
-                                room_to_first_slot_idx[room_num] = slot_idx
-                    
-                    # ▼▼▼ [새로 추가할 부분] 토요/휴일 요청사항도 request_cells에 기록하여 메모 기능 활성화 ▼▼▼
-                    if not st.session_state["df_room_request"].empty:
-                        requests_for_day = st.session_state["df_room_request"][
-                            st.session_state["df_room_request"]['날짜정보'].str.startswith(formatted_date)
-                        ]
-                        for _, req in requests_for_day.iterrows():
-                            person_req = req['이름']
-                            category_req = req['분류'] # 예: "7번방"
-                            room_match_req = re.match(r'(\d+)번방', category_req)
-
-                            if room_match_req:
-                                room_num_req = room_match_req.group(1)
-                                # 이 요청이 실제로 배정에 반영되었는지 확인
-                                if f"방({room_num_req})" in assignment_dict and assignment_dict[f"방({room_num_req})"] == person_req:
-                                    # 해당 방 번호에 해당하는 슬롯 이름을 찾음
-                                    if room_num_req in room_to_first_slot_idx:
-                                        slot_idx = room_to_first_slot_idx[room_num_req]
-                                        slot_name = columns[slot_idx + 2] # +2 for '날짜', '요일' columns
-                                        request_cells[(formatted_date, slot_name)] = {'이름': person_req, '분류': category_req}
-        
-                    mapped_assignment = [None] * (len(columns) - 2)
-                    
-                    # sorted_rooms를 기준으로 배정하여 순서 보장
-                    for room_num in sorted_rooms:
-                        slot_key = f"방({room_num})"
-                        if slot_key in assignment_dict:
-                            person = assignment_dict[slot_key]
-                            if room_num in room_to_first_slot_idx:
-                                slot_idx = room_to_first_slot_idx[room_num]
-                                mapped_assignment[slot_idx] = person
-                            
-                    result_data.append(result_row + mapped_assignment)
-                    continue # 평일 로직 건너뛰기
-                    
-                has_person = any(val for val in row.iloc[2:-1] if pd.notna(val) and val)
-                personnel_for_the_day = [p for p in row.iloc[2:].dropna() if p]
-                        
-                # 이 코드는 사용자의 기존 `if date_str in special_dates:` 블록을 대체합니다.
-                if date_str in special_dates:
-                    found_special_schedule = False
-                    # 해당 날짜의 특별 근무 일정을 찾습니다.
-                    for date_obj, special_date_str, personnel in special_schedules:
-                        if special_date_str == date_str:
-                            # Streamlit 세션 상태에서 해당 날짜의 주말/공휴일 설정을 가져옵니다.
-                            settings = st.session_state["weekend_room_settings"].get(date_str, {})
-                            duty_person = settings.get("duty_person", None)
-                            duty_room = settings.get("duty_room", None)
-
-                            # 설정된 인원과 방 정보를 바탕으로 배정 계획을 생성합니다.
-                            # assignment_dict는 {"방번호": "담당자"} 형태의 딕셔너리입니다.
-                            assignment_dict, sorted_rooms = assign_special_date(personnel, date_str, formatted_date, settings, special_df_for_assignment, valid_requests_df)
-                            
-                            # 배정된 인원 수가 방 수보다 적을 경우 경고 메시지를 표시합니다.
-                            if len(assignment_dict) < len(sorted_rooms):
-                                st.warning(f"{date_str}: 인원 수({len(personnel)}) 부족으로 {len(sorted_rooms) - len(assignment_dict)}개 방배정 안 됨.")
-                            
-                            # 1. 각 방 번호와 매칭되는 첫 번째 오전 슬롯의 인덱스를 찾습니다.
-                            room_to_first_slot_idx = {}
-                            # DataFrame의 최종 컬럼을 기준으로 슬롯을 순회하여 길이 불일치 문제를 해결합니다.
-                            for slot_idx, slot in enumerate(columns[2:]):
-                                # 오후(13:30) 슬롯이나 '온콜' 등 배정 대상이 아닌 슬롯은 건너뜁니다.
-                                slot_str = str(slot)
-                                if '13:30' in slot_str or '온콜' in slot_str:
-                                    continue
-                                
-                                # 정규식을 사용해 슬롯 이름에서 방 번호를 추출합니다. 예: "8:30(1)_당직" -> "1"
-                                room_match = re.search(r'\((\d+)\)', slot_str)
-                                if room_match:
-                                    room_num = room_match.group(1)
-                                    # 아직 맵에 없는 방 번호일 경우에만 추가하여, 각 방의 '첫 번째' 슬롯만 매핑되도록 합니다.
-                                    if room_num not in room_to_first_slot_idx:
-                                        room_to_first_slot_idx[room_num] = slot_idx
-                            
-                            # 2. 배정 결과를 최종 슬롯 리스트에 매핑합니다.
-                            # 최종 결과(엑셀의 한 행)를 담을 리스트를 'columns' 길이에 맞춰 초기화합니다.
-                            mapped_assignment = [None] * (len(columns) - 2)
-                            # 중복 배정을 방지하기 위해 이미 배정된 인원을 기록하는 세트입니다.
-                            assigned_personnel = set()
-                            
-                            # `assignment_dict`의 모든 항목(방-사람)을 순회하며 배정합니다.
-                            for room_num, person_with_room in assignment_dict.items():
-                                # 담당자 이름만 추출합니다. (예: "강승주[3]" -> "강승주")
-                                person = person_with_room.split('[')[0].strip()
-
-                                # 해당 방 번호가 배정 대상인 오전 슬롯에 포함되어 있는지 확인합니다.
-                                if room_num in room_to_first_slot_idx:
-                                    # 이미 다른 방에 배정된 인원인지 확인하여 중복을 방지합니다.
-                                    if person in assigned_personnel:
-                                        st.warning(f"{date_str}: {person}님이 중복 배정되었습니다. 확인이 필요합니다.")
-                                        continue
-
-                                    # 배정할 슬롯의 인덱스를 가져옵니다.
-                                    slot_idx = room_to_first_slot_idx[room_num]
-                                    
-                                    # 최종 배정 리스트의 해당 위치에 담당자 이름을 할당합니다.
-                                    mapped_assignment[slot_idx] = person
-                                    # 이 담당자를 '배정 완료' 세트에 추가합니다.
-                                    assigned_personnel.add(person)
-                            
-                            # 완성된 배정 결과를 전체 결과 데이터에 추가합니다.
-                            full_row = result_row + mapped_assignment
-                            result_data.append(full_row)
-                            found_special_schedule = True
-                            break  # 해당 날짜의 처리가 끝났으므로 내부 루프를 종료합니다.
-
-                    # 특별 근무 일정이 없는 경우 (예: 공휴일이지만 근무자가 없는 날) 빈 행을 추가합니다.
-                    if not found_special_schedule:
-                        result_data.append(result_row + [None] * (len(columns) - 2))
-
-                    # special_date 처리가 끝났으므로, 평일 배정 로직을 건너뛰고 다음 날짜로 넘어갑니다.
-                    continue
-
-                # 기존 평일 처리
-                # 2. '소수 인원 근무'로 판단할 기준 인원수를 설정합니다.
-                # SMALL_TEAM_THRESHOLD = 15
-
-                # # 3. 근무 인원수가 설정된 기준보다 적으면, 방배정 없이 순서대로 나열합니다.
-                # if len(personnel_for_the_day) < SMALL_TEAM_THRESHOLD and has_person:
-                #     result_row.append(None)
-                #     result_row.extend(personnel_for_the_day)
-                #     num_slots_to_fill = len(all_slots)
-                #     slots_filled_count = len(personnel_for_the_day) + 1  # 근무자 수 + 비워둔 1칸
-                #     padding_needed = num_slots_to_fill - slots_filled_count
-                #     if padding_needed > 0:
-                #         result_row.extend([None] * padding_needed)
-                #     result_data.append(result_row)
-                #     continue
-                
-                morning_personnel = [row[str(i)] for i in range(1, 12) if pd.notna(row[str(i)]) and row[str(i)]]
-                afternoon_personnel = [row[f'오후{i}'] for i in range(1, 5) if pd.notna(row[f'오후{i}']) and row[f'오후{i}']]
-                
-                if not (morning_personnel or afternoon_personnel):
-                    result_row.extend([None] * len(all_slots))
-                    result_data.append(result_row)
-                    continue
-                
-                # ✨ --- 여기가 수정된 요청사항 처리 로직입니다 --- ✨
-                request_assignments = {}
-                # 그날에 해당하는 유효한 요청만 필터링
-                requests_for_day = valid_requests_df[valid_requests_df['날짜정보'].str.startswith(formatted_date)]
-                
-                if not requests_for_day.empty:
-                    # 1단계: '특정 방' 요청 먼저 처리 (충돌 가능성 높음)
-                    room_reqs = requests_for_day[requests_for_day['분류'].str.contains('번방')].sort_index()
-                    for _, req in room_reqs.iterrows():
-                        person, category = req['이름'], req['분류']
-                        # 이 사람/시간대에 대한 요청이 이미 처리되었는지 확인
-                        if any(p == person for p in request_assignments.values()): continue
-
-                        slots_for_category = st.session_state["memo_rules"].get(category, [])
-                        if slots_for_category:
-                            # '1번방' 요청은 슬롯이 하나뿐이므로, 그 슬롯이 비어있으면 배정
-                            target_slot = slots_for_category[0]
-                            if target_slot not in request_assignments:
-                                request_assignments[target_slot] = person
-                                request_cells[(formatted_date, target_slot)] = {'이름': person, '분류': category}
-
-                    # 2단계: '특정 시간대' 및 기타 요청 처리
-                    other_reqs = requests_for_day[~requests_for_day['분류'].str.contains('번방')].sort_index()
-                    for _, req in other_reqs.iterrows():
-                        person, category, date_info = req['이름'], req['분류'], req['날짜정보']
-                        is_morning = '(오전)' in date_info
-                        if any(p == person for p in request_assignments.values()): continue
-
-                        # 요청을 만족하는 '아직 비어있는' 슬롯 찾기
-                        possible_slots = [s for s in st.session_state["memo_rules"].get(category, []) if s not in request_assignments]
-                        if possible_slots:
-                            selected_slot = random.choice(possible_slots)
-                            request_assignments[selected_slot] = person
-                            request_cells[(formatted_date, selected_slot)] = {'이름': person, '분류': category}
-
-                # `random_assign` 호출은 기존과 동일합니다.
-                assignment, _ = random_assign(list(set(morning_personnel)|set(afternoon_personnel)), assignable_slots, request_assignments, st.session_state["time_groups"], total_stats, list(morning_personnel), list(afternoon_personnel), afternoon_duty_counts)
-
-                for slot in all_slots:
-                    person = row['오전당직(온콜)'] if slot == morning_duty_slot or slot == '온콜' else (assignment[assignable_slots.index(slot)] if slot in assignable_slots and assignment else None)
-                    result_row.append(person if has_person else None)
-                
-                # [추가] 중복 배정 검증 로직
-                assignments_for_day = dict(zip(all_slots, result_row[2:]))
-                morning_slots_check = [s for s in all_slots if s.startswith(('8:30', '9:00', '9:30', '10:00'))]
-                afternoon_slots_check = [s for s in all_slots if s.startswith('13:30')]
-
-                morning_counts = Counter(p for s, p in assignments_for_day.items() if s in morning_slots_check and p)
-                for person, count in morning_counts.items():
-                    if count > 1:
-                        duplicated_slots = [s for s, p in assignments_for_day.items() if p == person and s in morning_slots_check]
-                        st.error(f"⚠️ {date_str}: '{person}'님이 오전에 중복 배정되었습니다 (슬롯: {', '.join(duplicated_slots)}).")
-                
-                afternoon_counts = Counter(p for s, p in assignments_for_day.items() if s in afternoon_slots_check and p)
-                for person, count in afternoon_counts.items():
-                    if count > 1:
-                        duplicated_slots = [s for s, p in assignments_for_day.items() if p == person and s in afternoon_slots_check]
-                        st.error(f"⚠️ {date_str}: '{person}'님이 오후/온콜에 중복 배정되었습니다 (슬롯: {', '.join(duplicated_slots)}).")
-
-                result_data.append(result_row)
-            
-            df_room = pd.DataFrame(result_data, columns=columns)
-
-            # 1. 'df_room' (최종 방배정 결과)를 기반으로 'total_stats'를 (재)계산합니다.
-            total_stats = {
-                'early': Counter(), 
-                'late': Counter(), 
-                'morning_duty': Counter(), 
-                'afternoon_duty': Counter(), 
-                'rooms': {str(i): Counter() for i in range(1, 13)}, 
-                'time_room_slots': {s: Counter() for s in st.session_state["time_slots"].keys()}
-            }
-            
-            for _, row in df_room.iterrows():
-                current_date_str = row['날짜']
-                if current_date_str in special_dates:
-                    continue # 토요/휴일은 통계에 포함 안 함
-
-                # 'columns' 리스트와 'row' (Series)를 매핑
-                assignment_for_day = row[columns[2:]] # '날짜', '요일' 제외
-
-                for slot_name, person in assignment_for_day.items():
-                    if not person:
-                        continue
-                    
-                    # 1. 오전 당직
-                    if slot_name == morning_duty_slot:
-                        total_stats['morning_duty'][person] += 1
-                    
-                    # 2. 오후 당직 (13:30 당직)
-                    elif slot_name.startswith('13:30') and slot_name.endswith('_당직'):
-                        total_stats['afternoon_duty'][person] += 1
-                    
-                    # 3. 이른방 (8:30, 당직 제외)
-                    elif slot_name.startswith('8:30') and '_당직' not in slot_name:
-                        total_stats['early'][person] += 1
-                    
-                    # 4. 늦은방 (10:00)
-                    elif slot_name.startswith('10:00'):
-                        total_stats['late'][person] += 1
-                    
-                    # 5. 시간대별/방별 통계 (for stats_df)
-                    if slot_name in total_stats['time_room_slots']:
-                        total_stats['time_room_slots'][slot_name][person] += 1
-
-# 2. 통계 DataFrame을 생성합니다.
-            stats_data = []
-            all_personnel_stats = set(p for _, r in st.session_state["df_schedule_md"].iterrows() for p in r[2:].dropna() if p)
-            
-            # --- [수정] 화면 원본(df_cumulative_original)에서 4가지 값을 모두 가져옵니다 ---
-            df_source_raw = st.session_state.get("df_cumulative_original", pd.DataFrame())
-            
-            # 맵 초기화
-            map_pm_cum = {} # 오후당직누적
-            map_pm_src = {} # 오후당직
-            map_am_cum = {} # 오전당직누적
-            map_am_src = {} # 오전당직
-
-            if not df_source_raw.empty:
-                first_col = df_source_raw.columns[0]
-                
-                # 데이터 매핑 함수 (행 이름 -> 딕셔너리)
-                def get_row_map(row_name):
-                    row = df_source_raw[df_source_raw[first_col].astype(str).str.strip() == row_name]
-                    result = {}
-                    if not row.empty:
-                        for col in df_source_raw.columns[1:]:
-                            try:
-                                val = row.iloc[0][col]
-                                result[str(col).strip()] = int(val) if val not in [None, ''] else 0
-                            except:
-                                result[str(col).strip()] = 0
-                    return result
-
-                map_pm_cum = get_row_map('오후당직누적')
-                map_pm_src = get_row_map('오후당직')
-                map_am_cum = get_row_map('오전당직누적')
-                map_am_src = get_row_map('오전당직')
-
-            # --- 통계 계산 루프 ---
-            for person in sorted(all_personnel_stats):
-                person_key = str(person).strip()
-
-                # [오후당직] 공식: (시트누적 - 시트당월) + 이번달배정
-                pm_sheet_cum = map_pm_cum.get(person_key, 0)
-                pm_sheet_src = map_pm_src.get(person_key, 0)
-                pm_this_month = total_stats['afternoon_duty'][person]
-                
-                pm_final = (pm_sheet_cum - pm_sheet_src) + pm_this_month
-                
-                # [오전당직] 공식: (시트누적 - 시트당월) + 이번달배정
-                am_sheet_cum = map_am_cum.get(person_key, 0)
-                am_sheet_src = map_am_src.get(person_key, 0)
-                am_this_month = total_stats['morning_duty'][person]
-                
-                am_final = (am_sheet_cum - am_sheet_src) + am_this_month
-
-                stats_entry = {
-                    '인원': person,
-                    '이른방 합계': total_stats['early'][person],
-                    '늦은방 합계': total_stats['late'][person],
-                    '오전당직': am_this_month,
-                    '오전당직 누적': am_final,
-                    '오후당직': pm_this_month,
-                    '오후당직 누적': pm_final
-                }
-                
-                for slot in st.session_state["time_slots"].keys():
-                    if not slot.endswith('_당직'):
-                        stats_entry[f'{slot} 합계'] = total_stats['time_room_slots'].get(slot, Counter())[person]
-                
-                stats_data.append(stats_entry)
-
-            time_order = ['8:30', '9:00', '9:30', '10:00', '13:30']
-
-            # [수정] 컬럼 목록에 '오전당직 누적' 추가
-            sorted_columns = ['인원', '이른방 합계', '늦은방 합계', '오전당직', '오전당직 누적', '오후당직', '오후당직 누적']
-            
-            time_slots_sorted = sorted(
-                [slot for slot in st.session_state["time_slots"].keys() if not slot.endswith('_당직')],
-                key=lambda x: (time_order.index(x.split('(')[0]), int(x.split('(')[1].split(')')[0]))
-            )
-            sorted_columns.extend([f'{slot} 합계' for slot in time_slots_sorted])
-            stats_df_names_as_rows = pd.DataFrame(stats_data)[sorted_columns]
-            # [신규] (항목-행) 기준으로 Transpose 하여 최종 stats_df 생성
-            stats_df = stats_df_names_as_rows.set_index('인원').transpose().reset_index().rename(columns={'index': '항목'})
-
-            # --- [수정 3] 배정 완료 후, 모든 로그 생성 ---
-            
-            # 3-1. 방배정 요청 로그 생성
-            applied_request_keys = set((key[0], value['이름'], value['분류']) for key, value in request_cells.items())
-            
-            # ▼▼▼ [수정] 이 블록 전체를 교체하세요. (1594~1608 라인) ▼▼▼
-            
-            # [FIX] 휴일 날짜 문자열 세트를 미리 생성 (예: '10월 18일')
-            special_dates_str_set = {s[1] for s in st.session_state.get("special_schedules", [])}
-
-            for _, req in valid_requests_df.iterrows():
-                req_date, is_morning = parse_date_info(req['날짜정보'])
-                if not req_date: continue
-                person, category = req['이름'], req['분류']
-                
-                date_obj = datetime.strptime(req_date, '%Y-%m-%d')
-                # [FIX] 날짜 형식을 '10월 18일' (m월 d일)로 변경 (휴일 세트와 비교하기 위함)
-                date_str_display_for_check = f"{date_obj.month}월 {date_obj.day}일"
-                # 화면 표시용 날짜 (요일 포함)
-                date_str_display = f"{date_str_display_for_check}({weekday_map[date_obj.weekday()]})"
-                time_str_display = '오전' if is_morning else '오후'
-                
-                if (req_date, person, category) in applied_request_keys:
-                    msg = f"✅ {person}: {date_str_display} ({time_str_display})의 '{category}' 요청이 적용되었습니다."
-                    applied_messages.append(msg)
-                else:
-                    # [FIX] 이 요청이 실패한 요청인지 확인
-                    
-                    # 1. 이 날짜가 휴일인지 확인
-                    is_special_day_log = date_str_display_for_check in special_dates_str_set
-                    
-                    if is_special_day_log:
-                        # [FIX] 날짜가 휴일(토요일 포함)이기만 하면, 실패 시 무조건 수기 수정 메시지
-                        msg = f"⛔️ {person}: {date_str_display} ({time_str_display})의 '{category}' 요청은 토요 방입니다. 수기로 수정해 주십시오."
-                    else:
-                        # 평일 요청이 실패한 경우 (배정 균형)
-                        msg = f"⚠️ {person}: {date_str_display} ({time_str_display})의 '{category}' 요청이 배정 균형을 위해 반영되지 않았습니다."
-                    
-                    unapplied_messages.append(msg)
-                # ▲▲▲ [수정] 교체 완료 ▲▲▲
-
-            # 3-2. 오후당직 배정 로그 생성
-            oncall_logs = []
-            actual_duty_counts = total_stats.get('afternoon_duty', Counter())
-            
-            # [수정] 오후당직 배정 로그를 횟수별로 그룹화합니다.
-            # 1. 횟수별로 인원을 저장할 딕셔너리 초기화
-            counts_to_workers = {}
-
-            # 2. 모든 인원(all_personnel_stats)을 순회하며 횟수별 딕셔너리에 추가
-            # (actual_duty_counts에 없는 0회 배정자도 포함하기 위함)
-            for person in all_personnel_stats: # L1879에서 정의된 변수
-                count = actual_duty_counts.get(person, 0) # 배정 못 받았으면 0
-                if count not in counts_to_workers:
-                    counts_to_workers[count] = []
-                counts_to_workers[count].append(person)
-                
-            # 3. oncall_logs 리스트 생성 (횟수(key) 기준으로 정렬)
-            for count, workers in sorted(counts_to_workers.items()):
-                if workers: # 해당 횟수에 배정된 사람이 있을 경우에만 로그 생성
-                    sorted_workers = sorted(workers) # 이름순으로 정렬
-                    log_message = f"- {count}회 배정: {', '.join(sorted_workers)}"
-                    oncall_logs.append(log_message)
-
-            # --- [수정] Google Sheets 연결 및 시트 저장 로직 (누락된 부분 복원) ---
-            try:
-                gc = get_gspread_client()
-                sheet = gc.open_by_url(st.secrets["google_sheet"]["url"])
-
-                # --- 1. [신규 삽입] "스케줄 최종" 저장 로직 (L1448-L1542 코드) ---
-                try:
-                    df_schedule_to_save = st.session_state["df_schedule_original"].copy()
-                    
-                    # 'edited_df_md' (L1377에서 정의됨)는 현재 data_editor의 상태입니다.
-                    edited_df_md_for_save = edited_df_md 
-
-                    # L1450-L1455: robust_parse_date 함수 정의
-                    target_year_for_save = int(month_str.split('년')[0]) 
-                    def robust_parse_date(date_str, year=target_year_for_save):
-                        try:
-                            if "월" in str(date_str): return datetime.strptime(str(date_str), '%m월 %d일').replace(year=year).date()
-                            else: return pd.to_datetime(date_str).date()
-                        except: return None
-                    
-                    df_schedule_to_save['parsed_date'] = df_schedule_to_save['날짜'].apply(robust_parse_date)
-                    
-                    # L1456-L1522: edited_df_md_for_save를 순회하며 df_schedule_to_save 업데이트
-                    for _, edited_row in edited_df_md_for_save.iterrows():
-                        edited_date_obj = robust_parse_date(edited_row['날짜'])
-                        if edited_date_obj is None: continue
-                        target_indices = df_schedule_to_save[df_schedule_to_save['parsed_date'] == edited_date_obj].index
-                        if target_indices.empty: continue
-                        original_row_idx = target_indices[0]
-
-                        # (L1464) 수정된 내용 가져오기
-                        oncall_person = str(edited_row.get('오전당직(온콜)', '')).strip()
-                        am_editor_cols = [str(i) for i in range(1, 12)]
-                        am_personnel = [str(edited_row[col]).strip() for col in am_editor_cols if col in edited_row and pd.notna(edited_row[col]) and str(edited_row[col]).strip()]
-                        pm_editor_cols = [f'오후{i}' for i in range(1, 5)]
-                        pm_personnel = [str(edited_row[col]).strip() for col in pm_editor_cols if col in edited_row and pd.notna(edited_row[col]) and str(edited_row[col]).strip()]
-
-                        # (L1477) 원본 스케줄의 숨겨진 근무자 파싱
-                        original_schedule_row = st.session_state["df_schedule_original"].loc[original_row_idx]
-                        pm_hidden_cols = [f'오후{i}' for i in range(5, 10)]
-                        pm_hidden_personnel = [
-                            clean_name(original_schedule_row[col]) for col in pm_hidden_cols
-                            if col in original_schedule_row and pd.notna(original_schedule_row[col]) and clean_name(original_schedule_row[col])
-                        ]
-                        am_hidden_cols = [str(i) for i in range(12, 18)]
-                        am_hidden_personnel = [
-                            clean_name(original_schedule_row[col]) for col in am_hidden_cols
-                            if col in original_schedule_row and pd.notna(original_schedule_row[col]) and clean_name(original_schedule_row[col])
-                        ]
-
-                        # (L1501) 저장할 DataFrame의 모든 관련 열 초기화
-                        cols_to_clear_am = [str(i) for i in range(1, 18)]
-                        for col in cols_to_clear_am:
-                            if col in df_schedule_to_save.columns: df_schedule_to_save.at[original_row_idx, col] = ''
-                        cols_to_clear_pm = [f'오후{i}' for i in range(1, 10)]
-                        for col in cols_to_clear_pm:
-                            if col in df_schedule_to_save.columns: df_schedule_to_save.at[original_row_idx, col] = ''
-
-                        # (L1510) 수정된 내용으로 다시 채워넣기
-                        df_schedule_to_save.at[original_row_idx, '오전당직(온콜)'] = oncall_person
-
-                        am_save_list = list(dict.fromkeys(am_personnel + ([oncall_person] if oncall_person else []) + am_hidden_personnel))
-                        for i, person in enumerate(am_save_list, 1):
-                            col_name_am = str(i)
-                            if col_name_am in df_schedule_to_save.columns:
-                                df_schedule_to_save.at[original_row_idx, col_name_am] = person
-
-                        pm_save_list = list(dict.fromkeys(pm_personnel + pm_hidden_personnel))
-                        for i, person in enumerate(pm_save_list, 1):
-                            col_name_pm = f'오후{i}'
-                            if col_name_pm in df_schedule_to_save.columns:
-                                df_schedule_to_save.at[original_row_idx, col_name_pm] = person
-                    
-                    df_schedule_to_save.drop(columns=['parsed_date'], inplace=True, errors='ignore')
-
-                    # (L1524) "스케줄 최종" 시트에 저장
-                    schedule_sheet_name = f"{month_str} 스케줄 최종"
-                    try:
-                        worksheet_schedule = sheet.worksheet(schedule_sheet_name)
-                    except gspread.exceptions.WorksheetNotFound:
-                        worksheet_schedule = sheet.add_worksheet(title=schedule_sheet_name, rows=100, cols=30) 
-                    
-                    # [수정] 원본 df_schedule_original의 컬럼을 기준으로 저장할 컬럼을 정함
-                    columns_to_save_requested = st.session_state["df_schedule_original"].columns.tolist()
-                    
-                    # 불필요한 열 제거
-                    if 'parsed_date' in columns_to_save_requested:
-                         columns_to_save_requested.remove('parsed_date')
-                    if '날짜_dt' in columns_to_save_requested:
-                         columns_to_save_requested.remove('날짜_dt')
-
-                    columns_to_save = [col for col in columns_to_save_requested if col in df_schedule_to_save.columns]
-                    schedule_data = [columns_to_save] + df_schedule_to_save[columns_to_save].fillna('').values.tolist()
-
-                    if update_sheet_with_retry(worksheet_schedule, schedule_data):
-                        st.success(f"✅ '{schedule_sheet_name}' 시트 저장을 완료하였습니다.")
-                    else:
-                        save_errors.append(f"'{schedule_sheet_name}' 시트 저장에 실패하였습니다.")
-
-                except Exception as e:
-                    st.error(f"Google Sheets '스케줄 최종' 시트 저장 중 오류 발생: {type(e).__name__} - {e}")
-                    save_errors.append(f"'스케줄 최종' 시트 저장 실패: {e}")
-                # --- ▲▲▲ [신규 삽입] "스케줄 최종" 저장 로직 종료 ▲▲▲ ---
-
-
-                # --- 2. '방배정' 시트 저장 (기존 로직) ---
-                try:
-                    try:
-                        worksheet_result = sheet.worksheet(f"{month_str} 방배정 ver1.0")
-                    except gspread.exceptions.WorksheetNotFound:
-                        worksheet_result = sheet.add_worksheet(f"{month_str} 방배정 ver1.0", rows=100, cols=len(df_room.columns))
-                    
-                    if update_sheet_with_retry(worksheet_result, [df_room.columns.tolist()] + df_room.fillna('').values.tolist()):
-                        st.success(f"✅ {month_str} 방배정 ver1.0 테이블이 Google Sheets에 저장되었습니다.")
-                        time.sleep(2)
-                    else:
-                        save_errors.append(f"'{month_str} 방배정 ver1.0' 시트 저장에 실패하였습니다.")
-                        
-                except Exception as e:
-                    st.error(f"Google Sheets '방배정' 시트 저장 중 오류 발생: {type(e).__name__} - {e}")
-                    save_errors.append(f"'방배정' 시트 저장 실패: {e}")
+                for room in rooms_900:
+                    slot = f"9:00({room})"
+                    time_slots[slot] = len(time_slots)
+                    time_groups.setdefault('9:00', []).append(slot)
+                for room in rooms_930:
+                    slot = f"9:30({room})"
+                    time_slots[slot] = len(time_slots)
+                    time_groups.setdefault('9:30', []).append(slot)
+                for room in rooms_1000:
+                    slot = f"10:00({room})"
+                    time_slots[slot] = len(time_slots)
+                    time_groups.setdefault('10:00', []).append(slot)
+                for room in rooms_1330:
+                    slot = f"13:30({room})_당직" if room == duty_1330 else f"13:30({room})"
+                    time_slots[slot] = len(time_slots)
+                    time_groups.setdefault('13:30', []).append(slot)
 
-                # --- 3. '다음달 누적 최종' 시트 업데이트 (기존 로직) ---
-                try:
-                    target_month_dt = datetime.strptime(month_str, "%Y년 %m월")
-                    next_month_dt = target_month_dt + relativedelta(months=1)
-                    next_month_str = next_month_dt.strftime("%Y년 %-m월")
-                    
-                    latest_cumulative_name_next = st.session_state.get("latest_cumulative_name") 
+                memo_rules = {
+                    **{f'{i}번방': [s for s in time_slots if f'({i})' in s and '_당직' not in s] for i in range(1, 13)},
+                    '당직 아닌 이른방': [s for s in time_slots if s.startswith('8:30') and '_당직' not in s],
+                    '이른방 제외': [s for s in time_slots if s.startswith(('9:00', '9:30', '10:00'))],
+                    '늦은방 제외': [s for s in time_slots if s.startswith(('8:30', '9:00', '9:30'))],
+                    '8:30': [s for s in time_slots if s.startswith('8:30') and '_당직' not in s],
+                    '9:00': [s for s in time_slots if s.startswith('9:00')],
+                    '9:30': [s for s in time_slots if s.startswith('9:30')],
+                    '10:00': [s for s in time_slots if s.startswith('10:00')],
+                    '오후 당직 제외': [s for s in time_slots if s.startswith('13:30') and '_당직' not in s]
+                }
 
-                    if not latest_cumulative_name_next:
-                        save_errors.append(f"'{next_month_str} 누적' 시트를 찾을 수 없어 업데이트 불가.")
-                    else:
-                        worksheet_cumulative_next = sheet.worksheet(latest_cumulative_name_next)
-                        all_data = worksheet_cumulative_next.get_all_values() 
-                        
-                        if not all_data or len(all_data) < 2:
-                            save_errors.append(f"'{latest_cumulative_name_next}' 시트가 비어있거나 형식이 잘못됨.")
-                        else:
-                            headers, rows = all_data[0], all_data[1:]
-                            
-                            for r_idx, row_data in enumerate(rows):
-                                for c_idx, cell_value in enumerate(row_data):
-                                    if c_idx == 0: continue
-                                    try:
-                                        if cell_value != '':
-                                            rows[r_idx][c_idx] = int(cell_value)
-                                    except (ValueError, TypeError):
-                                        pass
-
-                            # [1단계] 오전/오후 인덱스 변수 초기화
-                            pm_target_row_index = -1 # '오후당직누적'
-                            pm_source_row_index = -1 # '오후당직'
-                            am_target_row_index = -1 # '오전당직누적'
-                            am_source_row_index = -1 # '오전당직'
-
-                            # [2단계] 4개 행의 인덱스 찾기
-                            for i, row_data in enumerate(rows):
-                                if row_data[0] == '오후당직누적':
-                                    pm_target_row_index = i
-                                if row_data[0] == '오후당직':
-                                    pm_source_row_index = i
-                                if row_data[0] == '오전당직누적':
-                                    am_target_row_index = i
-                                if row_data[0] == '오전당직':
-                                    am_source_row_index = i
-                            
-                            # [3단계] 4개 행을 모두 찾았는지 확인
-                            if all(idx != -1 for idx in [pm_target_row_index, pm_source_row_index, am_target_row_index, am_source_row_index]):
-                                
-                                # [4단계 & 5단계 통합 수정] 이미 계산된 'stats_data'를 사용하여 시트 데이터(rows) 업데이트
-                                # 이유: 화면에 보이는 결과와 100% 일치시키기 위함
-                                
-                                # 1. 계산된 통계 데이터를 이름 기준으로 빠르게 찾을 수 있게 딕셔너리로 변환
-                                # key: 이름, value: 해당 인원의 통계 딕셔너리
-                                calculated_stats_map = {item['인원']: item for item in stats_data}
-
-                                # 2. 시트의 헤더(이름)를 순회하며 값 대입
-                                for col_idx, name in enumerate(headers):
-                                    if col_idx == 0: continue # 첫 번째 열(항목) 건너뜀
-                                    name_strip = str(name).strip()
-                                    
-                                    if name_strip in calculated_stats_map:
-                                        stat_item = calculated_stats_map[name_strip]
-                                        
-                                        # --- 오후 당직 & 누적 업데이트 ---
-                                        if pm_source_row_index != -1:
-                                            # '오후당직' 행에 금방 계산된 '오후당직' 값 대입
-                                            rows[pm_source_row_index][col_idx] = stat_item['오후당직']
-                                        
-                                        if pm_target_row_index != -1:
-                                            # '오후당직누적' 행에 금방 계산된 '오후당직 누적' 값 대입
-                                            rows[pm_target_row_index][col_idx] = stat_item['오후당직 누적']
-
-                                        # --- 오전 당직 & 누적 업데이트 ---
-                                        if am_source_row_index != -1:
-                                            # '오전당직' 행에 금방 계산된 '오전당직' 값 대입
-                                            rows[am_source_row_index][col_idx] = stat_item['오전당직']
-                                        
-                                        if am_target_row_index != -1:
-                                            # '오전당직누적' 행에 금방 계산된 '오전당직 누적' 값 대입
-                                            rows[am_target_row_index][col_idx] = stat_item['오전당직 누적']
+                st.session_state.update({"time_slots": time_slots, "time_groups": time_groups, "memo_rules": memo_rules})
 
-                                final_cumulative_sheet_name = f"{next_month_str} 누적 최종"
-                                try:
-                                    worksheet_final_cumulative = sheet.worksheet(final_cumulative_sheet_name)
-                                except gspread.exceptions.WorksheetNotFound:
-                                    worksheet_final_cumulative = sheet.add_worksheet(title=final_cumulative_sheet_name,
-                                                                                    rows=len(all_data) + 5,
-                                                                                    cols=len(headers) + 5)
-
-                                if update_sheet_with_retry(worksheet_final_cumulative, [headers] + rows):
-                                    # [수정] 누적 시트는 숫자로 인식되어 우측 정렬되도록, 강제 텍스트 변환 함수 대신 기본 update 사용
-                                    try:
-                                        worksheet_final_cumulative.clear()
-                                        # value_input_option='USER_ENTERED'를 쓰면 파이썬의 int/float가 시트의 숫자로 자동 인식됨
-                                        worksheet_final_cumulative.update(
-                                            range_name='A1', 
-                                            values=[headers] + rows, 
-                                            value_input_option='USER_ENTERED'
-                                        )
-                                        st.success(f"✅ '{final_cumulative_sheet_name}' 시트 업데이트가 완료되었습니다.")
-                                    
-                                    except Exception as e:
-                                        # API 쿼터 초과 시 1회 재시도 로직
-                                        if "Quota exceeded" in str(e):
-                                            time.sleep(5)
-                                            try:
-                                                worksheet_final_cumulative.update(
-                                                    range_name='A1', 
-                                                    values=[headers] + rows, 
-                                                    value_input_option='USER_ENTERED'
-                                                )
-                                                st.success(f"✅ '{final_cumulative_sheet_name}' 시트 업데이트가 완료되었습니다. (재시도 성공)")
-                                            except Exception as e2:
-                                                save_errors.append(f"'{final_cumulative_sheet_name}' 시트 업데이트에 실패하였습니다: {e2}")
-                                        else:
-                                            save_errors.append(f"'{final_cumulative_sheet_name}' 시트 업데이트에 실패하였습니다: {e}")
-                                else:
-                                    save_errors.append(f"'{final_cumulative_sheet_name}' 시트 업데이트에 실패하였습니다.")
-                            
-                            # [6단계] 오류 메시지 수정
-                            elif pm_target_row_index == -1: 
-                                save_errors.append(f"'{latest_cumulative_name_next}' 시트에서 '오후당직누적' 항목을 찾을 수 없습니다.")
-                            elif pm_source_row_index == -1: 
-                                save_errors.append(f"'{latest_cumulative_name_next}' 시트에서 '오후당직' 항목을 찾을 수 없습니다.")
-                            elif am_target_row_index == -1: 
-                                save_errors.append(f"'{latest_cumulative_name_next}' 시트에서 '오전당직누적' 항목을 찾을 수 없습니다.")
-                            elif am_source_row_index == -1: 
-                                save_errors.append(f"'{latest_cumulative_name_next}' 시트에서 '오전당직' 항목을 찾을 수 없습니다.")
+            # 1. time_slots 딕셔너리는 L1007-L1022에서 이미 사용자 입력 순서대로 생성됨
+            #    (Python 3.7+ 딕셔너리는 삽입 순서를 보장함)
+            all_time_slots_ordered = list(time_slots.keys())
+            
+            # 2. 시간대별로 (순서가 유지된 채) 리스트를 분리
+            slots_830 = [s for s in all_time_slots_ordered if s.startswith('8:30')]
+            slots_900 = [s for s in all_time_slots_ordered if s.startswith('9:00')]
+            slots_930 = [s for s in all_time_slots_ordered if s.startswith('9:30')]
+            slots_1000 = [s for s in all_time_slots_ordered if s.startswith('10:00')]
+            slots_1330 = [s for s in all_time_slots_ordered if s.startswith('13:30')]
 
-                except Exception as e:
-                    st.error(f"Google Sheets '누적 최종' 시트 저장 중 오류 발생: {type(e).__name__} - {e}")
-                    save_errors.append(f"'누적 최종' 시트 저장 실패: {e}")
-                    time.sleep(5)
+            # 3. [수정] sorted() 함수를 제거하고, 순서가 보장된 리스트를 그대로 조합
+            all_slots = slots_830 + slots_900 + slots_930 + slots_1000 + \
+                        ['온콜'] + \
+                        slots_1330
+            
+            # 4. (필수) 'morning_duty_slot' 변수는 이후 로직(L1048, L1082)에서 사용되므로, 
+            #    all_slots 생성 후에도 올바른 값을 갖도록 여기서 정의합니다.
+            morning_duty_slot = f"8:30({duty_830})_당직"
 
-            except Exception as e:
-                # gc = get_gspread_client() 자체에서 오류가 난 경우
-                st.error(f"Google Sheets 연결 중 오류 발생: {type(e).__name__} - {e}")
-                save_errors.append(f"Google Sheets 연결 실패: {e}")
-
-            # --- [수정] Excel 생성 함수 호출 ---
-            output = generate_excel_output(
-                df_room=df_room,
-                stats_df=stats_df,
-                columns=columns,
-                special_dates=special_dates,
-                special_df=special_df,
-                date_cache=date_cache,
-                request_cells=request_cells,
-                swapped_assignments=st.session_state.get("swapped_assignments", set()), # 이 시점엔 비어있음
-                morning_duty_slot=morning_duty_slot,
-                month_str=month_str,
-            )
-            # --- [수정 완료] ---
+            columns = ['날짜', '요일'] + all_slots
 
-            st.session_state["assignment_results"] = {
-                "df_room": df_room,
-                "stats_df": stats_df,
-                "excel_output": output, # <-- 방금 생성한 output
+            # --- 방배정과 Google Sheets 저장은 백그라운드 작업 하나로 실행 (스크립트 재실행/새로고침과 무관하게 계속 진행) ---
+            room_inputs = {
+                "month_str": month_str,
+                "edited_df_md": edited_df_md.copy(),
+                "special_schedules": list(special_schedules),
+                "special_df": special_df.copy(),
+                "valid_requests_df": valid_requests_df,
                 "applied_messages": applied_messages,
                 "unapplied_messages": unapplied_messages,
-                "oncall_logs": oncall_logs,
-                "save_errors": save_errors,
-                "actual_duty_counts": actual_duty_counts, # <-- [핵심 수정] 이 줄을 추가하세요.
-
-                # ▼▼▼ [수정] 다운로드 재성성을 위해 이 변수들을 추가합니다 ▼▼▼
-                "columns": columns,
-                "special_dates": special_dates,
-                "date_cache": date_cache,
-                "request_cells": request_cells,
-                "morning_duty_slot": morning_duty_slot,
-                "all_personnel_stats": all_personnel_stats,
-                "time_slots": st.session_state["time_slots"],
-                "time_order": time_order,
+                "time_slots": dict(time_slots),
                 "all_slots": all_slots,
-            }
-            
-            save_errors = [] # 저장 오류 기록용
-
-            # 저장 오류가 있으면 화면에 표시
-            if save_errors:
-                for error_msg in save_errors:
-                    st.error(f"❌ {error_msg}")
-
-            # --- [수정] assignment_results에 통계 재계산을 위한 '설정값'도 함께 저장 ---
-            st.session_state["assignment_results"] = {
-                "df_room": df_room,
-                "stats_df": stats_df,
-                "excel_output": output,
-                "applied_messages": applied_messages,
-                "unapplied_messages": unapplied_messages,
-                "oncall_logs": oncall_logs,
-                "save_errors": save_errors,
-                "actual_duty_counts": actual_duty_counts, # <-- [핵심 수정] 이 줄을 추가하세요.
-                
-                # ▼▼▼ 통계 재계산을 위해 이 7줄을 추가하세요 ▼▼▼
                 "columns": columns,
-                "date_cache": date_cache,
-                "all_slots": all_slots,
-                "request_cells": request_cells, # <-- 이 줄이 누락되었습니다.
                 "morning_duty_slot": morning_duty_slot,
-                "special_dates": special_dates,
-                "time_slots": st.session_state["time_slots"],
-                "time_order": time_order,
-                "all_personnel_stats": all_personnel_stats 
             }
-            # --- [수정 완료] ---
-
-            st.rerun()
+            room_session = {key: copy.deepcopy(st.session_state[key]) for key in ROOM_JOB_SESSION_KEYS if key in st.session_state}
+            room_job_id = job_runner.get_job_runner().submit(
+                "room", run_room_assignment_job, room_inputs, room_session, get_gspread_client(),
+                st.secrets["google_sheet"]["url"], st.session_state.get("profile_page6", False),
+            )
+            job_runner.remember_job("room_job_id", room_job_id)
         
-        # 계산이 끝나면 스크립트를 재실행하여 아래의 '결과 표시' 로직을 타게 합니다.
+        # 작업을 제출했으면 스크립트를 재실행하여 아래의 '진행 상황/결과 표시' 로직을 타게 합니다.
         st.rerun()
 
 def get_sort_key_from_log(log_message):
@@ -3483,49 +3552,9 @@ def get_sort_key_from_log(log_message):
     
 # [L2114 부터 L2178까지의 '결과 표시' 로직 전체를 이 코드로 교체하세요]
 
-if "assignment_results" in st.session_state and \
-   st.session_state["assignment_results"] is not None and \
-   "df_room" in st.session_state["assignment_results"]:  # <--- [추가] 키 존재 여부 확인
-
-    results = st.session_state["assignment_results"]
-    df_room = results["df_room"]
-    stats_df = results.get("stats_df", pd.DataFrame()) # get()으로 안전하게 가져오기
-    output = results.get("excel_output", None)
-    applied_messages = results.get("applied_messages", [])
-    unapplied_messages = results.get("unapplied_messages", [])
-    
-    # 1. 생성된 메시지를 심각도에 따라 세 그룹으로 분류합니다.
-    critical_unapplied = [msg for msg in unapplied_messages if msg.strip().startswith('⛔️')]
-    warning_unapplied = [msg for msg in unapplied_messages if not msg.strip().startswith('⛔️')]
-    sorted_applied = sorted(applied_messages)
-    
-    # ▼▼▼ [수정] 로그 표시 로직 (기존과 동일) ▼▼▼
-    st.write("---")
-    with st.expander("🔍 방배정 상세 로그 보기", expanded=True):
-        st.write(" ")
-
-        st.write("**📞 오후당직 배정 로그**")
-        oncall_logs = results.get("oncall_logs", [])
-        oncall_log_text = "\n".join(oncall_logs) if oncall_logs else "모든 오후당직이 목표치에 맞게 정상 배정되었습니다."
-        st.code(oncall_log_text, language='text')
-        
-        st.divider()
-        st.write("**✅ 방배정 요청사항 적용됨**")
-        applied_log_text = "\n".join(f"• {msg[2:]}" for msg in sorted(applied_messages, key=get_sort_key_from_log)) if applied_messages else "해당 없음"
-        st.code(applied_log_text, language='text')
-
-        st.divider()
-        st.write("**⚠️ 방배정 요청사항 적용 안 됨**")
-        warning_log_text = "\n".join(f"• {msg[2:]}" for msg in sorted(warning_unapplied, key=get_sort_key_from_log)) if warning_unapplied else "해당 없음"
-        st.code(warning_log_text, language='text')
-
-        st.divider()
-        st.write("**⛔️ 방배정 요청사항 적용 안 됨 (수기 수정 필요)**")
-        critical_log_text = "\n".join(f"• {msg[2:]}" for msg in sorted(critical_unapplied, key=get_sort_key_from_log)) if critical_unapplied else "해당 없음"
-        st.code(critical_log_text, language='text')
-
-    # --- ▲▲▲ 로그 표시 로직 끝 ---
-
+@st.fragment
+def room_result_editors_fragment(results, df_room, output):
+    """방배정 결과·통계 편집기, 수정사항 로그, 저장/다운로드 버튼. 셀을 고치면 이 부분만 다시 실행됩니다."""
     st.divider()
     st.markdown("**✅ 방배정 스케줄 (수정 가능)**") 
     edited_df_room = st.data_editor(
@@ -3538,71 +3567,28 @@ if "assignment_results" in st.session_state and \
 
     # --- ▼▼▼ [신규] 통계 자동 재계산 로직 ▼▼▼ ---
     # 1. 세션에서 설정값과 원본 데이터를 불러옵니다.
-    df_cumulative = st.session_state["df_cumulative"]
     all_personnel_stats = results["all_personnel_stats"] # <-- 이 줄을 추가하세요.
     columns = results["columns"]
-    all_slots = results["all_slots"]
     morning_duty_slot = results["morning_duty_slot"]
     special_dates = results["special_dates"]
     time_slots = results["time_slots"]
     time_order = results["time_order"]
-    
+
     # --- [수정] 통계(Stats) 계산 로직 (L2208의 올바른 로직을 여기로 가져옴) ---
-    
+
     # 1. 'df_room' (최종 방배정 결과)를 기반으로 'total_stats'를 (재)계산합니다.
     # (이것이 '오전당직(온콜)'이 포함된 가장 정확한 통계입니다)
-    total_stats = {
-        'early': Counter(), 
-        'late': Counter(), 
-        'morning_duty': Counter(), 
-        'afternoon_duty': Counter(), 
-        'rooms': {str(i): Counter() for i in range(1, 13)}, 
-        'time_room_slots': {s: Counter() for s in st.session_state["time_slots"].keys()}
-    }
-    
-    for _, row in edited_df_room.iterrows():
-        current_date_str = row['날짜']
-        if current_date_str in special_dates:
-            continue # 토요/휴일은 통계에 포함 안 함
-
-        # 'columns' 리스트와 'row' (Series)를 매핑
-        assignment_for_day = row[columns[2:]] # '날짜', '요일' 제외
-
-        for slot_name, person in assignment_for_day.items():
-            if not person:
-                continue
-            
-            # 1. 오전 당직
-            if slot_name == morning_duty_slot:
-                total_stats['morning_duty'][person] += 1
-            
-            # 2. 오후 당직 (13:30 당직)
-            elif slot_name.startswith('13:30') and slot_name.endswith('_당직'):
-                total_stats['afternoon_duty'][person] += 1
-            
-            # 3. [삭제] 온콜 (오후 당직으로 합산) - 이 로직은 화면 재계산 로직과 동일하게 삭제
-            
-            # 4. 이른방 (8:30, 당직 제외)
-            elif slot_name.startswith('8:30') and '_당직' not in slot_name:
-                total_stats['early'][person] += 1
-            
-            # 5. 늦은방 (10:00)
-            elif slot_name.startswith('10:00'):
-                total_stats['late'][person] += 1
-            
-            # 6. 시간대별/방별 통계 (for stats_df)
-            if slot_name in total_stats['time_room_slots']:
-                total_stats['time_room_slots'][slot_name][person] += 1
+    total_stats = count_room_stats(edited_df_room, columns[2:], special_dates, time_slots, morning_duty_slot, month_str)
 
     time_order = ['8:30', '9:00', '9:30', '10:00', '13:30']
 
-# 2. 통계 DataFrame을 생성합니다.
+    # 2. 통계 DataFrame을 생성합니다.
     stats_data = []
     all_personnel_stats = set(p for _, r in st.session_state["df_schedule_md"].iterrows() for p in r[2:].dropna() if p)
-    
+
     # --- [수정] 화면 원본(df_cumulative_original)에서 4가지 값을 모두 가져옵니다 ---
     df_source_raw = st.session_state.get("df_cumulative_original", pd.DataFrame())
-    
+
     # 맵 초기화
     map_pm_cum = {} # 오후당직누적
     map_pm_src = {} # 오후당직
@@ -3611,7 +3597,7 @@ if "assignment_results" in st.session_state and \
 
     if not df_source_raw.empty:
         first_col = df_source_raw.columns[0]
-        
+
         # 데이터 매핑 함수 (행 이름 -> 딕셔너리)
         def get_row_map(row_name):
             row = df_source_raw[df_source_raw[first_col].astype(str).str.strip() == row_name]
@@ -3638,14 +3624,14 @@ if "assignment_results" in st.session_state and \
         pm_sheet_cum = map_pm_cum.get(person_key, 0)
         pm_sheet_src = map_pm_src.get(person_key, 0)
         pm_this_month = total_stats['afternoon_duty'][person]
-        
+
         pm_final = (pm_sheet_cum - pm_sheet_src) + pm_this_month
-        
+
         # [오전당직] 공식: (시트누적 - 시트당월) + 이번달배정
         am_sheet_cum = map_am_cum.get(person_key, 0)
         am_sheet_src = map_am_src.get(person_key, 0)
         am_this_month = total_stats['morning_duty'][person]
-        
+
         am_final = (am_sheet_cum - am_sheet_src) + am_this_month
 
         stats_entry = {
@@ -3657,23 +3643,23 @@ if "assignment_results" in st.session_state and \
             '오후당직': pm_this_month,
             '오후당직 누적': pm_final
         }
-        
-        for slot in st.session_state["time_slots"].keys():
+
+        for slot in time_slots.keys():
             if not slot.endswith('_당직'):
                 stats_entry[f'{slot} 합계'] = total_stats['time_room_slots'].get(slot, Counter())[person]
-        
+
         stats_data.append(stats_entry)
 
     # [수정] '오전당직 누적'을 포함하도록 컬럼 목록 수정
     sorted_columns = ['인원', '이른방 합계', '늦은방 합계', '오전당직', '오전당직 누적', '오후당직', '오후당직 누적']
-    
+
     # 시간대별 합계 컬럼 추가
     time_slots_sorted = sorted(
         [slot for slot in time_slots.keys() if not slot.endswith('_당직')],
         key=lambda x: (time_order.index(x.split('(')[0]), int(x.split('(')[1].split(')')[0]))
     )
     sorted_columns.extend([f'{slot} 합계' for slot in time_slots_sorted])
-    
+
     # 4. 'recalculated_stats_df' 라는 새 변수에 자동 재계산된 통계를 저장
     recalculated_stats_df_names_as_rows = pd.DataFrame(stats_data)[sorted_columns]
     # [신규] (항목-행) 기준으로 Transpose 하여 최종 df 생성
@@ -3701,12 +3687,12 @@ if "assignment_results" in st.session_state and \
     else:
         st.info("수정된 사항이 없습니다.")
     # --- ▲▲▲ 방배정 로그 끝 ---
-    
+
 
     st.divider()
     st.markdown("**☑️ 통계 테이블 (수정 가능)**")
     st.write("- 통계 테이블은 '방배정 스케줄' 편집기에 반영된 내용을 바탕으로 자동 재계산됩니다.")
-    
+
     # --- ▼▼▼ [수정] 통계 편집기에 'recalculated_stats_df'를 전달 ---
     edited_stats_df = st.data_editor(
         recalculated_stats_df, # [수정] stats_df -> recalculated_stats_df
@@ -3718,7 +3704,7 @@ if "assignment_results" in st.session_state and \
     # --- ▲▲▲ [수정] 완료 ---
 
     # --- ▼▼▼ [수정] 통계 로그 로직 (기존과 동일) ▼▼▼ ---
-# --- [수정] 통계 로그 로직 (L2331 ~ L2368 교체) ---
+    # --- [수정] 통계 로그 로직 (L2331 ~ L2368 교체) ---
 
     st.markdown("📝 **통계 테이블 수정사항**")
     stats_change_log = [] # 리스트 초기화
@@ -3738,62 +3724,62 @@ if "assignment_results" in st.session_state and \
     # 2. 인원별 통계 비교
     # (L2334) 비교 대상을 '최초 원본'으로 설정 (이전 단계에서 수정 완료됨)
     original_stats_df = results["stats_df"] 
-    
+
     # '최종 편집본'(edited_stats_df)과 '최초 원본'(original_stats_df)을 비교
     if not edited_stats_df.equals(original_stats_df): 
         try:
             stats_orig_str = original_stats_df.astype(str)
             stats_edit_str = edited_stats_df.astype(str)
-            
+
             diff_indices = np.where(stats_edit_str.ne(stats_orig_str))
             changed_cells_stats = set(zip(diff_indices[0], diff_indices[1])) 
 
             for row_idx, col_idx in changed_cells_stats:
                 stat_name = edited_stats_df.iloc[row_idx, 0] # '항목' (예: "오전당직")
                 person_name = edited_stats_df.columns[col_idx] # '인원' (예: "강승주")
-                
+
                 old_value = original_stats_df.iloc[row_idx, col_idx]
                 new_value = edited_stats_df.iloc[row_idx, col_idx]
 
                 log_msg = f"{person_name} '{stat_name}' 변경: {old_value} → {new_value}"
-                
+
                 # --- ▼▼▼ [수정] 로그를 튜플로 저장 (정렬 기준 포함) ▼▼▼ ---
-                
+
                 # 1. 맵에서 정렬 순서(숫자)를 조회.
                 #    '이른방' 등은 0-5, 맵에 없는 '8:30(4) 합계' 등은 99로 설정
                 item_sort_key = order_map.get(stat_name, 99) 
-                
+
                 # 2. (사람이름, 항목순서, 실제로그메시지) 튜플로 저장
                 stats_change_log.append((person_name, item_sort_key, log_msg))
-                
+
                 # --- ▲▲▲ [수정] (기존 log_msg.append(log_msg) 줄은 삭제) ---
-                
+
         except Exception as e:
             # (예외 발생 시 튜플 대신 문자열로 추가)
             stats_change_log.append(("[로그 오류]", 99, f"[로그 오류] 통계 변경사항을 비교하는 중 오류: {e}"))
-            
+
     if stats_change_log:
         # --- ▼▼▼ [수정] 튜플을 기준으로 정렬 (사람이름 > 항목순서) ▼▼▼ ---
-        
+
         # 1. 튜플의 첫 번째 요소 (x[0] = person_name)로 먼저 정렬
         # 2. 튜플의 두 번째 요소 (x[1] = item_sort_key)로 두 번째 정렬
         stats_change_log.sort(key=lambda x: (x[0], x[1]))
-        
+
         # 3. 정렬된 튜플 리스트에서 실제 로그 메시지(x[2])만 추출
         log_text_stats = "\n".join(f"• {msg_tuple[2]}" for msg_tuple in stats_change_log)
         st.code(log_text_stats, language='text')
         # --- ▲▲▲ [수정] 완료 ---
     else:
         st.info("수정된 사항이 없습니다.")
-    
+
     # --- [수정 완료] ---
     st.divider()
 
     # --- ▼▼▼ [수정] 저장/다운로드 버튼 영역 수정 ▼▼▼ ---
-    
+
     # 1. 변경사항 여부를 col1, col2를 정의하기 *전에* 계산합니다.
     has_unsaved_changes = bool(room_change_log or stats_change_log)
-    
+
     col1, col2 = st.columns(2)
     with col1:
         # 2. '저장' 버튼에 disabled 파라미터를 적용합니다.
@@ -3801,23 +3787,23 @@ if "assignment_results" in st.session_state and \
                     type="primary", 
                     use_container_width=True,
                     disabled=not has_unsaved_changes): # <-- 이 부분이 추가/수정되었습니다.
-            
+
             room_change_map = {}
             # 'results'에서 'df_room' (배정 직후 원본)을 가져옵니다.
             original_room_df_for_map = st.session_state.assignment_results["df_room"]
-            
+
             # 'edited_df_room'은 L2551에서 data_editor의 결과로 이미 정의됨
             if not edited_df_room.equals(original_room_df_for_map):
                 diff_indices = np.where(edited_df_room.astype(str).ne(original_room_df_for_map.astype(str)))
                 changed_cells = set(zip(diff_indices[0], diff_indices[1]))
-                
+
                 for row_idx, col_idx in changed_cells:
                     date_key = edited_df_room.iloc[row_idx, 0] # '날짜' (e.g., '10월 1일')
                     slot_key = edited_df_room.columns[col_idx] # '슬롯' (e.g., '8:30(1)')
-                    
+
                     old_value = original_room_df_for_map.iloc[row_idx, col_idx]
                     new_value = edited_df_room.iloc[row_idx, col_idx]
-                    
+
                     # 키: (날짜, 슬롯이름), 값: (이전 값, 새 값)
                     room_change_map[(date_key, slot_key)] = (str(old_value).strip(), str(new_value).strip())
 
@@ -3833,16 +3819,16 @@ if "assignment_results" in st.session_state and \
                             ws_sched = sheet.worksheet(schedule_sheet_name)
                         except gspread.exceptions.WorksheetNotFound: 
                             ws_sched = sheet.add_worksheet(title=schedule_sheet_name, rows=100, cols=len(edited_df_room.columns)+5)
-                        
+
                         # [수정] edited_df_room과 edited_stats_df를 저장해야 함
                         success_sched = update_sheet_with_retry(ws_sched, [edited_df_room.columns.tolist()] + edited_df_room.astype(str).fillna('').values.tolist())
 
                         # [필요시] 통계 테이블(edited_stats_df) 저장 로직 추가 (현재는 '방배정' 시트만 저장)
                         if success_sched:
-                            st.success(f"✅ '{schedule_sheet_name}' 시트에 수정된 내용이 저장되었습니다.")
+                            flash.flash(f"'{schedule_sheet_name}' 시트에 수정된 내용이 저장되었습니다.")
 
                             # --- ▼▼▼ [수정] Excel 파일(output)을 여기서 갱신합니다 ▼▼▼ ---
-                            
+
                             # 1. 갱신에 필요한 변수들을 results에서 다시 로드
                             results = st.session_state["assignment_results"]
                             swapped_assignments = st.session_state.get("swapped_assignments", set()) # 수동/일괄 적용 포함
@@ -3864,16 +3850,15 @@ if "assignment_results" in st.session_state and \
                                 month_str=month_str,
                                 change_log_map=room_change_map
                             )
-                            
+
                             # 3. 세션의 원본 데이터 및 'excel_output'을 갱신
                             st.session_state.assignment_results["df_room"] = edited_df_room.copy()
                             st.session_state.assignment_results["stats_df"] = edited_stats_df.copy()
                             st.session_state.assignment_results["excel_output"] = new_output # <-- 핵심
                             # --- ▲▲▲ [수정] 완료 ---
-                            
-                            
+
+
                             st.session_state.editor_has_changes = False
-                            time.sleep(1)
                             st.rerun()
                         else:
                             st.error("Google Sheets 업데이트가 완료되지 않았습니다.")
@@ -3883,7 +3868,7 @@ if "assignment_results" in st.session_state and \
             else:
                 st.error("편집된 데이터가 없습니다.")
 
-# [L2331 부근 - 수정 필요 없음, 참고용]
+    # [L2331 부근 - 수정 필요 없음, 참고용]
     with col2:
         # [수정] 다운로드 버튼의 오류 감지 로직 (기존과 동일)
         has_unsaved_changes = bool(room_change_log or stats_change_log)
@@ -3899,4 +3884,64 @@ if "assignment_results" in st.session_state and \
                 type="primary",
                 use_container_width=True,
                 key="download_btn_bottom"
-            )
\ No newline at end of file
+            )
+
+# 방배정 작업이 끝났으면 결과를 세션에 반영 (새로고침으로 세션이 초기화되어도 작업 ID로 마지막 결과를 복원)
+room_job_id = job_runner.current_job_id("room_job_id", "room")
+if room_job_id and st.session_state.get("assignment_results") is None:
+    room_job = job_runner.get_job_runner().status(room_job_id)
+    if room_job and room_job["state"] == "done" and room_job["result"]:
+        st.session_state["assignment_results"] = room_job["result"]["assignment_results"]
+        if room_job["result"]["profile"]:
+            st.session_state["profile_page6_result"] = room_job["result"]["profile"]
+    else:
+        # 아직 실행 중이거나 실패한 작업은 진행 상황/오류만 표시
+        job_runner.render_job_progress(room_job_id, "방배정 및 Google Sheets 저장")
+
+if "assignment_results" in st.session_state and \
+   st.session_state["assignment_results"] is not None and \
+   "df_room" in st.session_state["assignment_results"]:  # <--- [추가] 키 존재 여부 확인
+
+    results = st.session_state["assignment_results"]
+    if room_job_id:
+        job_runner.render_job_progress(room_job_id, "방배정 및 Google Sheets 저장")
+    df_room = results["df_room"]
+    stats_df = results.get("stats_df", pd.DataFrame()) # get()으로 안전하게 가져오기
+    output = results.get("excel_output", None)
+    applied_messages = results.get("applied_messages", [])
+    unapplied_messages = results.get("unapplied_messages", [])
+    
+    # 1. 생성된 메시지를 심각도에 따라 세 그룹으로 분류합니다.
+    critical_unapplied = [msg for msg in unapplied_messages if msg.strip().startswith('⛔️')]
+    warning_unapplied = [msg for msg in unapplied_messages if not msg.strip().startswith('⛔️')]
+    sorted_applied = sorted(applied_messages)
+    
+    # ▼▼▼ [수정] 로그 표시 로직 (기존과 동일) ▼▼▼
+    st.write("---")
+    with st.expander("🔍 방배정 상세 로그 보기", expanded=True):
+        st.write(" ")
+
+        st.write("**📞 오후당직 배정 로그**")
+        oncall_logs = results.get("oncall_logs", [])
+        oncall_log_text = "\n".join(oncall_logs) if oncall_logs else "모든 오후당직이 목표치에 맞게 정상 배정되었습니다."
+        st.code(oncall_log_text, language='text')
+        
+        st.divider()
+        st.write("**✅ 방배정 요청사항 적용됨**")
+        applied_log_text = "\n".join(f"• {msg[2:]}" for msg in sorted(applied_messages, key=get_sort_key_from_log)) if applied_messages else "해당 없음"
+        st.code(applied_log_text, language='text')
+
+        st.divider()
+        st.write("**⚠️ 방배정 요청사항 적용 안 됨**")
+        warning_log_text = "\n".join(f"• {msg[2:]}" for msg in sorted(warning_unapplied, key=get_sort_key_from_log)) if warning_unapplied else "해당 없음"
+        st.code(warning_log_text, language='text')
+
+        st.divider()
+        st.write("**⛔️ 방배정 요청사항 적용 안 됨 (수기 수정 필요)**")
+        critical_log_text = "\n".join(f"• {msg[2:]}" for msg in sorted(critical_unapplied, key=get_sort_key_from_log)) if critical_unapplied else "해당 없음"
+        st.code(critical_log_text, language='text')
+
+    # --- ▲▲▲ 로그 표시 로직 끝 ---
+
+    instrumentation.render_profile("profile_page6")
+    room_result_editors_fragment(results, df_room, output)
\ No newline at end of file
@@ -8,13 +8,17 @@ from google.oauth2.service_account import Credentials
 import time
 from datetime import datetime, date
 from io import BytesIO
-import openpyxl
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-from openpyxl.comments import Comment
+import lazy_imports
+# openpyxl은 엑셀 내보내기 때 처음 불러옵니다. (페이지 첫 실행 시간 단축)
+openpyxl = lazy_imports.lazy_module("openpyxl")
+PatternFill, Alignment, Font, Border, Side = lazy_imports.lazy_attrs("openpyxl.styles", "PatternFill", "Alignment", "Font", "Border", "Side")
+Comment = lazy_imports.lazy_attrs("openpyxl.comments", "Comment")
 import menu
+import swap_engine
+import flash
 import os
 from dateutil.relativedelta import relativedelta
-from openpyxl.utils import get_column_letter
+get_column_letter = lazy_imports.lazy_attrs("openpyxl.utils", "get_column_letter")
 
 # --- 페이지 기본 설정 ---
 st.set_page_config(page_title="방배정 변경", page_icon="🔄", layout="wide")
@@ -23,9 +27,7 @@ menu.menu()
 
 # --- 로그인 확인 ---
 if not st.session_state.get("login_success", False):
-    st.warning("⚠️ Home 페이지에서 먼저 로그인해주세요.")
-    st.error("1초 후 Home 페이지로 돌아갑니다...")
-    time.sleep(1)
+    flash.flash("Home 페이지에서 먼저 로그인해주세요.", "warning")
     st.switch_page("Home.py")
     st.stop()
 
@@ -211,72 +213,70 @@ def load_special_schedules(month_str):
         return pd.DataFrame()
 
 def apply_assignment_swaps(df_assignment, df_requests, df_special):
-    df_modified = df_assignment.copy()
+    """변경 요청을 한 번에 파싱하고, (날짜, 방배정 슬롯)별 충돌/순환을 걸러낸 순서로 적용합니다. (swap_engine)
+
+    같은 슬롯의 연쇄 요청(A➡️B, B➡️C)은 자리를 넘겨받은 순서대로 적용합니다.
+    """
     df_special_modified = df_special.copy() if df_special is not None else pd.DataFrame()
     changed_log = []
     applied_count = 0
     # [수정] 메시지를 담을 리스트 생성
     messages = []
 
-    for _, req in df_requests.iterrows():
-        try:
-            swap_request_str = str(req.get('변경 요청', '')).strip()
-            raw_slot_info = str(req.get('변경 요청한 방배정', '')).strip()
+    requests = swap_engine.parse_swap_requests(df_requests, '변경 요청한 방배정')
+
+    # 토요/휴일 날짜 → 행 인덱스 (요청마다 날짜_dt로 필터링하지 않도록 한 번만 만듭니다)
+    special_rows = {}
+    if not df_special_modified.empty and '날짜_dt' in df_special_modified.columns:
+        for idx, dt in df_special_modified['날짜_dt'].items():
+            if pd.notna(dt):
+                special_rows.setdefault(dt.date(), idx)
+
+    def apply_one(grid, req):
+        old_person, new_person, target_slot = req['변경 전'], req['변경 후'], req['슬롯']
+        date_obj = req['날짜']
+        target_date_str = req['날짜표시']
+
+        target_row_idx = grid.row(target_date_str)
+        if target_row_idx is None:
+            return swap_engine.REJECTED, ('warning', f"⚠️ 요청 처리 불가: 방배정표에서 날짜 '{target_date_str}'를 찾을 수 없습니다.")
+
+        if target_slot not in grid.col_index or grid.get(target_row_idx, target_slot) != old_person:
+            return swap_engine.REJECTED, ('error', f"❌ 적용 실패: {target_date_str}의 '{target_slot}'에 '{old_person}'님이 배정되어 있지 않습니다.")
+
+        grid.set(target_row_idx, target_slot, new_person)
+
+        notes = []
+        special_idx = special_rows.get(date_obj)
+        if special_idx is not None:
+            current_duty_person = str(df_special_modified.at[special_idx, '당직']).strip()
+            if current_duty_person == old_person:
+                df_special_modified.at[special_idx, '당직'] = new_person
+                notes.append(('info', f"ℹ️ {target_date_str}의 토요/휴일 당직자가 '{new_person}' (으)로 함께 변경됩니다."))
+
+        return swap_engine.APPLIED, ({
+            '날짜': f"{target_date_str} ({'월화수목금토일'[date_obj.weekday()]})",
+            '방배정': target_slot,
+            '변경 전 인원': old_person,
+            '변경 후 인원': new_person,
+        }, notes)
+
+    df_modified, results = swap_engine.apply_swap_requests(
+        df_assignment, requests, list(df_assignment.columns[2:]), apply_one, handoff=True
+    )
 
-            if '➡️' not in swap_request_str: continue
-            old_person, new_person = [p.strip() for p in swap_request_str.split('➡️')]
-            
-            slot_match = re.match(r'(\d{4}-\d{2}-\d{2}) \((.+)\)', raw_slot_info)
-            if not slot_match: continue
-            
-            date_str, target_slot = slot_match.groups()
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-            target_date_str = f"{date_obj.month}월 {date_obj.day}일"
-            
-            row_indices = df_modified.index[df_modified['날짜'] == target_date_str].tolist()
-            if not row_indices:
-                # [수정] 메시지 리스트에 추가
-                messages.append(('warning', f"⚠️ 요청 처리 불가: 방배정표에서 날짜 '{target_date_str}'를 찾을 수 없습니다."))
-                continue
-            target_row_idx = row_indices[0]
-
-            target_col_found = None
-            for col in df_modified.columns[2:]: 
-                person_in_cell = str(df_modified.at[target_row_idx, col]).strip()
-                if person_in_cell == old_person and col == target_slot:
-                    target_col_found = col
-                    break
-            
-            if target_col_found:
-                df_modified.at[target_row_idx, target_col_found] = new_person
-                applied_count += 1
-                
-                is_special_date = False
-                if df_special is not None and not df_special.empty and '날짜_dt' in df_special.columns:
-                    is_special_date = not df_special[df_special['날짜_dt'].dt.date == date_obj.date()].empty
-                
-                if is_special_date and not df_special_modified.empty:
-                    duty_row = df_special_modified[df_special_modified['날짜_dt'].dt.date == date_obj.date()]
-                    if not duty_row.empty:
-                        current_duty_person = str(duty_row['당직'].iloc[0]).strip()
-                        if current_duty_person == old_person:
-                            df_special_modified.loc[duty_row.index, '당직'] = new_person
-                            # [수정] 메시지 리스트에 추가
-                            messages.append(('info', f"ℹ️ {target_date_str}의 토요/휴일 당직자가 '{new_person}' (으)로 함께 변경됩니다."))
-
-                changed_log.append({
-                    '날짜': f"{target_date_str} ({'월화수목금토일'[date_obj.weekday()]})",
-                    '방배정': target_slot,
-                    '변경 전 인원': old_person,
-                    '변경 후 인원': new_person,
-                })
-            else:
-                # [수정] 메시지 리스트에 추가
-                messages.append(('error', f"❌ 적용 실패: {target_date_str}의 '{target_slot}'에 '{old_person}'님이 배정되어 있지 않습니다."))
-                
-        except Exception as e:
-            # [수정] 메시지 리스트에 추가
-            messages.append(('error', f"⚠️ 요청 처리 중 시스템 오류 발생: {e}"))
+    for req, status, value in results:
+        if status == swap_engine.APPLIED:
+            log, notes = value
+            applied_count += 1
+            changed_log.append(log)
+            messages.extend(notes)
+        elif status == swap_engine.FAILED:
+            messages.append(('error', f"⚠️ 요청 처리 중 시스템 오류 발생: {value}"))
+        elif isinstance(value, tuple):
+            messages.append(value)
+        else:
+            messages.append(('warning', f"🟡 {req['슬롯 정보']} - {req['요청']} 적용 건너뜀: {value}"))
 
     if applied_count > 0:
         # [수정] 메시지 리스트에 추가 (가장 위로)
@@ -954,12 +954,10 @@ if check_final_sheets_exist(month_str, next_month_str):
                                 pass
                         
                         if deleted_cnt > 0:
-                            st.success("✅ 초기화 완료. 페이지를 새로고침합니다.")
                             keys_to_clear = ["final_download_ready", "show_final_results", "change_data_loaded", "load_error"]
                             for k in keys_to_clear:
                                 if k in st.session_state: del st.session_state[k]
-                            time.sleep(1.5)
-                            st.rerun()
+                            flash.rerun("초기화 완료. 페이지를 새로고침합니다.")
                         else:
                             st.warning("삭제할 시트가 존재하지 않습니다.")
                             
@@ -1256,9 +1254,7 @@ if st.button("🚀 최종 방배정 수행", type="primary", use_container_width
             new_base_stats = calculate_stats_from_schedule(original_df)
             st.session_state.df_cumulative_stats = new_base_stats.copy()
 
-            st.success(f"✅ '{final_sheet_name}' 시트가 원본 상태로 저장/초기화 되었습니다.")
-            time.sleep(1)
-            st.rerun()
+            flash.rerun(f"'{final_sheet_name}' 시트가 원본 상태로 저장/초기화 되었습니다.")
 
         except Exception as e:
             st.error(f"저장 및 수행 중 오류 발생: {e}")
@@ -1417,9 +1413,7 @@ if st.session_state.get('show_final_results', False):
                     st.session_state.df_final_assignment_base = edited_final_schedule.copy()
                     st.session_state.df_final_assignment = edited_final_schedule.copy()
                     
-                    st.success(f"✅ '{ws_name}' 시트에 수정된 내용이 저장되었습니다.")
-                    time.sleep(1)
-                    st.rerun()
+                    flash.rerun(f"'{ws_name}' 시트에 수정된 내용이 저장되었습니다.")
                 except Exception as e:
                     st.error(f"저장 실패: {e}")
 
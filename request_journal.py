@@ -0,0 +1,167 @@
+import threading
+import uuid
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+from gspread.exceptions import WorksheetNotFound
+
+import sheet_ops
+import write_behind
+
+REQUEST_COLUMNS = ["이름", "분류", "날짜정보"]
+JOURNAL_COLUMNS = ["요청ID", "시각", "작업"] + REQUEST_COLUMNS
+JOURNAL_SUFFIX = " 로그"
+OP_ADD = "추가"
+OP_DELETE = "삭제"
+# 삭제 표시의 요청ID는 취소할 추가 항목의 요청ID 뒤에 이 접미사를 붙입니다. (로그 열을 늘리지 않고 대상을 가리킴)
+TOMBSTONE_SUFFIX = ":삭제"
+ID_COLUMN = "요청ID"
+
+_compact_locks = {}
+_compact_locks_guard = threading.Lock()
+
+
+def journal_name(base_name):
+    return f"{base_name}{JOURNAL_SUFFIX}"
+
+
+def get_journal_worksheet(sheet, base_name):
+    """'{base_name} 로그' 추가 전용 시트를 가져오고, 없으면 헤더와 함께 만듭니다."""
+    return sheet_ops.get_or_create_worksheet(sheet, journal_name(base_name), JOURNAL_COLUMNS, rows=200)
+
+
+def _entry(op, name, category, date_info, request_id=None):
+    now = datetime.now(ZoneInfo("Asia/Seoul")).strftime("%Y-%m-%d %H:%M:%S")
+    return [request_id or uuid.uuid4().hex, now, op, name, category, date_info]
+
+
+def queue_request(url, base_name, name, category, date_info):
+    """요청 추가를 로그에 한 줄 남깁니다. (사전 전체 읽기 없음, write-behind 큐로 비동기 반영) 요청ID를 반환합니다."""
+    row = _entry(OP_ADD, name, category, date_info)
+    write_behind.get_queue().submit(url, journal_name(base_name), row, header=JOURNAL_COLUMNS)
+    return row[0]
+
+
+def queue_tombstones(url, base_name, records):
+    """records(이름/분류/날짜정보, 로그에서 온 요청이면 요청ID 포함)의 삭제 표시(tombstone)를 로그에 남깁니다.
+
+    로그로 추가된 요청은 그 요청ID를 가리키므로, 내용이 같은 다른 요청은 함께 지워지지 않습니다.
+    기준 시트에 있던 요청(요청ID 없음)은 내용이 같은 요청 하나만 지웁니다.
+    실제 행은 지우지 않으므로, 다른 사용자가 방금 추가한 행의 위치가 바뀌거나 함께 지워지지 않습니다.
+    """
+    queue = write_behind.get_queue()
+    for r in records:
+        target = r.get(ID_COLUMN) or ""
+        request_id = f"{target}{TOMBSTONE_SUFFIX}" if target else None
+        queue.submit(url, journal_name(base_name), _entry(OP_DELETE, r["이름"], r["분류"], r["날짜정보"], request_id), header=JOURNAL_COLUMNS)
+    return len(records)
+
+
+def with_queued_entries(url, base_name, journal_records):
+    """시트에서 읽은 로그에 아직 반영 중인(큐에 있는) 로그 행을 요청ID 기준으로 덧붙입니다."""
+    queued = write_behind.get_queue().rows(url, journal_name(base_name))
+    return write_behind.merge_rows(journal_records, JOURNAL_COLUMNS, queued, key="요청ID")
+
+
+def _key(record):
+    return tuple(str(record.get(col, "")).strip() for col in REQUEST_COLUMNS)
+
+
+def materialize(base_records, journal_records, with_ids=False):
+    """기준 시트 records에 로그를 순서대로 재생한 '현재 요청' 목록을 반환합니다.
+
+    추가는 같은 요청ID가 이미 반영됐거나 내용이 같은 요청이 있으면 그 요청을 가리키기만 하고(재전송·재압축에도 중복 없음),
+    삭제는 대상 요청ID가 가리키는 요청 하나를, 대상이 로그에 없으면(압축됨·기준 시트 요청) 내용이 같은 요청 하나를 지웁니다.
+    with_ids면 각 요청에 로그 요청ID(기준 시트에서 온 요청은 빈 문자열)를 함께 담습니다.
+    """
+    current = [dict({col: record.get(col, "") for col in REQUEST_COLUMNS}, **{ID_COLUMN: ""}) for record in base_records]
+    by_id = {}
+    for entry in journal_records:
+        request_id = str(entry.get(ID_COLUMN, ""))
+        key = _key(entry)
+        if entry.get("작업") == OP_ADD:
+            if request_id in by_id:
+                continue
+            existing = next((item for item in current if _key(item) == key), None)
+            if existing is None:
+                existing = dict({col: entry.get(col, "") for col in REQUEST_COLUMNS}, **{ID_COLUMN: request_id})
+                current.append(existing)
+            by_id[request_id] = existing
+        elif entry.get("작업") == OP_DELETE:
+            target_id = request_id[:-len(TOMBSTONE_SUFFIX)] if request_id.endswith(TOMBSTONE_SUFFIX) else None
+            if target_id in by_id:
+                target = by_id[target_id]
+            else:
+                # 대상 추가가 이미 기준 시트로 압축됐거나 기준 시트의 요청이면 내용이 같은 요청 하나
+                target = next((item for item in current if _key(item) == key), None)
+            if target is not None and any(item is target for item in current):
+                current = [item for item in current if item is not target]
+    if not with_ids:
+        return [{col: item[col] for col in REQUEST_COLUMNS} for item in current]
+    return current
+
+
+def _read_journal(sheet, base_name):
+    try:
+        worksheet = sheet.worksheet(journal_name(base_name))
+    except WorksheetNotFound:
+        return None, []
+    return worksheet, worksheet.get_all_records()
+
+
+def _current_records(sheet, base_name, base_records=None):
+    if base_records is None:
+        base_records = sheet.worksheet(base_name).get_all_records()
+    _, journal_records = _read_journal(sheet, base_name)
+    journal_records = with_queued_entries(sheet.url, base_name, journal_records)
+    return materialize(base_records, journal_records) if journal_records else base_records
+
+
+def load_current_requests(sheet, base_name):
+    """기준 시트 + 아직 압축되지 않은 로그(큐 대기분 포함)를 합친 현재 요청 DataFrame. (시트 읽기 2회, 쓰기 없음)"""
+    records = _current_records(sheet, base_name)
+    return pd.DataFrame(records) if records else pd.DataFrame(columns=REQUEST_COLUMNS)
+
+
+def _compact_lock(sheet, base_name):
+    with _compact_locks_guard:
+        return _compact_locks.setdefault((sheet.id, base_name), threading.Lock())
+
+
+def compact(sheet, base_name, base_worksheet=None, base_records=None):
+    """로그를 기준 시트에 반영하고, 반영한 로그 행을 지웁니다. (관리자 페이지 로드 시 호출)
+
+    로그가 비어 있으면 읽기 1회로 끝납니다. 순서는 안전한 쪽으로 둡니다:
+    1. 새 기준 시트를 덮어쓴 뒤 남는 아래쪽 행만 비웁니다. (clear 후 쓰기 실패로 시트가 비는 일 없음)
+    2. 로그를 다시 읽어, 방금 반영한 요청ID의 행만 지웁니다. (그 사이 추가된 로그는 위치가 바뀌어도 남음)
+    쓰기 후 로그 삭제 전에 실패해도 다음 압축의 재생은 중복을 만들지 않습니다. (materialize 참고)
+    같은 시트의 압축은 프로세스 안에서 한 번에 하나만 돌고, 다른 관리자 세션이 압축 중이면 기다리지 않고
+    기준 시트 + 로그를 합친 현재 요청만 돌려줍니다. 반환값은 현재 요청 records입니다.
+    """
+    base_worksheet = base_worksheet or sheet.worksheet(base_name)
+    lock = _compact_lock(sheet, base_name)
+    if not lock.acquire(blocking=False):
+        return _current_records(sheet, base_name, base_records)
+    try:
+        if base_records is None:
+            base_records = base_worksheet.get_all_records()
+        journal_ws, journal_records = _read_journal(sheet, base_name)
+        if not journal_records:
+            return base_records
+
+        current = materialize(base_records, journal_records)
+        rows = [REQUEST_COLUMNS] + [[r[col] for col in REQUEST_COLUMNS] for r in current]
+        base_worksheet.update(rows, "A1")
+        if len(base_records) + 1 > len(rows):
+            base_worksheet.batch_clear([f"A{len(rows) + 1}:{_last_column(len(REQUEST_COLUMNS))}{len(base_records) + 1}"])
+
+        applied = {str(r.get(ID_COLUMN, "")) for r in journal_records}
+        sheet_ops.delete_records(journal_ws, lambda r: str(r.get(ID_COLUMN, "")) in applied)
+        return current
+    finally:
+        lock.release()
+
+
+def _last_column(count):
+    return chr(ord("A") + count - 1)
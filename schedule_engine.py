@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+TIME_SLOTS = ["오전", "오후"]
+COUNTED_STATUSES = ['근무', '대체보충', '보충']
+
+
+class _SlotWeekCounts:
+    """한 근무자의 한 시간대에 대한 {주차: 횟수} 뷰. (배열을 직접 읽고 씁니다)"""
+
+    def __init__(self, owner, worker_idx, slot_idx):
+        self._owner, self._i, self._k = owner, worker_idx, slot_idx
+
+    def __getitem__(self, week):
+        return int(self._owner.array[self._i, self._k, self._owner.week_index[week]])
+
+    def __setitem__(self, week, value):
+        self._owner.array[self._i, self._k, self._owner.week_index[week]] = value
+
+    def get(self, week, default=0):
+        j = self._owner.week_index.get(week)
+        return default if j is None else int(self._owner.array[self._i, self._k, j])
+
+    def items(self):
+        return [(week, int(self._owner.array[self._i, self._k, j])) for week, j in self._owner.week_index.items()]
+
+
+class _WorkerCounts:
+    def __init__(self, owner, worker_idx):
+        self._owner, self._i = owner, worker_idx
+
+    def __getitem__(self, time_slot):
+        return _SlotWeekCounts(self._owner, self._i, TIME_SLOTS.index(time_slot))
+
+    def get(self, time_slot, default=None):
+        return self[time_slot] if time_slot in TIME_SLOTS else default
+
+
+class WeeklyCounts:
+    """근무자 × 시간대 × 주차 근무 횟수 배열.
+
+    array[i, k, j]는 names[i]의 TIME_SLOTS[k] 근무 횟수(weeks[j]주차)입니다.
+    기존 중첩 딕셔너리처럼 weekly_counts[이름]['오전'][주차]로 읽고 쓸 수 있어, 배정 중 증감은 배열에 바로 반영됩니다.
+    """
+
+    def __init__(self, names, weeks, array=None):
+        self.names = tuple(names)
+        self.weeks = tuple(weeks)
+        self.name_index = {name: i for i, name in enumerate(self.names)}
+        self.week_index = {week: j for j, week in enumerate(self.weeks)}
+        self.array = array if array is not None else np.zeros((len(self.names), len(TIME_SLOTS), len(self.weeks)), dtype=np.int64)
+
+    def __getitem__(self, worker):
+        return _WorkerCounts(self, self.name_index[worker])
+
+    def __contains__(self, worker):
+        return worker in self.name_index
+
+    def get(self, worker, default=None):
+        i = self.name_index.get(worker)
+        return default if i is None else _WorkerCounts(self, i)
+
+    def copy(self):
+        return WeeklyCounts(self.names, self.weeks, self.array.copy())
+
+
+def calculate_weekly_counts(df_final, all_names, week_numbers):
+    """지정된 주차 정보에 따라 모든 인원의 주간 오전/오후 근무 횟수를 계산합니다.
+
+    (근무자, 시간대, 주차) 한 번의 groupby로 집계하며, 주차는 df_final의 '주차' 컬럼(없으면 날짜로 한 번 계산)을 사용합니다.
+    """
+    weeks = sorted(set(w for w in week_numbers.values() if w))
+    counts = WeeklyCounts(list(dict.fromkeys(all_names)), weeks)
+    if df_final.empty:
+        return counts
+
+    df = df_final[df_final['상태'].isin(COUNTED_STATUSES)]
+    if '주차' in df.columns:
+        week_col = pd.to_numeric(df['주차'], errors='coerce')
+    else:
+        unique_dates = pd.Series(df['날짜'].unique())
+        parsed = pd.to_datetime(unique_dates, errors='coerce').dt.date.map(week_numbers)
+        week_col = df['날짜'].map(dict(zip(unique_dates, parsed)))
+    df = df.assign(주차=week_col)
+    df = df[df['주차'].isin(weeks) & df['근무자'].isin(counts.name_index) & df['시간대'].isin(TIME_SLOTS)]
+    if df.empty:
+        return counts
+
+    grouped = df.groupby(['근무자', '시간대', '주차'], observed=True).size()
+    # Categorical 열(typed df_final)이면 범주 전체가 아닌 실제 값만 매핑하도록 object로 바꿔 매핑
+    worker_idx = grouped.index.get_level_values(0).astype(object).map(counts.name_index).to_numpy()
+    slot_idx = grouped.index.get_level_values(1).astype(object).map(TIME_SLOTS.index).to_numpy()
+    week_idx = grouped.index.get_level_values(2).map(counts.week_index).to_numpy()
+    counts.array[worker_idx, slot_idx, week_idx] = grouped.to_numpy()
+    return counts
+
+
+def replace_adjustments(df):
+    """
+    [수정됨] 동일 인물 + 동일 시간대에서 추가보충/추가제외 -> 대체보충/대체휴근로 변경합니다.
+    [★] '주차' 제약을 제거하고 월 전체에서 1:1 매칭을 수행합니다.
+    [★] 메모 형식을 'm/d에서 대체됨', 'm/d로 대체함'으로 변경합니다.
+    [★] 짝짓기는 그룹별 날짜순 번호(cumcount) + merge 한 번으로, 갱신은 행 위치로 일괄 수행합니다.
+    """
+    # 1. '보충' 또는 '휴근'인 행만 필터링 (행 위치를 함께 보관해 마지막에 위치로 한 번에 갱신)
+    keys = ['근무자', '시간대']
+    adjustments_df = df[['근무자', '시간대', '날짜', '상태']].assign(_pos=range(len(df)))
+    adjustments_df = adjustments_df[adjustments_df['상태'].isin(['보충', '휴근'])].dropna(subset=keys)
+
+    # 2. (근무자, 시간대, 상태)별로 날짜순 번호를 매기고, 같은 번호의 보충·휴근을 짝지음 (min(보충 수, 휴근 수)쌍)
+    adjustments_df = adjustments_df.sort_values(by='날짜', kind='stable')
+    adjustments_df['_rank'] = adjustments_df.groupby(keys + ['상태'], sort=False, observed=True).cumcount()
+    bochung_df = adjustments_df[adjustments_df['상태'] == '보충']
+    jeoe_df = adjustments_df[adjustments_df['상태'] == '휴근']
+    pairs = bochung_df.merge(jeoe_df, on=keys + ['_rank'], suffixes=('_보충', '_휴근')).sort_values('_rank', kind='stable')
+    if pairs.empty:
+        return df
+
+    # 3. 같은 (근무자, 시간대, 날짜)의 레코드는 처음 짝지어진 상대 날짜로 한꺼번에 바뀝니다. (기존 순차 매칭과 동일)
+    def matched_rows(records, own_date, other_date):
+        first_pair = pairs.drop_duplicates(keys + [own_date])[keys + [own_date, other_date]]
+        rows = records.dropna(subset=['날짜']).merge(first_pair, left_on=keys + ['날짜'], right_on=keys + [own_date])
+        return rows['_pos'].tolist(), pd.to_datetime(rows[other_date]).dt.strftime('%-m/%-d').tolist()
+
+    # 4. 대체보충(추가보충이었던 레코드) / 대체휴근(추가제외였던 레코드)으로 일괄 변경
+    if '메모' not in df.columns:
+        df['메모'] = pd.Series(dtype=object)
+    status_col, color_col, memo_col = (df.columns.get_loc(col) for col in ['상태', '색상', '메모'])
+    for records, own_date, other_date, status, color, memo_format in [
+        (bochung_df, '날짜_보충', '날짜_휴근', '대체보충', '🟢 초록색', "{}에서 대체됨"),
+        (jeoe_df, '날짜_휴근', '날짜_보충', '대체휴근', '🔵 파란색', "{}로 대체함"),
+    ]:
+        positions, other_dates = matched_rows(records, own_date, other_date)
+        df.iloc[positions, status_col] = status
+        df.iloc[positions, color_col] = color
+        df.iloc[positions, memo_col] = [memo_format.format(d) for d in other_dates]
+
+    # 5. 최종 결과를 반환합니다. (호출한 곳에서 최종 중복 제거 필요)
+    return df
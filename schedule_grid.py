@@ -0,0 +1,68 @@
+import pandas as pd
+
+WEEKDAY_NAMES = ['월', '화', '수', '목', '금', '토', '일']
+ONCALL_COLUMN = '오전당직(온콜)'
+
+
+def am_columns(count):
+    return [str(i) for i in range(1, count + 1)]
+
+
+def pm_columns(count):
+    return [f'오후{i}' for i in range(1, count + 1)]
+
+
+def month_frame(month_start, month_end):
+    """월의 날짜별 (키 'YYYY-MM-DD', 라벨 'M월 D일', 요일) 표."""
+    dates = pd.date_range(start=month_start, end=month_end)
+    return pd.DataFrame({
+        '날짜키': dates.strftime('%Y-%m-%d'),
+        '날짜': [f"{d.month}월 {d.day}일" for d in dates],
+        '요일': [WEEKDAY_NAMES[d.weekday()] for d in dates],
+    })
+
+
+def rank_within(df_long, keys, order=None):
+    """keys 그룹 안에서 0부터 매긴 '순위' 열을 붙입니다. (groupby().cumcount())
+
+    order가 있으면 그룹 안을 order 열 순서로 정렬한 뒤 매기고, 없으면 기존 행 순서를 따릅니다.
+    """
+    if order:
+        df_long = df_long.sort_values(list(keys) + list(order), kind='stable')
+    return df_long.assign(순위=df_long.groupby(list(keys), sort=False).cumcount())
+
+
+def long_to_wide(df_long, row_key, column, value, index, columns, fill=''):
+    """long 표를 (row_key × column) 격자로 한 번에 펼칩니다. (pivot)
+
+    index/columns 순서로 맞추며, columns에 없는 열의 값은 버리고 빈 칸은 fill로 채웁니다.
+    같은 칸에 값이 여럿이면 첫 값을 씁니다.
+    """
+    df_long = df_long[df_long[column].isin(columns)].drop_duplicates([row_key, column])
+    wide = df_long.pivot(index=row_key, columns=column, values=value)
+    wide = wide.reindex(index=index, columns=columns).astype(object)
+    return wide.where(wide.notna(), fill)
+
+
+def wide_to_long(df_wide, columns, value_name='값'):
+    """격자의 columns를 (행, 열, 열순서, 값) long 표로 펼칩니다. long_to_wide의 반대 방향으로, 편집한 격자를 저장할 때 씁니다.
+
+    '행'은 df_wide의 인덱스 라벨이며, 행 순서 → 열 순서대로 정렬됩니다. 없는 열은 건너뜁니다.
+    """
+    columns = [col for col in columns if col in df_wide.columns]
+    order = {col: i for i, col in enumerate(columns)}
+    df_long = (df_wide[columns].rename_axis('행').reset_index()
+               .melt(id_vars='행', value_vars=columns, var_name='열', value_name=value_name))
+    df_long['열순서'] = df_long['열'].map(order)
+    positions = pd.Series(range(len(df_wide)), index=df_wide.index)
+    df_long['_행순서'] = df_long['행'].map(positions)
+    return (df_long.sort_values(['_행순서', '열순서'], kind='stable')
+            .drop(columns='_행순서').reset_index(drop=True))
+
+
+def first_rows_by(df, key, labels):
+    """df에서 key 값별 첫 행을 labels 순서로 맞춘 표와, 해당 행이 있었는지 여부(bool 배열)."""
+    if df is None or df.empty or key not in df.columns:
+        return pd.DataFrame(index=pd.Index(labels)), pd.Series(False, index=labels).to_numpy()
+    first = df.drop_duplicates(key).set_index(key)
+    return first.reindex(labels), pd.Index(labels).isin(first.index)
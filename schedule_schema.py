@@ -0,0 +1,283 @@
+import re
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+REQUEST_COLUMNS = ["이름", "분류", "날짜정보"]
+
+# 근무 배정 결과(df_final) 열과 범주. 처음 보는 값은 add_schedule_categories()로 범주에 추가됩니다.
+SCHEDULE_COLUMNS = ["날짜", "요일", "주차", "시간대", "근무자", "상태", "메모", "색상"]
+SHIFTS = ["오전", "오후", "오전당직"]
+STATUSES = ["근무", "꼭 근무", "보충", "휴근", "대체보충", "대체휴근", "휴가", "학회", "당직"]
+COLORS = ["기본", "🟠 주황색", "🟢 초록색", "🟡 노란색", "🔴 빨간색", "🔵 파란색", "🟣 보라색", "특수근무색"]
+
+
+def parse_schedule_dates(values, year):
+    """'2025-10-01' 또는 '10월 1일' 형식의 날짜 문자열을 datetime64로 변환합니다. (해석 불가 값은 NaT)"""
+    values = pd.Series(values).astype(str).str.strip()
+    iso = pd.to_datetime(values, format='%Y-%m-%d', errors='coerce')
+    korean = pd.to_datetime(f"{year}년 " + values, format='%Y년 %m월 %d일', errors='coerce')
+    return iso.fillna(korean)
+
+
+def explode_request_dates(df_request, parse_dates):
+    """요청사항을 (요청 행, 날짜) 한 줄씩 펼친 long 테이블로 만듭니다.
+
+    날짜는 datetime64, 이름/분류는 Categorical이라 날짜별 필터링과 그룹핑이 정수 코드로 수행됩니다.
+    parse_dates는 '날짜정보' 문자열을 'YYYY-MM-DD' 목록으로 바꾸는 함수입니다.
+    """
+    if df_request is None or df_request.empty or not set(REQUEST_COLUMNS) <= set(df_request.columns):
+        return pd.DataFrame({"요청행": pd.Series(dtype="int64"),
+                             "이름": pd.Categorical([]), "분류": pd.Categorical([]),
+                             "날짜": pd.Series(dtype="datetime64[ns]")})
+    df = df_request[REQUEST_COLUMNS].reset_index(drop=True)
+    unique_infos = df["날짜정보"].astype(str).unique()
+    parsed = {info: list(dict.fromkeys(parse_dates(info))) for info in unique_infos}
+    df_long = (df.assign(요청행=df.index, 날짜=df["날짜정보"].astype(str).map(parsed))
+               .explode("날짜").dropna(subset=["날짜"]))
+    return pd.DataFrame({
+        "요청행": df_long["요청행"].to_numpy(dtype="int64"),
+        "이름": pd.Categorical(df_long["이름"].astype(str)),
+        "분류": pd.Categorical(df_long["분류"].astype(str)),
+        "날짜": pd.to_datetime(df_long["날짜"], format='%Y-%m-%d').to_numpy(),
+    })
+
+
+class RequestDateIndex:
+    """(날짜, 분류)별 요청자 이름 집합 인덱스.
+
+    매 날짜마다 요청 테이블 전체를 iterrows + 날짜정보 파싱으로 훑던 조회를
+    typed long 테이블의 groupby 한 번으로 대신합니다.
+    """
+
+    def __init__(self, df_long):
+        self.frame = df_long
+        self._names = {}
+        self._categories = {}
+        if not df_long.empty:
+            grouped = df_long.groupby(["날짜", "분류"], observed=True, sort=False)["이름"]
+            for (date, category), names in grouped:
+                self._names[(pd.Timestamp(date), category)] = frozenset(names.astype(str))
+            ordered = df_long.sort_values("요청행", kind="stable")
+            for (date, name), categories in ordered.groupby(["날짜", "이름"], observed=True, sort=False)["분류"]:
+                self._categories[(pd.Timestamp(date), name)] = tuple(categories.astype(str))
+
+    def names(self, date, categories):
+        """해당 날짜에 categories(문자열 또는 목록) 요청을 낸 이름 집합."""
+        date = pd.Timestamp(date)
+        if isinstance(categories, str):
+            categories = [categories]
+        result = set()
+        for category in categories:
+            result |= self._names.get((date, category), frozenset())
+        return result
+
+    def category_of(self, date, name, categories, default=None):
+        """해당 날짜에 name이 낸 요청 중 categories에 속하는 첫 번째 분류 (요청 시트 순서 기준)."""
+        for category in self._categories.get((pd.Timestamp(date), name), ()):
+            if category in categories:
+                return category
+        return default
+
+
+def empty_schedule_frame(names):
+    """빈 df_final. 날짜는 datetime64, 시간대/근무자/상태/색상은 Categorical이라 배정 중 필터링이 정수 코드 비교로 수행됩니다."""
+    return pd.DataFrame(columns=SCHEDULE_COLUMNS).astype({
+        "날짜": "datetime64[ns]",
+        "시간대": pd.CategoricalDtype(SHIFTS),
+        "근무자": pd.CategoricalDtype(sorted(set(names))),
+        "상태": pd.CategoricalDtype(STATUSES),
+        "색상": pd.CategoricalDtype(COLORS),
+    })
+
+
+def add_schedule_categories(df, values):
+    """values({열: 값})의 값이 해당 Categorical 열의 범주에 없으면 범주에 추가한 df를 반환합니다. (문자열 열은 그대로)"""
+    missing = {col: value for col, value in values.items()
+               if isinstance(df[col].dtype, pd.CategoricalDtype) and value not in df[col].cat.categories}
+    if not missing:
+        return df
+    return df.assign(**{col: df[col].cat.add_categories([value]) for col, value in missing.items()})
+
+
+def append_schedule_row(df, row):
+    """df_final에 한 행을 덧붙입니다.
+
+    typed 표는 열마다 배열 끝에 값을 붙여 다시 만들어 Categorical 열의 범주/dtype이 그대로 유지되고
+    (pd.concat의 범주 비교를 거치지 않음), 문자열 표는 기존처럼 pd.concat으로 붙입니다.
+    """
+    if not any(isinstance(dtype, pd.CategoricalDtype) for dtype in df.dtypes):
+        return pd.concat([df, pd.DataFrame([row])], ignore_index=True)
+    df = add_schedule_categories(df, row)
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = np.append(series.cat.codes.to_numpy(), series.cat.categories.get_loc(row[col]))
+            columns[col] = pd.Categorical.from_codes(codes, dtype=series.dtype, validate=False)
+        else:
+            value = pd.Timestamp(row[col]) if pd.api.types.is_datetime64_dtype(series.dtype) else row[col]
+            columns[col] = np.append(series.to_numpy(), np.array([value], dtype=series.dtype))
+    return pd.DataFrame(columns, copy=False)
+
+
+def find_schedule_rows(df, date_str, time_slot, worker):
+    """(날짜, 시간대, 근무자)가 같은 df_final 행의 인덱스 목록. typed 표는 Categorical 코드와 datetime64 배열을 바로 비교합니다."""
+    if not isinstance(df["근무자"].dtype, pd.CategoricalDtype):
+        return df.index[(df["날짜"] == date_str) & (df["시간대"] == time_slot) & (df["근무자"] == worker)].tolist()
+    shifts, names = df["시간대"].array, df["근무자"].array
+    if time_slot not in shifts.categories or worker not in names.categories:
+        return []
+    mask = ((df["날짜"].to_numpy() == np.datetime64(pd.Timestamp(date_str), "ns"))
+            & (shifts.codes == shifts.categories.get_loc(time_slot))
+            & (names.codes == names.categories.get_loc(worker)))
+    return df.index[mask].tolist()
+
+
+def schedule_to_strings(df):
+    """typed df_final을 화면 표시/시트 저장용 문자열 열로 되돌립니다. (날짜는 'YYYY-MM-DD')"""
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+    if pd.api.types.is_datetime64_dtype(df["날짜"].dtype):
+        df["날짜"] = df["날짜"].dt.strftime("%Y-%m-%d").astype(object)
+    return df
+
+
+def room_assignments_long(df_room, slot_columns, year, exclude_dates=()):
+    """방배정 표(날짜 × 슬롯 열)를 배정 한 칸당 한 줄인 long 테이블로 펼칩니다.
+
+    날짜는 datetime64, 슬롯/근무자는 Categorical이라 슬롯별·인원별 집계가 정수 코드로 수행됩니다.
+    빈 칸과 exclude_dates('날짜' 열 문자열 기준)의 날짜는 뺍니다.
+    """
+    slot_columns = list(dict.fromkeys(slot_columns))
+    grid = df_room[~df_room["날짜"].isin(set(exclude_dates))]
+    long = grid.melt(id_vars=["날짜"], value_vars=slot_columns, var_name="슬롯", value_name="근무자")
+    long = long[long["근무자"].fillna("").astype(bool)]
+    return pd.DataFrame({
+        "날짜": parse_schedule_dates(long["날짜"], year).to_numpy(),
+        "슬롯": pd.Categorical(long["슬롯"], categories=slot_columns),
+        "근무자": pd.Categorical(long["근무자"]),
+    })
+
+
+def _display_date(date):
+    return date.strftime("%-m월 %-d일") + f" ({'월화수목금토일'[date.weekday()]})"
+
+
+class ShiftIndex:
+    """스케줄 시트의 역색인: {이름: [(날짜, 근무형태, 열)]}, {(날짜, 근무형태): 이름 집합}.
+
+    근무형태는 '오전', '오후', '오전당직(온콜)'입니다. 변경 요청 화면의 동료 목록/중복 확인을
+    날짜마다 DataFrame을 필터링하는 대신 딕셔너리 조회로 처리합니다.
+    """
+
+    def __init__(self, df, am_cols, pm_cols, oncall_col):
+        self.by_person = {}
+        self.by_slot = {}
+        # 동료 목록(employees)은 온콜 열을 제외한 오전/오후 근무 열에서만 모읍니다.
+        self.employees = set()
+        if df.empty:
+            return
+        columns = [(col, "오전") for col in am_cols] + [(col, "오후") for col in pm_cols] + [(oncall_col, oncall_col)]
+        dates = pd.to_datetime(df["날짜_dt"]).dt.date.tolist()
+        for col, shift_type in columns:
+            if col not in df.columns:
+                continue
+            for date, person in zip(dates, df[col].tolist()):
+                if not person:
+                    continue
+                self.by_person.setdefault(person, []).append((date, shift_type, col))
+                self.by_slot.setdefault((date, shift_type), set()).add(person)
+                if shift_type != oncall_col:
+                    self.employees.add(person)
+
+    def is_assigned(self, person, date, shift_type):
+        return person in self.by_slot.get((date, shift_type), ())
+
+    def workers(self, date, shift_type):
+        return set(self.by_slot.get((date, shift_type), ()))
+
+    def shifts(self, person):
+        """person의 (날짜, 근무형태)별 근무 목록. 날짜·근무형태 순으로 정렬된 dict 목록입니다."""
+        slots = sorted({(date, shift_type) for date, shift_type, _ in self.by_person.get(person, ())})
+        return [{"date_obj": date, "shift_type": shift_type,
+                 "display_str": f"{_display_date(date)} - {shift_type}", "person_name": person}
+                for date, shift_type in slots]
+
+
+class RoomAssignmentIndex:
+    """방배정 시트의 역색인: {이름: [배정 dict]}, {날짜: 그날 배정된 이름 집합} (+ 토요/휴일 근무자)."""
+
+    def __init__(self, df_room, df_special=None):
+        self.by_person = {}
+        self.by_date = {}
+        self.special_by_date = {}
+        special_dates = set()
+        if df_special is not None and not df_special.empty:
+            special_dates = set(df_special["날짜_dt"].dt.date)
+            for date, workers in df_special.drop_duplicates("날짜_dt")[["날짜_dt", "근무"]].itertuples(index=False):
+                names = workers.split(", ") if workers else []
+                self.special_by_date[date.date()] = {re.sub(r"\[\d+\]", "", name).strip() for name in names}
+        if df_room.empty:
+            self.employees = set()
+            return
+
+        sorted_df = df_room.sort_values(by="날짜_dt").reset_index(drop=True)
+        assignment_cols = [col for col in df_room.columns if col not in ["날짜", "요일", "날짜_dt"]]
+        for row in sorted_df[["날짜_dt"] + assignment_cols].itertuples(index=False, name=None):
+            dt, values = row[0], row[1:]
+            if pd.isna(dt):
+                continue
+            date = dt.date()
+            display_date_str = _display_date(dt)
+            sheet_date_str = dt.strftime("%Y-%m-%d")
+            for col, value in zip(assignment_cols, values):
+                person = str(value).strip()
+                if not person:
+                    continue
+                self.by_date.setdefault(date, set()).add(person)
+                display_str = f"{display_date_str} - {col}"
+                if date in special_dates:
+                    # 토요/휴일은 "날짜 - X번방"으로 표시
+                    room_match = re.search(r"\((\d+)\)", str(col))
+                    if room_match:
+                        display_str = f"{display_date_str} - {room_match.group(1)}번방"
+                self.by_person.setdefault(person, []).append({
+                    "date_obj": date, "column_name": str(col), "person_name": person,
+                    "display_str": display_str, "sheet_str": f"{sheet_date_str} ({col})",
+                })
+        for assignments in self.by_person.values():
+            assignments.sort(key=lambda a: (a["date_obj"], a["column_name"]))
+
+        time_cols = [col for col in df_room.columns if re.search(r"(\d{1,2}:\d{2})", str(col)) or "당직" in str(col) or "온콜" in str(col)]
+        values = pd.unique(df_room[time_cols].to_numpy().ravel()) if time_cols else []
+        self.employees = {re.sub(r"\[\d+\]", "", str(v)).strip() for v in values if v}
+
+    def assignments(self, person):
+        return list(self.by_person.get(person, ()))
+
+    def is_assigned(self, person, date):
+        return person in self.by_date.get(date, ()) or person in self.special_by_date.get(date, ())
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _cached_shift_index(_df, version, am_cols, pm_cols, oncall_col):
+    return ShiftIndex(_df, list(am_cols), list(pm_cols), oncall_col)
+
+
+def get_shift_index(df, version, am_cols, pm_cols, oncall_col):
+    """스케줄을 불러올 때 정한 버전(versioned_memo.new_version)별로 캐싱된 ShiftIndex. 표는 해시하지 않습니다."""
+    return _cached_shift_index(df, version, tuple(am_cols), tuple(pm_cols), oncall_col)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _cached_room_index(_df_room, _df_special, version):
+    return RoomAssignmentIndex(_df_room, _df_special)
+
+
+def get_room_assignment_index(df_room, df_special, version):
+    """방배정/토요·휴일 시트를 불러올 때 정한 버전 (방배정 버전, 토요·휴일 버전)별로 캐싱된 RoomAssignmentIndex."""
+    return _cached_room_index(df_room, df_special, version)
@@ -0,0 +1,69 @@
+from gspread.exceptions import GSpreadException, WorksheetNotFound
+
+
+def _row_runs(row_numbers):
+    """1-based 행 번호들을 연속 구간 [(시작, 끝)] 목록으로 묶습니다. (뒤쪽 구간부터)"""
+    runs = []
+    for row in sorted(set(row_numbers), reverse=True):
+        if runs and runs[-1][0] == row + 1:
+            runs[-1] = (row, runs[-1][1])
+        else:
+            runs.append((row, row))
+    return runs
+
+
+def batch_delete_rows(worksheet, row_numbers):
+    """여러 행을 한 번의 batch_update(deleteDimension)로 삭제합니다.
+
+    행 번호는 gspread와 같은 1-based이며, 인덱스가 밀리지 않도록 아래쪽 구간부터 삭제 요청을 보냅니다.
+    연속된 행은 하나의 요청으로 묶습니다.
+    """
+    runs = _row_runs(row_numbers)
+    if not runs:
+        return 0
+    requests = [{
+        "deleteDimension": {
+            "range": {"sheetId": worksheet.id, "dimension": "ROWS", "startIndex": start - 1, "endIndex": end},
+        }
+    } for start, end in runs]
+    worksheet.spreadsheet.batch_update({"requests": requests})
+    return sum(end - start + 1 for start, end in runs)
+
+
+def delete_record_rows(worksheet, records, predicate):
+    """get_all_records() 결과 중 predicate(record)가 참인 행을 일괄 삭제합니다.
+
+    삭제 후 다시 읽지 않고, 같은 records에서 남은 행을 계산해 (삭제 건수, 남은 records)를 반환합니다.
+    records[i]는 시트의 i + 2행(1행은 헤더)입니다.
+    """
+    targets = [i for i, record in enumerate(records) if predicate(record)]
+    deleted = batch_delete_rows(worksheet, [i + 2 for i in targets])
+    target_set = set(targets)
+    remaining = [record for i, record in enumerate(records) if i not in target_set]
+    return deleted, remaining
+
+
+def delete_records(worksheet, predicate):
+    """시트를 한 번 읽어 predicate(record)가 참인 행을 일괄 삭제합니다. (읽기 1회 + 쓰기 1회)"""
+    return delete_record_rows(worksheet, worksheet.get_all_records(), predicate)
+
+
+def get_or_create_worksheet(spreadsheet, title, header, rows=100):
+    """title 워크시트를 가져오고, 없으면 header 행과 함께 만듭니다.
+
+    여러 세션이 동시에 처음 만들려 하면 한 곳만 성공하고 나머지는 '이미 있음' 오류를 받으므로, 그때는 다시 가져옵니다.
+    헤더는 append가 아닌 A1 덮어쓰기라 양쪽이 함께 써도 한 줄만 남고, 반환 전에 항상 써 두므로 데이터 행보다 먼저 들어갑니다.
+    """
+    try:
+        return spreadsheet.worksheet(title)
+    except WorksheetNotFound:
+        pass
+    try:
+        worksheet = spreadsheet.add_worksheet(title=title, rows=rows, cols=len(header))
+    except GSpreadException as e:
+        try:
+            worksheet = spreadsheet.worksheet(title)
+        except WorksheetNotFound:
+            raise e
+    worksheet.update([header], "A1")
+    return worksheet
@@ -0,0 +1,178 @@
+import pandas as pd
+
+ARROW = "➡️"
+SLOT_PATTERN = r"^(\d{4}-\d{2}-\d{2}) \((.+)\)$"
+
+APPLIED = "applied"
+REJECTED = "rejected"
+FAILED = "failed"
+
+
+def parse_swap_requests(df_requests, slot_column):
+    """변경 요청 시트를 한 번에 파싱합니다.
+
+    '변경 요청'(A ➡️ B)과 slot_column('YYYY-MM-DD (시간대/방)')을 나눠
+    [순번, 요청, 슬롯 정보, 변경 전, 변경 후, 날짜, 날짜표시, 슬롯] 열의 DataFrame을 반환합니다.
+    형식이 맞지 않는 행은 기존처럼 조용히 제외합니다. 순번은 시트에서의 요청 순서입니다.
+    """
+    columns = ["순번", "요청", "슬롯 정보", "변경 전", "변경 후", "날짜", "날짜표시", "슬롯"]
+    if df_requests is None or df_requests.empty or "변경 요청" not in df_requests.columns or slot_column not in df_requests.columns:
+        return pd.DataFrame(columns=columns)
+
+    change = df_requests["변경 요청"].astype(str).str.strip()
+    info = df_requests[slot_column].astype(str).str.strip()
+    people = change.str.split(ARROW, n=1, expand=True).reindex(columns=[0, 1])
+    slot = info.str.extract(SLOT_PATTERN)
+    dates = pd.to_datetime(slot[0], format="%Y-%m-%d", errors="coerce")
+
+    parsed = pd.DataFrame({
+        "순번": range(len(df_requests)),
+        "요청": change.to_numpy(),
+        "슬롯 정보": info.to_numpy(),
+        "변경 전": people[0].str.strip().to_numpy(),
+        "변경 후": people[1].str.strip().to_numpy(),
+        "날짜": dates.to_numpy(),
+        "슬롯": slot[1].to_numpy(),
+    })
+    valid = change.str.contains(ARROW, regex=False).to_numpy() & dates.notna().to_numpy()
+    parsed = parsed[valid].reset_index(drop=True)
+    parsed["날짜"] = pd.to_datetime(parsed["날짜"]).dt.date
+    parsed["날짜표시"] = [f"{d.month}월 {d.day}일" for d in parsed["날짜"]]
+    return parsed[columns]
+
+
+class SwapPlan:
+    """(날짜, 슬롯) 그룹별 요청 그래프로 정한 적용 순서와 충돌로 제외된 요청.
+
+    그룹 안에서 요청은 '변경 전 → 변경 후' 간선입니다.
+    - 같은 요청이 여러 번 있으면 첫 요청만 남깁니다.
+    - 한 사람에게 두 요청이 몰리거나(이중 배정), 한 사람을 두 사람에게 넘기는 요청은 첫 요청만 남깁니다.
+    - 남은 간선 중 순환(A→B, B→A 등)은 적용하면 서로 자리만 바뀌어 의미가 없으므로 모두 제외합니다.
+    - 연쇄(A→B, B→C)는 슬롯 종류에 따라 순서를 정합니다.
+      여러 명이 근무하는 시간대(오전/오후)는 B→C를 먼저 적용해야 A→B가 '이미 근무 중'으로 막히지 않으므로 사슬 끝부터,
+      한 칸짜리 슬롯(방)은 A→B로 넘어온 자리를 B→C가 다시 넘기는 것이므로 사슬 앞부터(handoff=True) 적용합니다.
+    그룹 순서는 그룹의 첫 요청 순번을 따르므로, 같은 요청 목록이면 결과가 항상 같습니다.
+    """
+
+    def __init__(self, order, rejected):
+        self.order = order
+        self.rejected = rejected
+
+
+def _chain_order(edges, handoff):
+    """단순 경로들의 간선 적용 순서와 순환에 속한 간선. edges: [(순번, 변경 전, 변경 후)], 출/입차수 ≤ 1."""
+    by_source = {before: (seq, after) for seq, before, after in edges}
+    targets = {after for _, _, after in edges}
+    order, visited = [], set()
+    # 경로의 시작점(들어오는 간선이 없는 사람)부터 간선을 따라갑니다. 시작점이 없는 간선은 순환에 속합니다.
+    for seq, before, _ in sorted(edges):
+        if before in targets or seq in visited:
+            continue
+        path, node = [], before
+        while node in by_source and by_source[node][0] not in visited:
+            edge_seq, nxt = by_source[node]
+            visited.add(edge_seq)
+            path.append(edge_seq)
+            node = nxt
+        order.extend(path if handoff else reversed(path))
+    cyclic = [seq for seq, _, _ in edges if seq not in visited]
+    return order, cyclic
+
+
+def plan_swaps(parsed, group_of=None, handoff=False):
+    """parsed(parse_swap_requests 결과)의 적용 순서를 정합니다.
+
+    group_of(row)는 요청이 속한 그룹 키를 반환합니다. (기본: (날짜표시, 슬롯))
+    """
+    group_of = group_of or (lambda row: (row["날짜표시"], row["슬롯"]))
+    groups = {}
+    for row in parsed.to_dict("records"):
+        groups.setdefault(group_of(row), []).append(row)
+
+    order, rejected = [], {}
+    for rows in groups.values():
+        edges, same, seen_pairs, sources, targets = [], [], set(), set(), set()
+        for row in rows:
+            seq, before, after = row["순번"], row["변경 전"], row["변경 후"]
+            if (before, after) in seen_pairs:
+                rejected[seq] = "같은 요청이 이미 있습니다"
+            elif before == after:
+                # 그래프에 넣으면 자기 순환이 되므로 따로 두고, 처리(경고 또는 그대로 반영)는 apply_one에 맡깁니다.
+                same.append(seq)
+            elif after in targets:
+                rejected[seq] = f"'{after}'님에게 같은 시간대 다른 요청이 먼저 배정되었습니다 (이중 배정)"
+            elif before in sources:
+                rejected[seq] = f"'{before}'님의 같은 시간대 근무가 다른 요청으로 먼저 넘겨졌습니다"
+            else:
+                edges.append((seq, before, after))
+                sources.add(before)
+                targets.add(after)
+            seen_pairs.add((before, after))
+        chain, cyclic = _chain_order(edges, handoff)
+        order.extend(chain + same)
+        for seq in cyclic:
+            rejected[seq] = "순환 요청입니다 (서로 맞바꾸는 요청은 적용해도 배정이 달라지지 않습니다)"
+    return SwapPlan(order, rejected)
+
+
+class SwapGrid:
+    """스케줄/방배정 표의 배정 열을 object 배열로 옮겨 조회·수정하고, 마지막에 한 번에 써 넣습니다.
+
+    날짜표시 → 행 위치 사전을 한 번 만들어, 요청마다 df['날짜'] == ... 로 필터링하지 않습니다.
+    """
+
+    def __init__(self, df, columns, clean=None):
+        self.columns = [col for col in columns if col in df.columns]
+        self.col_index = {col: j for j, col in enumerate(self.columns)}
+        self.values = df[self.columns].to_numpy(dtype=object, copy=True)
+        self.row_of = {}
+        for i, label in enumerate(df["날짜"].astype(str).tolist()):
+            self.row_of.setdefault(label, i)
+        self._clean = clean or (lambda value: str(value).strip())
+        self._dirty = set()
+
+    def row(self, date_label):
+        return self.row_of.get(date_label)
+
+    def get(self, row, col):
+        return self._clean(self.values[row, self.col_index[col]])
+
+    def set(self, row, col, value):
+        self.values[row, self.col_index[col]] = value
+        self._dirty.add(col)
+
+    def find(self, row, person, columns=None):
+        """row에서 person이 배정된 열 목록 (columns 순서)."""
+        columns = self.columns if columns is None else [col for col in columns if col in self.col_index]
+        return [col for col in columns if self.get(row, col) == person]
+
+    def people(self, row, columns):
+        return {self.get(row, col) for col in columns if col in self.col_index}
+
+    def write_to(self, df):
+        """수정된 열만 df 사본에 한 번에 반영합니다. (바뀌지 않은 열은 dtype을 그대로 유지)"""
+        df_modified = df.copy()
+        dirty = [col for col in self.columns if col in self._dirty]
+        if dirty:
+            df_modified[dirty] = pd.DataFrame(self.values[:, [self.col_index[col] for col in dirty]], index=df.index, columns=dirty)
+        return df_modified
+
+
+def apply_swap_requests(df, parsed, columns, apply_one, group_of=None, clean=None, handoff=False):
+    """계획된 순서대로 apply_one(grid, row)을 실행하고, 결과 표와 요청별 결과를 반환합니다.
+
+    apply_one은 요청을 grid에 반영하면 (APPLIED, 로그 dict 또는 None), 반영할 수 없으면 (REJECTED, 메시지)를 반환합니다.
+    그래프 단계에서 제외된 요청은 (REJECTED, 사유 문자열)로, apply_one에서 난 예외는 (FAILED, 예외)로
+    시트 순번 순서의 [(row, 상태, 값)] 목록에 함께 담깁니다.
+    """
+    grid = SwapGrid(df, columns, clean=clean)
+    plan = plan_swaps(parsed, group_of, handoff)
+    rows = {row["순번"]: row for row in parsed.to_dict("records")}
+    outcomes = {seq: (REJECTED, reason) for seq, reason in plan.rejected.items()}
+    for seq in plan.order:
+        try:
+            outcomes[seq] = apply_one(grid, rows[seq])
+        except Exception as e:
+            outcomes[seq] = (FAILED, e)
+    results = [(rows[seq], *outcomes[seq]) for seq in sorted(outcomes)]
+    return grid.write_to(df), results
@@ -0,0 +1,140 @@
+import calendar
+import random
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+WEEKDAYS = ["월", "화", "수", "목", "금"]
+SURNAMES = "김이박최정강조윤장임한오서신권황안송류홍"
+GIVEN = "민서지현우준도하윤수예진성재영은태연주원승혜경호나리"
+REQUEST_CATEGORIES = {
+    "휴가": 0.3, "학회": 0.1, "보충 어려움(오전)": 0.1, "보충 어려움(오후)": 0.1,
+    "보충 불가(오전)": 0.12, "보충 불가(오후)": 0.12, "꼭 근무(오전)": 0.08, "꼭 근무(오후)": 0.08,
+}
+ROOM_REQUEST_CATEGORIES = ["1번방", "2번방", "3번방", "4번방", "5번방", "6번방", "7번방", "8번방", "9번방", "10번방",
+                           "11번방", "12번방", "8:30", "9:00", "9:30", "10:00", "당직 아닌 이른방", "이른방 제외",
+                           "늦은방 제외", "오후 당직 제외"]
+# 토요일 외에 평일 공휴일을 며칠 두는지: 이름 → (단독 공휴일 수, 연휴 길이)
+HOLIDAY_PATTERNS = {"none": (0, 0), "single": (1, 0), "long_weekend": (1, 3)}
+AM_TARGET = 12
+PM_TARGET = 4
+
+
+def staff_names(count, rng):
+    """서로 다른 count개의 합성 이름. (성 1자 + 이름 2자)"""
+    pool = [s + a + b for s in SURNAMES for a in GIVEN for b in GIVEN if a != b]
+    return rng.sample(pool, count)
+
+
+def month_dates(year, month):
+    _, last_day = calendar.monthrange(year, month)
+    return [date(year, month, d) for d in range(1, last_day + 1)]
+
+
+def _holidays(weekdays, pattern, rng):
+    singles, run = HOLIDAY_PATTERNS[pattern]
+    holidays = set()
+    if run:
+        start = rng.randrange(0, max(1, len(weekdays) - run))
+        holidays.update(weekdays[start:start + run])
+    candidates = [d for d in weekdays if d not in holidays]
+    holidays.update(rng.sample(candidates, min(singles, len(candidates))))
+    return sorted(holidays)
+
+
+def _master_rows(names, coverage, rng):
+    """요일·시간대별 마스터 인원이 목표 인원 × coverage 근처가 되도록 근무 패턴을 나눠 줍니다.
+
+    인원이 많으면 대부분 '근무없음'이 되고, 일부는 특정 주차('1주', '3주' 등)에만 근무합니다.
+    """
+    am_prob = min(1.0, AM_TARGET * coverage / len(names))
+    pm_prob = min(1.0, PM_TARGET * coverage / len(names))
+    rows = []
+    for name in names:
+        part_time = rng.random() < 0.1
+        weeks = sorted(rng.sample(["1주", "2주", "3주", "4주", "5주"], 2)) if part_time else ["매주"]
+        for week in weeks:
+            for day in WEEKDAYS:
+                am, pm = rng.random() < am_prob, rng.random() < pm_prob
+                status = "오전 & 오후" if am and pm else "오전" if am else "오후" if pm else "근무없음"
+                rows.append([name, week, day, status])
+    return rows
+
+
+def _request_rows(names, weekdays, density, rng):
+    """평균 density건/인 요청. 휴가는 기간('~'), 나머지는 날짜 목록(', ')으로 적습니다."""
+    categories, weights = zip(*REQUEST_CATEGORIES.items())
+    rows = []
+    for name in names:
+        count = sum(rng.random() < density / 3 for _ in range(3)) if density < 3 else round(density)
+        if count == 0:
+            rows.append([name, "요청 없음", ""])
+        for _ in range(count):
+            category = rng.choices(categories, weights)[0]
+            start = rng.randrange(len(weekdays))
+            if category == "휴가":
+                end = min(start + rng.randrange(1, 5), len(weekdays) - 1)
+                info = f"{weekdays[start]:%Y-%m-%d} ~ {weekdays[end]:%Y-%m-%d}"
+            else:
+                picked = sorted(rng.sample(weekdays, min(len(weekdays), rng.randrange(1, 4))))
+                info = ", ".join(f"{d:%Y-%m-%d}" for d in picked)
+            rows.append([name, category, info])
+    return rows
+
+
+def _room_request_rows(names, weekdays, density, rng):
+    rows = []
+    for name in names:
+        if rng.random() >= density:
+            continue
+        category = rng.choice(ROOM_REQUEST_CATEGORIES)
+        picked = sorted(rng.sample(weekdays, min(len(weekdays), rng.randrange(1, 3))))
+        info = ", ".join(f"{d:%Y-%m-%d} ({rng.choice(['오전', '오후'])})" for d in picked)
+        rows.append([name, category, info])
+    return rows
+
+
+def _special_rows(dates, names, rng):
+    """토요/휴일 스케줄 행 (날짜, 근무, 당직). 근무 인원은 4~8명."""
+    rows = []
+    for d in dates:
+        workers = rng.sample(names, min(len(names), rng.randrange(4, 9)))
+        rows.append([f"{d:%Y-%m-%d}", ", ".join(workers), workers[0]])
+    return rows
+
+
+def generate(month_str, staff_count=100, request_density=1.0, room_request_density=0.3,
+             holiday_pattern="single", coverage=1.1, seed=0):
+    """스케줄 배정/방배정 페이지가 읽는 시트들의 합성 데이터. {워크시트 제목: 값(헤더 포함 2차원 목록)}
+
+    month_str은 배정 대상 월('2025년 10월')이며 마스터, 매핑, 요청, 방배정 요청, 누적,
+    토요/휴일 스케줄, 휴관일 시트를 만듭니다. 같은 인자와 seed면 항상 같은 데이터입니다.
+    """
+    rng = random.Random(seed)
+    year, month = (int(part) for part in month_str.replace("월", "").split("년"))
+    dates = month_dates(year, month)
+    weekdays = [d for d in dates if d.weekday() < 5]
+    holidays = _holidays(weekdays, holiday_pattern, rng)
+    workdays = [d for d in weekdays if d not in holidays]
+    saturdays = [d for d in dates if d.weekday() == 5]
+    names = staff_names(staff_count, rng)
+
+    cumulative = [["항목"] + names]
+    for label, low, high in (("오전누적", -3, 3), ("오후누적", -3, 3), ("오전당직누적", 0, 3), ("오후당직누적", 0, 3)):
+        cumulative.append([label] + [rng.randint(low, high) for _ in names])
+
+    return {
+        "매핑": [["이름", "사번"]] + [[name, f"{i + 1:05d}"] for i, name in enumerate(names)],
+        "마스터": [["이름", "주차", "요일", "근무여부"]] + _master_rows(names, coverage, rng),
+        f"{month_str} 요청": [["이름", "분류", "날짜정보"]] + _request_rows(names, workdays, request_density, rng),
+        f"{month_str} 방배정 요청": [["이름", "분류", "날짜정보"]] + _room_request_rows(names, workdays, room_request_density, rng),
+        f"{month_str} 누적": cumulative,
+        f"{year}년 토요/휴일 스케줄": [["날짜", "근무", "당직"]] + _special_rows(sorted(saturdays + holidays), names, rng),
+        f"{year}년 휴관일": [["날짜"]] + [[f"{d:%Y-%m-%d}"] for d in holidays],
+    }
+
+
+def next_month_str(today=None):
+    """스케줄 배정 페이지가 대상으로 삼는 달(한국 시간 오늘 기준 다음 달) 문자열."""
+    today = today or datetime.now(ZoneInfo("Asia/Seoul")).date()
+    first_next = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return f"{first_next.year}년 {first_next.month}월"
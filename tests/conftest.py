@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 페이지와 같은 방식(`import schedule_engine`)으로 루트 모듈을 불러올 수 있게 합니다.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,45 @@
+import answer_cache
+
+
+def test_normalize_question_ignores_case_spacing_and_punctuation():
+    assert answer_cache.normalize_question("  오전 당직은  누구?? ") == answer_cache.normalize_question("오전 당직은 누구")
+    assert answer_cache.normalize_question("Who IS on-call") == "who is on call"
+
+
+def test_lookup_by_exact_question_and_by_similar_vector():
+    cache = answer_cache.SemanticAnswerCache(threshold=0.95)
+    cache.store("오전 당직은 누구?", [1.0, 0.0], "김철수", is_admin=False, kb_version="v1")
+
+    assert cache.lookup_exact("오전 당직은 누구", False, "v1") == "김철수"
+    assert cache.lookup([10.0, 0.1], False, "v1") == "김철수"
+    assert cache.lookup([0.0, 1.0], False, "v1") is None
+    summary = cache.summary()
+    assert (summary["hits"], summary["exact_hits"], summary["misses"]) == (2, 1, 1)
+
+
+def test_entries_are_scoped_by_admin_mode_and_kb_version():
+    cache = answer_cache.SemanticAnswerCache()
+    cache.store("질문", [1.0, 0.0], "관리자 답변", is_admin=True, kb_version="v1")
+
+    assert cache.lookup_exact("질문", False, "v1") is None
+    assert cache.lookup([1.0, 0.0], False, "v1") is None
+    assert cache.lookup([1.0, 0.0], True, "v2") is None
+    assert cache.lookup([1.0, 0.0], True, "v1") == "관리자 답변"
+
+
+def test_lru_eviction_and_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now[0])
+    cache = answer_cache.SemanticAnswerCache(max_entries=2, ttl_seconds=60)
+    cache.store("a", [1.0, 0.0], "A", False, "v1")
+    cache.store("b", [0.0, 1.0], "B", False, "v1")
+    assert cache.lookup_exact("a", False, "v1") == "A"    # a가 최근 사용으로 올라감
+    cache.store("c", [1.0, 1.0], "C", False, "v1")
+
+    assert cache.lookup_exact("b", False, "v1") is None
+    assert cache.summary()["evicted"] == 1
+
+    now[0] += 61
+    assert cache.lookup_exact("a", False, "v1") is None
+    assert cache.summary()["entries"] == 0
+    assert cache.summary()["expired"] == 2
@@ -0,0 +1,46 @@
+import pandas as pd
+
+import dataset_store
+
+
+def _df():
+    return pd.DataFrame({"이름": ["김철수", "이영희"], "횟수": [1, 2]})
+
+
+def test_content_version_is_order_dtype_and_column_sensitive():
+    version = dataset_store._content_version
+    assert version(_df()) == version(_df())
+    assert version(_df()) != version(_df().iloc[::-1].reset_index(drop=True))
+    assert version(_df()) != version(_df().astype({"횟수": float}))
+    assert version(_df()) != version(_df().rename(columns={"횟수": "건수"}))
+    assert version(_df()) != version(_df().set_axis([5, 6]))
+    assert version(pd.DataFrame(columns=["a"])) != version(pd.DataFrame(columns=["b"]))
+
+
+def test_put_shares_equal_frames_and_frees_after_last_owner():
+    store = dataset_store.DatasetStore()
+    first, second = _df(), _df()
+
+    key = store.put("시트", first, owner="s1")
+    assert store.put("시트", second, owner="s2") == key
+    assert store.get(key) is first
+    assert store.is_shared(first) and not store.is_shared(second)
+    assert store.datasets_report()["참조 세션"].tolist() == [2]
+
+    store.release(key, "s1")
+    assert store.get(key) is first
+    store.release_owner("s2")
+    assert store.get(key) is None
+    assert store.datasets_report().empty
+
+
+def test_explicit_version_and_session_report():
+    store = dataset_store.DatasetStore()
+    key = store.put("시트", _df(), version="load-1", owner="s1")
+    assert key == ("시트", "load-1")
+    assert store.put("시트", _df().iloc[:1], version="load-2", owner="s1") != key
+
+    store.record_session("s1", [key, ("시트", "사라진 버전")], private_bytes=10)
+    report = store.sessions_report()
+    assert report[["세션", "공유 데이터", "세션 전용 바이트"]].values.tolist() == [["s1", 1, 10]]
+    assert report["공유 데이터 바이트"].iloc[0] == dataset_store.frame_bytes(_df())
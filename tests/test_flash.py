@@ -0,0 +1,40 @@
+import subprocess
+
+import flash
+
+
+def test_find_fixed_sleeps_reports_constant_sleeps_with_their_function(tmp_path):
+    (tmp_path / "Home.py").write_text("import time\ntime.sleep(1)\n", encoding="utf-8")
+    (tmp_path / "pages").mkdir()
+    (tmp_path / "pages" / "2 요청.py").write_text(
+        "import time\n\ndef save_job(delay):\n    time.sleep(0.5)\n    time.sleep(delay)\n", encoding="utf-8")
+
+    found = flash.find_fixed_sleeps(str(tmp_path))
+
+    assert found.values.tolist() == [["Home.py", "(모듈)", 2, 1.0], ["2 요청.py", "save_job", 4, 0.5]]
+
+
+def _git(repo, *args):
+    subprocess.run(["git", "-C", str(repo), "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+                   check=True, capture_output=True)
+
+
+def test_sleep_audit_reports_seconds_removed_since_base_per_file_and_function(tmp_path):
+    (tmp_path / "Home.py").write_text("import time\ntime.sleep(1)\ntime.sleep(1.5)\n", encoding="utf-8")
+    (tmp_path / "pages").mkdir()
+    page = tmp_path / "pages" / "2 요청.py"
+    page.write_text("import time\n\ndef add_callback():\n    time.sleep(1.5)\n\ntime.sleep(2)\n", encoding="utf-8")
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "base")
+
+    (tmp_path / "Home.py").write_text("import time\ntime.sleep(1)\n", encoding="utf-8")
+    page.write_text("def add_callback():\n    pass\n\ndef save_job():\n    import time\n    time.sleep(5)\n", encoding="utf-8")
+
+    audit = flash.sleep_audit(root=str(tmp_path)).set_index(["파일", "함수"])
+
+    assert audit["제거된 대기(초)"].to_dict() == {
+        ("2 요청.py", "(모듈)"): 2.0, ("2 요청.py", "add_callback"): 1.5,
+        ("2 요청.py", "save_job"): -5.0, ("Home.py", "(모듈)"): 1.5,
+    }
+    assert audit.loc[("Home.py", "(모듈)"), ["기존 호출", "남은 호출"]].tolist() == [2, 1]
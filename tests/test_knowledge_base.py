@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("langchain_community")
+pytest.importorskip("faiss")
+
+import knowledge_base
+
+
+def _write(root, name, text):
+    (root / name).write_text(text, encoding="utf-8")
+
+
+def test_incremental_update_embeds_only_changed_chunks(tmp_path):
+    root, index_dir = tmp_path / "app", tmp_path / "index"
+    root.mkdir()
+    _write(root, "a.md", "오전 당직 안내")
+    _write(root, "b.md", "방배정 요청 방법")
+
+    _, first = knowledge_base.load_vectorstore(provider="local", root=str(root), index_dir=str(index_dir))
+    assert (first["rebuilt"], first["embedded"]) == (True, 2)
+
+    _, unchanged = knowledge_base.load_vectorstore(provider="local", root=str(root), index_dir=str(index_dir))
+    assert (unchanged["rebuilt"], unchanged["embedded"], unchanged["removed"]) == (False, 0, 0)
+    assert unchanged["version"] == first["version"]
+
+    _write(root, "b.md", "스케줄 변경 요청 방법")
+    vectorstore, changed = knowledge_base.load_vectorstore(provider="local", root=str(root), index_dir=str(index_dir))
+    assert (changed["embedded"], changed["removed"]) == (1, 1)
+    assert len(vectorstore.index_to_docstore_id) == 2
+
+
+def test_crash_between_index_save_and_manifest_write_does_not_duplicate_chunks(tmp_path, monkeypatch):
+    root, index_dir = tmp_path / "app", tmp_path / "index"
+    root.mkdir()
+    _write(root, "a.md", "오전 당직 안내")
+    knowledge_base.load_vectorstore(provider="local", root=str(root), index_dir=str(index_dir))
+
+    _write(root, "b.md", "방배정 요청 방법")
+
+    def crash(index_dir, manifest):
+        raise OSError("매니페스트를 쓰기 전에 종료됨")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(knowledge_base, "_write_manifest", crash)
+        with pytest.raises(OSError):
+            knowledge_base.load_vectorstore(provider="local", root=str(root), index_dir=str(index_dir))
+
+    # 인덱스에는 b.md 조각이 이미 저장됐고 매니페스트는 예전 그대로인 상태
+    vectorstore, stats = knowledge_base.load_vectorstore(provider="local", root=str(root), index_dir=str(index_dir))
+    assert (stats["rebuilt"], stats["embedded"], stats["removed"]) == (False, 0, 0)
+    assert sorted(vectorstore.index_to_docstore_id.values()) == sorted(knowledge_base.split_documents(knowledge_base.collect_documents(str(root))))
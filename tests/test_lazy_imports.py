@@ -0,0 +1,43 @@
+import sys
+import threading
+
+import lazy_imports
+
+
+def test_first_access_from_many_threads_sees_a_fully_loaded_module(tmp_path, monkeypatch):
+    (tmp_path / "slow_module_for_lazy_test.py").write_text("import time\ntime.sleep(0.05)\nVALUE = 42\n", encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "slow_module_for_lazy_test", raising=False)
+
+    module = lazy_imports.lazy_module("slow_module_for_lazy_test")
+    value = lazy_imports.lazy_attrs("slow_module_for_lazy_test", "VALUE")
+    assert "slow_module_for_lazy_test" not in sys.modules
+
+    barrier = threading.Barrier(16)
+    seen, errors = [], []
+
+    def touch():
+        barrier.wait()
+        try:
+            seen.append((module.VALUE, value.real))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=touch) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert seen == [(42, 42)] * 16
+
+
+def test_lazy_module_returns_loaded_module_and_rejects_unknown_names():
+    assert lazy_imports.lazy_module("json") is sys.modules["json"]
+    try:
+        lazy_imports.lazy_module("no_such_module_for_lazy_test")
+    except ModuleNotFoundError as e:
+        assert e.name == "no_such_module_for_lazy_test"
+    else:
+        raise AssertionError("ModuleNotFoundError가 나야 합니다.")
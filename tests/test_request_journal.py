@@ -0,0 +1,71 @@
+import fake_sheets
+import request_journal
+
+
+def _base(*rows):
+    return [dict(zip(request_journal.REQUEST_COLUMNS, row)) for row in rows]
+
+
+def _log(request_id, op, name, category, date_info):
+    return {"요청ID": request_id, "시각": "2025-04-01 09:00:00", "작업": op, "이름": name, "분류": category, "날짜정보": date_info}
+
+
+ADD, DELETE = request_journal.OP_ADD, request_journal.OP_DELETE
+SUFFIX = request_journal.TOMBSTONE_SUFFIX
+
+
+def test_materialize_replays_adds_and_targeted_deletes():
+    base = _base(("김철수", "휴가", "2025-04-01"))
+    journal = [
+        _log("a1", ADD, "이영희", "보충 불가", "2025-04-02"),
+        _log("a2", ADD, "박민수", "휴가", "2025-04-03"),
+        _log("a1" + SUFFIX, DELETE, "이영희", "보충 불가", "2025-04-02"),
+        _log("x9", DELETE, "김철수", "휴가", "2025-04-01"),    # 기준 시트 요청은 내용으로 지움
+    ]
+
+    assert request_journal.materialize(base, journal) == _base(("박민수", "휴가", "2025-04-03"))
+    assert request_journal.materialize(base, journal, with_ids=True) == [
+        {"이름": "박민수", "분류": "휴가", "날짜정보": "2025-04-03", "요청ID": "a2"},
+    ]
+
+
+def test_materialize_is_idempotent_for_resent_and_compacted_adds():
+    journal = [
+        _log("a1", ADD, "이영희", "휴가", "2025-04-02"),
+        _log("a1", ADD, "이영희", "휴가", "2025-04-02"),    # write-behind 재전송
+    ]
+    assert request_journal.materialize([], journal) == _base(("이영희", "휴가", "2025-04-02"))
+
+    # 기준 시트에 이미 반영된 뒤 로그 삭제 전에 실패한 경우: 다시 재생해도 한 건
+    compacted = _base(("이영희", "휴가", "2025-04-02"))
+    assert request_journal.materialize(compacted, journal) == compacted
+    assert request_journal.materialize(compacted, journal + [_log("a1" + SUFFIX, DELETE, "이영희", "휴가", "2025-04-02")]) == []
+
+
+def test_materialize_delete_removes_only_one_matching_base_request():
+    base = _base(("김철수", "휴가", "2025-04-01"), ("김철수", "휴가", "2025-04-01"))
+    journal = [_log("x1", DELETE, "김철수", "휴가", "2025-04-01")]
+    assert request_journal.materialize(base, journal) == base[:1]
+
+
+def test_compact_rewrites_base_and_removes_only_applied_journal_rows():
+    header = request_journal.REQUEST_COLUMNS
+    journal_header = request_journal.JOURNAL_COLUMNS
+    sheet = fake_sheets.FakeSpreadsheet({
+        "요청": [header, ["김철수", "휴가", "2025-04-01"], ["박민수", "휴가", "2025-04-05"]],
+        "요청 로그": [
+            journal_header,
+            ["a1", "2025-04-01 09:00:00", ADD, "이영희", "휴가", "2025-04-02"],
+            ["x1", "2025-04-01 09:01:00", DELETE, "김철수", "휴가", "2025-04-01"],
+            ["x2", "2025-04-01 09:02:00", DELETE, "박민수", "휴가", "2025-04-05"],
+        ],
+    })
+
+    current = request_journal.compact(sheet, "요청")
+
+    expected = _base(("이영희", "휴가", "2025-04-02"))
+    assert current == expected
+    values = sheet.values()
+    assert values["요청"] == [header, ["이영희", "휴가", "2025-04-02"]]
+    assert values["요청 로그"] == [journal_header]
+    assert request_journal.compact(sheet, "요청") == expected
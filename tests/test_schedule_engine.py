@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+import schedule_engine
+
+
+def _adjustment_frame():
+    rows = [
+        ('2025-04-01', '오전', '김철수', '보충', '🟡 노란색', ''),
+        ('2025-04-03', '오전', '김철수', '휴근', '🔴 빨간색', ''),
+        ('2025-04-07', '오전', '김철수', '보충', '🟡 노란색', ''),    # 짝이 없는 두 번째 보충
+        ('2025-04-02', '오후', '이영희', '휴근', '🔴 빨간색', ''),
+        ('2025-04-02', '오후', '이영희', '휴근', '🔴 빨간색', ''),    # 같은 날짜 중복
+        ('2025-04-09', '오후', '이영희', '보충', '🟡 노란색', ''),
+        ('2025-04-10', '오후', '이영희', '보충', '🟡 노란색', ''),
+        ('2025-04-05', '오전', np.nan, '보충', '🟡 노란색', ''),      # 근무자 없음
+        ('2025-04-06', '오전', np.nan, '휴근', '🔴 빨간색', ''),
+        ('2025-04-04', '오전', '김철수', '근무', '기본', ''),
+        ('2025-04-08', '오후', '김철수', '휴근', '🔴 빨간색', ''),    # 다른 시간대
+    ]
+    df = pd.DataFrame(rows, columns=['날짜', '시간대', '근무자', '상태', '색상', '메모'])
+    # 정렬되지 않은 비기본 인덱스에서도 행 위치로 갱신되는지 확인
+    df.index = [10 * i + 3 for i in reversed(range(len(df)))]
+    return df
+
+
+def test_replace_adjustments_golden():
+    result = schedule_engine.replace_adjustments(_adjustment_frame())
+
+    assert result['상태'].tolist() == [
+        '대체보충', '대체휴근', '보충',
+        '대체휴근', '대체휴근', '대체보충', '대체보충',
+        '보충', '휴근', '근무', '휴근',
+    ]
+    assert result['색상'].tolist() == [
+        '🟢 초록색', '🔵 파란색', '🟡 노란색',
+        '🔵 파란색', '🔵 파란색', '🟢 초록색', '🟢 초록색',
+        '🟡 노란색', '🔴 빨간색', '기본', '🔴 빨간색',
+    ]
+    assert result['메모'].tolist() == [
+        '4/3에서 대체됨', '4/1로 대체함', '',
+        '4/9로 대체함', '4/9로 대체함', '4/2에서 대체됨', '4/2에서 대체됨',
+        '', '', '', '',
+    ]
+    assert result.index.tolist() == _adjustment_frame().index.tolist()
+
+
+def test_replace_adjustments_adds_memo_column_only_when_matched():
+    df = _adjustment_frame().drop(columns='메모')
+    result = schedule_engine.replace_adjustments(df)
+    assert result.loc[result['상태'] == '보충', '메모'].isna().all()
+    assert (result.loc[result['상태'] == '대체보충', '메모'] == ['4/3에서 대체됨', '4/2에서 대체됨', '4/2에서 대체됨']).all()
+
+    unmatched = _adjustment_frame().iloc[[0, 2, 9]].drop(columns='메모')
+    assert schedule_engine.replace_adjustments(unmatched.copy()).equals(unmatched)
+
+
+def _typed(df):
+    return df.astype({
+        '날짜': 'datetime64[ns]', '시간대': 'category', '근무자': 'category', '상태': 'category',
+        '색상': pd.CategoricalDtype(['🟡 노란색', '🔴 빨간색', '기본', '🟢 초록색', '🔵 파란색']),
+    })
+
+
+def test_replace_adjustments_on_typed_frame_matches_string_frame():
+    expected = schedule_engine.replace_adjustments(_adjustment_frame())
+    df = _typed(_adjustment_frame())
+    df['상태'] = df['상태'].cat.add_categories(['대체보충', '대체휴근'])
+    result = schedule_engine.replace_adjustments(df)
+
+    assert isinstance(result['상태'].dtype, pd.CategoricalDtype)
+    for col in ['상태', '색상', '메모']:
+        assert result[col].astype(object).tolist() == expected[col].tolist()
+
+
+def test_calculate_weekly_counts_ignores_unobserved_categories():
+    df = pd.DataFrame({
+        '날짜': ['2025-04-01', '2025-04-02', '2025-04-08', '2025-04-08'],
+        '주차': [1, 1, 2, 2],
+        '시간대': pd.Categorical(['오전', '오후', '오전', '오전'], categories=['오전', '오후', '오전당직']),
+        '근무자': pd.Categorical(['김철수', '김철수', '이영희', '박지민'], categories=['김철수', '이영희', '박지민', '최민수']),
+        '상태': pd.Categorical(['근무', '보충', '근무', '휴근']),
+    })
+    counts = schedule_engine.calculate_weekly_counts(df, ['김철수', '이영희'], {})
+    assert counts.weeks == ()
+
+    week_numbers = {pd.Timestamp(d).date(): w for d, w in [('2025-04-01', 1), ('2025-04-02', 1), ('2025-04-08', 2)]}
+    counts = schedule_engine.calculate_weekly_counts(df, ['김철수', '이영희'], week_numbers)
+    assert counts['김철수']['오전'][1] == 1 and counts['김철수']['오후'][1] == 1
+    assert counts['이영희']['오전'][2] == 1
+    assert counts.array.sum() == 3
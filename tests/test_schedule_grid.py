@@ -0,0 +1,47 @@
+import pandas as pd
+
+import schedule_grid
+
+
+def test_month_frame_labels_and_weekdays():
+    frame = schedule_grid.month_frame('2025-04-01', '2025-04-03')
+    assert frame['날짜키'].tolist() == ['2025-04-01', '2025-04-02', '2025-04-03']
+    assert frame['날짜'].tolist() == ['4월 1일', '4월 2일', '4월 3일']
+    assert frame['요일'].tolist() == ['화', '수', '목']
+
+
+def test_rank_within_uses_order_then_row_order():
+    df = pd.DataFrame({'날짜': ['d1', 'd1', 'd2', 'd1'], '근무자': ['C', 'A', 'B', 'B']})
+    assert schedule_grid.rank_within(df, ['날짜'])['순위'].tolist() == [0, 1, 0, 2]
+    ranked = schedule_grid.rank_within(df, ['날짜'], order=['근무자'])
+    assert ranked['순위'].sort_index().tolist() == [2, 0, 0, 1]
+
+
+def test_long_to_wide_and_back_round_trip():
+    columns = schedule_grid.am_columns(2) + schedule_grid.pm_columns(1)
+    df_long = pd.DataFrame({
+        '날짜': ['d1', 'd1', 'd1', 'd2', 'd2'],
+        '열': ['1', '1', '오후1', '2', '없는열'],
+        '근무자': ['A', 'X', 'B', 'C', 'Z'],
+    })
+
+    wide = schedule_grid.long_to_wide(df_long, '날짜', '열', '근무자', ['d1', 'd2', 'd3'], columns)
+
+    assert wide.columns.tolist() == ['1', '2', '오후1']
+    assert wide.values.tolist() == [['A', '', 'B'], ['', 'C', ''], ['', '', '']]
+
+    back = schedule_grid.wide_to_long(wide, columns + ['없는열'], value_name='근무자')
+    assert back[['행', '열', '열순서']].head(3).values.tolist() == [['d1', '1', 0], ['d1', '2', 1], ['d1', '오후1', 2]]
+    assert back.loc[back['근무자'] != '', ['행', '열', '근무자']].values.tolist() == [
+        ['d1', '1', 'A'], ['d1', '오후1', 'B'], ['d2', '2', 'C'],
+    ]
+
+
+def test_first_rows_by_aligns_to_labels():
+    df = pd.DataFrame({'날짜': ['d2', 'd1', 'd2'], '값': [1, 2, 3]})
+    rows, found = schedule_grid.first_rows_by(df, '날짜', ['d1', 'd2', 'd3'])
+    assert rows['값'].tolist()[:2] == [2, 1]
+    assert found.tolist() == [True, True, False]
+
+    empty_rows, empty_found = schedule_grid.first_rows_by(pd.DataFrame(), '날짜', ['d1'])
+    assert empty_rows.index.tolist() == ['d1'] and empty_found.tolist() == [False]
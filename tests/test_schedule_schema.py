@@ -0,0 +1,53 @@
+import pandas as pd
+
+import schedule_schema
+
+
+def _row(date, time_slot, worker, status='근무', color='기본'):
+    return {'날짜': date, '요일': '화', '주차': 1, '시간대': time_slot, '근무자': worker,
+            '상태': status, '메모': '', '색상': color}
+
+
+def test_typed_schedule_frame_round_trips_to_string_frame():
+    rows = [_row('2025-04-01', '오전', '김철수'), _row('2025-04-01', '오후', '이영희', '보충', '🟡 노란색'),
+            _row('2025-04-02', '오전', '신입', '특근', '새 색상')]  # 처음 보는 이름/상태/색상
+    typed = schedule_schema.empty_schedule_frame(['김철수', '이영희'])
+    plain = pd.DataFrame(columns=schedule_schema.SCHEDULE_COLUMNS)
+    for row in rows:
+        typed = schedule_schema.append_schedule_row(typed, row)
+        plain = schedule_schema.append_schedule_row(plain, row)
+
+    assert str(typed['날짜'].dtype) == 'datetime64[ns]'
+    assert all(isinstance(typed[col].dtype, pd.CategoricalDtype) for col in ['시간대', '근무자', '상태', '색상'])
+    assert '신입' in typed['근무자'].cat.categories and '특근' in typed['상태'].cat.categories
+    assert schedule_schema.schedule_to_strings(typed).equals(plain)
+
+
+def test_find_schedule_rows_matches_on_typed_and_string_frames():
+    typed = schedule_schema.empty_schedule_frame(['김철수', '이영희'])
+    for row in [_row('2025-04-01', '오전', '김철수'), _row('2025-04-01', '오후', '김철수'), _row('2025-04-02', '오전', '김철수')]:
+        typed = schedule_schema.append_schedule_row(typed, row)
+    plain = schedule_schema.schedule_to_strings(typed)
+
+    for df in (typed, plain):
+        assert schedule_schema.find_schedule_rows(df, '2025-04-01', '오후', '김철수') == [1]
+        assert schedule_schema.find_schedule_rows(df, '2025-04-02', '오전', '이영희') == []
+        assert schedule_schema.find_schedule_rows(df, '2025-04-02', '오전', '없는사람') == []
+
+    typed = schedule_schema.add_schedule_categories(typed, {'상태': '휴근', '메모': '무시'})
+    typed.loc[[0], ['상태']] = ['휴근']
+    assert typed['상태'].tolist() == ['휴근', '근무', '근무']
+
+
+def test_room_assignments_long_skips_blanks_and_excluded_dates():
+    df_room = pd.DataFrame({
+        '날짜': ['4월 1일', '4월 2일', '4월 5일'],
+        '요일': ['화', '수', '토'],
+        '8:30(1)': ['김철수', '', '박지민'],
+        '13:30(2)_당직': ['이영희', None, '박지민'],
+    })
+    long = schedule_schema.room_assignments_long(df_room, ['8:30(1)', '13:30(2)_당직'], 2025, exclude_dates=['4월 5일'])
+
+    assert long['날짜'].dt.strftime('%Y-%m-%d').tolist() == ['2025-04-01', '2025-04-01']
+    assert long['슬롯'].cat.categories.tolist() == ['8:30(1)', '13:30(2)_당직']
+    assert list(zip(long['슬롯'], long['근무자'])) == [('8:30(1)', '김철수'), ('13:30(2)_당직', '이영희')]
@@ -0,0 +1,66 @@
+import pandas as pd
+
+import swap_engine
+
+
+def _requests(*pairs, slot='오전'):
+    return pd.DataFrame({
+        '변경 요청': [f"{before} ➡️ {after}" for before, after in pairs],
+        '변경 요청한 스케줄': [f"2025-04-01 ({slot})"] * len(pairs),
+    })
+
+
+def test_parse_swap_requests_skips_malformed_rows():
+    df = pd.DataFrame({
+        '변경 요청': ['김철수 ➡️ 이영희', '화살표 없음', '박민수 ➡️ 최지우', '정하나 ➡️ 한두리'],
+        '변경 요청한 스케줄': ['2025-04-01 (오전)', '2025-04-02 (오후)', '날짜 없음', '2025-04-03 (오후)'],
+    })
+    parsed = swap_engine.parse_swap_requests(df, '변경 요청한 스케줄')
+
+    assert parsed['순번'].tolist() == [0, 3]
+    assert parsed['변경 전'].tolist() == ['김철수', '정하나']
+    assert parsed['변경 후'].tolist() == ['이영희', '한두리']
+    assert parsed['날짜표시'].tolist() == ['4월 1일', '4월 3일']
+    assert parsed['슬롯'].tolist() == ['오전', '오후']
+    assert swap_engine.parse_swap_requests(df, '없는 열').empty
+
+
+def test_plan_swaps_orders_chains_and_rejects_conflicts():
+    parsed = swap_engine.parse_swap_requests(
+        _requests(('A', 'B'), ('B', 'C'), ('A', 'B'), ('D', 'C'), ('E', 'F'), ('F', 'E')),
+        '변경 요청한 스케줄',
+    )
+
+    plan = swap_engine.plan_swaps(parsed)
+    # 여러 명이 근무하는 시간대는 사슬 끝(B→C)부터 적용합니다.
+    assert plan.order == [1, 0]
+    assert set(plan.rejected) == {2, 3, 4, 5}
+    assert '같은 요청' in plan.rejected[2]
+    assert '이중 배정' in plan.rejected[3]
+    assert '순환' in plan.rejected[4] and '순환' in plan.rejected[5]
+
+    assert swap_engine.plan_swaps(parsed, handoff=True).order == [0, 1]
+
+
+def test_apply_swap_requests_writes_only_changed_columns():
+    df = pd.DataFrame({'날짜': ['4월 1일', '4월 2일'], '오전1': ['A', 'A'], '오전2': ['B', 'C'], '비고': [1, 2]})
+    parsed = swap_engine.parse_swap_requests(_requests(('A', 'B'), ('B', 'C'), ('X', 'Y')), '변경 요청한 스케줄')
+
+    def apply_one(grid, row):
+        target = grid.row(row['날짜표시'])
+        cols = grid.find(target, row['변경 전'])
+        if row['변경 전'] == 'X':
+            raise ValueError('boom')
+        if not cols or row['변경 후'] in grid.people(target, ['오전1', '오전2']):
+            return swap_engine.REJECTED, None
+        grid.set(target, cols[0], row['변경 후'])
+        return swap_engine.APPLIED, cols[0]
+
+    result, outcomes = swap_engine.apply_swap_requests(df, parsed, ['오전1', '오전2', '없는 열'], apply_one)
+
+    assert result['오전1'].tolist() == ['B', 'A']
+    assert result['오전2'].tolist() == ['C', 'C']
+    assert result['비고'].dtype == df['비고'].dtype
+    assert df['오전1'].tolist() == ['A', 'A']
+    statuses = [(row['순번'], status) for row, status, _ in outcomes]
+    assert statuses == [(0, swap_engine.APPLIED), (1, swap_engine.APPLIED), (2, swap_engine.FAILED)]
@@ -0,0 +1,82 @@
+import types
+
+import pandas as pd
+import pytest
+
+import versioned_memo
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    versioned_memo.clear()
+    versioned_memo.stats.update(hits=0, misses=0, evicted=0)
+    yield
+    versioned_memo.clear()
+
+
+def _counting(value):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return value
+    return compute, calls
+
+
+def test_hit_and_miss_per_version_and_key():
+    version = versioned_memo.new_version("시트")
+    compute, calls = _counting([1, 2])
+
+    assert versioned_memo.memoize(version, "김철수", compute) == (1, 2)
+    assert versioned_memo.memoize(version, "김철수", compute) == (1, 2)
+    assert len(calls) == 1
+    assert versioned_memo.stats["hits"] == 1 and versioned_memo.stats["misses"] == 1
+
+    versioned_memo.memoize(version, "이영희", compute)
+    assert len(calls) == 2
+    assert versioned_memo.stats["misses"] == 2
+
+
+def test_new_version_invalidates_previous_results():
+    first = versioned_memo.new_version("시트")
+    second = versioned_memo.new_version("시트")
+    assert first != second and first[0] == second[0] == "시트"
+
+    assert versioned_memo.memoize(first, "키", lambda: "이전") == "이전"
+    assert versioned_memo.memoize(second, "키", lambda: "새 값") == "새 값"
+    assert versioned_memo.stats["misses"] == 2 and versioned_memo.stats["hits"] == 0
+
+
+def test_lru_evicts_least_recently_used_entry():
+    version = versioned_memo.new_version("시트")
+    for key in ("a", "b"):
+        versioned_memo.memoize(version, key, lambda: key, max_entries=2)
+    versioned_memo.memoize(version, "a", lambda: "다시 계산", max_entries=2)  # a를 최근 사용으로
+    versioned_memo.memoize(version, "c", lambda: "c", max_entries=2)
+
+    assert versioned_memo.stats["evicted"] == 1
+    assert versioned_memo.memoize(version, "a", lambda: "다시 계산", max_entries=2) == "a"
+    assert versioned_memo.memoize(version, "b", lambda: "다시 계산", max_entries=2) == "다시 계산"
+
+
+def test_results_are_frozen_snapshots():
+    version = versioned_memo.new_version("시트")
+    value = versioned_memo.memoize(version, "키", lambda: {"이름": ["김철수"], "날짜": {"2025-10-01"}})
+
+    assert isinstance(value, types.MappingProxyType)
+    assert value["이름"] == ("김철수",)
+    assert value["날짜"] == frozenset({"2025-10-01"})
+    with pytest.raises(TypeError):
+        value["이름"] = []
+
+
+def test_frames_are_returned_as_copies():
+    version = versioned_memo.new_version("시트")
+    compute = lambda: pd.DataFrame({"횟수": [1, 2]})
+
+    first = versioned_memo.memoize(version, "표", compute)
+    first.loc[0, "횟수"] = 99
+    second = versioned_memo.memoize(version, "표", compute)
+
+    assert second["횟수"].tolist() == [1, 2]
+    assert second is not first
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import fake_sheets
+import write_behind
+
+HEADER = ["요청ID", "이름"]
+
+
+def _queue(tmp_path, spreadsheet):
+    # 백그라운드 플러시가 끼어들지 않도록 주기를 길게 두고 테스트에서 직접 flush()합니다.
+    return write_behind.WriteBehindQueue(lambda: fake_sheets.FakeClient(spreadsheet),
+                                         buffer_path=str(tmp_path / "pending.jsonl"), interval=3600)
+
+
+def test_flush_appends_per_worksheet_and_keeps_recent_rows(tmp_path):
+    spreadsheet = fake_sheets.FakeSpreadsheet()
+    queue = _queue(tmp_path, spreadsheet)
+    queue.submit(fake_sheets.FAKE_URL, "로그", ["a1", "김철수"], header=HEADER)
+    queue.submit(fake_sheets.FAKE_URL + "#gid=0", "로그", ["a2", "이영희"], header=HEADER)
+
+    assert queue.flush() == 2
+    assert spreadsheet.values()["로그"] == [HEADER, ["a1", "김철수"], ["a2", "이영희"]]
+    assert queue.pending_count() == 0
+    assert queue.rows(fake_sheets.FAKE_URL, "로그") == [["a1", "김철수"], ["a2", "이영희"]]
+    assert (tmp_path / "pending.jsonl").read_text(encoding="utf-8") == ""
+
+
+def test_pending_rows_survive_restart(tmp_path):
+    spreadsheet = fake_sheets.FakeSpreadsheet()
+    _queue(tmp_path, spreadsheet).submit(fake_sheets.FAKE_URL, "로그", ["a1", "김철수"], header=HEADER)
+    with open(tmp_path / "pending.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"id": "잘린 줄')
+
+    restarted = _queue(tmp_path, spreadsheet)
+    assert restarted.pending_count() == 1
+    assert restarted.flush() == 1
+    assert spreadsheet.values()["로그"][1:] == [["a1", "김철수"]]
+
+
+def test_failing_worksheet_backs_off_without_blocking_others(tmp_path):
+    spreadsheet = fake_sheets.FakeSpreadsheet()
+    queue = _queue(tmp_path, spreadsheet)
+    queue.submit(fake_sheets.FAKE_URL, "없는 시트", ["x"])    # header가 없으면 만들지 않으므로 실패
+    queue.submit(fake_sheets.FAKE_URL, "로그", ["a1", "김철수"], header=HEADER)
+
+    assert queue.flush() == 1
+    assert spreadsheet.values()["로그"][1:] == [["a1", "김철수"]]
+    failures = queue.failures()
+    assert [(f["워크시트"], f["대기 행"], f["연속 실패"]) for f in failures] == [("없는 시트", 1, 1)]
+
+    calls = spreadsheet.stats["read"]
+    assert queue.flush() == 0    # 백오프 중이라 다시 요청하지 않음
+    assert spreadsheet.stats["read"] == calls
+    assert queue.pending_count() == 1
+
+
+def test_cancel_does_not_count_rows_being_written(tmp_path):
+    spreadsheet = fake_sheets.FakeSpreadsheet({"로그": [HEADER]})
+    worksheet = spreadsheet.worksheet("로그")
+    started, release = threading.Event(), threading.Event()
+    append_rows = worksheet.append_rows
+
+    def slow_append_rows(values, **kwargs):
+        started.set()
+        release.wait(5)
+        return append_rows(values, **kwargs)
+
+    worksheet.append_rows = slow_append_rows
+    queue = _queue(tmp_path, spreadsheet)
+    queue.submit(fake_sheets.FAKE_URL, "로그", ["a1", "김철수"], header=HEADER)
+    flusher = threading.Thread(target=queue.flush)
+    flusher.start()
+    assert started.wait(5)
+
+    result = []
+    canceller = threading.Thread(target=lambda: result.append(queue.cancel(fake_sheets.FAKE_URL, "로그", lambda row: row[0] == "a1")))
+    canceller.start()
+    time.sleep(0.1)
+    assert canceller.is_alive()    # 쓰는 중인 행은 플러시가 끝날 때까지 기다림
+    release.set()
+    flusher.join(5)
+    canceller.join(5)
+
+    # 시트에 이미 쓰였으므로 취소 개수에 넣지 않고, 호출한 쪽이 시트에서 지우도록 0을 돌려줌
+    assert result == [0]
+    assert spreadsheet.values()["로그"][1:] == [["a1", "김철수"]]
+    assert queue.rows(fake_sheets.FAKE_URL, "로그") == []
+
+
+def test_cancel_removes_queued_rows(tmp_path):
+    queue = _queue(tmp_path, fake_sheets.FakeSpreadsheet())
+    queue.submit(fake_sheets.FAKE_URL, "로그", ["a1", "김철수"], header=HEADER)
+    queue.submit(fake_sheets.FAKE_URL, "로그", ["a2", "이영희"], header=HEADER)
+
+    assert queue.cancel(fake_sheets.FAKE_URL, "로그", lambda row: row[1] == "김철수") == 1
+    assert queue.rows(fake_sheets.FAKE_URL, "로그") == [["a2", "이영희"]]
+    assert len(_queue(tmp_path, fake_sheets.FakeSpreadsheet()).rows(fake_sheets.FAKE_URL, "로그")) == 1
+
+
+def test_merge_rows_skips_keys_already_read():
+    records = [{"요청ID": "a1", "이름": "김철수"}]
+    merged = write_behind.merge_rows(records, HEADER, [["a1", "김철수"], ["a2", "이영희"], ["a2", "이영희"]], key="요청ID")
+    assert merged == records + [{"요청ID": "a2", "이름": "이영희"}]
@@ -0,0 +1,66 @@
+import threading
+from collections import OrderedDict
+from itertools import count
+from types import MappingProxyType
+
+import pandas as pd
+
+DEFAULT_MAX_ENTRIES = 256
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_loads = count(1)
+stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+
+def new_version(source):
+    """불러온 데이터에 붙일 버전 키 (source, 로드 번호).
+
+    source는 시트 이름처럼 데이터 출처를 나타내는 작은 값이며, 데이터를 다시 불러올 때마다 새 번호를 받으므로
+    이전 로드에서 계산한 결과는 다시 쓰이지 않습니다. (내용 해시 없이 무효화)
+    """
+    return (source, next(_loads))
+
+
+def freeze(value):
+    """결과를 바꿀 수 없는 스냅샷으로 바꿉니다. (list→tuple, dict→읽기 전용 dict, set→frozenset)"""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def _snapshot(value):
+    # DataFrame/Series는 불변으로 만들 수 없으므로 꺼낼 때마다 복사본을 줍니다.
+    return value.copy() if isinstance(value, (pd.DataFrame, pd.Series)) else value
+
+
+def memoize(version, key, compute, max_entries=DEFAULT_MAX_ENTRIES):
+    """(version, key)별로 compute() 결과를 한 번만 계산해 스냅샷으로 돌려줍니다.
+
+    st.cache_data와 달리 큰 DataFrame 인자를 매 호출 해시하지 않고, 호출하는 쪽이 넘긴 작은 버전 키(new_version)와
+    key(이름·날짜 같은 작은 값)만으로 찾습니다. 모든 세션이 함께 쓰며, LRU(max_entries)로 오래된 항목을 내보냅니다.
+    """
+    cache_key = (version, key)
+    with _lock:
+        if cache_key in _entries:
+            _entries.move_to_end(cache_key)
+            stats["hits"] += 1
+            return _snapshot(_entries[cache_key])
+        stats["misses"] += 1
+    value = freeze(compute())
+    with _lock:
+        _entries[cache_key] = value
+        _entries.move_to_end(cache_key)
+        while len(_entries) > max_entries:
+            _entries.popitem(last=False)
+            stats["evicted"] += 1
+    return _snapshot(value)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
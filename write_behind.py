@@ -0,0 +1,252 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+import gspread
+import pandas as pd
+import streamlit as st
+from google.oauth2.service_account import Credentials
+
+import sheet_ops
+
+BUFFER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".write_behind", "pending.jsonl")
+FLUSH_INTERVAL_SECONDS = 3.0
+MAX_BACKOFF_SECONDS = 60.0
+RECENT_SECONDS = 60.0
+
+logger = logging.getLogger(__name__)
+
+
+def _sheet_key(url):
+    """같은 스프레드시트의 다른 URL 표기(/edit#gid=... 등)를 하나의 키로 맞춥니다."""
+    try:
+        return gspread.utils.extract_id_from_url(url)
+    except gspread.exceptions.NoValidUrlKeyFound:
+        return url
+
+
+def _default_client():
+    scope = ["https://www.googleapis.com/auth/spreadsheets"]
+    service_account_info = dict(st.secrets["gspread"])
+    service_account_info["private_key"] = service_account_info["private_key"].replace("\\n", "\n")
+    credentials = Credentials.from_service_account_info(service_account_info, scopes=scope)
+    return gspread.authorize(credentials)
+
+
+class WriteBehindQueue:
+    """사용자 제출 행을 로컬 버퍼에 먼저 기록하고, 백그라운드에서 시트별로 모아 append_rows로 반영합니다.
+
+    submit()은 버퍼 파일에 한 줄을 fsync한 뒤 바로 반환하므로 화면은 시트 응답을 기다리지 않습니다.
+    플러시는 FLUSH_INTERVAL_SECONDS마다 (시트 URL, 워크시트)별로 한 번의 append_rows를 보내고,
+    실패한 워크시트만 지수 백오프로 재시도합니다. (한 워크시트의 실패가 다른 워크시트를 막지 않음) 프로세스가 죽어도 버퍼 파일에 남은 행은 다음 시작 시 다시 보냅니다.
+    """
+
+    def __init__(self, client_factory=_default_client, buffer_path=BUFFER_PATH, interval=FLUSH_INTERVAL_SECONDS):
+        self.buffer_path = buffer_path
+        self.interval = interval
+        self._client_factory = client_factory
+        self._client = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._recent = []
+        self._inflight = set()
+        self._failed = {}
+        self.stats = {"submitted": 0, "flushed_rows": 0, "api_calls": 0, "failures": 0}
+        os.makedirs(os.path.dirname(self.buffer_path), exist_ok=True)
+        self._replay()
+        self._thread = threading.Thread(target=self._loop, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def submit(self, url, worksheet_title, row, header=None):
+        """행 하나를 큐에 넣고 항목 ID를 반환합니다. header가 있으면 시트가 없을 때 이 헤더로 만듭니다."""
+        entry = {"id": uuid.uuid4().hex, "url": _sheet_key(url), "worksheet": worksheet_title,
+                 "row": [("" if v is None else v) for v in row], "header": header, "queued_at": time.time()}
+        with self._lock:
+            with open(self.buffer_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending.append(entry)
+            self.stats["submitted"] += 1
+        return entry["id"]
+
+    def cancel(self, url, worksheet_title, predicate):
+        """predicate(row)가 참인 행을 큐에서 취소합니다. 아직 시트에 쓰이지 않아 취소된 개수를 반환합니다.
+
+        지금 시트에 쓰는 중인 행은 취소하지 않고 그 플러시가 끝나기를 기다립니다. 쓰였으면 세지 않으므로
+        0이면 호출한 쪽이 시트에서 지워야 하고, 이미 반영된 최근 행도 rows() 결과에서 빠집니다.
+        """
+        url = _sheet_key(url)
+
+        def matches(e):
+            return e["url"] == url and e["worksheet"] == worksheet_title and predicate(e["row"])
+
+        while True:
+            with self._lock:
+                if not any(matches(e) and e["id"] in self._inflight for e in self._pending):
+                    keep = [e for e in self._pending if not matches(e)]
+                    cancelled = len(self._pending) - len(keep)
+                    self._recent = [e for e in self._recent if not matches(e)]
+                    if cancelled:
+                        self._pending = keep
+                        self._rewrite_buffer()
+                    return cancelled
+            # 쓰는 중인 플러시가 끝나면 성공한 행은 _pending에서 빠지고, 실패한 행은 다시 취소할 수 있습니다.
+            with self._flush_lock:
+                pass
+
+    def rows(self, url, worksheet_title):
+        """대기 중이거나 최근(RECENT_SECONDS 이내)에 반영된 행. 시트 읽기 결과에 합쳐 '내가 쓴 값'을 바로 보여줄 때 사용합니다."""
+        url = _sheet_key(url)
+        cutoff = time.time() - RECENT_SECONDS
+        with self._lock:
+            entries = [e for e in self._recent if e["flushed_at"] >= cutoff] + self._pending
+            return [list(e["row"]) for e in entries if e["url"] == url and e["worksheet"] == worksheet_title]
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """대기 중인 행을 워크시트별로 한 번씩 append_rows 합니다. (백오프 중인 워크시트는 건너뜀)"""
+        with self._flush_lock:
+            now = time.time()
+            with self._lock:
+                batch = [e for e in self._pending
+                         if self._failed.get((e["url"], e["worksheet"]), {}).get("retry_at", 0.0) <= now]
+                self._inflight = {e["id"] for e in batch}
+            done_ids = set()
+            try:
+                groups = {}
+                for entry in batch:
+                    groups.setdefault((entry["url"], entry["worksheet"]), []).append(entry)
+                if groups and self._client is None:
+                    try:
+                        self._client = self._client_factory()
+                    except Exception as e:
+                        for group, entries in groups.items():
+                            self._record_failure(group, entries, e)
+                        return 0
+                for group, entries in groups.items():
+                    url, title = group
+                    try:
+                        worksheet = self._get_worksheet(url, title, entries[0]["header"])
+                        worksheet.append_rows([e["row"] for e in entries], value_input_option="RAW")
+                    except Exception as e:
+                        self._record_failure(group, entries, e)
+                        continue
+                    self.stats["api_calls"] += 1
+                    done_ids.update(e["id"] for e in entries)
+                    with self._lock:
+                        self._failed.pop(group, None)
+            finally:
+                now = time.time()
+                with self._lock:
+                    self._inflight = set()
+                    if done_ids:
+                        flushed = [e for e in self._pending if e["id"] in done_ids]
+                        self._pending = [e for e in self._pending if e["id"] not in done_ids]
+                        self._recent = [e for e in self._recent if e["flushed_at"] >= now - RECENT_SECONDS]
+                        self._recent += [dict(e, flushed_at=now) for e in flushed]
+                        self._rewrite_buffer()
+                self.stats["flushed_rows"] += len(done_ids)
+            return len(done_ids)
+
+    def _record_failure(self, group, entries, error):
+        """group(시트, 워크시트)의 실패를 기록하고, 그 워크시트만 지수 백오프로 미룹니다."""
+        self.stats["failures"] += 1
+        with self._lock:
+            previous = self._failed.get(group, {})
+            backoff = min(MAX_BACKOFF_SECONDS, max(self.interval, previous.get("backoff", 0.0) * 2))
+            self._failed[group] = {"failures": previous.get("failures", 0) + 1, "backoff": backoff,
+                                   "retry_at": time.time() + backoff, "error": f"{type(error).__name__}: {error}",
+                                   "rows": len(entries)}
+        logger.warning("write-behind: '%s'에 %d행 반영 실패 (%d회째, %.0f초 뒤 재시도): %s",
+                       group[1], len(entries), self._failed[group]["failures"], backoff, error)
+
+    def failures(self):
+        """반영에 실패하고 재시도 대기 중인 워크시트 목록. (관리자 화면 표시용)"""
+        with self._lock:
+            pending = {}
+            for e in self._pending:
+                pending[(e["url"], e["worksheet"])] = pending.get((e["url"], e["worksheet"]), 0) + 1
+            return [{"워크시트": title, "대기 행": pending.get((url, title), 0), "연속 실패": info["failures"],
+                     "다음 재시도": time.strftime("%H:%M:%S", time.localtime(info["retry_at"])), "마지막 오류": info["error"]}
+                    for (url, title), info in self._failed.items()]
+
+    def _get_worksheet(self, sheet_key, title, header):
+        spreadsheet = self._client.open_by_key(sheet_key)
+        self.stats["api_calls"] += 1
+        if not header:
+            return spreadsheet.worksheet(title)
+        # 사용자 페이지가 같은 시트를 동시에 처음 만들 수 있으므로 '이미 있음'이면 다시 가져옵니다.
+        return sheet_ops.get_or_create_worksheet(spreadsheet, title, header)
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+    def _replay(self):
+        if not os.path.exists(self.buffer_path):
+            return
+        with open(self.buffer_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    self._pending.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # 쓰는 도중 종료되어 잘린 마지막 줄
+                    continue
+
+    def _rewrite_buffer(self):
+        tmp_path = self.buffer_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self._pending:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.buffer_path)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    """프로세스 전체가 공유하는 쓰기 큐. (새로고침 버튼의 st.cache_resource.clear()에 영향받지 않도록 모듈 전역)"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = WriteBehindQueue()
+        return _queue
+
+
+def render_status():
+    """관리자용 사이드바 쓰기 대기열 상태. 시트 반영이 계속 실패하는 워크시트를 보여 줍니다."""
+    if _queue is None:
+        return
+    failures = _queue.failures()
+    pending = _queue.pending_count()
+    with st.sidebar.expander(f"📤 시트 쓰기 대기열{' ⚠️' if failures else ''}", expanded=bool(failures)):
+        st.caption(f"대기 {pending}행 · 반영 {_queue.stats['flushed_rows']}행 · 실패 {_queue.stats['failures']}회")
+        if failures:
+            st.dataframe(pd.DataFrame(failures), hide_index=True, use_container_width=True)
+
+
+def merge_rows(records, header, queued_rows, key):
+    """시트에서 읽은 records에 큐의 행(queued_rows)을 key 기준 중복 없이 덧붙입니다."""
+    seen = {str(r.get(key)) for r in records}
+    merged = list(records)
+    for row in queued_rows:
+        record = dict(zip(header, row))
+        if str(record.get(key)) not in seen:
+            seen.add(str(record.get(key)))
+            merged.append(record)
+    return merged